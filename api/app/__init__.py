@@ -11,11 +11,15 @@ from flask_admin import Admin, AdminIndexView, helpers, expose
 from flask_admin.contrib.sqla import ModelView
 import flask_login as login
 from wtforms import form, fields, validators
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
 import tldextract
 
 app = Flask(__name__)
 app.config.from_object('config')
+if app.config['PROXY_FIX_X_FOR']:
+    # Take the client's address from the X-Forwarded-For entries added by our own proxies only
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
 CORS(app, resources={r"/api/*": {"origins": "*"}}, supports_credentials=True)
 print((app.config['SQLALCHEMY_DATABASE_URI']))
 rest_api = restful.Api(app)
@@ -31,6 +35,17 @@ migrate = Migrate(app, db)
 manager = Manager(app)
 manager.add_command('db', MigrateCommand)
 
+from .outbox.worker import OutboxWorkerCommand
+manager.add_command('outbox_worker', OutboxWorkerCommand())
+from .campaigns.dispatch import ResumeCampaignsCommand
+manager.add_command('resume_campaigns', ResumeCampaignsCommand())
+from .reviews.commands import RebuildReviewProgressCommand
+manager.add_command('rebuild_review_progress', RebuildReviewProgressCommand())
+from .content.commands import RebuildContentPayloadsCommand
+manager.add_command('rebuild_content', RebuildContentPayloadsCommand())
+from .users.commands import BenchmarkPasswordHashingCommand
+manager.add_command('benchmark_password_hashing', BenchmarkPasswordHashingCommand())
+
 from .organisation.resolver import OrganisationResolver
 
 def get_domain():
@@ -81,6 +96,24 @@ def populate_organisation():
         LOGGER.info('Origin Domain: {}'.format(domain))  # TODO: Remove this after testing
         g.organisation = OrganisationResolver.resolve_from_domain(domain)
 
+@app.before_first_request
+def warm_email_template_cache():
+    from .email_template.repository import EmailRepository
+    try:
+        LOGGER.info('Cached {} email templates'.format(EmailRepository.warm_cache()))
+    except Exception as e:
+        LOGGER.warning('Could not warm the email template cache: {}'.format(e))
+        db.session.rollback()
+
+@app.before_first_request
+def build_content_payloads():
+    from .content.payloads import content_payloads
+    try:
+        LOGGER.info('Built {} content payloads'.format(content_payloads.build()))
+    except Exception as e:
+        LOGGER.warning('Could not build the content payloads: {}'.format(e))
+        db.session.rollback()
+
 ## Flask Admin Config
 
 # set optional bootswatch theme
@@ -93,6 +126,7 @@ from .outcome.models import Outcome
 from .events.models import Event, EventRole
 from app.utils.auth import auth_required, admin_required, generate_token
 from app.utils.errors import UNAUTHORIZED, FORBIDDEN
+from app.utils.passwords import password_hasher
 from .reviews.models import ReviewForm, ReviewQuestion
 from .registration.models import Offer, RegistrationForm, RegistrationSection, RegistrationQuestion, Registration, RegistrationAnswer
 from .invitationletter.models import InvitationTemplate, InvitationLetterRequest
@@ -108,7 +142,7 @@ class LoginForm(form.Form):
             raise validators.ValidationError('Invalid user')
 
 
-        if not bcrypt.check_password_hash(user.password, self.password.data):
+        if not password_hasher.check(user.password, self.password.data):
             raise validators.ValidationError('Invalid password')
 
         if not user.is_admin:
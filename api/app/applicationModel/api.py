@@ -5,13 +5,15 @@ import flask_restful as restful
 
 from flask_restful import reqparse, fields, marshal_with, marshal
 from sqlalchemy.exc import SQLAlchemyError
-from flask import g
+from flask import g, request, Response as FlaskResponse
 
 from app.applicationModel.models import ApplicationForm, Question, Section, SectionTranslation, QuestionTranslation
+from app.applicationModel.cache import application_form_cache, with_etag
 from app.events.repository import EventRepository as event_repository
 from app.applicationModel.repository import ApplicationFormRepository as application_form_repository
 from app.users.repository import UserRepository as user_repository
 from app.utils.auth import auth_required, event_admin_required
+from app.utils.identity import current_identity
 from app.utils.errors import APPLICATION_FORM_EXISTS, EVENT_NOT_FOUND, QUESTION_NOT_FOUND, SECTION_NOT_FOUND, DB_NOT_AVAILABLE, FORM_NOT_FOUND, APPLICATIONS_CLOSED
 
 from app import db, bcrypt
@@ -116,16 +118,24 @@ class ApplicationFormAPI(restful.Resource):
             if not form:
                 return FORM_NOT_FOUND
 
-            if not event.is_application_open and not user_repository.get_by_id(g.current_user['id']).is_event_admin(args['event_id']):
+            if not event.is_application_open and not current_identity().is_event_admin(args['event_id']):
                 return APPLICATIONS_CLOSED
-            
-            if not form.sections:
+
+            cached = application_form_cache.get(form.id, language, lambda: with_etag(get_form_fields(form, language)))
+            form_fields = cached['form']
+
+            if not form_fields['sections']:
                 return SECTION_NOT_FOUND
             
-            if not form.questions:
+            if not any(section['questions'] for section in form_fields['sections']):
                 return QUESTION_NOT_FOUND
 
-            return get_form_fields(form, language)
+            # Applicants revalidate the form they already have on every page of the wizard
+            headers = {'ETag': '"{}"'.format(cached['etag']), 'Cache-Control': 'private, no-cache'}
+            if request.if_none_match.contains(cached['etag']):
+                return FlaskResponse(status=304, headers=headers)
+
+            return form_fields, 200, headers
 
         except SQLAlchemyError as e:
             LOGGER.error("Database error encountered: {}".format(e))
@@ -228,6 +238,7 @@ class ApplicationFormDetailAPI(restful.Resource):
                 question.depends_on_question_id = question_id_map[question_data['depends_on_question_id']]
 
         app_form = application_form_repository.get_by_id(app_form.id)
+        application_form_cache.bump(app_form.id)
         return app_form, 201
 
     @event_admin_required
@@ -281,6 +292,7 @@ class ApplicationFormDetailAPI(restful.Resource):
                 # If ID is populated, then update the existing section
                 section = next((s for s in current_sections if s.id == section_data['id']), None)  # type: Section
                 if not section:
+                    application_form_cache.bump(app_form.id)
                     return SECTION_NOT_FOUND
 
                 current_translations = section.section_translations  # type: Sequence[SectionTranslation]
@@ -318,6 +330,7 @@ class ApplicationFormDetailAPI(restful.Resource):
                 question_data_map.update(question_map)
                 question_id_map.update(question_ids)
             except ValueError:
+                application_form_cache.bump(app_form.id)
                 return QUESTION_NOT_FOUND
 
         db.session.commit()
@@ -332,6 +345,7 @@ class ApplicationFormDetailAPI(restful.Resource):
                 question.depends_on_question_id = question_id_map[question_data['depends_on_question_id']]
 
         app_form = application_form_repository.get_by_id(app_form.id)
+        application_form_cache.bump(app_form.id)
 
         return app_form, 200
 
@@ -0,0 +1,28 @@
+"""Cache of the application forms shown to applicants.
+
+The application wizard loads its form on every page, and at deadline time thousands of applicants
+do so while the form itself doesn't change. application_form_cache keeps each form serialized per
+(form id, language, version), shared by the workers through Redis (see app.utils.shared_cache).
+The version is bumped whenever the form is saved or a question or section is deleted.
+
+Each cached form carries a strong ETag computed from its content, so browsers can revalidate the
+form they already have and be answered with a 304.
+"""
+
+import hashlib
+import json
+
+from app.utils.shared_cache import VersionedCache
+from config import APPLICATION_FORM_CACHE_TTL
+
+
+application_form_cache = VersionedCache('application_form', APPLICATION_FORM_CACHE_TTL)
+
+
+def with_etag(form_fields):
+    """The cached value of serialized form fields: the fields and their ETag."""
+    content = json.dumps(form_fields, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return {
+        'form': form_fields,
+        'etag': hashlib.sha256(content).hexdigest()[:32]
+    }
@@ -1,6 +1,7 @@
 from app import db, bcrypt
 import app
-from typing import Any, Callable, Mapping
+
+from app.utils.translations import TranslatedMixin
 
 
 class ApplicationForm(db.Model):
@@ -20,8 +21,9 @@ class ApplicationForm(db.Model):
         self.is_open = is_open
         self.nominations = nominations
 
-class Question(db.Model):
+class Question(TranslatedMixin, db.Model):
     __tablename__ = 'question'
+    __translations__ = 'question_translations'
 
     id = db.Column(db.Integer(), primary_key=True)
     application_form_id = db.Column(db.Integer(), db.ForeignKey('application_form.id'), nullable=False)
@@ -44,19 +46,9 @@ class Question(db.Model):
         self.is_required = is_required
         self.key = key
     
-    def get_translation(self, language: str) -> 'QuestionTranslation':
-        question_translation = self.question_translations.filter_by(language=language).first()
-        return question_translation
-    
     def is_review_identifier(self):
         return self.key == 'review-identifier'
 
-    def _translations_for_field(self, accessor_fn: Callable[['QuestionTranslation'], Any]) -> Mapping[str, Any]:
-        translations = {}
-        for translation in self.question_translations:
-            translations[translation.language] = accessor_fn(translation)
-        return translations
-
     @property
     def headline_translations(self):
         return self._translations_for_field(lambda q: q.headline)
@@ -85,8 +77,9 @@ class Question(db.Model):
     def show_for_values_translations(self):
         return self._translations_for_field(lambda q: q.show_for_values)
 
-class Section(db.Model):
+class Section(TranslatedMixin, db.Model):
     __tablename__ = 'section'
+    __translations__ = 'section_translations'
 
     id = db.Column(db.Integer(), primary_key=True)
     application_form_id = db.Column(db.Integer(), db.ForeignKey('application_form.id'), nullable=False)
@@ -104,16 +97,6 @@ class Section(db.Model):
         self.depends_on_question_id = depends_on_question_id
         self.key = key
 
-    def get_translation(self, language: str) -> 'SectionTranslation':
-        section_translation = self.section_translations.filter_by(language=language).first()
-        return section_translation
-
-    def _translations_for_field(self, accessor_fn: Callable[['SectionTranslation'], Any]) -> Mapping[str, Any]:
-        translations = {}
-        for translation in self.section_translations:
-            translations[translation.language] = accessor_fn(translation)
-        return translations
-
     @property
     def name_translations(self):
         return self._translations_for_field(lambda t: t.name)
@@ -1,6 +1,7 @@
 from app import db
 from app.applicationModel.models import ApplicationForm, Question, QuestionTranslation, Section, SectionTranslation
 from app.events.models import Event
+from app.applicationModel.cache import application_form_cache
 
 
 class ApplicationFormRepository():
@@ -29,6 +30,17 @@ class ApplicationFormRepository():
                     .order_by(Section.order, Question.order)
                     .all())
 
+    @staticmethod
+    def get_review_identifier_translations(event_id):
+        """{(question_id, language): translation} for the event's review identifier questions."""
+        translations = (db.session.query(QuestionTranslation)
+                            .join(Question, Question.id == QuestionTranslation.question_id)
+                            .filter(Question.key == 'review-identifier')
+                            .join(ApplicationForm, Question.application_form_id == ApplicationForm.id)
+                            .filter_by(event_id=event_id)
+                            .all())
+        return {(t.question_id, t.language): t for t in translations}
+
     @staticmethod
     def delete_question(question_to_delete: Question):
         # Remove any dependencies
@@ -42,12 +54,15 @@ class ApplicationFormRepository():
         db.session.commit()
         
         # Delete question and translations
+        application_form_id = question_to_delete.application_form_id
         db.session.query(QuestionTranslation).filter_by(question_id=question_to_delete.id).delete()
         db.session.query(Question).filter_by(id=question_to_delete.id).delete()
         db.session.commit()
+        application_form_cache.bump(application_form_id)
 
     @staticmethod
     def delete_section(section):
+        application_form_id = section.application_form_id
         db.session.query(SectionTranslation).filter_by(section_id=section.id).delete()
 
         for question in db.session.query(Question).filter_by(section_id=section.id).all():
@@ -55,3 +70,4 @@ class ApplicationFormRepository():
 
         db.session.query(Section).filter_by(id=section.id).delete()
         db.session.commit()
+        application_form_cache.bump(application_form_id)
@@ -133,6 +133,41 @@ class ApplicationFormApiTest(ApiTestCase):
         self.assertEqual(data['sections'][0]['questions'][0]['validation_text'], 'Entrez un maximum de 200 mots')
         self.assertEqual(data['sections'][0]['questions'][0]['show_for_values'], ['oui'])
 
+    def test_revalidate_with_etag(self):
+        header = self.get_auth_header_for(self.test_user.email)
+        params = {'event_id': 1, 'language': 'en'}
+        response = self.app.get('/api/v1/application-form', headers=header, query_string=params)
+        etag = response.headers['ETag']
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response.headers['Cache-Control'])
+
+        response = self.app.get('/api/v1/application-form', headers=dict(header, **{'If-None-Match': etag}),
+                                query_string=params)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        response = self.app.get('/api/v1/application-form', headers=dict(header, **{'If-None-Match': etag}),
+                                query_string={'event_id': 1, 'language': 'fr'})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+    def test_question_deletion_invalidates_cache(self):
+        question_id = self.question2.id
+        header = self.get_auth_header_for(self.test_user.email)
+        params = {'event_id': 1, 'language': 'en'}
+        response = self.app.get('/api/v1/application-form', headers=header, query_string=params)
+        etag = response.headers['ETag']
+        self.assertEqual(len(json.loads(response.data)['sections'][1]['questions']), 1)
+
+        application_form_repository.delete_question(db.session.query(Question).get(question_id))
+
+        response = self.app.get('/api/v1/application-form', headers=dict(header, **{'If-None-Match': etag}),
+                                query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['sections'][1]['questions'], [])
+
 
 APPLICATION_FORM_POST_DATA = {
   "event_id": 1, 
@@ -682,6 +717,25 @@ class ApplicationFormUpdateTest(ApiTestCase):
                 continue
             self.assertEqual(section2_question1_actual[key], section2_question1_expected[key], key)
 
+    def test_update_invalidates_cache(self):
+        self._seed_data_update()
+        params = {'event_id': 1, 'language': 'en'}
+        response = self.app.get('/api/v1/application-form', headers=self.event_admin_headers, query_string=params)
+        etag = response.headers['ETag']
+        self.assertTrue(json.loads(response.data)['is_open'])
+
+        self.app.put(
+            '/api/v1/application-form-detail',
+            data=json.dumps(APPLICATION_FORM_PUT_DATA),
+            content_type='application/json',
+            headers=self.event_admin_headers)
+
+        response = self.app.get('/api/v1/application-form', headers=dict(self.event_admin_headers, **{'If-None-Match': etag}),
+                                query_string=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertFalse(json.loads(response.data)['is_open'])
+
 class QuestionListApiTest(ApiTestCase):
     def _seed_static_data(self):
         self.user1 = self.add_user('user1@mail.com')
@@ -13,6 +13,7 @@ from app.guestRegistrations.repository import GuestRegistrationRepository as gue
 from app.events.repository import EventRepository as event_repository
 from app.users.repository import UserRepository as user_repository
 from app.utils.auth import auth_required
+from app.utils.identity import current_identity
 from app.utils.emailer import email_user
 from app.utils.errors import ATTENDANCE_ALREADY_CONFIRMED, ATTENDANCE_NOT_FOUND, EVENT_NOT_FOUND, FORBIDDEN, USER_NOT_FOUND, INDEMNITY_NOT_FOUND, INDEMNITY_NOT_SIGNED, NOT_A_GUEST
 from app.registration.models import Offer
@@ -81,9 +82,8 @@ class AttendanceAPI(AttendanceMixin, restful.Resource):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
         user_id = args['user_id']
-        registration_user_id = g.current_user['id']
 
-        registration_user = user_repository.get_by_id(registration_user_id)
+        registration_user = current_identity()
         if not registration_user.is_registration_volunteer(event_id):
             return FORBIDDEN
 
@@ -139,7 +139,7 @@ class AttendanceAPI(AttendanceMixin, restful.Resource):
         indemnity_signed = args['indemnity_signed']
         registration_user_id = g.current_user['id']
 
-        registration_user = user_repository.get_by_id(registration_user_id)
+        registration_user = current_identity()
         if not registration_user.is_registration_volunteer(event_id):
             return FORBIDDEN
 
@@ -163,13 +163,13 @@ class AttendanceAPI(AttendanceMixin, restful.Resource):
             attendance_repository.add(attendance)
         attendance.sign_indemnity()
         attendance.confirm()
-        attendance_repository.save()
 
         email_user(
             'attendance-confirmation',
             event=event,
             user=user
         )
+        attendance_repository.save()
 
         return None, 201
 
@@ -178,9 +178,8 @@ class AttendanceAPI(AttendanceMixin, restful.Resource):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
         user_id = args['user_id']
-        registration_user_id = g.current_user['id']
 
-        registration_user = user_repository.get_by_id(registration_user_id)
+        registration_user = current_identity()
         if not registration_user.is_registration_volunteer(event_id):
             return FORBIDDEN
 
@@ -253,9 +252,6 @@ class IndemnityAPI(restful.Resource):
         LOGGER.info(f"Created attendance and signed")
         
         attendance_repository.add(attendance)
-        attendance_repository.save()
-        LOGGER.info(f"Saved")
-
         email_user(
             'indemnity-signed',
             event=event,
@@ -265,6 +261,9 @@ class IndemnityAPI(restful.Resource):
             })  
         LOGGER.info(f"Emailed")
 
+        attendance_repository.save()
+        LOGGER.info(f"Saved")
+
         return {
             'indemnity_form': indemnity.indemnity_form.format(attendee_name=user.full_name),
             'signed': attendance.indemnity_signed if attendance is not None else False,
@@ -282,9 +281,8 @@ class GuestListApi(restful.Resource):
         args = req_parser.parse_args()
         exclude_already_checked_in = args['exclude_already_checked_in']
         event_id = args['event_id']
-        registration_user_id = g.current_user["id"]
         
-        registration_user = user_repository.get_by_id(registration_user_id)
+        registration_user = current_identity()
         if not registration_user.is_registration_volunteer(event_id):
             return FORBIDDEN
 
@@ -306,9 +304,8 @@ class AttendeesApi(restful.Resource):
         req_parser.add_argument('event_id', type=int, required=True)
         args = req_parser.parse_args()
         event_id = args['event_id']
-        registration_user_id = g.current_user["id"]
         
-        registration_user = user_repository.get_by_id(registration_user_id)
+        registration_user = current_identity()
         if not registration_user.is_registration_volunteer(event_id):
             return FORBIDDEN
 
@@ -0,0 +1,94 @@
+import flask_restful as restful
+from flask import g
+from flask_restful import reqparse, fields, marshal
+
+from app.campaigns import dispatch
+from app.campaigns.repository import CampaignRepository as campaign_repository
+from app.utils.auth import admin_required, event_admin_required
+from app.utils.errors import CAMPAIGN_NOT_FOUND, CAMPAIGN_STATE_CONFLICT
+
+
+campaign_fields = {
+    'id': fields.Integer,
+    'event_id': fields.Integer,
+    'segment': fields.String,
+    'template_key': fields.String,
+    'subject': fields.String,
+    'status': fields.String(attribute=lambda c: c.status.value),
+    'max_per_second': fields.Float,
+    'total_recipients': fields.Integer,
+    'sent_count': fields.Integer,
+    'failed_count': fields.Integer,
+    'pending_count': fields.Integer(attribute=lambda c: c.total_recipients - c.sent_count - c.failed_count),
+    'last_error': fields.String,
+    'created_at': fields.DateTime(dt_format='iso8601'),
+    'started_at': fields.DateTime(dt_format='iso8601'),
+    'finished_at': fields.DateTime(dt_format='iso8601')
+}
+
+ACTIONS = {
+    'pause': dispatch.pause,
+    'resume': dispatch.resume,
+    'cancel': dispatch.cancel
+}
+
+
+class CampaignActionMixin(object):
+
+    def get_campaigns(self, get_one, get_all):
+        req_parser = reqparse.RequestParser()
+        req_parser.add_argument('campaign_id', type=int, required=False)
+        args = req_parser.parse_args()
+
+        if args['campaign_id'] is None:
+            return marshal(get_all(), campaign_fields), 200
+
+        campaign = get_one(args['campaign_id'])
+        if campaign is None:
+            return CAMPAIGN_NOT_FOUND
+
+        return marshal(campaign, campaign_fields), 200
+
+    def apply_action(self, get_one):
+        """Pause, resume or cancel a campaign."""
+        req_parser = reqparse.RequestParser()
+        req_parser.add_argument('campaign_id', type=int, required=True)
+        req_parser.add_argument('action', type=str, required=True, choices=list(ACTIONS))
+        args = req_parser.parse_args()
+
+        campaign = get_one(args['campaign_id'])
+        if campaign is None:
+            return CAMPAIGN_NOT_FOUND
+
+        if not ACTIONS[args['action']](campaign):
+            return CAMPAIGN_STATE_CONFLICT
+
+        return marshal(campaign_repository.get_by_id(campaign.id), campaign_fields), 200
+
+
+class EmailCampaignAPI(CampaignActionMixin, restful.Resource):
+
+    @event_admin_required
+    def get(self, event_id):
+        return self.get_campaigns(
+            lambda campaign_id: campaign_repository.get_for_event(event_id, campaign_id),
+            lambda: campaign_repository.get_all_for_event(event_id))
+
+    @event_admin_required
+    def put(self, event_id):
+        return self.apply_action(lambda campaign_id: campaign_repository.get_for_event(event_id, campaign_id))
+
+
+class AdminEmailCampaignAPI(CampaignActionMixin, restful.Resource):
+    """Campaigns of the organisation, including admin mail-merges that aren't linked to an event."""
+
+    @admin_required
+    def get(self):
+        return self.get_campaigns(
+            lambda campaign_id: campaign_repository.get_for_organisation(g.organisation.id, campaign_id),
+            lambda: campaign_repository.get_all_for_organisation(g.organisation.id))
+
+    @admin_required
+    def put(self):
+        return self.apply_action(
+            lambda campaign_id: campaign_repository.get_for_organisation(g.organisation.id, campaign_id))
@@ -0,0 +1,266 @@
+"""Background dispatch of email campaigns.
+
+The recipients of a campaign are snapshotted into email_campaign_recipient when it is created,
+so the segment can't shift while the campaign is being sent and every recipient's outcome is
+recorded. The sender works through the pending recipients in chunks: each chunk is rendered with
+emailer.email_users, so templates and event names are resolved once per language, delivered at
+no more than the campaign's max_per_second, and its outcomes are committed before the next
+chunk starts. With the outbox enabled a chunk is queued in one transaction, each mail scheduled
+for its slot at that rate. A campaign that is paused, cancelled or interrupted therefore resumes
+with the recipients that haven't been sent the email yet; at most the chunk that was in flight
+when a process died can be delivered twice.
+
+If the mail server goes away part way through a chunk, the recipients that were already sent
+the email are recorded and the campaign is paused with the error, so it can be resumed once the
+server is back.
+
+Every launch of a campaign increments its generation and a sender stops as soon as the
+campaign is no longer running under its generation, so pausing and resuming quickly can never
+leave two senders working on the same campaign.
+"""
+
+import threading
+import time
+import traceback
+
+from flask_script import Command, Option
+
+from app import app, LOGGER
+from app.campaigns.models import CampaignStatus, EmailCampaign
+from app.campaigns.repository import CampaignRepository as campaign_repository
+from app.users.repository import UserRepository as user_repository
+from app.utils import emailer
+from app.utils.smtp_pool import connection_lost
+from config import EMAIL_CAMPAIGN_CHUNK_SIZE, EMAIL_CAMPAIGN_MAX_PER_SECOND
+
+
+USERS_SEGMENT = 'users'
+
+# Event segments, mapped to a function returning a query for the ids of the users in them
+SEGMENTS = {
+    'unsubmitted': user_repository.get_ids_with_unsubmitted_response,
+    'not_started': user_repository.get_ids_without_responses,
+}
+
+
+class Throttle():
+    """Paces calls so that they happen at most rate times per second."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0
+        self._next = time.monotonic()
+
+    def reserve(self):
+        """Take the next free slot without waiting for it. Returns the seconds until the slot."""
+        if not self.interval:
+            return 0
+        now = time.monotonic()
+        slot = max(self._next, now)
+        self._next = slot + self.interval
+        return slot - now
+
+    def __call__(self):
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _create(campaign, user_ids_query):
+    campaign_repository.add_with_recipients(campaign, user_ids_query)
+    launch(campaign)
+    return campaign
+
+
+def create_campaign(event, segment, template_key, template_parameters, created_by_user_id, max_per_second=None):
+    """Email a template to the users in a segment of the event, in the background."""
+    campaign = EmailCampaign(
+        event_id=event.id,
+        organisation_id=event.organisation_id,
+        segment=segment,
+        template_key=template_key,
+        template_parameters=template_parameters,
+        created_by_user_id=created_by_user_id,
+        max_per_second=EMAIL_CAMPAIGN_MAX_PER_SECOND if max_per_second is None else max_per_second)
+    return _create(campaign, SEGMENTS[segment](event.id))
+
+
+def create_mail_merge(organisation_id, subject, body, created_by_user_id, user_ids=None, event=None, segment=None,
+                      max_per_second=None):
+    """Email a free-text subject and body to a list of users, or to a segment of an event, in the background."""
+    if user_ids is not None:
+        segment = USERS_SEGMENT
+        user_ids_query = user_repository.get_ids_in_organisation(user_ids, organisation_id)
+    else:
+        user_ids_query = SEGMENTS[segment](event.id)
+
+    campaign = EmailCampaign(
+        event_id=None if event is None else event.id,
+        organisation_id=organisation_id,
+        segment=segment,
+        template_key=None,
+        template_parameters={},
+        created_by_user_id=created_by_user_id,
+        max_per_second=EMAIL_CAMPAIGN_MAX_PER_SECOND if max_per_second is None else max_per_second,
+        subject=subject,
+        body=body)
+    return _create(campaign, user_ids_query)
+
+
+def launch(campaign, inline=None):
+    """Queue the campaign under a new generation and start sending it."""
+    campaign.relaunch()
+    campaign_repository.save()
+    campaign_id, generation = campaign.id, campaign.generation
+
+    if inline or (inline is None and app.config['EMAIL_CAMPAIGN_RUN_INLINE']):
+        run_campaign(campaign_id, generation)
+        return
+
+    def run():
+        with app.app_context():
+            run_campaign(campaign_id, generation)
+
+    threading.Thread(target=run, name='email-campaign-{}'.format(campaign_id), daemon=True).start()
+
+
+def pause(campaign):
+    """Stop sending after the current chunk. Returns False if the campaign isn't queued or running."""
+    if campaign.status not in (CampaignStatus.QUEUED, CampaignStatus.RUNNING):
+        return False
+    campaign.pause()
+    campaign_repository.save()
+    return True
+
+
+def resume(campaign):
+    """Continue sending a paused campaign to its pending recipients. Returns False if it isn't paused."""
+    if campaign.status != CampaignStatus.PAUSED:
+        return False
+    launch(campaign)
+    return True
+
+
+def cancel(campaign):
+    """Stop sending for good. Returns False if the campaign has already finished."""
+    if campaign.is_finished:
+        return False
+    campaign.cancel()
+    campaign_repository.save()
+    return True
+
+
+def _deliver_chunk(campaign, users, pace, on_sent):
+    sender_name = campaign.organisation.name
+    sender_email = campaign.organisation.email_from
+
+    if campaign.template_key is not None:
+        return emailer.email_users(
+            campaign.template_key, users, campaign.event, campaign.template_parameters,
+            sender_name=sender_name, sender_email=sender_email, pace=pace, on_sent=on_sent)
+
+    mails = [{
+        'recipient': user.email,
+        'subject': campaign.subject,
+        'body_text': emailer.render_generic_email(user, campaign.body)
+    } for user in users]
+    return emailer.deliver_many(mails, sender_name=sender_name, sender_email=sender_email, pace=pace,
+                                on_sent=on_sent)
+
+
+def _record_chunk(campaign, recipients, sent, failures):
+    """Mark the recipients the chunk was sent to, or failed for. Any others stay pending."""
+    errors = {address: '{}: {}'.format(type(e).__name__, e) for address, e in failures}
+    done = []
+    for recipient in recipients:
+        if recipient.user.email in errors:
+            recipient.mark_failed(errors[recipient.user.email])
+        elif recipient.user.email in sent:
+            recipient.mark_sent()
+        else:
+            continue
+        done.append(recipient)
+
+    if done:
+        campaign.record_progress(done[-1].user_id, len(done) - len(errors), len(errors))
+
+
+def _still_running(campaign_id, generation):
+    """Whether the campaign is still running under this generation, locking it until the next commit."""
+    status, current_generation = campaign_repository.get_state(campaign_id, for_update=True)
+    return status == CampaignStatus.RUNNING and current_generation == generation
+
+
+def run_campaign(campaign_id, generation):
+    if not campaign_repository.claim(campaign_id, generation):
+        LOGGER.info('Email campaign {} generation {} is no longer queued, not sending it'.format(
+            campaign_id, generation))
+        return
+
+    campaign = campaign_repository.get_by_id(campaign_id)
+    campaign.start()
+    campaign_repository.save()
+
+    LOGGER.info('Sending email campaign {} to {} recipients'.format(campaign.id, campaign.total_recipients))
+    pace = Throttle(campaign.max_per_second)
+
+    try:
+        while True:
+            status, current_generation = campaign_repository.get_state(campaign_id)
+            if status != CampaignStatus.RUNNING or current_generation != generation:
+                LOGGER.info('Email campaign {} is {}, stopping after {} sent'.format(
+                    campaign_id, status.value, campaign.sent_count))
+                return
+
+            recipients = campaign_repository.get_pending_recipients(campaign_id, EMAIL_CAMPAIGN_CHUNK_SIZE)
+            if not recipients:
+                break
+
+            sent = set()
+            try:
+                failures = _deliver_chunk(campaign, [recipient.user for recipient in recipients], pace, sent.add)
+            except Exception as e:
+                # Refused recipients come back as failures; only a lost connection pauses the campaign
+                if not connection_lost(e):
+                    raise
+                LOGGER.warning('Email campaign {} lost the mail server, pausing it: {}'.format(campaign_id, e))
+                _record_chunk(campaign, recipients, sent, [])
+                if _still_running(campaign_id, generation):
+                    campaign.pause('{}: {}'.format(type(e).__name__, e))
+                campaign_repository.save()
+                return
+
+            # Every mail that didn't fail was delivered
+            _record_chunk(campaign, recipients, {recipient.user.email for recipient in recipients}, failures)
+            campaign_repository.save()
+
+        # Paused or cancelled after the last chunk was sent
+        if not _still_running(campaign_id, generation):
+            campaign_repository.save()
+            return
+        campaign.complete()
+    except Exception as e:
+        LOGGER.error('Email campaign {} failed: {}'.format(campaign_id, traceback.format_exc()))
+        campaign_repository.rollback()
+        campaign.fail('{}: {}'.format(type(e).__name__, e))
+
+    campaign_repository.save()
+    LOGGER.info('Email campaign {} finished with status {}: {} sent, {} failed'.format(
+        campaign.id, campaign.status.value, campaign.sent_count, campaign.failed_count))
+
+
+class ResumeCampaignsCommand(Command):
+    """Finish sending campaigns that were interrupted, e.g. by a deploy or a crashed worker."""
+
+    option_list = (
+        Option('--campaign-id', dest='campaign_id', type=int, default=None,
+               help='Only resume this campaign'),
+    )
+
+    def run(self, campaign_id):
+        campaigns = campaign_repository.get_interrupted()
+        if campaign_id is not None:
+            campaigns = [campaign for campaign in campaigns if campaign.id == campaign_id]
+
+        for campaign in campaigns:
+            LOGGER.info('Resuming email campaign {}'.format(campaign.id))
+            launch(campaign, inline=True)
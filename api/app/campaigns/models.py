@@ -0,0 +1,140 @@
+from datetime import datetime
+from enum import Enum
+
+from app import db
+
+
+class CampaignStatus(Enum):
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    PAUSED = 'paused'
+    COMPLETED = 'completed'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+
+class RecipientStatus(Enum):
+    PENDING = 'pending'
+    SENT = 'sent'
+    FAILED = 'failed'
+
+
+class EmailCampaign(db.Model):
+    """An email sent to every user in a recipient segment, in the background.
+
+    The email is either an email template (template_key and template_parameters) or a mail-merge
+    of a free-text subject and body. The recipients are fixed when the campaign is created, and
+    each has a row in email_campaign_recipient recording whether they have been sent the email.
+    """
+
+    __tablename__ = 'email_campaign'
+
+    id = db.Column(db.Integer(), primary_key=True)
+    event_id = db.Column(db.Integer(), db.ForeignKey('event.id'), nullable=True)
+    organisation_id = db.Column(db.Integer(), db.ForeignKey('organisation.id'), nullable=False)
+    segment = db.Column(db.String(50), nullable=False)
+    template_key = db.Column(db.String(50), nullable=True)
+    template_parameters = db.Column(db.JSON(), nullable=False)
+    subject = db.Column(db.String(), nullable=True)
+    body = db.Column(db.String(), nullable=True)
+    max_per_second = db.Column(db.Float(), nullable=False)
+    # Incremented whenever the campaign is (re)launched, so a superseded sender stops
+    generation = db.Column(db.Integer(), nullable=False)
+    status = db.Column(db.Enum(CampaignStatus, name='campaign_status'), nullable=False)
+    total_recipients = db.Column(db.Integer(), nullable=False)
+    sent_count = db.Column(db.Integer(), nullable=False)
+    failed_count = db.Column(db.Integer(), nullable=False)
+    last_recipient_id = db.Column(db.Integer(), nullable=False)
+    last_error = db.Column(db.String(), nullable=True)
+    created_by_user_id = db.Column(db.Integer(), db.ForeignKey('app_user.id'), nullable=False)
+    created_at = db.Column(db.DateTime(), nullable=False)
+    started_at = db.Column(db.DateTime(), nullable=True)
+    finished_at = db.Column(db.DateTime(), nullable=True)
+
+    event = db.relationship('Event', foreign_keys=[event_id])
+    organisation = db.relationship('Organisation', foreign_keys=[organisation_id])
+
+    def __init__(self, event_id, organisation_id, segment, template_key, template_parameters, created_by_user_id,
+                 max_per_second, subject=None, body=None):
+        self.event_id = event_id
+        self.organisation_id = organisation_id
+        self.segment = segment
+        self.template_key = template_key
+        self.template_parameters = template_parameters
+        self.subject = subject
+        self.body = body
+        self.max_per_second = max_per_second
+        self.generation = 0
+        self.status = CampaignStatus.QUEUED
+        self.total_recipients = 0
+        self.sent_count = 0
+        self.failed_count = 0
+        self.last_recipient_id = 0
+        self.created_by_user_id = created_by_user_id
+        self.created_at = datetime.now()
+
+    @property
+    def is_finished(self):
+        return self.status in (CampaignStatus.COMPLETED, CampaignStatus.FAILED, CampaignStatus.CANCELLED)
+
+    def relaunch(self):
+        self.status = CampaignStatus.QUEUED
+        self.generation += 1
+
+    def start(self):
+        self.status = CampaignStatus.RUNNING
+        self.started_at = self.started_at or datetime.now()
+
+    def pause(self, error=None):
+        self.status = CampaignStatus.PAUSED
+        self.last_error = error
+
+    def record_progress(self, last_recipient_id, sent, failed):
+        self.last_recipient_id = last_recipient_id
+        self.sent_count += sent
+        self.failed_count += failed
+
+    def complete(self):
+        self.status = CampaignStatus.COMPLETED
+        self.finished_at = datetime.now()
+
+    def fail(self, error):
+        self.status = CampaignStatus.FAILED
+        self.last_error = error
+        self.finished_at = datetime.now()
+
+    def cancel(self):
+        self.status = CampaignStatus.CANCELLED
+        self.finished_at = datetime.now()
+
+
+class EmailCampaignRecipient(db.Model):
+
+    __tablename__ = 'email_campaign_recipient'
+    __table_args__ = (
+        db.UniqueConstraint('campaign_id', 'user_id', name='uq_email_campaign_recipient_campaign_id_user_id'),
+        db.Index('ix_email_campaign_recipient_campaign_id_status', 'campaign_id', 'status', 'id'),
+    )
+
+    id = db.Column(db.Integer(), primary_key=True)
+    campaign_id = db.Column(db.Integer(), db.ForeignKey('email_campaign.id'), nullable=False)
+    user_id = db.Column(db.Integer(), db.ForeignKey('app_user.id'), nullable=False)
+    status = db.Column(db.Enum(RecipientStatus, name='campaign_recipient_status'), nullable=False)
+    error = db.Column(db.String(), nullable=True)
+    sent_at = db.Column(db.DateTime(), nullable=True)
+
+    user = db.relationship('AppUser', foreign_keys=[user_id])
+
+    def __init__(self, campaign_id, user_id):
+        self.campaign_id = campaign_id
+        self.user_id = user_id
+        self.status = RecipientStatus.PENDING
+
+    def mark_sent(self):
+        self.status = RecipientStatus.SENT
+        self.error = None
+        self.sent_at = datetime.now()
+
+    def mark_failed(self, error):
+        self.status = RecipientStatus.FAILED
+        self.error = error
@@ -0,0 +1,136 @@
+from sqlalchemy import func, literal
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.campaigns.models import CampaignStatus, EmailCampaign, EmailCampaignRecipient, RecipientStatus
+from app.utils.repository import BaseRepository
+
+
+class CampaignRepository(BaseRepository):
+
+    @staticmethod
+    def get_by_id(campaign_id):
+        return db.session.query(EmailCampaign).get(campaign_id)
+
+    @staticmethod
+    def get_for_event(event_id, campaign_id):
+        return (
+            db.session.query(EmailCampaign)
+            .filter_by(id=campaign_id, event_id=event_id)
+            .first()
+        )
+
+    @staticmethod
+    def get_all_for_event(event_id):
+        return (
+            db.session.query(EmailCampaign)
+            .filter_by(event_id=event_id)
+            .order_by(EmailCampaign.id.desc())
+            .all()
+        )
+
+    @staticmethod
+    def get_for_organisation(organisation_id, campaign_id):
+        return (
+            db.session.query(EmailCampaign)
+            .filter_by(id=campaign_id, organisation_id=organisation_id)
+            .first()
+        )
+
+    @staticmethod
+    def get_all_for_organisation(organisation_id):
+        return (
+            db.session.query(EmailCampaign)
+            .filter_by(organisation_id=organisation_id)
+            .order_by(EmailCampaign.id.desc())
+            .all()
+        )
+
+    @staticmethod
+    def get_interrupted():
+        """Campaigns that were queued or running when their sender went away."""
+        return (
+            db.session.query(EmailCampaign)
+            .filter(EmailCampaign.status.in_([CampaignStatus.QUEUED, CampaignStatus.RUNNING]))
+            .order_by(EmailCampaign.id)
+            .all()
+        )
+
+    @staticmethod
+    def get_state(campaign_id, for_update=False):
+        """Read the current status and generation from the database, bypassing the session's copy.
+
+        With for_update, the campaign's row stays locked until the transaction ends, so the
+        status can't change before the caller commits its own change to it.
+        """
+        query = db.session.query(EmailCampaign.status, EmailCampaign.generation).filter_by(id=campaign_id)
+        if for_update:
+            query = query.with_for_update()
+        return query.one()
+
+    @staticmethod
+    def claim(campaign_id, generation):
+        """Atomically move a queued campaign of the given generation to running.
+
+        Returns:
+            True if this caller now owns the campaign.
+        """
+        claimed = (
+            db.session.query(EmailCampaign)
+            .filter_by(id=campaign_id, generation=generation, status=CampaignStatus.QUEUED)
+            .update({'status': CampaignStatus.RUNNING}, synchronize_session=False)
+        )
+        db.session.commit()
+        return claimed == 1
+
+    @staticmethod
+    def add_with_recipients(campaign, user_ids_query):
+        """Add a campaign, with the users returned by a query of user ids as its recipients, in one transaction."""
+        db.session.add(campaign)
+        db.session.flush()
+        CampaignRepository.add_recipients(campaign.id, user_ids_query)
+        campaign.total_recipients = CampaignRepository.count_recipients(campaign.id)
+        db.session.commit()
+        return campaign
+
+    @staticmethod
+    def add_recipients(campaign_id, user_ids_query):
+        """Snapshot the users returned by a query of user ids as the campaign's recipients, in one statement."""
+        table = EmailCampaignRecipient.__table__
+        user_ids = user_ids_query.subquery()
+        select = db.session.query(
+            literal(campaign_id),
+            user_ids.c.id,
+            literal(RecipientStatus.PENDING, type_=table.c.status.type)
+        ).statement
+        db.session.execute(table.insert().from_select(['campaign_id', 'user_id', 'status'], select))
+
+    @staticmethod
+    def count_recipients(campaign_id):
+        return (
+            db.session.query(func.count(EmailCampaignRecipient.id))
+            .filter_by(campaign_id=campaign_id)
+            .scalar()
+        )
+
+    @staticmethod
+    def get_pending_recipients(campaign_id, chunk_size):
+        return (
+            db.session.query(EmailCampaignRecipient)
+            .filter_by(campaign_id=campaign_id, status=RecipientStatus.PENDING)
+            .options(joinedload(EmailCampaignRecipient.user))
+            .order_by(EmailCampaignRecipient.id)
+            .limit(chunk_size)
+            .all()
+        )
+
+    @staticmethod
+    def get_recipients(campaign_id, status=None):
+        query = db.session.query(EmailCampaignRecipient).filter_by(campaign_id=campaign_id)
+        if status is not None:
+            query = query.filter_by(status=status)
+        return query.order_by(EmailCampaignRecipient.id).all()
+
+    @staticmethod
+    def rollback():
+        db.session.rollback()
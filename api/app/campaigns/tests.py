@@ -0,0 +1,378 @@
+import json
+import smtplib
+from functools import partial
+
+from mock import patch
+
+from app import db
+from app.campaigns import dispatch
+from app.campaigns.models import CampaignStatus, EmailCampaign, RecipientStatus
+from app.campaigns.repository import CampaignRepository as campaign_repository
+from app.email_template.repository import EmailRepository
+from app.outbox.models import OutboxEmail
+from app.utils.testing import ApiTestCase
+
+
+def _set_language(user, language):
+    user.user_primaryLanguage = language
+
+
+class ReminderCampaignTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.event_admin = self.add_user('event@admin.com')
+        self.event = self.add_event(name={'en': 'Event One', 'fr': 'Événement Un'},
+                                    description={'en': 'Description', 'fr': 'Description'}, key='EVENT1')
+        self.other_event = self.add_event(name={'en': 'Event Two'}, key='EVENT2')
+        self.add_event_role('admin', self.event_admin.id, self.event.id)
+        self.event_id = self.event.id
+        self.other_event_id = self.other_event.id
+
+        form = self.create_application_form(self.event.id)
+        other_form = self.create_application_form(self.other_event.id)
+
+        self.unsubmitted = []
+        for i in range(5):
+            language = 'fr' if i % 2 else 'en'
+            user = self.add_user('unsubmitted{}@user.com'.format(i), post_create_fn=partial(_set_language, language=language))
+            self.add_response(form.id, user.id)
+            self.unsubmitted.append(user.email)
+
+        self.last_unsubmitted_id = user.id
+
+        submitted = self.add_user('submitted@user.com')
+        self.add_response(form.id, submitted.id, is_submitted=True)
+
+        # Only started an application for another event
+        self.other_applicant = self.add_user('other@user.com')
+        self.add_response(other_form.id, self.other_applicant.id)
+
+        self.add_email_template('application-not-submitted', 'Hi {firstname}, finish {event_name} by {deadline}')
+        self.add_email_template('application-not-submitted', 'Salut {firstname}, {event_name} {deadline}', language='fr')
+        self.add_email_template('application-not-started', 'Hi {firstname}, start {event}')
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_CHUNK_SIZE', 2)
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_unsubmitted_reminder_scoped_to_event(self, send_many_fn):
+        """Only users with an unsubmitted response for the event are reminded, in chunks."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data['unsubmitted_responses'], 5)
+        self.assertEqual(send_many_fn.call_count, 3)
+
+        recipients = [mail['recipient'] for call in send_many_fn.call_args_list for mail in call[0][0]]
+        self.assertEqual(recipients, self.unsubmitted)
+
+        french_mail = send_many_fn.call_args_list[0][0][0][1]
+        self.assertTrue(french_mail['body_text'].startswith('Salut User, Événement Un'))
+
+        campaign = campaign_repository.get_by_id(data['campaign_id'])
+        self.assertEqual(campaign.status, CampaignStatus.COMPLETED)
+        self.assertEqual(campaign.sent_count, 5)
+        self.assertEqual(campaign.last_recipient_id, self.last_unsubmitted_id)
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_templates_resolved_once_per_language(self, send_many_fn):
+        """The template is looked up once per language rather than once per recipient."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        with patch('app.utils.emailer.email_repository.get', wraps=EmailRepository.get) as get_fn:
+            self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+
+        self.assertEqual(sorted(call[0][2] for call in get_fn.call_args_list), ['en', 'fr'])
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_not_started_reminder_excludes_other_event_applicants(self, send_many_fn):
+        """Applicants to another event still count as not started for this event."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        response = self.app.post('/api/v1/reminder-not-started', headers=header, data={'event_id': self.event_id})
+        data = json.loads(response.data)
+
+        recipients = [mail['recipient'] for mail in send_many_fn.call_args[0][0]]
+        self.assertEqual(recipients, ['event@admin.com', 'other@user.com'])
+        self.assertEqual(data['not_started_responses'], 2)
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_campaign_status(self, send_many_fn):
+        """Event admins can follow the progress of a campaign."""
+        send_many_fn.return_value = [('unsubmitted0@user.com', Exception('Refused'))]
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+        response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+        campaign_id = json.loads(response.data)['campaign_id']
+
+        response = self.app.get('/api/v1/email-campaign', headers=header,
+                                query_string={'event_id': self.event_id, 'campaign_id': campaign_id})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['total_recipients'], 5)
+        self.assertEqual(data['sent_count'], 4)
+        self.assertEqual(data['failed_count'], 1)
+
+        failed = campaign_repository.get_recipients(campaign_id, RecipientStatus.FAILED)
+        self.assertEqual([r.user.email for r in failed], ['unsubmitted0@user.com'])
+        self.assertEqual(failed[0].error, 'Exception: Refused')
+
+        response = self.app.get('/api/v1/email-campaign', headers=header,
+                                query_string={'event_id': self.other_event_id, 'campaign_id': campaign_id})
+        self.assertEqual(response.status_code, 403)
+
+    @patch('app.utils.emailer.send_many')
+    def test_missing_template_fails_campaign(self, send_many_fn):
+        """A campaign whose template can't be found is marked as failed."""
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        with patch('app.utils.emailer.email_repository.get', return_value=None):
+            response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+
+        campaign = campaign_repository.get_by_id(json.loads(response.data)['campaign_id'])
+        self.assertEqual(campaign.status, CampaignStatus.FAILED)
+        self.assertIn('application-not-submitted', campaign.last_error)
+        send_many_fn.assert_not_called()
+
+    def pause_after_first_chunk(self, mails, **kwargs):
+        if not self.sent:
+            db.session.query(EmailCampaign).update({'status': CampaignStatus.PAUSED}, synchronize_session=False)
+        self.sent.extend(mail['recipient'] for mail in mails)
+        return []
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_CHUNK_SIZE', 2)
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_pause_and_resume(self, send_many_fn):
+        """A paused campaign stops after the current chunk and resumes with the pending recipients."""
+        self.sent = []
+        send_many_fn.side_effect = self.pause_after_first_chunk
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+        campaign_id = json.loads(response.data)['campaign_id']
+
+        campaign = campaign_repository.get_by_id(campaign_id)
+        self.assertEqual(campaign.status, CampaignStatus.PAUSED)
+        self.assertEqual(campaign.sent_count, 2)
+        self.assertEqual(len(campaign_repository.get_recipients(campaign_id, RecipientStatus.PENDING)), 3)
+
+        response = self.app.put('/api/v1/email-campaign', headers=header,
+                                data={'event_id': self.event_id, 'campaign_id': campaign_id, 'action': 'resume'})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['sent_count'], 5)
+        self.assertEqual(data['pending_count'], 0)
+        self.assertEqual(self.sent, self.unsubmitted)
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_CHUNK_SIZE', 2)
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_cancel(self, send_many_fn):
+        """A cancelled campaign can't be resumed."""
+        self.sent = []
+        send_many_fn.side_effect = self.pause_after_first_chunk
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+        response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+        campaign_id = json.loads(response.data)['campaign_id']
+
+        response = self.app.put('/api/v1/email-campaign', headers=header,
+                                data={'event_id': self.event_id, 'campaign_id': campaign_id, 'action': 'cancel'})
+        self.assertEqual(json.loads(response.data)['status'], 'cancelled')
+
+        response = self.app.put('/api/v1/email-campaign', headers=header,
+                                data={'event_id': self.event_id, 'campaign_id': campaign_id, 'action': 'resume'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(send_many_fn.call_count, 1)
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_resume_interrupted(self, send_many_fn):
+        """Campaigns left running by a dead process are finished by the resume command."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        event = db.session.query(type(self.event)).get(self.event_id)
+
+        with patch('app.campaigns.dispatch.launch'):
+            campaign = dispatch.create_campaign(event, 'unsubmitted', 'application-not-submitted',
+                                                {'deadline': 'soon'}, created_by_user_id=1)
+        campaign_id = campaign.id
+        db.session.query(EmailCampaign).update({'status': CampaignStatus.RUNNING})
+        db.session.commit()
+
+        dispatch.ResumeCampaignsCommand().run(campaign_id=None)
+
+        campaign = campaign_repository.get_by_id(campaign_id)
+        self.assertEqual(campaign.status, CampaignStatus.COMPLETED)
+        self.assertEqual(campaign.generation, 1)
+        self.assertEqual(len(send_many_fn.call_args[0][0]), 5)
+
+    def drop_after_first_mail(self, mails, on_sent=None, **kwargs):
+        if not self.sent:
+            self.sent.append(mails[0]['recipient'])
+            on_sent(mails[0]['recipient'])
+            raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+        self.sent.extend(mail['recipient'] for mail in mails)
+        return []
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_CHUNK_SIZE', 2)
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_mail_server_lost_pauses(self, send_many_fn):
+        """Losing the mail server mid-chunk keeps what was sent and pauses the campaign for resuming."""
+        self.sent = []
+        send_many_fn.side_effect = self.drop_after_first_mail
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+
+        response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+        campaign_id = json.loads(response.data)['campaign_id']
+
+        campaign = campaign_repository.get_by_id(campaign_id)
+        self.assertEqual(campaign.status, CampaignStatus.PAUSED)
+        self.assertEqual(campaign.sent_count, 1)
+        self.assertIn('SMTPServerDisconnected', campaign.last_error)
+        self.assertEqual(len(campaign_repository.get_recipients(campaign_id, RecipientStatus.PENDING)), 4)
+
+        response = self.app.put('/api/v1/email-campaign', headers=header,
+                                data={'event_id': self.event_id, 'campaign_id': campaign_id, 'action': 'resume'})
+        data = json.loads(response.data)
+
+        self.assertEqual(data['status'], 'completed')
+        self.assertEqual(data['sent_count'], 5)
+        self.assertEqual(self.sent, self.unsubmitted)
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_CHUNK_SIZE', 2)
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.DEBUG', False)
+    def test_refused_recipient_fails_alone(self):
+        """A recipient the mail server refuses is marked failed and the campaign still completes."""
+        self.seed_static_data()
+        header = self.get_auth_header_for('event@admin.com')
+        refused = self.unsubmitted[2]
+        sent = []
+
+        def send_on(session, sender, recipient, message):
+            if recipient == refused:
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')})
+            sent.append(recipient)
+
+        with patch('app.utils.emailer.smtp_pool') as smtp_pool:
+            smtp_pool.send_on.side_effect = send_on
+            response = self.app.post('/api/v1/reminder-unsubmitted', headers=header, data={'event_id': self.event_id})
+
+        campaign_id = json.loads(response.data)['campaign_id']
+        campaign = campaign_repository.get_by_id(campaign_id)
+        self.assertEqual(campaign.status, CampaignStatus.COMPLETED)
+        self.assertEqual(campaign.sent_count, 4)
+        self.assertEqual(campaign.failed_count, 1)
+        failed = campaign_repository.get_recipients(campaign_id, RecipientStatus.FAILED)
+        self.assertEqual([recipient.user.email for recipient in failed], [refused])
+        self.assertIn('SMTPRecipientsRefused', failed[0].error)
+        self.assertEqual(sent, [email for email in self.unsubmitted if email != refused])
+
+    def test_stale_sender_stops(self):
+        """A sender whose generation has been superseded doesn't claim the campaign."""
+        self.seed_static_data()
+        event = db.session.query(type(self.event)).get(self.event_id)
+        with patch('app.campaigns.dispatch.launch'):
+            campaign = dispatch.create_campaign(event, 'unsubmitted', 'application-not-submitted',
+                                                {'deadline': 'soon'}, created_by_user_id=1)
+        campaign.relaunch()
+        campaign.relaunch()
+        db.session.commit()
+
+        self.assertFalse(campaign_repository.claim(campaign.id, 1))
+        self.assertTrue(campaign_repository.claim(campaign.id, 2))
+
+
+class AdminMailMergeTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.admin = self.add_user('admin@admin.com', is_admin=True)
+        self.candidates = [self.add_user('c{}@c.com'.format(i)) for i in range(3)]
+        self.candidate_ids = [c.id for c in self.candidates]
+        self.other_org = self.add_organisation('Other Org', domain='other')
+        self.outsider = self.add_user('outsider@c.com', organisation_id=self.other_org.id)
+        self.outsider_id = self.outsider.id
+
+    @patch('app.campaigns.dispatch.EMAIL_CAMPAIGN_MAX_PER_SECOND', 0)
+    @patch('app.utils.emailer.send_many')
+    def test_mail_merge_campaign(self, send_many_fn):
+        """Emailing several users creates a campaign limited to the organisation's users."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        header = self.get_auth_header_for('admin@admin.com')
+
+        response = self.app.post('/api/v1/admin/emailer', headers=header, data={
+            'user_id': self.candidate_ids + [self.outsider_id],
+            'email_subject': 'News',
+            'email_body': 'Something happened',
+            'max_per_second': 5
+        })
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data['segment'], 'users')
+        self.assertEqual(data['total_recipients'], 3)
+        self.assertEqual(data['max_per_second'], 5)
+
+        mails = send_many_fn.call_args[0][0]
+        self.assertEqual([m['recipient'] for m in mails], ['c0@c.com', 'c1@c.com', 'c2@c.com'])
+        self.assertEqual(mails[0]['subject'], 'News')
+        self.assertIn('Something happened', mails[0]['body_text'])
+
+        response = self.app.get('/api/v1/admin/email-campaign', headers=header)
+        self.assertEqual([c['id'] for c in json.loads(response.data)], [data['id']])
+
+    @patch('app.utils.emailer.EMAIL_OUTBOX_ENABLED', True)
+    def test_outbox_paced(self):
+        """With the outbox, a chunk is queued at once and its mails are scheduled at the campaign's rate."""
+        self.seed_static_data()
+        header = self.get_auth_header_for('admin@admin.com')
+
+        response = self.app.post('/api/v1/admin/emailer', headers=header, data={
+            'user_id': self.candidate_ids,
+            'email_subject': 'News',
+            'email_body': 'Something happened',
+            'max_per_second': 2
+        })
+        campaign = campaign_repository.get_by_id(json.loads(response.data)['id'])
+        self.assertEqual(campaign.status, CampaignStatus.COMPLETED)
+
+        emails = db.session.query(OutboxEmail).order_by(OutboxEmail.id).all()
+        self.assertEqual([e.recipient for e in emails], ['c0@c.com', 'c1@c.com', 'c2@c.com'])
+        gaps = [(later.next_attempt_at - earlier.next_attempt_at).total_seconds()
+                for earlier, later in zip(emails, emails[1:])]
+        for gap in gaps:
+            self.assertAlmostEqual(gap, 0.5, delta=0.1)
+
+    def test_mail_merge_requires_recipients(self):
+        """A mail-merge needs users or an event segment."""
+        self.seed_static_data()
+        header = self.get_auth_header_for('admin@admin.com')
+
+        response = self.app.post('/api/v1/admin/emailer', headers=header, data={
+            'email_subject': 'News',
+            'email_body': 'Something happened'
+        })
+
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,13 @@
+from flask_script import Command
+
+from app import LOGGER
+from app.content.payloads import content_payloads
+
+
+class RebuildContentPayloadsCommand(Command):
+    """Rebuild the precomputed content payloads of every worker, after the country or category tables changed."""
+
+    def run(self):
+        content_payloads.invalidate()
+        LOGGER.info('Rebuilt {} content payloads, workers will pick them up within {} seconds'.format(
+            content_payloads.build(), content_payloads.check_interval))
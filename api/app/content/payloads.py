@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""Precomputed payloads of the content endpoints.
+
+The signup and profile pages load every content list at once, and none of them changes between
+deploys except the country and category tables, which change only through the database. So
+each list is serialized once per language when the worker starts (or on its first request) and
+kept as JSON bytes with an ETag, and the endpoints just send those bytes.
+
+After changing the country or category tables, run
+
+    python run.py rebuild_content
+
+which bumps a version in Redis. Every worker checks that version at most every
+CONTENT_VERSION_CHECK_INTERVAL seconds and rebuilds its payloads when it has changed. Without
+Redis the workers pick up the change when they restart.
+"""
+
+from collections import namedtuple
+import hashlib
+import json
+import threading
+import time
+
+from flask import request, Response as FlaskResponse
+from flask_restful import fields, marshal
+
+from app import db
+from app.users.models import Country, UserCategory
+from app.utils.http_cache import http_cache_stats
+from app.utils.shared_cache import VersionCounter
+from config import CONTENT_MAX_AGE, CONTENT_VERSION_CHECK_INTERVAL
+
+
+DEFAULT_LANGUAGE = 'en'
+
+country_fields = {
+    'value': fields.Integer(attribute='id'),
+    'label': fields.String(attribute='name')
+}
+
+category_fields = {
+    'value': fields.Integer(attribute='id'),
+    'label': fields.String(attribute='name')
+}
+
+ETHNICITIES = [
+    {"label": "Black", "value": 'black'},
+    {"label": "Coloured / Mixed Descent", "value": 'coloured/mixed'},
+    {"label": "White", "value": 'white'},
+    {"label": "Indian Descent", "value": 'indian'},
+    {"label": "Other", "value": "other"}
+]
+
+TITLES = {
+    'en': [
+        {"value": "Mr", "label": "Mr"},
+        {"value": "Mrs", "label": "Mrs"},
+        {"value": "Ms", "label": "Ms"},
+        {"value": "Hon", "label": "Hon"},
+        {"value": "Prof", "label": "Prof"},
+        {"value": "Dr", "label": "Dr"},
+        {"value": "Mx", "label": "Mx"}
+    ],
+    'fr': [
+        {"value": "M.", "label": "M."},
+        {"value": "Mme", "label": "Mme"},
+        {"value": "Mlle", "label": "Mlle"},
+        {"value": "Dr", "label": "Dr"},
+        {"value": "Pr", "label": "Pr"}
+    ]
+}
+
+GENDERS = {
+    'en': [
+        {"value": "male", "label": "Male"},
+        {"value": "female", "label": "Female"},
+        {"value": "other", "label": "Other"},
+        {"value": "prefer_not_to_say", "label": "Prefer not to say"}
+    ],
+    'fr': [
+        {"value": "male", "label": "Homme"},
+        {"value": "female", "label": "Femme"},
+        {"value": "other", "label": "Autre"},
+        {"value": "prefer_not_to_say", "label": "Je préfère ne pas le dire"}
+    ]
+}
+
+DISABILITIES = [
+    {"label": "No disabilities", "value": "none"},
+    {"label": "Sight disability", "value": "sight"},
+    {"label": "Hearing disability", "value": "hearing"},
+    {"label": "Communication disability", "value": "communication"},
+    {"label": "Physical disability(e.g. difficulty in walking)",
+     "value": "physical"},
+    {"label": "Mental disability(e.g. difficulty in remembering or concentrating)",
+     "value": "mental"},
+    {"label": "Difficulty in self-care", "value": "self-care"},
+    {"label": "Other", "value": "other"},
+]
+
+Payload = namedtuple('Payload', ['body', 'etag'])
+
+
+def _payload(data):
+    # Encoded the way flask_restful encodes responses
+    body = (json.dumps(data) + '\n').encode('utf-8')
+    return Payload(body, hashlib.sha256(body).hexdigest()[:32])
+
+
+def _build():
+    """{(name, language): Payload} for every content list. Lists that aren't translated are under None."""
+    payloads = {
+        ('countries', None): _payload(marshal(db.session.query(Country).order_by(Country.id).all(), country_fields)),
+        ('categories', None): _payload(
+            marshal(db.session.query(UserCategory).order_by(UserCategory.id).all(), category_fields)),
+        ('ethnicity', None): _payload(ETHNICITIES),
+        ('disability', None): _payload(DISABILITIES),
+    }
+    for language, titles in TITLES.items():
+        payloads[('title', language)] = _payload(titles)
+    for language, genders in GENDERS.items():
+        payloads[('gender', language)] = _payload(genders)
+    return payloads
+
+
+class ContentPayloads():
+
+    def __init__(self, check_interval=CONTENT_VERSION_CHECK_INTERVAL, client=None):
+        self.check_interval = check_interval
+        self._versions = VersionCounter('content', client)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._payloads = None
+            self._version = None
+            self._checked_at = 0.0
+
+    def build(self):
+        """Serialize every content list again, returning the number of payloads."""
+        version = self._versions.shared_version('tables')
+        payloads = _build()
+        with self._lock:
+            self._payloads = payloads
+            self._version = version
+            self._checked_at = time.monotonic()
+        return len(payloads)
+
+    def invalidate(self):
+        """Make every worker rebuild its payloads. Call after changing the country or category tables."""
+        self._versions.bump('tables')
+
+    def _current(self):
+        with self._lock:
+            payloads = self._payloads
+            check = payloads is not None and time.monotonic() - self._checked_at >= self.check_interval
+            if check:
+                self._checked_at = time.monotonic()
+            version = self._version
+
+        if payloads is None or (check and self._versions.shared_version('tables') not in (None, version)):
+            self.build()
+            with self._lock:
+                payloads = self._payloads
+        return payloads
+
+    def get(self, name, language=None):
+        payloads = self._current()
+        if language is not None and (name, language) not in payloads:
+            language = DEFAULT_LANGUAGE
+        return payloads[(name, language)]
+
+    def response(self, name, language=None):
+        """The list as a response, or a 304 if the request already has it."""
+        payload = self.get(name, language)
+        headers = {
+            'ETag': '"{}"'.format(payload.etag),
+            'Cache-Control': 'public, max-age={}'.format(CONTENT_MAX_AGE),
+            'Vary': 'Origin'
+        }
+        endpoint = 'content.{}'.format(name)
+        if request.if_none_match.contains(payload.etag):
+            http_cache_stats.record(endpoint, hit=True)
+            return FlaskResponse(status=304, headers=headers)
+
+        http_cache_stats.record(endpoint, hit=False)
+        return FlaskResponse(payload.body, mimetype='application/json', headers=headers)
+
+
+content_payloads = ContentPayloads()
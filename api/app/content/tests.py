@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import fakeredis
+
+from app import app, db
+from app.content.payloads import content_payloads
+from app.users.models import Country
+from app.utils.shared_cache import reset_redis_backoff
+from app.utils.testing import ApiTestCase
+
+
+class ContentAPITest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.kenya = Country('Kenya')
+        db.session.add(self.kenya)
+        db.session.commit()
+        self.num_countries = db.session.query(Country).count()
+
+    def test_countries(self):
+        self.seed_static_data()
+        kenya_id = self.kenya.id
+        response = self.app.get('/api/v1/content/countries')
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(data), self.num_countries)
+        self.assertEqual(data[-1], {'value': kenya_id, 'label': 'Kenya'})
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=86400')
+
+        response = self.app.get('/api/v1/content/countries', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+
+    def test_languages(self):
+        response = self.app.get('/api/v1/content/gender', query_string={'language': 'fr'})
+        self.assertEqual(json.loads(response.data)[0], {'value': 'male', 'label': 'Homme'})
+
+        response = self.app.get('/api/v1/content/title', query_string={'language': 'zu'})
+        self.assertEqual(json.loads(response.data)[0], {'value': 'Mr', 'label': 'Mr'})
+
+        response = self.app.get('/api/v1/content/title')
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuilt_when_invalidated(self):
+        app.config['SHARED_CACHE_ENABLED'] = True
+        reset_redis_backoff()
+        content_payloads._versions.client = fakeredis.FakeStrictRedis()
+        content_payloads.check_interval = 0
+        try:
+            self.seed_static_data()
+            etag = self.app.get('/api/v1/content/countries').headers['ETag']
+
+            db.session.add(Country('Ghana'))
+            db.session.commit()
+            response = self.app.get('/api/v1/content/countries')
+            self.assertEqual(response.headers['ETag'], etag)
+
+            content_payloads.invalidate()
+            response = self.app.get('/api/v1/content/countries', headers={'If-None-Match': etag})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(json.loads(response.data)), self.num_countries + 1)
+        finally:
+            content_payloads._versions.client = None
+            content_payloads.check_interval = 30
@@ -0,0 +1,148 @@
+"""In-process cache of resolved email templates.
+
+EmailRepository.get falls back from the event's template to the global template and then to
+the English one, which costs up to three queries per email. The cache stores the result of
+that resolution per (event_id, key, language) together with the parsed subject and body, so
+bulk sends only pay for it once per language.
+
+Entries are dropped when a template with the same key is committed (through the admin or the
+API), and expire after EMAIL_TEMPLATE_CACHE_TTL seconds so that other processes pick up
+changes too.
+"""
+
+from string import Formatter
+import threading
+import time
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, object_session
+
+from app.email_template.models import EmailTemplate
+from config import EMAIL_TEMPLATE_CACHE_TTL
+
+
+class ParsedTemplate():
+    """A str.format template that is parsed once and can then be rendered many times."""
+
+    _formatter = Formatter()
+
+    def __init__(self, text):
+        self.text = text
+        self._parts = list(self._formatter.parse(text))
+        # Nested replacement fields in format specs are rare enough to leave to str.format
+        self._nested = any(spec and '{' in spec for _, _, spec, _ in self._parts)
+
+    def format(self, **kwargs):
+        if self._nested:
+            return self.text.format(**kwargs)
+
+        formatter = self._formatter
+        chunks = []
+        for literal, field_name, format_spec, conversion in self._parts:
+            chunks.append(literal)
+            if field_name is None:
+                continue
+            if field_name == '' or field_name.isdigit():
+                raise IndexError('Positional replacement fields are not supported in email templates')
+            value, _ = formatter.get_field(field_name, (), kwargs)
+            value = formatter.convert_field(value, conversion)
+            chunks.append(formatter.format_field(value, format_spec))
+        return ''.join(chunks)
+
+
+class CachedEmailTemplate():
+    """Detached copy of an EmailTemplate with its subject and body already parsed."""
+
+    def __init__(self, email_template):
+        self.id = email_template.id
+        self.key = email_template.key
+        self.event_id = email_template.event_id
+        self.language = email_template.language
+        self.subject = email_template.subject
+        self.template = email_template.template
+        self.parsed_subject = ParsedTemplate(email_template.subject)
+        self.parsed_template = ParsedTemplate(email_template.template)
+
+    def format_subject(self, **kwargs):
+        return self.parsed_subject.format(**kwargs)
+
+    def format_template(self, **kwargs):
+        return self.parsed_template.format(**kwargs)
+
+
+_MISSING = object()
+
+
+class EmailTemplateCache():
+
+    def __init__(self, ttl=EMAIL_TEMPLATE_CACHE_TTL):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, event_id, key, language):
+        """Return the cached template (or None if it is known not to exist), or _MISSING."""
+        with self._lock:
+            entry = self._entries.get((event_id, key, language))
+            if entry is not None and entry[1] > time.monotonic():
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+            return _MISSING
+
+    def put(self, event_id, key, language, email_template):
+        cached = None if email_template is None else CachedEmailTemplate(email_template)
+        with self._lock:
+            self._entries[(event_id, key, language)] = (cached, time.monotonic() + self.ttl)
+        return cached
+
+    def invalidate(self, keys):
+        """Drop every entry for the given template keys, whatever their event or language."""
+        keys = set(keys)
+        with self._lock:
+            for cache_key in [k for k in self._entries if k[1] in keys]:
+                del self._entries[cache_key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'size': len(self._entries)}
+
+
+email_template_cache = EmailTemplateCache()
+
+_CHANGED_KEYS = 'email_template_changed_keys'
+
+
+@event.listens_for(EmailTemplate, 'after_insert')
+@event.listens_for(EmailTemplate, 'after_update')
+@event.listens_for(EmailTemplate, 'after_delete')
+def _record_changed_template(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        changed = session.info.setdefault(_CHANGED_KEYS, set())
+        changed.add(target.key)
+        # A renamed template must also stop resolving under its old key
+        changed.update(inspect(target).attrs.key.history.deleted or ())
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changed_templates(session):
+    changed = session.info.pop(_CHANGED_KEYS, None)
+    if changed:
+        email_template_cache.invalidate(changed)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changed_templates(session, previous_transaction):
+    session.info.pop(_CHANGED_KEYS, None)
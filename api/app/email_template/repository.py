@@ -1,14 +1,48 @@
 from app import db
 
+from app.email_template.cache import email_template_cache, _MISSING
 from app.email_template.models import EmailTemplate
 
 class EmailRepository():
 
     @staticmethod
     def get(event_id, key, language):
+        """Resolve the template for an event, falling back to the global and then the English template.
+
+        The resolved template is cached, so the result is a detached CachedEmailTemplate.
+        """
+        email_template = email_template_cache.get(event_id, key, language)
+        if email_template is _MISSING:
+            email_template = email_template_cache.put(
+                event_id, key, language, EmailRepository.get_uncached(event_id, key, language))
+        return email_template
+
+    @staticmethod
+    def get_uncached(event_id, key, language):
         email_template = db.session.query(EmailTemplate).filter_by(event_id=event_id, key=key, language=language).first()
         if email_template is None:
             email_template = db.session.query(EmailTemplate).filter_by(event_id=None, key=key, language=language).first()
             if email_template is None:
                 email_template = db.session.query(EmailTemplate).filter_by(event_id=None, key=key, language='en').first()
-        return email_template
\ No newline at end of file
+        return email_template
+
+    @staticmethod
+    def warm_cache():
+        """Load every template in one query and cache the resolution of each key, in each language,
+        for every event that has templates of its own and for the global templates."""
+        templates = db.session.query(EmailTemplate).all()
+        by_key = {(t.event_id, t.key, t.language): t for t in templates}
+        event_ids = {t.event_id for t in templates} | {None}
+        keys = {t.key for t in templates}
+        languages = {t.language for t in templates}
+
+        for event_id in event_ids:
+            for key in keys:
+                for language in languages:
+                    email_template = (
+                        by_key.get((event_id, key, language))
+                        or by_key.get((None, key, language))
+                        or by_key.get((None, key, 'en')))
+                    email_template_cache.put(event_id, key, language, email_template)
+
+        return len(templates)
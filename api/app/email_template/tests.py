@@ -0,0 +1,76 @@
+from app import db
+from app.email_template.cache import ParsedTemplate, email_template_cache
+from app.email_template.models import EmailTemplate
+from app.email_template.repository import EmailRepository as email_repository
+from app.utils.testing import ApiTestCase
+
+
+class EmailTemplateCacheTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.event = self.add_event(key='EVENT1')
+        self.event_id = self.event.id
+        self.add_email_template('template1', 'Global {firstname}')
+        self.add_email_template('template1', 'Global FR {firstname}', language='fr')
+        self.add_email_template('template1', 'Event {firstname}', event_id=self.event_id)
+        email_template_cache.reset_stats()
+
+    def test_fallback_resolved_once(self):
+        """The fallback chain is resolved once, subsequent lookups are hits."""
+        self.seed_static_data()
+
+        first = email_repository.get(self.event_id, 'template1', 'es')
+        second = email_repository.get(self.event_id, 'template1', 'es')
+
+        self.assertEqual(first.template, 'Global {firstname}')
+        self.assertIs(first, second)
+        self.assertEqual(email_template_cache.stats()['misses'], 1)
+        self.assertEqual(email_template_cache.stats()['hits'], 1)
+
+    def test_missing_template_cached(self):
+        """Unknown keys are cached as missing until a template is added."""
+        self.seed_static_data()
+
+        self.assertIsNone(email_repository.get(None, 'template2', 'en'))
+        self.assertIsNone(email_repository.get(None, 'template2', 'en'))
+        self.assertEqual(email_template_cache.stats()['hits'], 1)
+
+        self.add_email_template('template2', 'New')
+        self.assertEqual(email_repository.get(None, 'template2', 'en').template, 'New')
+
+    def test_invalidated_on_change(self):
+        """Committing a change to a template drops the cached resolutions for its key."""
+        self.seed_static_data()
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'en').template, 'Event {firstname}')
+
+        event_template = db.session.query(EmailTemplate).filter_by(event_id=self.event_id).one()
+        event_template.template = 'Updated {firstname}'
+        db.session.flush()
+        # Not committed yet, so other lookups still see the cached template
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'en').template, 'Event {firstname}')
+        db.session.commit()
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'en').template, 'Updated {firstname}')
+
+        db.session.delete(event_template)
+        db.session.commit()
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'en').template, 'Global {firstname}')
+
+    def test_warm_cache(self):
+        """Warming resolves every event, key and language with a template in a single query."""
+        self.seed_static_data()
+
+        self.assertEqual(email_repository.warm_cache(), 3)
+        email_template_cache.reset_stats()
+
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'en').template, 'Event {firstname}')
+        self.assertEqual(email_repository.get(self.event_id, 'template1', 'fr').template, 'Global FR {firstname}')
+        self.assertEqual(email_template_cache.stats(), {'hits': 2, 'misses': 0, 'size': 4})
+
+    def test_parsed_template_matches_format(self):
+        """Parsed templates render exactly like str.format."""
+        for text in ['Plain', 'Hi {firstname}!', '{a!r} {b:>5} {{literal}} {c[0]}', '{x:{width}}']:
+            params = {'firstname': 'Jane', 'a': 'x', 'b': 'y', 'c': ['z'], 'x': 1, 'width': 3}
+            self.assertEqual(ParsedTemplate(text).format(**params), text.format(**params))
+
+        with self.assertRaises(KeyError):
+            ParsedTemplate('Hi {missing}').format(firstname='Jane')
@@ -1,6 +1,5 @@
 from datetime import datetime
 import traceback
-import itertools
 from flask import g, request
 import flask_restful as restful
 from flask_restful import reqparse, fields, marshal_with, marshal
@@ -13,10 +12,6 @@ from app.users.models import AppUser
 from app.users.repository import UserRepository as user_repository
 from app.applicationModel.models import ApplicationForm
 from app.responses.models import Response
-from app.responses.repository import ResponseRepository as response_repository
-from app.registration.repository import OfferRepository as offer_repository
-from app.registration.repository import RegistrationRepository as registration_repository
-from app.guestRegistrations.repository import GuestRegistrationRepository as guest_registration_repository
 
 from app import db, bcrypt, LOGGER
 from app.utils.errors import (
@@ -33,13 +28,15 @@ from app.utils.errors import (
 )
 
 from app.utils.auth import auth_optional, auth_required, event_admin_required
+from app.utils.identity import current_identity
+from app.utils.http_cache import conditional_get, PRIVATE
 from app.utils.emailer import email_user
+from app.campaigns import dispatch
 from app.events.repository import EventRepository as event_repository
 from app.organisation.models import Organisation
 from app.events.models import EventType
 import app.events.status as event_status
-from app.reviews.repository import ReviewRepository as review_repository
-from app.reviews.repository import ReviewConfigurationRepository as review_config_repository
+from app.events.stats import event_stats_cache
 
 def status_info(status):
     if status is None:
@@ -333,8 +330,7 @@ class EventAPI(EventMixin, restful.Resource):
         if event_repository.exists_by_key(args['key']) and args['key'] != event.key:
             return EVENT_KEY_IN_USE
 
-        user_id = g.current_user["id"]
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_admin(event.id):
             return FORBIDDEN
 
@@ -405,54 +401,23 @@ class EventsAPI(restful.Resource):
 
         upcoming_events = event_repository.get_upcoming_for_organisation(g.organisation.id)
         attended_events = event_repository.get_attended_by_user_for_organisation(g.organisation.id, user_id)
+        events = upcoming_events + attended_events
+        event_ids = [event.id for event in events]
+
+        statuses = {} if user_id == 0 else event_status.get_event_statuses(event_ids, user_id)
 
         returnEvents = []
 
-        for event in itertools.chain(upcoming_events, attended_events):
+        for event in events:
+            event_language = language
             if not event.has_specific_translation(language):
                 LOGGER.error('Missing {} translation for event {}.'.format(language, event.id))
-                language = default_language
-            status = None if user_id == 0 else event_status.get_event_status(event.id, user_id)
-            returnEvents.append(event_info(user_id, event, status, language))
-            language = request.args['language']
+                event_language = default_language
+            returnEvents.append(event_info(user_id, event, statuses.get(event.id), event_language))
 
         return returnEvents, 200
 
 
-def _process_timeseries(timeseries):
-    timeseries = [
-            (d.strftime('%Y-%m-%d'), c) for (d, c) in timeseries
-            if d is not None
-        ]
-    return timeseries
-
-def _combine_timeseries(first_timeseries, second_timeseries):
-    output = []
-    i, j = 0, 0
-    while i < len(first_timeseries) and j < len(second_timeseries):
-        first_date, first_count = first_timeseries[i]
-        second_date, second_count = second_timeseries[j]
-        if first_date == second_date:
-            output.append((first_date, first_count + second_count))
-            i += 1
-            j += 1
-        if first_date < second_date:
-            output.append((first_date, first_count))
-            i += 1
-        else:
-            output.append((second_date, second_count))
-
-    while i < len(first_timeseries):
-        output.append(first_timeseries[i])
-        i += 1
-
-    while j < len(second_timeseries):
-        output.append(second_timeseries[j])
-        j += 1
-
-    return output
-
-
 class EventStatsAPI(EventsMixin, restful.Resource):
 
     @event_admin_required
@@ -462,48 +427,7 @@ class EventStatsAPI(EventsMixin, restful.Resource):
             return EVENT_NOT_FOUND
 
         try:
-            num_responses = response_repository.get_total_count_by_event(event_id)
-            num_submitted_respones = response_repository.get_submitted_count_by_event(event_id)
-            num_withdrawn_responses = response_repository.get_withdrawn_count_by_event(event_id)
-            submitted_response_timeseries = _process_timeseries(response_repository.get_submitted_timeseries_by_event(event_id))
-
-            review_config = review_config_repository.get_configuration_for_event(event_id)
-            required_reviews = 1 if review_config is None else review_config.num_reviews_required
-            reviews_completed = review_repository.get_count_reviews_completed_for_event(event_id)
-            reviews_incomplete = review_repository.get_count_reviews_incomplete_for_event(event_id)
-            reviews_unallocated = review_repository.count_unassigned_reviews(event_id, required_reviews)
-            reviews_timeseries = _process_timeseries(review_repository.get_review_complete_timeseries_by_event(event_id))
-
-            offers_allocated = offer_repository.count_offers_allocated(event_id)
-            offers_accepted = offer_repository.count_offers_accepted(event_id)
-            offers_rejected = offer_repository.count_offers_rejected(event_id)
-            offers_timeseries = _process_timeseries(offer_repository.timeseries_offers_accepted(event_id))
-
-            num_registrations = registration_repository.count_registrations(event_id)
-            num_guests = guest_registration_repository.count_guests(event_id)
-            num_registered_guests = guest_registration_repository.count_registered_guests(event_id)
-            # registration_timeseries = _process_timeseries(registration_repository.timeseries_registrations(event_id))
-            # guest_registration_timeseries = _process_timeseries(guest_registration_repository.timeseries_guest_registrations(event_id))
-            # registration_timeseries = _combine_timeseries(registration_timeseries, guest_registration_timeseries)
-
-            return {
-                'num_responses': num_responses,
-                'num_submitted_responses': num_submitted_respones,
-                'num_withdrawn_responses': num_withdrawn_responses,
-                'submitted_timeseries': submitted_response_timeseries,
-                'reviews_completed': reviews_completed,
-                'review_incomplete': reviews_incomplete,
-                'reviews_unallocated': reviews_unallocated,
-                'reviews_complete_timeseries': reviews_timeseries,
-                'offers_allocated': offers_allocated,
-                'offers_accepted': offers_accepted,
-                'offers_rejected': offers_rejected,
-                'offers_accepted_timeseries': offers_timeseries,
-                'num_registrations': num_registrations,
-                'num_guests': num_guests,
-                'num_registered_guests': num_registered_guests,
-                # 'registration_timeseries': registration_timeseries
-            }, 200
+            return event_stats_cache.get(event_id), 200
 
         except SQLAlchemyError as e:
             LOGGER.error("Database error encountered: {}".format(e))
@@ -515,6 +439,7 @@ class EventStatsAPI(EventsMixin, restful.Resource):
 class EventsByKeyAPI(EventsKeyMixin, restful.Resource):
 
     @auth_required
+    @conditional_get(PRIVATE)
     def get(self):
         args = self.req_parser.parse_args()
 
@@ -552,24 +477,20 @@ class NotSubmittedReminderAPI(EventsMixin, restful.Resource):
         if not event:
             return EVENT_NOT_FOUND
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_admin(event_id):
             return FORBIDDEN
 
-        users = user_repository.get_all_with_unsubmitted_response()
-        for user in users:
-            organisation_name = event.organisation.name
-            deadline = event.application_close.strftime('%A %-d %B %Y')
-
-            email_user(
-                'application-not-submitted', 
-                template_parameters=dict(
-                    organisation_name=organisation_name,
-                    deadline=deadline), 
-                event=event,
-                user=user)
+        campaign = dispatch.create_campaign(
+            event,
+            'unsubmitted',
+            'application-not-submitted',
+            template_parameters=dict(
+                organisation_name=event.organisation.name,
+                deadline=event.application_close.strftime('%A %-d %B %Y')),
+            created_by_user_id=user_id)
 
-        return {'unsubmitted_responses': len(users)}, 201
+        return {'unsubmitted_responses': campaign.total_recipients, 'campaign_id': campaign.id}, 201
 
 
 class NotStartedReminderAPI(EventsMixin, restful.Resource):
@@ -584,30 +505,22 @@ class NotStartedReminderAPI(EventsMixin, restful.Resource):
         if not event:
             return EVENT_NOT_FOUND
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_admin(event_id):
             return FORBIDDEN
 
-        users = user_repository.get_all_without_responses()
-        for user in users:
-            event_name = event.get_name('en')
-            organisation_name = event.organisation.name
-            system_name = event.organisation.system_name
-            deadline = event.application_close.strftime('%A %-d %B %Y')
-
-            email_user(
-                'application-not-started', 
-                template_parameters=dict(
-                    event=event_name,
-                    organisation_name=organisation_name,
-                    system_name=system_name,
-                    deadline=deadline
-                ),
-                event=event,
-                user=user
-            )
+        campaign = dispatch.create_campaign(
+            event,
+            'not_started',
+            'application-not-started',
+            template_parameters=dict(
+                event=event.get_name('en'),
+                organisation_name=event.organisation.name,
+                system_name=event.organisation.system_name,
+                deadline=event.application_close.strftime('%A %-d %B %Y')),
+            created_by_user_id=user_id)
 
-        return {'not_started_responses': len(users)}, 201
+        return {'not_started_responses': campaign.total_recipients, 'campaign_id': campaign.id}, 201
 
 event_fee_fields = {
     'id': fields.Integer,
@@ -631,13 +544,12 @@ class EventFeeAPI(EventFeeMixin, restful.Resource):
     def get(self):
         args = self.get_parser.parse_args()
         event_id = args['event_id']
-        user_id = g.current_user['id']
 
         event = event_repository.get_by_id(event_id)
         if not event:
             return EVENT_NOT_FOUND
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_treasurer(event_id):
             return FORBIDDEN
         
@@ -654,7 +566,7 @@ class EventFeeAPI(EventFeeMixin, restful.Resource):
         if not event:
             return EVENT_NOT_FOUND
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_treasurer(event_id):
             return FORBIDDEN
 
@@ -678,7 +590,7 @@ class EventFeeAPI(EventFeeMixin, restful.Resource):
         event_fee_id = args['event_fee_id']
         user_id = g.current_user['id']
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_treasurer(event_id):
             return FORBIDDEN
 
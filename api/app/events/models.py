@@ -2,6 +2,7 @@
 from datetime import datetime
 
 from app import db
+from app.utils.translations import TranslatedMixin
 from enum import Enum
 
 class EventType(Enum):
@@ -27,9 +28,10 @@ def check_opening(open):
     if open:
         return now < open
     return True
-class Event(db.Model):
+class Event(TranslatedMixin, db.Model):
 
     __tablename__ = "event"
+    __translations__ = 'event_translations'
 
     id = db.Column(db.Integer(), primary_key=True)
     start_date = db.Column(db.DateTime(), nullable=False)
@@ -157,28 +159,22 @@ class Event(db.Model):
         self.event_roles.append(event_role)
 
     def get_name(self, language):
-        event_translation = self.event_translations.filter_by(language=language).first()
+        event_translation = self.get_translation(language)
         if event_translation is not None:
             return event_translation.name
         return None
 
     def get_description(self, language):
-        event_translation = self.event_translations.filter_by(language=language).first()
+        event_translation = self.get_translation(language)
         if event_translation is not None:
             return event_translation.description
         return None
     
     def get_all_name_translations(self):
-        name_translation_map = {}
-        for event_translation in self.event_translations.all():
-            name_translation_map[event_translation.language] = event_translation.name
-        return name_translation_map
+        return self._translations_for_field(lambda t: t.name)
 
     def get_all_description_translations(self):
-        description_translation_map = {}
-        for event_translation in self.event_translations.all():
-            description_translation_map[event_translation.language] = event_translation.description
-        return description_translation_map
+        return self._translations_for_field(lambda t: t.description)
 
     def add_event_translations(self, names, descriptions):
         for language in names:
@@ -197,9 +193,6 @@ class Event(db.Model):
         self.event_fees.append(event_fee)
         return event_fee
 
-    def has_specific_translation(self, language):
-        return self.event_translations.filter_by(language=language).count() == 1
-
     def update(self,
                names,
                descriptions,
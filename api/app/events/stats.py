@@ -0,0 +1,221 @@
+"""Event statistics for the admin dashboard.
+
+compute() gathers everything EventStatsAPI shows with a handful of grouped queries, and folds
+their rows into counts and timeseries in Python. EventStatsCache keeps the resulting snapshot
+in Redis for EVENT_STATS_CACHE_TTL seconds, so admins refreshing the dashboard at the same time
+share one computation.
+
+Snapshots are kept for EVENT_STATS_STALE_TTL seconds after they go stale. Whoever finds a stale
+snapshot first takes a short lock and recomputes it, while everyone else keeps being served the
+stale one, so a burst of refreshes never becomes a burst of queries. With
+EVENT_STATS_BACKGROUND_REFRESH the lock holder recomputes in a background thread and is served the
+stale snapshot straight away too. Without Redis the same happens within each process.
+"""
+
+from collections import Counter
+from datetime import datetime
+import json
+import threading
+import time
+import traceback
+
+from app import app, LOGGER
+from app.guestRegistrations.repository import GuestRegistrationRepository as guest_registration_repository
+from app.registration.repository import OfferRepository as offer_repository
+from app.responses.repository import ResponseRepository as response_repository
+from app.reviews.repository import ReviewRepository as review_repository
+from app.reviews.repository import ReviewConfigurationRepository as review_config_repository
+from app.utils.shared_cache import redis_call, UNAVAILABLE
+from config import EVENT_STATS_CACHE_TTL, EVENT_STATS_STALE_TTL
+
+
+# Seconds a request waits for another process to compute the first snapshot of an event
+FIRST_SNAPSHOT_WAIT = 5
+_POLL_INTERVAL = 0.1
+
+
+def _day(value):
+    # Dates come back as date objects from Postgres and as strings from SQLite
+    return value if isinstance(value, str) else value.strftime('%Y-%m-%d')
+
+
+def _timeseries(counts):
+    return [[day, counts[day]] for day in sorted(counts)]
+
+
+def compute(event_id):
+    """The statistics shown on the event's dashboard, as a JSON-serialisable dict."""
+    num_responses, num_submitted, num_withdrawn, num_reviewable = 0, 0, 0, 0
+    submitted_per_day = Counter()
+    for day, is_submitted, is_withdrawn, count in response_repository.get_status_counts_by_event(event_id):
+        num_responses += count
+        if is_submitted:
+            num_submitted += count
+            if day is not None:
+                submitted_per_day[_day(day)] += count
+        if is_withdrawn:
+            num_withdrawn += count
+        if is_submitted and not is_withdrawn:
+            num_reviewable += count
+
+    reviews_completed = 0
+    reviews_per_day = Counter()
+    for day, is_submitted, count in review_repository.get_review_status_counts_by_event(event_id):
+        if is_submitted:
+            reviews_completed += count
+        if day is not None:
+            reviews_per_day[_day(day)] += count
+
+    review_config = review_config_repository.get_configuration_for_event(event_id)
+    required_reviews = 1 if review_config is None else review_config.num_reviews_required
+    reviews_unallocated = (num_reviewable * required_reviews
+                           - review_repository.count_reviewers_of_submitted_responses(event_id))
+
+    offers_allocated, offers_accepted, offers_rejected = 0, 0, 0
+    accepted_per_day = Counter()
+    for day, candidate_response, count in offer_repository.get_response_counts_by_event(event_id):
+        offers_allocated += count
+        if candidate_response is True:
+            offers_accepted += count
+            if day is not None:
+                accepted_per_day[_day(day)] += count
+        elif candidate_response is False:
+            offers_rejected += count
+
+    num_registrations, num_guests, num_registered_guests = (
+        guest_registration_repository.count_registrations_and_guests(event_id))
+
+    return {
+        'num_responses': num_responses,
+        'num_submitted_responses': num_submitted,
+        'num_withdrawn_responses': num_withdrawn,
+        'submitted_timeseries': _timeseries(submitted_per_day),
+        'reviews_completed': reviews_completed,
+        'review_incomplete': review_repository.get_count_reviews_incomplete_for_event(event_id),
+        'reviews_unallocated': reviews_unallocated,
+        'reviews_complete_timeseries': _timeseries(reviews_per_day),
+        'offers_allocated': offers_allocated,
+        'offers_accepted': offers_accepted,
+        'offers_rejected': offers_rejected,
+        'offers_accepted_timeseries': _timeseries(accepted_per_day),
+        'num_registrations': num_registrations,
+        'num_guests': num_guests,
+        'num_registered_guests': num_registered_guests,
+        'computed_at': datetime.now().isoformat()
+    }
+
+
+class EventStatsCache():
+
+    def __init__(self, ttl=EVENT_STATS_CACHE_TTL, stale_ttl=EVENT_STATS_STALE_TTL, lock_timeout=60, client=None):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.lock_timeout = lock_timeout
+        self.client = client
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget the snapshots kept in this process (but not in Redis)."""
+        with self._lock:
+            self._snapshots = {}
+            self._refreshing = set()
+            self.hits = 0
+            self.misses = 0
+
+    def _key(self, event_id):
+        return 'event_stats:{}'.format(event_id)
+
+    def _lock_key(self, event_id):
+        return 'event_stats:{}:lock'.format(event_id)
+
+    def _load(self, event_id):
+        stored = redis_call('get', self._key(event_id), client=self.client)
+        if stored is UNAVAILABLE:
+            with self._lock:
+                return self._snapshots.get(event_id)
+        return None if stored is None else json.loads(stored)
+
+    def _store(self, event_id, snapshot):
+        with self._lock:
+            self._snapshots[event_id] = snapshot
+        redis_call('set', self._key(event_id), json.dumps(snapshot), ex=self.stale_ttl, client=self.client)
+
+    def _is_fresh(self, snapshot):
+        age = datetime.now() - datetime.fromisoformat(snapshot['computed_at'])
+        return age.total_seconds() < self.ttl
+
+    def _acquire(self, event_id):
+        """Take the right to recompute the event's snapshot, in this process and then in Redis."""
+        with self._lock:
+            if event_id in self._refreshing:
+                return False
+            self._refreshing.add(event_id)
+
+        acquired = redis_call('set', self._lock_key(event_id), 1, nx=True, ex=self.lock_timeout, client=self.client)
+        if acquired is UNAVAILABLE or acquired:
+            return True
+
+        with self._lock:
+            self._refreshing.discard(event_id)
+        return False
+
+    def _release(self, event_id):
+        redis_call('delete', self._lock_key(event_id), client=self.client)
+        with self._lock:
+            self._refreshing.discard(event_id)
+
+    def refresh(self, event_id):
+        snapshot = compute(event_id)
+        self._store(event_id, snapshot)
+        return snapshot
+
+    def _refresh_in_background(self, event_id):
+        def run():
+            with app.app_context():
+                try:
+                    self.refresh(event_id)
+                except Exception:
+                    LOGGER.error('Could not refresh the statistics of event {}: {}'.format(
+                        event_id, traceback.format_exc()))
+                finally:
+                    self._release(event_id)
+
+        threading.Thread(target=run, name='event-stats-{}'.format(event_id), daemon=True).start()
+
+    def get(self, event_id):
+        snapshot = self._load(event_id)
+        if snapshot is not None and self._is_fresh(snapshot):
+            with self._lock:
+                self.hits += 1
+            return snapshot
+
+        if self._acquire(event_id):
+            with self._lock:
+                self.misses += 1
+            if snapshot is not None and app.config.get('EVENT_STATS_BACKGROUND_REFRESH'):
+                self._refresh_in_background(event_id)
+                return snapshot
+            try:
+                return self.refresh(event_id)
+            finally:
+                self._release(event_id)
+
+        # Somebody else is already recomputing the snapshot
+        if snapshot is not None:
+            with self._lock:
+                self.hits += 1
+            return snapshot
+
+        deadline = time.monotonic() + FIRST_SNAPSHOT_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(_POLL_INTERVAL)
+            snapshot = self._load(event_id)
+            if snapshot is not None:
+                return snapshot
+
+        LOGGER.warning('Timed out waiting for the statistics of event {}, computing them again'.format(event_id))
+        return self.refresh(event_id)
+
+
+event_stats_cache = EventStatsCache()
@@ -41,46 +41,74 @@ def _get_registration_status(registration):
         return 'Not Confirmed'
 
 
-def get_event_status(event_id, user_id):
-    invited_guest = invited_guest_repository.get_for_event_and_user(event_id, user_id)
-    if invited_guest:
-        registration = invited_guest_repository.get_registration_for_event_and_user(event_id, user_id)
-        # If they're an invited guest, we don't bother with whether they applied or not
-        return EventStatus(invited_guest=invited_guest.role, 
-                           registration_status=_get_registration_status(registration))
-    
-    response = response_repository.get_by_user_id_for_event(user_id, event_id)
+def _get_application_status(response):
     if response is None:
-        application_status = None
-    elif response.is_submitted:
-        application_status = 'Submitted'
-    elif response.is_withdrawn:
-        application_status = 'Withdrawn'
-    else:
-        application_status = 'Not Submitted'
+        return None
+    if response.is_submitted:
+        return 'Submitted'
+    if response.is_withdrawn:
+        return 'Withdrawn'
+    return 'Not Submitted'
 
-    outcome = outcome_repository.get_latest_by_user_for_event(user_id, event_id)
-    if outcome is None:
-        outcome_status = None
-    else:
-        outcome_status = outcome.status.name
 
-    offer = offer_repository.get_by_user_id_for_event(user_id, event_id)
+def _get_offer_status(offer):
     if offer is None:
-        offer_status = None
-    elif offer.candidate_response:
-        offer_status = 'Accepted'
-    elif offer.candidate_response == False:
-        offer_status = 'Rejected'
-    elif offer.is_expired():
-        offer_status = 'Expired'
-    else:
-        offer_status = 'Pending'
+        return None
+    if offer.candidate_response:
+        return 'Accepted'
+    if offer.candidate_response == False:
+        return 'Rejected'
+    if offer.is_expired():
+        return 'Expired'
+    return 'Pending'
+
+
+def _first_by_event(pairs):
+    """{event_id: first item} from (event_id, item) pairs."""
+    first = {}
+    for event_id, item in pairs:
+        first.setdefault(event_id, item)
+    return first
 
-    registration = registration_repository.get_by_user_id(user_id, event_id)
-    registration_status = _get_registration_status(registration)
 
-    return EventStatus(application_status=application_status,
-                       outcome_status=outcome_status,
-                       offer_status=offer_status,
-                       registration_status=registration_status)
+def get_event_statuses(event_ids, user_id):
+    """The user's EventStatus at each of the events, as {event_id: EventStatus}.
+
+    Runs the same six queries however many events there are.
+    """
+    event_ids = list(set(event_ids))
+    if not event_ids:
+        return {}
+
+    invited_guests = _first_by_event((guest.event_id, guest) for guest in
+                                     invited_guest_repository.get_for_events_and_user(event_ids, user_id))
+    guest_registrations = _first_by_event(
+        invited_guest_repository.get_registrations_for_events_and_user(event_ids, user_id))
+    responses = _first_by_event(response_repository.get_by_user_id_for_events(user_id, event_ids))
+    outcomes = _first_by_event((outcome.event_id, outcome) for outcome in
+                               outcome_repository.get_latest_by_user_for_events(user_id, event_ids))
+    offers = _first_by_event((offer.event_id, offer) for offer in
+                             offer_repository.get_by_user_id_for_events(user_id, event_ids))
+    registrations = _first_by_event(registration_repository.get_by_user_id_for_events(user_id, event_ids))
+
+    statuses = {}
+    for event_id in event_ids:
+        invited_guest = invited_guests.get(event_id)
+        if invited_guest:
+            # If they're an invited guest, we don't bother with whether they applied or not
+            statuses[event_id] = EventStatus(
+                invited_guest=invited_guest.role,
+                registration_status=_get_registration_status(guest_registrations.get(event_id)))
+            continue
+
+        outcome = outcomes.get(event_id)
+        statuses[event_id] = EventStatus(
+            application_status=_get_application_status(responses.get(event_id)),
+            outcome_status=None if outcome is None else outcome.status.name,
+            offer_status=_get_offer_status(offers.get(event_id)),
+            registration_status=_get_registration_status(registrations.get(event_id)))
+    return statuses
+
+
+def get_event_status(event_id, user_id):
+    return get_event_statuses([event_id], user_id)[event_id]
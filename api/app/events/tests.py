@@ -2,6 +2,8 @@ import json
 import warnings
 
 from datetime import datetime, date, timedelta
+from mock import patch
+from sqlalchemy import event as sqlalchemy_event
 from app import app, db, LOGGER
 from app.events.models import Event, EventFee
 from app.utils.testing import ApiTestCase
@@ -17,6 +19,7 @@ from app.outcome.models import Outcome
 from app.outcome.models import Status as OutcomeStatus
 from app.invitedGuest.models import InvitedGuest, GuestRegistration
 import app.events.status as event_status
+from app.events.stats import EventStatsCache, event_stats_cache
 from app.registration.models import RegistrationForm, Offer, Registration
 
 class EventsAPITest(ApiTestCase):
@@ -132,6 +135,48 @@ class EventsAPITest(ApiTestCase):
         response = self.app.get('/api/v1/events')
         self.assertEqual(response.status_code, 401)  # Unauthorized
 
+    def test_statuses_for_several_events(self):
+        """Test the status at each event, and that the number of queries doesn't grow with the number of events."""
+        self.seed_static_data()
+        user_id = self.test_user.id
+        self.add_response(self.test_form.id, user_id, is_submitted=True)
+        header = self.get_auth_header_for('something@email.com')
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def get_events():
+            del statements[:]
+            response = self.app.get('/api/v1/events', headers=header, query_string={'language': 'fr'})
+            return json.loads(response.data), len(statements)
+
+        sqlalchemy_event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            _, one_event_queries = get_events()
+
+            offer_event = self.add_event({'en': 'Offer Event', 'fr': 'Evenement'}, {'en': 'Offers', 'fr': 'Offres'},
+                                         key='OFFEREVENT')
+            self.add_offer(user_id, offer_event.id, candidate_response=True)
+            guest_event = self.add_event({'en': 'Guest Event'}, {'en': 'Guests'}, key='GUESTEVENT')
+            self.add_invited_guest(user_id, guest_event.id, role='Speaker')
+
+            data, three_event_queries = get_events()
+        finally:
+            sqlalchemy_event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+
+        self.assertEqual(one_event_queries, three_event_queries)
+        events = {event['key']: event for event in data}
+        self.assertEqual(len(events), 3)
+        self.assertEqual(events['SPEEDNET']['name'], 'Test Event')
+        self.assertEqual(events['SPEEDNET']['status']['application_status'], 'Submitted')
+        self.assertIsNone(events['SPEEDNET']['status']['offer_status'])
+        self.assertEqual(events['OFFEREVENT']['name'], 'Evenement')
+        self.assertEqual(events['OFFEREVENT']['status']['offer_status'], 'Accepted')
+        self.assertIsNone(events['OFFEREVENT']['status']['application_status'])
+        self.assertEqual(events['GUESTEVENT']['status']['invited_guest'], 'Speaker')
+        self.assertTrue(events['GUESTEVENT']['status']['is_event_attendee'])
+
     def test_past_event_offer_accepted(self):
         """API should return past events that user had an accepted offer for."""
         self.seed_static_data()
@@ -287,6 +332,66 @@ class EventsStatsAPITest(ApiTestCase):
                                 query_string={'someparam': self.test_event.id})
         self.assertEqual(response.status_code, 400)
 
+    def test_get_stats(self):
+        self.seed_static_data()
+        self.add_offer(self.test_user2['id'], self.test_event.id, candidate_response=True)
+
+        response = self.app.get('/api/v1/eventstats',
+                                headers={'Authorization': self.test_user1['token']},
+                                query_string={'event_id': self.test_event.id})
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['num_responses'], 2)
+        self.assertEqual(data['num_submitted_responses'], 1)
+        self.assertEqual(data['num_withdrawn_responses'], 0)
+        self.assertEqual(data['submitted_timeseries'], [[date.today().isoformat(), 1]])
+        self.assertEqual(data['reviews_completed'], 0)
+        self.assertEqual(data['reviews_unallocated'], 1)
+        self.assertEqual(data['offers_allocated'], 1)
+        self.assertEqual(data['offers_accepted'], 1)
+        self.assertEqual(data['offers_rejected'], 0)
+        self.assertEqual(data['num_registrations'], 0)
+        self.assertIn('computed_at', data)
+
+    def test_stats_cached(self):
+        self.seed_static_data()
+        event_id = self.test_event.id
+        form_id = self.test_form.id
+        params = {'event_id': event_id}
+        headers = {'Authorization': self.test_user1['token']}
+
+        first = json.loads(self.app.get('/api/v1/eventstats', headers=headers, query_string=params).data)
+
+        third_user = self.add_user('third@user.com')
+        self.add_response(form_id, third_user.id, is_submitted=True)
+
+        second = json.loads(self.app.get('/api/v1/eventstats', headers=headers, query_string=params).data)
+        self.assertEqual(second['num_responses'], 2)
+        self.assertEqual(second['computed_at'], first['computed_at'])
+
+        event_stats_cache.clear()
+        third = json.loads(self.app.get('/api/v1/eventstats', headers=headers, query_string=params).data)
+        self.assertEqual(third['num_responses'], 3)
+
+    def test_stale_stats_served_during_refresh(self):
+        self.seed_static_data()
+        event_id = self.test_event.id
+        cache = EventStatsCache(ttl=30)
+        cache.get(event_id)
+        cache._snapshots[event_id]['computed_at'] = (datetime.now() - timedelta(hours=1)).isoformat()
+
+        # Another request is already recomputing the snapshot, so the stale one is served
+        cache._refreshing.add(event_id)
+        with patch('app.events.stats.compute') as compute:
+            snapshot = cache.get(event_id)
+        compute.assert_not_called()
+        self.assertEqual(snapshot['num_responses'], 2)
+
+        cache._refreshing.discard(event_id)
+        snapshot = cache.get(event_id)
+        self.assertGreater(datetime.fromisoformat(snapshot['computed_at']), datetime.now() - timedelta(minutes=1))
+
 
 class RemindersAPITest(ApiTestCase):
     def seed_static_data(self):
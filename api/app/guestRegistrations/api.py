@@ -141,7 +141,6 @@ class GuestRegistrationApi(restful.Resource):
                                                      value=answer_args['value'], is_active=True,
                                                      created_on=datetime.now())
                     db.session.add(answer)
-            db.session.commit()
 
             registration_answers = db.session.query(GuestRegistrationAnswer).filter(
                 GuestRegistrationAnswer.guest_registration_id == registration.id,
@@ -152,7 +151,7 @@ class GuestRegistrationApi(restful.Resource):
             email_sent = self.send_confirmation(current_user, registration_questions, registration_answers, event)
             if email_sent:
                 registration.confirmation_email_sent_at = date.today()
-                db.session.commit()
+            db.session.commit()
 
             return registration, 201  # 201 is 'CREATED' status code
         except SQLAlchemyError as e:
@@ -205,7 +204,6 @@ class GuestRegistrationApi(restful.Resource):
                                                      created_on=datetime.now())
 
                     db.session.add(answer)
-            db.session.commit()
 
             current_user = user_repository.get_by_id(user_id)
 
@@ -224,7 +222,7 @@ class GuestRegistrationApi(restful.Resource):
             email_sent = self.send_confirmation(current_user, registration_questions, registration_answers, event)
             if email_sent:
                 registration.confirmation_email_sent_at = date.today()
-                db.session.commit()
+            db.session.commit()
 
             return 200
         except Exception as e:
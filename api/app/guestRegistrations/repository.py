@@ -2,7 +2,7 @@ from app import db
 from app.invitedGuest.models import InvitedGuest, GuestRegistration, GuestRegistrationAnswer
 from app.users.models import AppUser
 from app.events.models import Event
-from app.registration.models import RegistrationForm, RegistrationQuestion
+from app.registration.models import Registration, RegistrationForm, RegistrationQuestion
 from app.attendance.models import Attendance
 from sqlalchemy.sql import exists
 from app import LOGGER
@@ -77,6 +77,22 @@ class GuestRegistrationRepository():
                         .count())
         return count
 
+    @staticmethod
+    def count_registrations_and_guests(event_id):
+        """(registrations, invited guests, registered guests) for the event, in a single query."""
+        registrations = (db.session.query(func.count(Registration.id))
+                         .join(RegistrationForm, Registration.registration_form_id == RegistrationForm.id)
+                         .filter(RegistrationForm.event_id == event_id)
+                         .as_scalar())
+        guests = (db.session.query(func.count(InvitedGuest.id))
+                  .filter(InvitedGuest.event_id == event_id)
+                  .as_scalar())
+        registered_guests = (db.session.query(func.count(GuestRegistration.id))
+                             .join(RegistrationForm, GuestRegistration.registration_form_id == RegistrationForm.id)
+                             .filter(RegistrationForm.event_id == event_id)
+                             .as_scalar())
+        return db.session.query(registrations, guests, registered_guests).one()
+
     @staticmethod
     def count_registered_guests(event_id):
         count = (db.session.query(GuestRegistration)
@@ -4,6 +4,7 @@ import flask_restful as restful
 from sqlalchemy.exc import IntegrityError
 
 from app.utils.auth import auth_required, event_admin_required
+from app.utils.identity import current_identity
 from app import LOGGER
 from app import db, bcrypt
 from flask import g
@@ -81,9 +82,8 @@ class InvitedGuestAPI(InvitedGuestMixin, restful.Resource):
         event_id = args['event_id']
         invited_guest_id = args['invited_guest_id']
         language = args['language']
-        current_user_id = g.current_user['id']
 
-        current_user = user_repository.get_by_id(current_user_id)
+        current_user = current_identity()
         if not (current_user.is_event_admin(event_id) or current_user.is_admin):
             return FORBIDDEN
     
@@ -124,8 +124,9 @@ class InvitedGuestAPI(InvitedGuestMixin, restful.Resource):
         db.session.add(invitedGuest)
 
         try:
-            db.session.commit()
+            db.session.flush()
         except IntegrityError:
+            db.session.rollback()
             LOGGER.error(
                 "Failed to add invited guest: {}".format(email))
             return ADD_INVITED_GUEST_FAILED
@@ -147,6 +148,7 @@ class InvitedGuestAPI(InvitedGuestMixin, restful.Resource):
                 LOGGER.error('Failed to send email to invited guest with user Id {}, due to {}'.format(user.id, e))
                 return INVITED_GUEST_EMAIL_FAILED
 
+        db.session.commit()
         return invitedGuest_info(invitedGuest, user), 201
 
 class InvitedGuestTagAPI(restful.Resource, InvitedGuestTagMixin):
@@ -196,7 +198,7 @@ class CreateUser(SignupMixin, restful.Resource):
             reset_code = misc.make_code()
             password_reset=PasswordReset(user=user)
             db.session.add(password_reset)
-            db.session.commit()
+            db.session.flush()
 
             try:
 
@@ -215,6 +217,7 @@ class CreateUser(SignupMixin, restful.Resource):
             except Exception as e:
                 LOGGER.error('Failed to send email for invited guest with user Id {} due to: {}'.format(user.id, e))
                 return INVITED_GUEST_EMAIL_FAILED
+            db.session.commit()
 
         return invited_guest_info, status
 
@@ -240,9 +243,8 @@ class InvitedGuestList(InvitedGuestListMixin, restful.Resource):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
         language = args['language']
-        current_user_id = g.current_user['id']
 
-        current_user = user_repository.get_by_id(current_user_id)
+        current_user = current_identity()
         if not (current_user.is_event_admin(event_id) or current_user.is_admin):
             return FORBIDDEN
 
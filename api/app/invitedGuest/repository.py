@@ -16,6 +16,23 @@ class InvitedGuestRepository():
                 .filter(InvitedGuest.event_id == event_id, InvitedGuest.user_id == user_id)
                 .first())
 
+    @staticmethod
+    def get_for_events_and_user(event_ids, user_id):
+        return (db.session.query(InvitedGuest)
+                .filter(InvitedGuest.event_id.in_(event_ids), InvitedGuest.user_id == user_id)
+                .all())
+
+    @staticmethod
+    def get_registrations_for_events_and_user(event_ids, user_id):
+        """(event_id, GuestRegistration) pairs of the user's guest registrations for the events."""
+        return (db.session.query(RegistrationForm.event_id, GuestRegistration)
+                .select_from(GuestRegistration)
+                .filter(GuestRegistration.user_id == user_id)
+                .join(RegistrationForm, GuestRegistration.registration_form_id == RegistrationForm.id)
+                .filter(RegistrationForm.event_id.in_(event_ids))
+                .order_by(GuestRegistration.id)
+                .all())
+
     @staticmethod
     def get_registration_for_event_and_user(event_id, user_id):
         return (db.session.query(GuestRegistration)
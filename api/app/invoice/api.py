@@ -30,6 +30,7 @@ from app.utils.errors import (
     INVOICE_OVERDUE,
     INVOICE_NEGATIVE)
 from app.utils.auth import auth_required
+from app.utils.identity import current_identity
 from app.utils.exceptions import BaobabError
 from config import BOABAB_HOST
 
@@ -135,8 +136,7 @@ class InvoiceAdminAPI(InvoiceAdminMixin, restful.Resource):
         args = self.get_parser.parse_args()
         event_id = args['event_id']
 
-        user_id = g.current_user["id"]
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
 
         if not current_user.is_event_treasurer(event_id):
             return FORBIDDEN
@@ -153,7 +153,7 @@ class InvoiceAdminAPI(InvoiceAdminMixin, restful.Resource):
         event_fee_ids = args['event_fee_ids']
 
         user_id = g.current_user["id"]
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         event = event_repository.get_by_id(event_id)
 
         if not current_user.is_event_treasurer(event_id):
@@ -211,7 +211,8 @@ class InvoiceAdminAPI(InvoiceAdminMixin, restful.Resource):
             error_message = f"Offers {','.join(str(id) for id in invalid_offer_ids)} already have an invoice."
             return {'message': error_message}, 400
 
-        invoice_repository.add_all(invoices)
+        # Committed once the invoice emails are queued, so that they are committed together
+        invoice_repository.flush_all(invoices)
 
         # Generate PDFs and email them
         for invoice in invoices:
@@ -240,6 +241,7 @@ class InvoiceAdminAPI(InvoiceAdminMixin, restful.Resource):
             except Exception as e:
                 LOGGER.error("Could not upload invoice to cloud storage: " + str(e))
 
+        invoice_repository.save()
         return marshal(invoices, invoice_list_fields), 201
 
     @auth_required
@@ -249,7 +251,7 @@ class InvoiceAdminAPI(InvoiceAdminMixin, restful.Resource):
         invoice_id = args['invoice_id']
 
         current_user_id = g.current_user["id"]
-        current_user = user_repository.get_by_id(current_user_id)
+        current_user = current_identity()
         if not current_user.is_event_treasurer(event_id):
             return FORBIDDEN
 
@@ -10,6 +10,13 @@ from app.registration.models import Offer
 from app.utils.repository import BaseRepository
 
 class InvoiceRepository(BaseRepository):
+    @staticmethod
+    def flush_all(invoices):
+        """Add invoices and assign their ids without committing them."""
+        db.session.add_all(invoices)
+        db.session.flush()
+        return invoices
+
     @staticmethod
     def get_by_id(invoice_id):
         return db.session.query(Invoice).get(invoice_id)
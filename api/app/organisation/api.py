@@ -1,13 +1,16 @@
 import flask_restful as restful
 from flask import g
-from flask_restful import fields, marshal_with
+from flask_restful import fields, marshal, marshal_with
+from sqlalchemy.exc import IntegrityError
 
+from app import LOGGER
 from app.organisation.mixins import StripeSettingsMixin
 from app.organisation.resolver import OrganisationResolver
 from app.organisation.repository import OrganisationRepository as organisation_repository
 from app.users.repository import UserRepository as user_repository
 from app.utils.auth import auth_required
-from app.utils.errors import FORBIDDEN
+from app.utils.errors import FORBIDDEN, STRIPE_ACCOUNT_IN_USE
+from app.utils.http_cache import conditional_get, PUBLIC
 
 class OrganisationApi(restful.Resource):
     organisation_fields = {
@@ -26,6 +29,7 @@ class OrganisationApi(restful.Resource):
         'iso_currency_code': fields.String
     }
 
+    @conditional_get(PUBLIC, max_age=300)
     @marshal_with(organisation_fields)
     def get(self):
         return g.organisation
@@ -35,7 +39,8 @@ class StripeSettingsApi(restful.Resource, StripeSettingsMixin):
         'iso_currency_code': fields.String,
         'stripe_api_publishable_key': fields.String,
         'stripe_api_secret_key': fields.String,
-        'stripe_webhook_secret_key': fields.String
+        'stripe_webhook_secret_key': fields.String,
+        'stripe_account_id': fields.String
     }
 
     @auth_required
@@ -48,7 +53,6 @@ class StripeSettingsApi(restful.Resource, StripeSettingsMixin):
         return g.organisation
 
     @auth_required
-    @marshal_with(settings_fields)
     def post(self):
         current_user = user_repository.get_by_id(g.current_user['id'])
         if not current_user.is_admin:
@@ -61,9 +65,15 @@ class StripeSettingsApi(restful.Resource, StripeSettingsMixin):
         organisation.set_stripe_keys(
             args['publishable_key'],
             args['secret_key'],
-            args['webhook_secret_key']
+            args['webhook_secret_key'],
+            args['account_id']
         )
-        organisation_repository.save()
+        try:
+            organisation_repository.save()
+        except IntegrityError:
+            organisation_repository.rollback()
+            LOGGER.warning('Stripe account {} is already used by another organisation'.format(args['account_id']))
+            return STRIPE_ACCOUNT_IN_USE
 
         OrganisationResolver.bust_cache()
-        return organisation, 200
\ No newline at end of file
+        return marshal(organisation, self.settings_fields), 200
\ No newline at end of file
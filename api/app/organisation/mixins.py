@@ -5,4 +5,5 @@ class StripeSettingsMixin(object):
     req_parser.add_argument('iso_currency_code', type=str, required=True)
     req_parser.add_argument('publishable_key', type=str, required=True)
     req_parser.add_argument('secret_key', type=str, required=True)
-    req_parser.add_argument('webhook_secret_key', type=str, required=True)
\ No newline at end of file
+    req_parser.add_argument('webhook_secret_key', type=str, required=True)
+    req_parser.add_argument('account_id', type=str, required=False)
\ No newline at end of file
@@ -21,6 +21,8 @@ class Organisation(db.Model):
     stripe_api_publishable_key = db.Column(db.String(200), nullable=True)
     stripe_api_secret_key = db.Column(db.String(200), nullable=True)
     stripe_webhook_secret_key = db.Column(db.String(200), nullable=True)
+    # The acct_... id of the organisation's Stripe account, sent with webhooks from connected accounts
+    stripe_account_id = db.Column(db.String(100), nullable=True, index=True, unique=True)
 
     events = db.relationship('Event')
 
@@ -48,10 +50,13 @@ class Organisation(db.Model):
     def set_currency(self, iso_currency_code):
         self.iso_currency_code = iso_currency_code
 
-    def set_stripe_keys(self, publishable_key, secret_key, webhook_secret_key):
+    def set_stripe_keys(self, publishable_key, secret_key, webhook_secret_key, account_id=None):
         self.stripe_api_publishable_key = publishable_key
         self.stripe_api_secret_key = secret_key
         self.stripe_webhook_secret_key = webhook_secret_key
+        if account_id is not None:
+            # Kept unless given, an empty id clears it
+            self.stripe_account_id = account_id or None
 
 
 @dataclasses.dataclass
@@ -73,6 +78,7 @@ class PlainOrganisation:
     stripe_api_publishable_key: str
     stripe_api_secret_key: str
     stripe_webhook_secret_key: str
+    stripe_account_id: str
 
     @classmethod
     def from_organisation_model(cls, organisation: Organisation):
@@ -93,4 +99,5 @@ class PlainOrganisation:
             stripe_api_publishable_key=str(organisation.stripe_api_publishable_key),
             stripe_api_secret_key=str(organisation.stripe_api_secret_key),
             stripe_webhook_secret_key=str(organisation.stripe_webhook_secret_key),
+            stripe_account_id=organisation.stripe_account_id,
         )
@@ -11,8 +11,12 @@ class OrganisationRepository(BaseRepository):
 
     @staticmethod
     def get_by_domain(domain):
-        return db.session.query(Organisation).Filter(Organisation.domain == domain).one_or_none()
+        return db.session.query(Organisation).filter(Organisation.domain == domain).one_or_none()
 
     @staticmethod
     def get_all():
         return db.session.query(Organisation).all()
+
+    @staticmethod
+    def rollback():
+        db.session.rollback()
@@ -1,56 +1,190 @@
+"""Resolution of the organisation a request is for.
+
+Every request resolves its organisation from the domain of its Origin (or Referer), and every
+Stripe webhook from its signature, so the organisations are kept in each process for
+ORGANISATION_CACHE_TTL seconds rather than queried each time.
+
+A domain that isn't in the cache is looked up on its own, in case the organisation was added
+since the cache was loaded. Domains that turn out to be unknown are remembered for
+ORGANISATION_NEGATIVE_CACHE_TTL seconds, so requests with bogus Origin headers are turned away
+without querying again.
+
+bust_cache() forgets the organisations in this process and publishes on Redis, and every other
+worker forgets them as soon as its subscriber thread hears about it. Without Redis the other
+workers see the change when their cache expires.
+
+Webhooks from connected Stripe accounts name the account, which is looked up in an index of the
+organisations' stripe_account_id. Otherwise, or if the named organisation's secret doesn't match,
+the signature is checked against every organisation's webhook secret.
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import request
+from redis.exceptions import RedisError
+from werkzeug.exceptions import BadRequest
+
+from app import app, redis, LOGGER
 from app.organisation.repository import OrganisationRepository
 from app.organisation.models import PlainOrganisation
 from app.utils.auth import verify_payload
-from app import LOGGER
-from flask import request
-from werkzeug.exceptions import BadRequest
+from config import ORGANISATION_CACHE_TTL, ORGANISATION_NEGATIVE_CACHE_TTL, REDIS_RETRY_INTERVAL
+
+
+INVALIDATION_CHANNEL = 'organisation:invalidate'
+
+# Unknown domains remembered at most, so bogus Origin headers can't grow the cache without bound
+_MAX_UNKNOWN_DOMAINS = 10000
+
+
+def _stripe_account(signed_payload):
+    """The connected account a webhook's payload ("<timestamp>.<event JSON>") names, if any."""
+    try:
+        event = json.loads(signed_payload.split('.', 1)[1])
+    except (IndexError, ValueError):
+        return None
+    return event.get('account') if isinstance(event, dict) else None
+
 
 class OrganisationResolver():
+    ttl = ORGANISATION_CACHE_TTL
+    negative_ttl = ORGANISATION_NEGATIVE_CACHE_TTL
+    client = None
+
+    _lock = threading.Lock()
     _cache = None
+    _by_stripe_account = {}
+    _loaded_at = 0.0
+    _unknown_domains = {}
+    _subscriber_pid = None
 
     @classmethod
     def _populate_cache(cls):
         LOGGER.info('Populating Organisation Cache')
-        organisations = OrganisationRepository.get_all()
-        cls._cache = {}
-        for org in organisations:
-            cls._cache[org.domain] = PlainOrganisation.from_organisation_model(org)
+        cache, by_stripe_account = {}, {}
+        for org in OrganisationRepository.get_all():
+            plain = PlainOrganisation.from_organisation_model(org)
+            cache[plain.domain] = plain
+            if plain.stripe_account_id:
+                by_stripe_account[plain.stripe_account_id] = plain
+
+        with cls._lock:
+            cls._cache = cache
+            cls._by_stripe_account = by_stripe_account
+            cls._loaded_at = time.monotonic()
+            cls._unknown_domains = {}
+        return cache
+
+    @classmethod
+    def _organisations(cls):
+        cls._subscribe()
+        cache = cls._cache
+        if cache is None or time.monotonic() - cls._loaded_at >= cls.ttl:
+            cache = cls._populate_cache()
+        return cache
 
     @classmethod
     def reset_cache(cls):
-        cls._cache = None
+        """Forget the organisations in this process."""
+        with cls._lock:
+            cls._cache = None
+            cls._by_stripe_account = {}
+            cls._unknown_domains = {}
 
     @classmethod
     def bust_cache(cls):
-        cls._populate_cache()
+        """Make every worker reload the organisations. Call after changing an organisation."""
+        cls.reset_cache()
+        if app.config.get('SHARED_CACHE_ENABLED', True):
+            try:
+                (cls.client or redis).publish(INVALIDATION_CHANNEL, os.getpid())
+            except RedisError as e:
+                LOGGER.warning('Could not tell other workers to reload the organisations: {}'.format(e))
+
+    @classmethod
+    def _subscribe(cls):
+        """Start this process's thread listening for bust_cache() in other workers, unless it's running."""
+        if cls._subscriber_pid == os.getpid() or not app.config.get('SHARED_CACHE_ENABLED', True):
+            return
+        with cls._lock:
+            if cls._subscriber_pid == os.getpid():
+                return
+            cls._subscriber_pid = os.getpid()
+        threading.Thread(target=cls._listen, name='organisation-cache-invalidation', daemon=True).start()
+
+    @classmethod
+    def _listen(cls):
+        while True:
+            try:
+                pubsub = (cls.client or redis).pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Invalidations published while we weren't subscribed are lost
+                cls.reset_cache()
+                for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        cls.reset_cache()
+            except RedisError as e:
+                LOGGER.warning('Lost the organisation invalidation channel, retrying in {} seconds: {}'.format(
+                    REDIS_RETRY_INTERVAL, e))
+                time.sleep(REDIS_RETRY_INTERVAL)
+
+    @classmethod
+    def _is_known_unknown(cls, domain):
+        with cls._lock:
+            expires_at = cls._unknown_domains.get(domain)
+            if expires_at is not None and expires_at <= time.monotonic():
+                del cls._unknown_domains[domain]
+                expires_at = None
+        return expires_at is not None
+
+    @classmethod
+    def _remember_unknown(cls, domain):
+        with cls._lock:
+            if len(cls._unknown_domains) >= _MAX_UNKNOWN_DOMAINS:
+                cls._unknown_domains = {}
+            cls._unknown_domains[domain] = time.monotonic() + cls.negative_ttl
 
     @classmethod
     def resolve_from_domain(cls, domain):
-        if not cls._cache:
-            cls._populate_cache()
-        
-        if domain not in cls._cache:
-            # Re-populate the cache and retry
-            cls._populate_cache()
-            LOGGER.warning('Could not resolve organisation from domain: {}, trying to repopulate cache'.format(domain))
-            if domain not in cls._cache:
-                LOGGER.error('Could not resolve organisation from domain: {}, HTTP Origin: {}, HTTP Referer: {}'.format(
-                    domain, request.environ.get('HTTP_ORIGIN', ''), request.environ.get('HTTP_REFERER', '')))
-                raise BadRequest('Could not resolve organisation')
-        
-        return cls._cache[domain]
-    
+        organisation = cls._organisations().get(domain)
+        if organisation is not None:
+            return organisation
+
+        if cls._is_known_unknown(domain):
+            raise BadRequest('Could not resolve organisation')
+
+        # The organisation may have been added since the cache was loaded
+        org = OrganisationRepository.get_by_domain(domain)
+        if org is None:
+            cls._remember_unknown(domain)
+            LOGGER.error('Could not resolve organisation from domain: {}, HTTP Origin: {}, HTTP Referer: {}'.format(
+                domain, request.environ.get('HTTP_ORIGIN', ''), request.environ.get('HTTP_REFERER', '')))
+            raise BadRequest('Could not resolve organisation')
+
+        organisation = PlainOrganisation.from_organisation_model(org)
+        with cls._lock:
+            if cls._cache is not None:
+                cls._cache[domain] = organisation
+        return organisation
+
     @classmethod
     def resolve_from_stripe_signature(cls, signed_payload: str, expected_signature: str):
-        if not cls._cache:
-            cls._populate_cache()
-        
-        for org in cls._cache.values():
+        organisations = cls._organisations()
+
+        account = _stripe_account(signed_payload)
+        org = cls._by_stripe_account.get(account) if account else None
+        if org is not None and org.stripe_webhook_secret_key:
+            if verify_payload(signed_payload, org.stripe_webhook_secret_key, expected_signature):
+                return org
+            LOGGER.warning('Webhook for Stripe account {} not signed with its secret'.format(account))
+
+        for org in list(organisations.values()):
             secret = org.stripe_webhook_secret_key
             if secret:
                 if verify_payload(signed_payload, secret, expected_signature):
                     return org
-        
-        raise BadRequest('Could not resolve organisation from stripe signature')
-    
 
+        raise BadRequest('Could not resolve organisation from stripe signature')
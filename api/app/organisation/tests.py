@@ -1,6 +1,10 @@
 import json
-from app.organisation.resolver import OrganisationResolver
-from app.utils.errors import FORBIDDEN
+from mock import patch
+from app.organisation.models import Organisation
+from app.organisation.repository import OrganisationRepository
+from app.organisation.resolver import INVALIDATION_CHANNEL, OrganisationResolver
+from app.utils.auth import sign_payload, verify_payload
+from app.utils.errors import FORBIDDEN, STRIPE_ACCOUNT_IN_USE
 from app.utils.testing import ApiTestCase
 from app import app, db
 
@@ -115,4 +119,90 @@ class StripeSettingsApiTest(ApiTestCase):
         self.assertEqual(data['iso_currency_code'], 'zar')
         self.assertEqual(data['stripe_api_publishable_key'], 'very_public')
         self.assertEqual(data['stripe_api_secret_key'], '42')
-        self.assertEqual(data['stripe_webhook_secret_key'], '616')
\ No newline at end of file
+        self.assertEqual(data['stripe_webhook_secret_key'], '616')
+
+    def test_stripe_account_already_in_use(self):
+        other = self.add_organisation('Other Org', domain='other')
+        other.stripe_account_id = 'acct_123'
+        db.session.commit()
+        self.add_user(is_admin=True)
+
+        header = self.get_auth_header_for('user@user.com')
+        params = {
+            'iso_currency_code': 'zar',
+            'publishable_key': 'very_public',
+            'secret_key': '42',
+            'webhook_secret_key': '616',
+            'account_id': 'acct_123'
+        }
+        response = self.app.post(self.url, headers=header, data=params)
+
+        self.assertEqual(response.status_code, STRIPE_ACCOUNT_IN_USE[1])
+        self.assertEqual(json.loads(response.data), STRIPE_ACCOUNT_IN_USE[0])
+        self.assertEqual(db.session.query(Organisation).get(self.dummy_org_id).iso_currency_code, 'usd')
+
+
+class FakePublisher():
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append(channel)
+
+
+class OrganisationResolverTest(ApiTestCase):
+
+    def get_organisation(self, origin):
+        return self.app.get('/api/v1/organisation', headers={'Origin': origin})
+
+    def test_unknown_domain_remembered(self):
+        with patch.object(OrganisationRepository, 'get_all', wraps=OrganisationRepository.get_all) as get_all, \
+                patch.object(OrganisationRepository, 'get_by_domain',
+                             wraps=OrganisationRepository.get_by_domain) as get_by_domain:
+            self.assertEqual(self.get_organisation('https://www.bogus.com').status_code, 400)
+            self.assertEqual(self.get_organisation('https://www.bogus.com').status_code, 400)
+
+            self.assertEqual(get_all.call_count, 1)
+            self.assertEqual(get_by_domain.call_count, 1)
+
+    def test_new_organisation_found_without_reloading(self):
+        self.assertEqual(self.get_organisation('https://www.bogus.com').status_code, 400)
+        self.add_organisation(name='Newcomer', domain='newcomer')
+
+        with patch.object(OrganisationRepository, 'get_all') as get_all:
+            response = self.get_organisation('https://apply.newcomer.org')
+            get_all.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)['name'], 'Newcomer')
+
+    def test_bust_cache_tells_other_workers(self):
+        app.config['SHARED_CACHE_ENABLED'] = True
+        OrganisationResolver.client = FakePublisher()
+        try:
+            with patch.object(OrganisationResolver, '_subscribe'):
+                OrganisationResolver.resolve_from_domain('org')
+                OrganisationResolver.bust_cache()
+            self.assertIsNone(OrganisationResolver._cache)
+            self.assertEqual(OrganisationResolver.client.published, [INVALIDATION_CHANNEL])
+        finally:
+            OrganisationResolver.client = None
+
+    def test_stripe_account_index(self):
+        org = self.add_organisation(name='Connected', domain='connected', webhook_secret_key='whsec_connected')
+        org.stripe_account_id = 'acct_123'
+        db.session.commit()
+        org_id = org.id
+
+        payload = '1700000000.' + json.dumps({'account': 'acct_123', 'type': 'payment_intent.succeeded'})
+        signature = sign_payload(payload, 'whsec_connected')
+
+        with patch('app.organisation.resolver.verify_payload', wraps=verify_payload) as verify:
+            organisation = OrganisationResolver.resolve_from_stripe_signature(payload, signature)
+            self.assertEqual(verify.call_count, 1)
+        self.assertEqual(organisation.id, org_id)
+
+        # Without an account, every secret is tried
+        payload = '1700000000.' + json.dumps({'type': 'payment_intent.succeeded'})
+        signature = sign_payload(payload, 'whsec_connected')
+        self.assertEqual(OrganisationResolver.resolve_from_stripe_signature(payload, signature).id, org_id)
@@ -0,0 +1,18 @@
+import flask_restful as restful
+
+from app.email_template.cache import email_template_cache
+from app.outbox.repository import OutboxRepository as outbox_repository
+from app.utils.auth import admin_required
+from app.utils.email_metrics import email_metrics
+
+
+class EmailMetricsAPI(restful.Resource):
+    """Email delivery metrics of the process serving the request, and the state of the outbox."""
+
+    @admin_required
+    def get(self):
+        return {
+            'templates': email_metrics.snapshot(),
+            'template_cache': email_template_cache.stats(),
+            'outbox': {status.value: count for status, count in outbox_repository.count_by_status().items()}
+        }, 200
@@ -0,0 +1,88 @@
+from datetime import datetime, timedelta
+from enum import Enum
+
+from app import db
+
+
+class OutboxStatus(Enum):
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+
+
+class OutboxEmail(db.Model):
+    """A fully rendered email waiting to be delivered by the outbox worker."""
+
+    __tablename__ = 'outbox_email'
+    __table_args__ = tuple([db.Index('ix_outbox_email_status_next_attempt_at', 'status', 'next_attempt_at')])
+
+    id = db.Column(db.Integer(), primary_key=True)
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(), nullable=False)
+    body_text = db.Column(db.String(), nullable=False)
+    body_html = db.Column(db.String(), nullable=False)
+    sender_name = db.Column(db.String(100), nullable=False)
+    sender_email = db.Column(db.String(255), nullable=False)
+    attachment_name = db.Column(db.String(255), nullable=True)
+    attachment = db.Column(db.LargeBinary(), nullable=True)
+    template_key = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.Enum(OutboxStatus, name='outbox_status'), nullable=False)
+    attempts = db.Column(db.Integer(), nullable=False)
+    next_attempt_at = db.Column(db.DateTime(), nullable=False)
+    locked_at = db.Column(db.DateTime(), nullable=True)
+    last_error = db.Column(db.String(), nullable=True)
+    created_at = db.Column(db.DateTime(), nullable=False)
+    sent_at = db.Column(db.DateTime(), nullable=True)
+
+    def __init__(self,
+                 recipient,
+                 subject,
+                 body_text,
+                 sender_name,
+                 sender_email,
+                 body_html='',
+                 attachment_name=None,
+                 attachment=None,
+                 template_key=None,
+                 next_attempt_at=None):
+        self.recipient = recipient
+        self.subject = subject
+        self.body_text = body_text
+        self.body_html = body_html
+        self.sender_name = sender_name
+        self.sender_email = sender_email
+        self.attachment_name = attachment_name
+        self.attachment = attachment
+        self.template_key = template_key
+        self.status = OutboxStatus.PENDING
+        self.attempts = 0
+        self.created_at = datetime.now()
+        self.next_attempt_at = next_attempt_at or self.created_at
+
+    def claim(self, now):
+        self.status = OutboxStatus.SENDING
+        self.locked_at = now
+
+    def mark_sent(self):
+        self.status = OutboxStatus.SENT
+        self.sent_at = datetime.now()
+        self.locked_at = None
+        self.last_error = None
+
+    def mark_failed(self, error, max_attempts, backoff_seconds):
+        """Record a failed delivery, scheduling a retry with exponential backoff or dead-lettering the email."""
+        self.attempts += 1
+        self.last_error = error
+        self.locked_at = None
+        if self.attempts >= max_attempts:
+            self.status = OutboxStatus.DEAD
+        else:
+            self.status = OutboxStatus.PENDING
+            self.next_attempt_at = datetime.now() + timedelta(seconds=backoff_seconds * 2 ** (self.attempts - 1))
+
+    def requeue(self):
+        self.status = OutboxStatus.PENDING
+        self.attempts = 0
+        self.next_attempt_at = datetime.now()
+        self.locked_at = None
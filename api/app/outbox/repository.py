@@ -0,0 +1,78 @@
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_
+
+from app import db
+from app.outbox.models import OutboxEmail, OutboxStatus
+
+
+class OutboxRepository():
+
+    @staticmethod
+    def get_by_id(outbox_email_id):
+        return db.session.query(OutboxEmail).get(outbox_email_id)
+
+    @staticmethod
+    def add(outbox_email):
+        """Add an email to the outbox without committing it.
+
+        The email is written by the caller's own commit, so it is only delivered if the
+        change that triggered it is persisted, and is discarded if that change is rolled back.
+        """
+        db.session.add(outbox_email)
+        return outbox_email
+
+    @staticmethod
+    def add_all(outbox_emails):
+        """Add many emails to the outbox in one transaction."""
+        db.session.add_all(outbox_emails)
+        db.session.commit()
+        return outbox_emails
+
+    @staticmethod
+    def claim_batch(batch_size, stale_before):
+        """Claim a batch of emails that are due for delivery.
+
+        Emails stuck in the sending state since before stale_before belong to a worker that
+        died mid-batch and are claimed again. Rows locked by another worker are skipped.
+        """
+        now = datetime.now()
+        emails = (
+            db.session.query(OutboxEmail)
+            .filter(or_(
+                and_(OutboxEmail.status == OutboxStatus.PENDING, OutboxEmail.next_attempt_at <= now),
+                and_(OutboxEmail.status == OutboxStatus.SENDING, OutboxEmail.locked_at < stale_before)))
+            .order_by(OutboxEmail.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for email in emails:
+            email.claim(now)
+        db.session.commit()
+        return emails
+
+    @staticmethod
+    def get_dead():
+        return (
+            db.session.query(OutboxEmail)
+            .filter_by(status=OutboxStatus.DEAD)
+            .order_by(OutboxEmail.id)
+            .all()
+        )
+
+    @staticmethod
+    def count_by_status():
+        return dict(
+            db.session.query(OutboxEmail.status, func.count(OutboxEmail.id))
+            .group_by(OutboxEmail.status)
+            .all()
+        )
+
+    @staticmethod
+    def save():
+        db.session.commit()
+
+    @staticmethod
+    def rollback():
+        db.session.rollback()
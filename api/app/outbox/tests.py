@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta
+import email
+import socket
+
+from aiosmtpd.controller import Controller
+from flask import g
+from mock import patch
+
+from app import app, db
+from app.organisation.models import Organisation
+from app.outbox.models import OutboxEmail, OutboxStatus
+from app.outbox.repository import OutboxRepository as outbox_repository
+from app.outbox.worker import OutboxWorker
+from app.utils.emailer import email_user
+from app.utils.smtp_pool import SMTPConnectionPool
+from app.utils.testing import ApiTestCase
+
+
+class CollectingHandler():
+    """aiosmtpd handler that keeps every message it receives."""
+
+    def __init__(self):
+        self.messages = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.messages.append(envelope)
+        return '250 Message accepted for delivery'
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class OutboxTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.user = self.add_user(email='applicant@person.com')
+        self.add_email_template('template1', 'Hello {firstname} {param}', subject='Subject {param}')
+
+    def queue_email(self, recipient='applicant@person.com'):
+        outbox_email = OutboxEmail(recipient, 'Subject', 'Body', 'My Org', 'contact@org.com')
+        outbox_repository.add(outbox_email)
+        outbox_repository.save()
+        return outbox_email
+
+    @patch('app.utils.emailer.send_mail')
+    @patch('app.utils.emailer.EMAIL_OUTBOX_ENABLED', True)
+    def test_email_user_enqueues(self, send_mail_fn):
+        """When the outbox is enabled, email_user stores the rendered email instead of sending it."""
+        self.seed_static_data()
+
+        with app.test_request_context():
+            g.organisation = db.session.query(Organisation).get(self.dummy_org_id)
+            email_user('template1', template_parameters={'param': 'there'}, subject_parameters={'param': 'S'},
+                       user=self.user)
+            db.session.commit()
+
+        send_mail_fn.assert_not_called()
+        queued = db.session.query(OutboxEmail).one()
+        self.assertEqual(queued.recipient, 'applicant@person.com')
+        self.assertEqual(queued.subject, 'Subject S')
+        self.assertEqual(queued.body_text, 'Hello User there')
+        self.assertEqual(queued.sender_name, 'My Org')
+        self.assertEqual(queued.template_key, 'template1')
+        self.assertEqual(queued.status, OutboxStatus.PENDING)
+
+    @patch('app.utils.emailer.EMAIL_OUTBOX_ENABLED', True)
+    def test_email_user_rolled_back_with_caller(self):
+        """The queued email belongs to the caller's transaction, so it is discarded if that is rolled back."""
+        self.seed_static_data()
+
+        with app.test_request_context():
+            g.organisation = db.session.query(Organisation).get(self.dummy_org_id)
+            email_user('template1', template_parameters={'param': 'there'}, subject_parameters={'param': 'S'},
+                       user=self.user)
+            db.session.rollback()
+
+        self.assertEqual(db.session.query(OutboxEmail).count(), 0)
+
+    @patch('app.utils.emailer.EMAIL_OUTBOX_ENABLED', True)
+    def test_request_commits_email_with_change(self):
+        """A handler's email is committed in the same transaction as the change it is about."""
+        self.seed_static_data()
+        self.add_email_template('password-reset')
+
+        response = self.app.post('/api/v1/password-reset/request', data={'email': 'applicant@person.com'})
+
+        self.assertEqual(response.status_code, 201)
+        db.session.remove()
+        queued = db.session.query(OutboxEmail).one()
+        self.assertEqual(queued.recipient, 'applicant@person.com')
+        self.assertEqual(queued.template_key, 'password-reset')
+
+    def test_worker_delivers_over_smtp(self):
+        """The worker drains the outbox through a real SMTP conversation."""
+        self.seed_static_data()
+        handler = CollectingHandler()
+        port = _free_port()
+        controller = Controller(handler, hostname='127.0.0.1', port=port)
+        controller.start()
+        try:
+            pool = SMTPConnectionPool('127.0.0.1', port, None, None, use_tls=False)
+            first = self.queue_email('first@person.com')
+            second = self.queue_email('second@person.com')
+
+            with patch('app.utils.emailer.DEBUG', False), patch('app.utils.emailer.smtp_pool', pool):
+                processed = OutboxWorker(concurrency=2).run_once()
+            pool.close_all()
+        finally:
+            controller.stop()
+
+        self.assertEqual(processed, 2)
+        self.assertEqual(sorted(m.rcpt_tos[0] for m in handler.messages), ['first@person.com', 'second@person.com'])
+        self.assertEqual(email.message_from_bytes(handler.messages[0].content)['Subject'], 'Subject')
+        self.assertEqual(outbox_repository.get_by_id(first.id).status, OutboxStatus.SENT)
+        self.assertEqual(outbox_repository.get_by_id(second.id).status, OutboxStatus.SENT)
+
+    @patch('app.utils.emailer.send_mail')
+    def test_failure_retries_with_backoff(self, send_mail_fn):
+        """A failed delivery is rescheduled with exponential backoff."""
+        send_mail_fn.side_effect = ConnectionRefusedError('relay down')
+        queued = self.queue_email()
+        worker = OutboxWorker(max_attempts=3, backoff_seconds=60)
+
+        worker.run_once()
+        queued = outbox_repository.get_by_id(queued.id)
+        self.assertEqual(queued.status, OutboxStatus.PENDING)
+        self.assertEqual(queued.attempts, 1)
+        self.assertIn('relay down', queued.last_error)
+        self.assertGreater(queued.next_attempt_at, datetime.now() + timedelta(seconds=50))
+
+        # Not due yet, so nothing is claimed
+        self.assertEqual(worker.run_once(), 0)
+
+    @patch('app.utils.emailer.send_mail')
+    def test_dead_letter_after_max_attempts(self, send_mail_fn):
+        """An email is dead-lettered once it has used all its attempts."""
+        send_mail_fn.side_effect = ConnectionRefusedError('relay down')
+        queued = self.queue_email()
+        worker = OutboxWorker(max_attempts=2, backoff_seconds=0)
+
+        worker.run_once()
+        worker.run_once()
+
+        queued = outbox_repository.get_by_id(queued.id)
+        self.assertEqual(queued.status, OutboxStatus.DEAD)
+        self.assertEqual(queued.attempts, 2)
+        self.assertEqual(worker.run_once(), 0)
+
+    @patch('app.utils.emailer.send_mail')
+    def test_stale_claim_recovered(self, send_mail_fn):
+        """Emails left in the sending state by a crashed worker are claimed again."""
+        queued = self.queue_email()
+        queued.claim(datetime.now() - timedelta(hours=1))
+        db.session.commit()
+
+        processed = OutboxWorker(stale_after_seconds=600).run_once()
+
+        self.assertEqual(processed, 1)
+        self.assertEqual(outbox_repository.get_by_id(queued.id).status, OutboxStatus.SENT)
@@ -0,0 +1,147 @@
+"""Background delivery of emails queued in the outbox.
+
+Run a worker alongside the web processes with:
+
+    python run.py outbox_worker
+
+Each polling cycle claims a batch of due emails, delivers them concurrently over the pooled
+SMTP sessions and records the outcome. Failed emails are retried with exponential backoff
+and dead-lettered once they have used up their attempts.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import signal
+import time
+import traceback
+
+from flask_script import Command, Option
+
+from app import LOGGER
+from app.outbox.models import OutboxStatus
+from app.outbox.repository import OutboxRepository as outbox_repository
+from app.utils import emailer
+from app.utils.email_metrics import email_metrics
+from config import (OUTBOX_WORKER_CONCURRENCY, OUTBOX_BATCH_SIZE, OUTBOX_POLL_INTERVAL, OUTBOX_MAX_ATTEMPTS,
+                    OUTBOX_BACKOFF_SECONDS, OUTBOX_STALE_AFTER_SECONDS)
+
+
+def _deliver(message):
+    with email_metrics.tracking(message['template_key']):
+        try:
+            emailer.send_mail(
+                recipient=message['recipient'],
+                subject=message['subject'],
+                body_text=message['body_text'],
+                body_html=message['body_html'],
+                file_name=message['attachment_name'] or '',
+                file_content=message['attachment'],
+                sender_name=message['sender_name'],
+                sender_email=message['sender_email'])
+            return None
+        except Exception as e:
+            return '{}: {}'.format(type(e).__name__, e)
+
+
+class OutboxWorker():
+
+    def __init__(self,
+                 concurrency=OUTBOX_WORKER_CONCURRENCY,
+                 batch_size=OUTBOX_BATCH_SIZE,
+                 poll_interval=OUTBOX_POLL_INTERVAL,
+                 max_attempts=OUTBOX_MAX_ATTEMPTS,
+                 backoff_seconds=OUTBOX_BACKOFF_SECONDS,
+                 stale_after_seconds=OUTBOX_STALE_AFTER_SECONDS):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.stale_after_seconds = stale_after_seconds
+        self._stopping = False
+
+    def run_once(self):
+        """Deliver one batch of due emails. Returns the number of emails processed."""
+        stale_before = datetime.now() - timedelta(seconds=self.stale_after_seconds)
+        emails = outbox_repository.claim_batch(self.batch_size, stale_before)
+        if not emails:
+            return 0
+
+        # Worker threads must not touch the ORM session, so they get plain copies of the emails.
+        messages = [{
+            'recipient': email.recipient,
+            'subject': email.subject,
+            'body_text': email.body_text,
+            'body_html': email.body_html,
+            'attachment_name': email.attachment_name,
+            'attachment': email.attachment,
+            'sender_name': email.sender_name,
+            'sender_email': email.sender_email,
+            'template_key': email.template_key
+        } for email in emails]
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            errors = list(executor.map(_deliver, messages))
+
+        for email, error in zip(emails, errors):
+            if error is None:
+                email.mark_sent()
+                continue
+
+            email.mark_failed(error, self.max_attempts, self.backoff_seconds)
+            if email.status == OutboxStatus.DEAD:
+                LOGGER.error('Giving up on outbox email {} to {} after {} attempts: {}'.format(
+                    email.id, email.recipient, email.attempts, error))
+            else:
+                LOGGER.warning('Outbox email {} to {} failed, retrying at {}: {}'.format(
+                    email.id, email.recipient, email.next_attempt_at, error))
+
+        outbox_repository.save()
+        return len(emails)
+
+    def stop(self, *args):
+        LOGGER.info('Stopping outbox worker after the current batch')
+        self._stopping = True
+
+    def run(self):
+        LOGGER.info('Starting outbox worker with concurrency {}'.format(self.concurrency))
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        while not self._stopping:
+            try:
+                processed = self.run_once()
+            except Exception:
+                LOGGER.error('Outbox worker cycle failed: {}'.format(traceback.format_exc()))
+                outbox_repository.rollback()
+                processed = 0
+
+            if processed == 0:
+                time.sleep(self.poll_interval)
+
+
+class OutboxWorkerCommand(Command):
+    """Deliver emails queued in the outbox."""
+
+    option_list = (
+        Option('--concurrency', dest='concurrency', type=int, default=OUTBOX_WORKER_CONCURRENCY),
+        Option('--batch-size', dest='batch_size', type=int, default=OUTBOX_BATCH_SIZE),
+        Option('--once', dest='once', action='store_true', help='Deliver a single batch and exit'),
+        Option('--requeue-dead', dest='requeue_dead', action='store_true',
+               help='Move dead-lettered emails back into the queue and exit'),
+    )
+
+    def run(self, concurrency, batch_size, once, requeue_dead):
+        if requeue_dead:
+            dead = outbox_repository.get_dead()
+            for email in dead:
+                email.requeue()
+            outbox_repository.save()
+            LOGGER.info('Requeued {} dead-lettered emails'.format(len(dead)))
+            return
+
+        worker = OutboxWorker(concurrency=concurrency, batch_size=batch_size)
+        if once:
+            worker.run_once()
+        else:
+            worker.run()
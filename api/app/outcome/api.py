@@ -104,7 +104,6 @@ class OutcomeAPI(restful.Resource):
                     g.current_user['id'])
 
             outcome_repository.add(outcome)
-            db.session.commit()
 
             if (status == Status.REJECTED or status == Status.WAITLIST):  # Email will be sent with offer for accepted candidates  
                 email_user(
@@ -115,6 +114,7 @@ class OutcomeAPI(restful.Resource):
                     event=event,
                     user=user,
                 )
+            db.session.commit()
 
             return outcome, 201
 
@@ -11,6 +11,13 @@ class OutcomeRepository():
                         .first())
         return outcome
     
+    @staticmethod
+    def get_latest_by_user_for_events(user_id, event_ids):
+        return (db.session.query(Outcome)
+                .filter(Outcome.user_id == user_id, Outcome.event_id.in_(event_ids), Outcome.latest == True)
+                .order_by(Outcome.id)
+                .all())
+
     @staticmethod
     def get_all_by_user_for_event(user_id, event_id):
         outcomes = (db.session.query(Outcome)
@@ -15,6 +15,7 @@ from app.utils.errors import EVENT_NOT_FOUND, USER_NOT_FOUND, RESPONSE_NOT_FOUND
                         APPLICATIONS_CLOSED, REFERENCE_REQUEST_NOT_FOUND, BAD_CONFIGURATION
 
 from app.utils.auth import auth_optional, auth_required
+from app.utils.identity import current_identity
 from app.utils.emailer import email_user
 from app.references.repository import ReferenceRequestRepository as reference_request_repository
 from app.references.repository import ReferenceRepository as reference_repository
@@ -222,7 +223,7 @@ class ReferenceAPI(ReferenceMixin, restful.Resource):
     @auth_required
     def get(self):
         args = self.get_req_parser.parse_args()
-        user = user_repository.get_by_id(g.current_user['id'])
+        user = current_identity()
         response = response_repository.get_by_id(args['response_id'])
         if not response:
             return RESPONSE_NOT_FOUND
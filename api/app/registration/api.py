@@ -20,6 +20,7 @@ from app.users.models import AppUser
 from app import db, LOGGER
 from app.utils import errors
 from app.utils.auth import auth_required, admin_required, event_admin_required
+from app.utils.http_cache import conditional_get, PRIVATE
 from app.utils.emailer import email_user
 from app.utils import misc
 from app.outcome.models import Outcome, Status
@@ -207,8 +208,6 @@ class OfferAPI(OfferMixin, restful.Resource):
             )
             db.session.add(offer_tag)
         
-        db.session.commit()
-        
         if grant_tags:
             grant_strs = [OfferAPI._stringify_tag_name_description(offer_tag) for offer_tag in offer_entity.offer_tags]
             grants_summary = "\n\u2022 " + "\n\u2022 ".join(grant_strs)
@@ -227,6 +226,7 @@ class OfferAPI(OfferMixin, restful.Resource):
             ),
             event=event,
             user=user)
+        db.session.commit()
 
         return offer_info(offer_entity), 201
 
@@ -336,6 +336,7 @@ class RegistrationFormAPI(RegistrationFormMixin, restful.Resource):
         }
 
     @auth_required
+    @conditional_get(PRIVATE)
     def get(self):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
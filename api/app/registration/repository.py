@@ -13,6 +13,13 @@ class OfferRepository():
     def get_by_user_id_for_event(user_id, event_id):
         return db.session.query(Offer).filter_by(user_id=user_id, event_id=event_id).first()
 
+    @staticmethod
+    def get_by_user_id_for_events(user_id, event_ids):
+        return (db.session.query(Offer)
+                .filter(Offer.user_id == user_id, Offer.event_id.in_(event_ids))
+                .order_by(Offer.id)
+                .all())
+
     @staticmethod
     def get_offers_for_event(event_id, offer_ids):
         return (
@@ -59,6 +66,16 @@ class OfferRepository():
                         .all())
         return timeseries
     
+    @staticmethod
+    def get_response_counts_by_event(event_id):
+        """Counts of the event's offers per (response date, candidate_response)."""
+        responded_date = func.date(Offer.responded_at)
+        return (db.session.query(responded_date, Offer.candidate_response, func.count(Offer.id))
+                        .filter(Offer.event_id == event_id)
+                        .group_by(responded_date, Offer.candidate_response)
+                        .order_by(responded_date)
+                        .all())
+
     @staticmethod
     def tag_offer(offer_id, tag_id, accepted):
         offer_tag = OfferTag(offer_id, tag_id, accepted)
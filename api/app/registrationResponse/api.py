@@ -10,6 +10,7 @@ from app.registration.models import Offer, Registration, RegistrationAnswer, Reg
 from app.users.models import AppUser
 from app.events.models import Event
 from app.utils.auth import auth_required, admin_required
+from app.utils.identity import current_identity
 from app.users.repository import UserRepository
 from app.events.repository import EventRepository
 from app.utils import errors, emailer, strings
@@ -157,7 +158,6 @@ class RegistrationApi(restful.Resource):
                                                 value=answer_args['value'])
 
                     db.session.add(answer)
-            db.session.commit()
 
             registration_answers = db.session.query(RegistrationAnswer).filter(
                 RegistrationAnswer.registration_id == registration.id).all()
@@ -165,6 +165,7 @@ class RegistrationApi(restful.Resource):
                 RegistrationQuestion.registration_form_id == args['registration_form_id']).all()
 
             self.send_confirmation(current_user, registration_questions, registration_answers, registration.confirmed, event)
+            db.session.commit()
 
             # 201 is 'CREATED' status code
             return marshal(registration, self.registration_fields), 201
@@ -225,7 +226,6 @@ class RegistrationApi(restful.Resource):
                                                 value=answer_args['value'])
 
                     db.session.add(answer)
-            db.session.commit()
 
             current_user = user_repository.get_by_id(user_id)
 
@@ -242,6 +242,7 @@ class RegistrationApi(restful.Resource):
 
             self.send_confirmation(
                 current_user, registration_questions, registration_answers, registration.confirmed, event)
+            db.session.commit()
 
             return 200
         except Exception as e:
@@ -326,9 +327,9 @@ registration_admin_fields = {
 }
 
 
-def _get_registrations(event_id, user_id, confirmed, exclude_already_signed_in=False, include_guests=True):
+def _get_registrations(event_id, confirmed, exclude_already_signed_in=False, include_guests=True):
     try:
-        current_user = UserRepository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_registration_volunteer(event_id):
             return errors.FORBIDDEN
         if(exclude_already_signed_in == True):
@@ -370,10 +371,9 @@ class RegistrationUnconfirmedAPI(RegistrationAdminMixin, restful.Resource):
     def get(self):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
-        user_id = g.current_user['id']
         include_guests = args['include_guests']
 
-        return _get_registrations(event_id, user_id, confirmed=False, include_guests=include_guests)
+        return _get_registrations(event_id, confirmed=False, include_guests=include_guests)
 
 
 class RegistrationConfirmedAPI(RegistrationAdminMixin, restful.Resource):
@@ -383,10 +383,9 @@ class RegistrationConfirmedAPI(RegistrationAdminMixin, restful.Resource):
         
         args = self.req_parser.parse_args()
         event_id = args['event_id']
-        user_id = g.current_user['id']
         exclude_already_signed_in = args['exclude_already_signed_in'] or None
         # This is just for Indaba
-        return _get_registrations(event_id, user_id, confirmed=None, exclude_already_signed_in=exclude_already_signed_in)
+        return _get_registrations(event_id, confirmed=None, exclude_already_signed_in=exclude_already_signed_in)
 
 
 def send_registration_confirmation_mail(user, event):
@@ -417,10 +416,9 @@ class RegistrationConfirmAPI(RegistrationConfirmMixin, restful.Resource):
     def post(self):
         args = self.req_parser.parse_args()
         registration_id = args['registration_id']
-        user_id = g.current_user['id']
 
         try:
-            current_user = UserRepository.get_by_id(user_id)
+            current_user = current_identity()
             registration, offer = RegistrationRepository.get_by_id_with_offer(
                 registration_id)
             if not current_user.is_registration_admin(offer.event_id):
@@ -23,6 +23,7 @@ from app.users.repository import UserRepository as user_repository
 from app.utils import emailer, errors, strings, pdfconvertor, zipping, storage
 from app.utils.zipping import zip_in_memory
 from app.utils.auth import auth_required, event_admin_required
+from app.utils.identity import current_identity
 from flask import g, request, send_file
 from flask_restful import fields, inputs, marshal_with, reqparse
 from sqlalchemy.exc import SQLAlchemyError
@@ -99,7 +100,7 @@ class ResponseAPI(ResponseMixin, restful.Resource):
         for answer_args in args['answers']:
             answer = Answer(response.id, answer_args['question_id'], answer_args['value'])
             answers.append(answer)
-        response_repository.save_answers(answers)
+        response_repository.add_answers(answers)
 
         try:
             if response.is_submitted:
@@ -115,8 +116,9 @@ class ResponseAPI(ResponseMixin, restful.Resource):
                         self.send_confirmation(event_admin, response)
         except:
             LOGGER.warn('Failed to send confirmation email for response with ID : {id}, but the response was submitted succesfully'.format(id=response.id))
-        finally:
-            return response, 201
+
+        response_repository.save(response)
+        return response, 201
 
     @auth_required
     @marshal_with(response_fields)
@@ -151,7 +153,7 @@ class ResponseAPI(ResponseMixin, restful.Resource):
                 response_repository.merge_answer(answer)
             active_answer = Answer(response.id, answer_args['question_id'], answer_args['value'])
             answers.append(active_answer)
-        response_repository.save_answers(answers)
+        response_repository.add_answers(answers)
 
         try:
             if response.is_submitted:
@@ -167,8 +169,9 @@ class ResponseAPI(ResponseMixin, restful.Resource):
                         self.send_confirmation(event_admin, response)
         except:                
             LOGGER.warn('Failed to send confirmation email for response with ID : {id}, but the response was submitted succesfully'.format(id=response.id))
-        finally:
-            return response, 200
+
+        response_repository.save(response)
+        return response, 200
 
     @auth_required
     def delete(self):
@@ -183,7 +186,6 @@ class ResponseAPI(ResponseMixin, restful.Resource):
             return errors.UNAUTHORIZED
 
         response.withdraw()
-        response_repository.save(response)      
 
         try:
             user = user_repository.get_by_id(current_user_id)
@@ -202,6 +204,7 @@ class ResponseAPI(ResponseMixin, restful.Resource):
         except:                
             LOGGER.error('Failed to send withdrawal confirmation email for response with ID : {id}, but the response was withdrawn succesfully'.format(id=args['id']))
 
+        response_repository.save(response)
         return {}, 204
 
     def send_confirmation(self, user, response):
@@ -273,12 +276,13 @@ def _serialize_reviewer(response_reviewer, review_response):
         'status': _review_response_status(review_response)
     }
 
-def _serialize_answer(answer, language):
+def _serialize_answer(answer, language, translation=None):
     question = answer.question
-    translation = question.get_translation(language)
     if translation is None:
+        translation = question.get_translation(language)
+    if translation is None or translation.language != language:
         LOGGER.warn('No {} translation found for question id {}'.format(language, question.id))
-        translation = question.get_translation('en')
+        translation = translation or question.get_translation('en')
 
     return {
         'question_id': answer.question_id,
@@ -288,11 +292,12 @@ def _serialize_answer(answer, language):
         'headline': translation.headline
     }
 
-def _serialize_tag(tag, language):
-    translation = tag.get_translation(language)
+def _serialize_tag(tag, language, translation=None):
     if translation is None:
+        translation = tag.get_translation(language)
+    if translation is None or translation.language != language:
         LOGGER.warn('Could not find {} translation for tag id {}'.format(language, tag.id))
-        translation = tag.get_translation('en')
+        translation = translation or tag.get_translation('en')
     return {
         'id': tag.id,
         'event_id': tag.event_id,
@@ -302,46 +307,46 @@ def _serialize_tag(tag, language):
     }
 
 class ResponseListAPI(restful.Resource):
+    REVIEW_STATUSES = ('unassigned', 'incomplete', 'complete')
+    MAX_LIMIT = 500
 
-    @event_admin_required
-    def get(self, event_id):
-        req_parser = reqparse.RequestParser()
-        req_parser.add_argument('include_unsubmitted', type=inputs.boolean, required=True)
-        # Note: Including [] in the question_ids parameter because that gets added by Axios on the front-end
-        req_parser.add_argument('question_ids[]', type=int, required=False, action='append')
-        req_parser.add_argument('language', type=str, required=True)
-        args = req_parser.parse_args()
-
-        include_unsubmitted = args['include_unsubmitted']
-        question_ids = args['question_ids[]']
-        language = args['language']
-        
-        print(('Include unsubmitted:', include_unsubmitted))
+    @staticmethod
+    def _serialize_responses(event_id, responses, question_ids, language):
+        """Serialize a page of responses with a fixed number of queries, however long the page is."""
+        if not responses:
+            return []
 
-        responses = response_repository.get_all_for_event(event_id, not include_unsubmitted)
+        response_ids = [response.id for response in responses]
 
         review_config = review_configuration_repository.get_configuration_for_event(event_id)
         required_reviewers = 1 if review_config is None else review_config.num_reviews_required + review_config.num_optional_reviews
 
-        response_reviewers = review_repository.get_response_reviewers_for_event(event_id)
+        response_reviewers = review_repository.get_response_reviewers_for_responses(response_ids)
         response_to_reviewers = {
             k: list(g) for k, g in itertools.groupby(response_reviewers, lambda r: r.response_id)
         }
-
-        review_responses = review_repository.get_review_responses_for_event(event_id)
-        reviewer_to_review_response = {
-            r.reviewer_user_id: r for r in review_responses
+        review_responses = {
+            (r.response_id, r.reviewer_user_id): r
+            for r in review_repository.get_review_responses_for_responses(response_ids)
         }
 
+        response_to_answers = {}
+        question_translations = {}
+        if question_ids:
+            answers = response_repository.get_answers_for_responses(response_ids, question_ids)
+            response_to_answers = {k: list(g) for k, g in itertools.groupby(answers, lambda a: a.response_id)}
+            question_translations = response_repository.get_question_translations(question_ids, language)
+
+        tag_ids = {rt.tag_id for response in responses for rt in response.response_tags}
+        tag_translations = response_repository.get_tag_translations(tag_ids, language) if tag_ids else {}
+
         serialized_responses = []
         for response in responses:
-            reviewers = [_serialize_reviewer(r, reviewer_to_review_response.get(r.reviewer_user_id, None)) 
+            reviewers = [_serialize_reviewer(r, review_responses.get((response.id, r.reviewer_user_id)))
                          for r in response_to_reviewers.get(response.id, [])]
             reviewers = _pad_list(reviewers, required_reviewers)
-            if question_ids:
-                answers = [_serialize_answer(answer, language) for answer in response.answers if answer.question_id in question_ids]
-            else:
-                answers = []
+            answers = [_serialize_answer(answer, language, question_translations.get(answer.question_id))
+                       for answer in response_to_answers.get(response.id, [])]
 
             serialized = {
                 'response_id': response.id,
@@ -357,16 +362,59 @@ class ResponseListAPI(restful.Resource):
                 'language': response.language,
                 'answers': answers,
                 'reviewers': reviewers,
-                'tags': [_serialize_tag(rt.tag, language) for rt in response.response_tags]
+                'tags': [_serialize_tag(rt.tag, language, tag_translations.get(rt.tag_id))
+                         for rt in response.response_tags]
             }
 
             serialized_responses.append(serialized)
 
         return serialized_responses
 
+    @event_admin_required
+    def get(self, event_id):
+        req_parser = reqparse.RequestParser()
+        req_parser.add_argument('include_unsubmitted', type=inputs.boolean, required=True)
+        # Note: Including [] in the question_ids parameter because that gets added by Axios on the front-end
+        req_parser.add_argument('question_ids[]', type=int, required=False, action='append')
+        req_parser.add_argument('language', type=str, required=True)
+        req_parser.add_argument('is_withdrawn', type=inputs.boolean, required=False)
+        req_parser.add_argument('tag_ids[]', type=int, required=False, action='append')
+        req_parser.add_argument('review_status', type=str, required=False, choices=ResponseListAPI.REVIEW_STATUSES)
+        # Keyset pagination: after is the id of the last response on the previous page
+        req_parser.add_argument('after', type=int, required=False)
+        req_parser.add_argument('limit', type=inputs.positive, required=False)
+        args = req_parser.parse_args()
+
+        question_ids = args['question_ids[]']
+        language = args['language']
+        limit = args['limit']
+        filters = {
+            'submitted_only': not args['include_unsubmitted'],
+            'is_withdrawn': args['is_withdrawn'],
+            'tag_ids': args['tag_ids[]'],
+            'review_status': args['review_status']
+        }
+
+        if limit is None:
+            # Without a limit, every matching response is returned as a list
+            responses = response_repository.get_page_for_event(event_id, after=args['after'], **filters)
+            return ResponseListAPI._serialize_responses(event_id, responses, question_ids, language)
+
+        limit = min(limit, ResponseListAPI.MAX_LIMIT)
+        # Fetch one extra response to tell whether there is another page
+        responses = response_repository.get_page_for_event(event_id, after=args['after'], limit=limit + 1, **filters)
+        has_next = len(responses) > limit
+        responses = responses[:limit]
+
+        return {
+            'responses': ResponseListAPI._serialize_responses(event_id, responses, question_ids, language),
+            'num_entries': response_repository.count_for_event(event_id, **filters),
+            'next_after': responses[-1].id if has_next else None
+        }
+
 
-def _validate_user_admin_or_reviewer(user_id, event_id, response_id):
-    user = user_repository.get_by_id(user_id)
+def _validate_user_admin_or_reviewer(event_id, response_id):
+    user = current_identity()
     # Check if the user is an event admin
     permitted = user.is_event_admin(event_id)
     # If they're not an event admin, check if they're a reviewer for the relevant response
@@ -393,7 +441,7 @@ class ResponseTagAPI(restful.Resource, ResponseTagMixin):
         tag_id = args['tag_id']
         response_id = args['response_id']
 
-        if not _validate_user_admin_or_reviewer(g.current_user['id'], event_id, response_id):
+        if not _validate_user_admin_or_reviewer(event_id, response_id):
             return errors.FORBIDDEN
 
         return response_repository.tag_response(response_id, tag_id), 201
@@ -406,7 +454,7 @@ class ResponseTagAPI(restful.Resource, ResponseTagMixin):
         tag_id = args['tag_id']
         response_id = args['response_id']
 
-        if not _validate_user_admin_or_reviewer(g.current_user['id'], event_id, response_id):
+        if not _validate_user_admin_or_reviewer(event_id, response_id):
             return errors.FORBIDDEN
 
         response_repository.remove_tag_from_response(response_id, tag_id)
@@ -11,6 +11,7 @@ from app.users.models import AppUser
 
 class Response(db.Model):
     __tablename__ = "response"
+    __table_args__ = (db.Index('ix_response_application_form_id_id', 'application_form_id', 'id'),)
     
     id = db.Column(db.Integer(), primary_key=True)
     application_form_id = db.Column(db.Integer(), db.ForeignKey("application_form.id"), nullable=False)
@@ -56,6 +57,7 @@ class Response(db.Model):
 
 class Answer(db.Model):
     __tablename__ = "answer"
+    __table_args__ = (db.Index('ix_answer_response_id_question_id', 'response_id', 'question_id'),)
 
     id = db.Column(db.Integer(), primary_key=True)
     response_id = db.Column(db.Integer(), db.ForeignKey("response.id"), nullable=False)
@@ -80,11 +82,15 @@ class Answer(db.Model):
 
     @property
     def value_display(self):
+        # Only multi-choice answers are displayed differently from their value
+        if self.question.type != 'multi-choice':
+            return self.value
+
         question_translation = self.question.get_translation(self.response.language)
         if question_translation is None:
             LOGGER.error('Missing {} translation for question {}'.format(self.response.language, self.question.id))
             question_translation = self.question.get_translation('en')
-        if self.question.type == 'multi-choice' and question_translation.options is not None:
+        if question_translation.options is not None:
             option = [option for option in question_translation.options if option['value'] == self.value]
             if option:
                 return option[0]['label']
@@ -93,7 +99,7 @@ class Answer(db.Model):
 
 class ResponseReviewer(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
-    response_id = db.Column(db.Integer(), db.ForeignKey('response.id'), nullable=False)
+    response_id = db.Column(db.Integer(), db.ForeignKey('response.id'), nullable=False, index=True)
     reviewer_user_id = db.Column(db.Integer(), db.ForeignKey('app_user.id'), nullable=False)
     active = db.Column(db.Boolean(), nullable=False)
 
@@ -110,7 +116,7 @@ class ResponseReviewer(db.Model):
 
 class ResponseTag(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
-    response_id = db.Column(db.Integer(), db.ForeignKey('response.id'), nullable=False)
+    response_id = db.Column(db.Integer(), db.ForeignKey('response.id'), nullable=False, index=True)
     tag_id = db.Column(db.Integer(), db.ForeignKey('tag.id'), nullable=False)
 
     response = db.relationship('Response', foreign_keys=[response_id])
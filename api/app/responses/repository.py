@@ -1,10 +1,14 @@
 from typing import List
 
 from app import db
-from app.responses.models import Response, Answer, ResponseTag
+from app.responses.models import Response, Answer, ResponseReviewer, ResponseTag
 from app.applicationModel.models import ApplicationForm, Question, Section
+from app.reviews.models import ReviewForm, ReviewResponse
+from app.tags.models import Tag
 from app.users.models import AppUser
-from sqlalchemy import func, cast, Date
+from app.utils.translations import get_translations
+from sqlalchemy import and_, exists, func, cast, Date
+from sqlalchemy.orm import joinedload, selectinload
 import itertools
 
 
@@ -20,9 +24,8 @@ class ResponseRepository():
         db.session.commit()
 
     @staticmethod
-    def save_answers(answers):
+    def add_answers(answers):
         db.session.add_all(answers)
-        db.session.commit()
 
     @staticmethod
     def merge_answer(answer):
@@ -43,6 +46,17 @@ class ResponseRepository():
             .filter_by(event_id=event_id) \
             .first()
 
+    @staticmethod
+    def get_by_user_id_for_events(user_id, event_ids):
+        """(event_id, Response) pairs of the user's responses to the events' application forms."""
+        return db.session.query(ApplicationForm.event_id, Response) \
+            .select_from(Response) \
+            .filter(Response.user_id == user_id) \
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id) \
+            .filter(ApplicationForm.event_id.in_(event_ids)) \
+            .order_by(Response.id) \
+            .all()
+
     @staticmethod
     def get_submitted_by_user_id_for_event(user_id, event_id):
         return db.session.query(Response) \
@@ -127,6 +141,17 @@ class ResponseRepository():
                 .order_by(cast(Response.submitted_timestamp, Date))
                 .all())
 
+    @staticmethod
+    def get_status_counts_by_event(event_id):
+        """Counts of the event's responses per (submission date, is_submitted, is_withdrawn)."""
+        submitted_date = func.date(Response.submitted_timestamp)
+        return (db.session.query(submitted_date, Response.is_submitted, Response.is_withdrawn, func.count(Response.id))
+                .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+                .filter(ApplicationForm.event_id == event_id)
+                .group_by(submitted_date, Response.is_submitted, Response.is_withdrawn)
+                .order_by(submitted_date)
+                .all())
+
     @staticmethod
     def get_all_for_event(event_id, submitted_only=True) -> List[Response]:
         query = db.session.query(Response)
@@ -138,6 +163,107 @@ class ResponseRepository():
                 .filter_by(event_id=event_id)
                 .all())
 
+    @staticmethod
+    def get_ids_for_event(event_id, submitted_only=True) -> List[int]:
+        query = db.session.query(Response.id)
+        if submitted_only:
+            query = query.filter_by(is_submitted=True)
+
+        return [response_id for (response_id,) in (query
+                .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+                .filter_by(event_id=event_id)
+                .order_by(Response.id)
+                .all())]
+
+    @staticmethod
+    def get_all_by_ids_with_answers(response_ids) -> List[Response]:
+        """The responses with their users, answers and answered questions loaded up front."""
+        return (db.session.query(Response)
+                .filter(Response.id.in_(response_ids))
+                .options(joinedload(Response.user),
+                         selectinload(Response.answers).joinedload(Answer.question))
+                .all())
+
+    @staticmethod
+    def _filter_for_event(event_id, submitted_only=True, is_withdrawn=None, tag_ids=None, review_status=None):
+        query = (db.session.query(Response)
+                 .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+                 .filter(ApplicationForm.event_id == event_id))
+
+        if submitted_only:
+            query = query.filter(Response.is_submitted == True)
+        if is_withdrawn is not None:
+            query = query.filter(Response.is_withdrawn == is_withdrawn)
+        for tag_id in tag_ids or []:
+            query = query.filter(exists().where(and_(ResponseTag.response_id == Response.id,
+                                                     ResponseTag.tag_id == tag_id)))
+
+        if review_status is not None:
+            has_reviewer = exists().where(and_(ResponseReviewer.response_id == Response.id,
+                                               ResponseReviewer.active == True))
+            submitted_review = (exists()
+                                .where(and_(ReviewResponse.response_id == Response.id,
+                                            ReviewResponse.reviewer_user_id == ResponseReviewer.reviewer_user_id,
+                                            ReviewResponse.is_submitted == True,
+                                            ReviewResponse.review_form_id == ReviewForm.id,
+                                            ReviewForm.active == True))
+                                .correlate(Response, ResponseReviewer))
+            has_outstanding_review = exists().where(and_(ResponseReviewer.response_id == Response.id,
+                                                         ResponseReviewer.active == True,
+                                                         ~submitted_review))
+            if review_status == 'unassigned':
+                query = query.filter(~has_reviewer)
+            elif review_status == 'incomplete':
+                query = query.filter(has_outstanding_review)
+            elif review_status == 'complete':
+                query = query.filter(has_reviewer, ~has_outstanding_review)
+
+        return query
+
+    @staticmethod
+    def get_page_for_event(event_id, submitted_only=True, is_withdrawn=None, tag_ids=None, review_status=None,
+                           after=None, limit=None) -> List[Response]:
+        """The event's responses matching the filters in order of id, starting after the given id.
+
+        Users and tags are loaded with the responses, so serializing a page takes a fixed number of queries.
+        """
+        query = (ResponseRepository._filter_for_event(event_id, submitted_only, is_withdrawn, tag_ids, review_status)
+                 .options(joinedload(Response.user),
+                          selectinload(Response.response_tags).joinedload(ResponseTag.tag))
+                 .order_by(Response.id))
+        if after is not None:
+            query = query.filter(Response.id > after)
+        if limit is not None:
+            query = query.limit(limit)
+        return query.all()
+
+    @staticmethod
+    def count_for_event(event_id, submitted_only=True, is_withdrawn=None, tag_ids=None, review_status=None) -> int:
+        return (ResponseRepository._filter_for_event(event_id, submitted_only, is_withdrawn, tag_ids, review_status)
+                .with_entities(func.count(Response.id))
+                .scalar())
+
+    @staticmethod
+    def get_answers_for_responses(response_ids, question_ids) -> List[Answer]:
+        """The active answers to the questions in the responses, with their questions loaded."""
+        return (db.session.query(Answer)
+                .filter(Answer.response_id.in_(response_ids),
+                        Answer.question_id.in_(question_ids),
+                        Answer.is_active == True)
+                .options(joinedload(Answer.question))
+                .order_by(Answer.response_id, Answer.order)
+                .all())
+
+    @staticmethod
+    def get_question_translations(question_ids, language):
+        """{question_id: translation} for the questions, falling back to English."""
+        return get_translations(Question, question_ids, language)
+
+    @staticmethod
+    def get_tag_translations(tag_ids, language):
+        """{tag_id: translation} for the tags, falling back to English."""
+        return get_translations(Tag, tag_ids, language)
+
     @staticmethod
     def tag_response(response_id, tag_id):
         rt = ResponseTag(response_id, tag_id)
@@ -8,8 +8,10 @@ from unittest import skip
 
 import dateutil.parser
 
+
 from app import db
 from app.email_template.models import EmailTemplate
+from app.responses.models import Response
 from app.utils.testing import ApiTestCase
 
 
@@ -199,6 +201,7 @@ class ResponseApiTest(ApiTestCase):
         """Test a typical POST flow."""
 
         self._seed_data()
+        form_id, question_id, question2_id = self.form.id, self.question.id, self.question2.id
         response_data = {
             'application_form_id': self.form.id,
             'is_submitted': True,
@@ -225,7 +228,7 @@ class ResponseApiTest(ApiTestCase):
 
         data = json.loads(response.data)
 
-        self.assertEqual(data['application_form_id'], self.form.id)
+        self.assertEqual(data['application_form_id'], form_id)
         self.assertEqual(data['user_id'], self.user_data['id'])
         self.assertIsNotNone(data['submitted_timestamp'])
         self.assertTrue(data['is_submitted'])
@@ -236,12 +239,12 @@ class ResponseApiTest(ApiTestCase):
 
         answer = data['answers'][0]
         self.assertEqual(answer['value'], 'Answer 1')
-        self.assertEqual(answer['question_id'], self.question.id)
+        self.assertEqual(answer['question_id'], question_id)
 
         answer = data['answers'][1]
         self.assertEqual(
             answer['value'], 'Hello world, this is the 2nd answer.')
-        self.assertEqual(answer['question_id'], self.question2.id)
+        self.assertEqual(answer['question_id'], question2_id)
 
     def test_second_response_rejected_without_nomination(self):
         self._seed_data()
@@ -308,6 +311,8 @@ class ResponseApiTest(ApiTestCase):
         """Test a typical PUT flow."""
 
         self._seed_data()
+        event_id, form_id = self.event.id, self.form.id
+        question_id, question2_id = self.question.id, self.question2.id
         update_data = {
             'id': self.response.id,
             'application_form_id': self.form.id,
@@ -337,11 +342,11 @@ class ResponseApiTest(ApiTestCase):
         response = self.app.get(
             'api/v1/response',
             headers={'Authorization': self.other_user_data['token']},
-            query_string={'event_id': self.event.id})
+            query_string={'event_id': event_id})
 
         data = json.loads(response.data)[0]
 
-        self.assertEqual(data['application_form_id'], self.form.id)
+        self.assertEqual(data['application_form_id'], form_id)
         self.assertEqual(data['user_id'], self.other_user_data['id'])
 
         parsed_submitted = dateutil.parser.parse(
@@ -356,11 +361,11 @@ class ResponseApiTest(ApiTestCase):
 
         answer = data['answers'][0]
         self.assertEqual(answer['value'], 'Answer 1 UPDATED')
-        self.assertEqual(answer['question_id'], self.question.id)
+        self.assertEqual(answer['question_id'], question_id)
 
         answer = data['answers'][1]
         self.assertEqual(answer['value'], 'This is the 2nd answer.')
-        self.assertEqual(answer['question_id'], self.question2.id)
+        self.assertEqual(answer['question_id'], question2_id)
 
     def test_update_missing(self):
         """Test that 404 is returned if we try to update a response that doesn't exist."""
@@ -426,6 +431,7 @@ class ResponseApiTest(ApiTestCase):
         """Test a typical DELETE flow."""
         
         self._seed_data()
+        event_id = self.event.id
         response = self.app.delete(
             '/api/v1/response',
             headers={'Authorization': self.other_user_data['token']},
@@ -437,7 +443,7 @@ class ResponseApiTest(ApiTestCase):
         response = self.app.get(
             '/api/v1/response',
             headers={'Authorization': self.other_user_data['token']},
-            query_string={'event_id': self.event.id})
+            query_string={'event_id': event_id})
         data = json.loads(response.data)[0]
         self.assertFalse(data['is_submitted'])
         self.assertTrue(data['is_withdrawn'])
@@ -651,6 +657,72 @@ class ResponseListAPITest(ApiTestCase):
         self.assertEqual(response3['tags'][1]['id'], 2)
         self.assertEqual(response3['tags'][1]['name'], 'Tag 2 en')
 
+    def _get_response_ids(self, **params):
+        params = dict({'event_id': 1, 'language': 'en', 'include_unsubmitted': True}, **params)
+        response = self.app.get(
+            '/api/v1/responses',
+            headers=self.get_auth_header_for('event1admin@mail.com'),
+            data=params)
+        return [r['response_id'] for r in json.loads(response.data)]
+
+    def test_paginated(self):
+        """Test that responses are returned a page at a time, starting after the last response seen."""
+        self._seed_static_data()
+        header = self.get_auth_header_for('event1admin@mail.com')
+        params = {'event_id': 1, 'language': 'en', 'include_unsubmitted': True, 'limit': 2}
+
+        data = json.loads(self.app.get('/api/v1/responses', headers=header, data=params).data)
+        self.assertEqual([r['response_id'] for r in data['responses']], [1, 2])
+        self.assertEqual(data['num_entries'], 3)
+        self.assertEqual(data['next_after'], 2)
+
+        params['after'] = data['next_after']
+        data = json.loads(self.app.get('/api/v1/responses', headers=header, data=params).data)
+        self.assertEqual([r['response_id'] for r in data['responses']], [3])
+        self.assertEqual(data['next_after'], None)
+
+    def test_filtered_by_tag(self):
+        """Test that only responses with all of the requested tags are returned."""
+        self._seed_static_data()
+
+        self.assertEqual(self._get_response_ids(**{'tag_ids[]': [1]}), [1, 3])
+        self.assertEqual(self._get_response_ids(**{'tag_ids[]': [1, 2]}), [3])
+
+    def test_filtered_by_review_status(self):
+        """Test filtering responses by whether their reviewers have submitted their reviews."""
+        self._seed_static_data()
+
+        self.assertEqual(self._get_response_ids(review_status='unassigned'), [3])
+        self.assertEqual(self._get_response_ids(review_status='incomplete'), [1, 2])
+        self.assertEqual(self._get_response_ids(review_status='complete'), [])
+
+        self.add_review_response(1, 2, 1, is_submitted=True)
+
+        self.assertEqual(self._get_response_ids(review_status='incomplete'), [1])
+        self.assertEqual(self._get_response_ids(review_status='complete'), [2])
+
+    def test_filtered_by_withdrawn(self):
+        """Test filtering out withdrawn responses."""
+        self._seed_static_data()
+        response = db.session.query(Response).get(3)
+        response.withdraw()
+        db.session.commit()
+
+        self.assertEqual(self._get_response_ids(is_withdrawn=False), [1, 2])
+        self.assertEqual(self._get_response_ids(is_withdrawn=True), [3])
+
+    def test_constant_queries(self):
+        """Test that the number of queries doesn't grow with the number of responses on the page."""
+        self._seed_static_data()
+        header = self.get_auth_header_for('event1admin@mail.com')
+
+        def get_page(limit):
+            params = {'event_id': 1, 'language': 'fr', 'include_unsubmitted': True, 'question_ids[]': [1, 2],
+                      'limit': limit}
+            self.app.get('/api/v1/responses', headers=header, data=params)
+
+        self.assertEqual(self.count_queries(lambda: get_page(1)), self.count_queries(lambda: get_page(3)))
+
 
 class ResponseTagAPITest(ApiTestCase):
     def _seed_static_data(self):
@@ -1,7 +1,10 @@
-from flask import g
+from collections import Counter, defaultdict
+from flask import g, stream_with_context, Response as FlaskResponse
 import flask_restful as restful
 from flask_restful import reqparse, fields, marshal_with, marshal
+import itertools
 from math import ceil
+from operator import attrgetter
 import random
 from sqlalchemy.sql import func, exists
 
@@ -15,11 +18,15 @@ from app.events.repository import EventRepository as event_repository
 from app.responses.repository import ResponseRepository as response_repository
 from app.responses.models import Response, ResponseReviewer
 from app.reviews.mixins import ReviewMixin, GetReviewResponseMixin, PostReviewResponseMixin, PostReviewAssignmentMixin, \
-    GetReviewAssignmentMixin, GetReviewHistoryMixin
+    GetReviewAssignmentMixin, GetReviewHistoryMixin, PostReviewAutoAssignmentMixin
+from app.reviews import assignment
 from app.reviews.models import ReviewForm, ReviewResponse, ReviewScore, ReviewQuestion, ReviewSection, ReviewSectionTranslation, ReviewQuestionTranslation
 from app.reviews.repository import ReviewRepository as review_repository
 from app.reviews.repository import ReviewConfigurationRepository as review_configuration_repository
+from app.reviews.repository import ReviewProgressRepository as review_progress_repository
+from app.reviews.scores import score_matrix_cache
 from app.references.repository import ReferenceRequestRepository as reference_repository
+from app.applicationModel.repository import ApplicationFormRepository as application_form_repository
 
 from app.users.models import AppUser, Country, UserCategory
 from app.users.repository import UserRepository as user_repository
@@ -28,11 +35,14 @@ from app.events.repository import EventRepository as event_repository
 from app.utils.auth import auth_required
 
 from app.utils.auth import auth_required, event_admin_required
+from app.utils.identity import current_identity
 from app.utils.errors import EVENT_NOT_FOUND, REVIEW_RESPONSE_NOT_FOUND, FORBIDDEN, USER_NOT_FOUND, RESPONSE_NOT_FOUND, \
     REVIEW_FORM_NOT_FOUND, REVIEW_ALREADY_COMPLETED, NO_ACTIVE_REVIEW_FORM, REVIEW_FORM_FOR_STAGE_NOT_FOUND
 
-from app.utils import misc
-from app.utils.emailer import email_user
+from app.utils import misc, spreadsheets
+from app.utils.emailer import email_user, email_users
+from app.utils.shared_cache import VersionedCache
+from config import REVIEW_FORM_CACHE_TTL
 
 option_fields = {
     'value': fields.String,
@@ -111,11 +121,13 @@ review_fields = {
     'review_form': fields.Raw,
     'response': fields.Nested(response_fields),
     'user': fields.Nested(user_fields),
-    'reviews_remaining_count': fields.Integer,
+    # Left out (null) when paging by response id
+    'reviews_remaining_count': fields.Integer(default=None),
     'review_response': fields.Nested(review_response_fields),
     'references': fields.List(fields.Nested(reference_fields)),
     'is_submitted': fields.Boolean,
-    'submitted_timestamp': fields.DateTime(dt_format='iso8601')
+    'submitted_timestamp': fields.DateTime(dt_format='iso8601'),
+    'next_response_ids': fields.List(fields.Integer)
 }
 
 reviewer_user_fields = {
@@ -165,11 +177,12 @@ response_review_fields = {
     'review_responses': fields.List(fields.Nested(extended_review_fields)),
 }
 
-def _serialize_review_question(review_question, language):
-    translation = review_question.get_translation(language)
+def _serialize_review_question(review_question, language, translation=None):
     if translation is None:
+        translation = review_question.get_translation(language)
+    if translation is None or translation.language != language:
         LOGGER.warn('Missing {} translation for review review_question id {}'.format(language, review_question.id))
-        translation = review_question.get_translation('en')
+        translation = translation or review_question.get_translation('en')
     return {
         'id': review_question.id,
         'question_id': review_question.question_id,
@@ -185,20 +198,32 @@ def _serialize_review_question(review_question, language):
         'weight': review_question.weight
     }
 
+# Serialized review forms per (review form id, language), bumped whenever a form is changed
+review_form_cache = VersionedCache('review_form', REVIEW_FORM_CACHE_TTL)
+
+
 def _serialize_review_form(review_form: ReviewForm, language: str) -> Mapping[str, Any]:
+    return review_form_cache.get(review_form.id, language, lambda: _build_review_form(review_form, language))
+
+
+def _build_review_form(review_form: ReviewForm, language: str) -> Mapping[str, Any]:
     review_sections = []
 
+    # Load the translations of the whole form up front rather than one query per section and question
+    section_translations = review_repository.get_section_translations(review_form.id, language)
+    question_translations = review_repository.get_question_translations(review_form.id, language)
+
     for section in review_form.review_sections:
-        translation = section.get_translation(language)
-        if translation is None:
+        translation = section_translations.get(section.id)
+        if translation is None or translation.language != language:
             LOGGER.warn('Missing {} translation for review section id {}'.format(language, section.id))
-            translation = section.get_translation('en')
         review_sections.append({
             'id': section.id,
             'order': section.order,
             'headline': translation.headline,
             'description': translation.description,
-            'review_questions': [_serialize_review_question(q, language) for q in section.review_questions]
+            'review_questions': [_serialize_review_question(q, language, question_translations.get(q.id))
+                                 for q in section.review_questions]
         })
 
     form = {
@@ -221,7 +246,7 @@ def _add_reviewer_role(user_id, event_id):
 
 class ReviewResponseUser():
     def __init__(self, review_form, response, reviews_remaining_count, language, reference_responses=None,
-                 review_response=None, reviewer=None):
+                 review_response=None, reviewer=None, next_response_ids=None):
         self.review_form = _serialize_review_form(review_form, language)
         self.response = response
         self.user = None if response is None else response.user
@@ -229,6 +254,7 @@ class ReviewResponseUser():
         self.references = reference_responses
         self.review_response = review_response
         self.reviewer = reviewer
+        self.next_response_ids = next_response_ids or []
 
 class ReviewResponses():
     def __init__(self, review_form, review_responses, language):
@@ -246,22 +272,39 @@ class ReviewResponseReference():
 
 
 class ReviewAPI(ReviewMixin, restful.Resource):
+    # Number of upcoming response ids returned for the client to prefetch
+    NEXT_RESPONSE_COUNT = 3
 
     @auth_required
     @marshal_with(review_fields)
     def get(self):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
+        after = args['after']
+        reviewer_user_id = g.current_user['id']
 
         review_form = review_repository.get_review_form(event_id)
         if review_form is None:
             return EVENT_NOT_FOUND
 
-        reviews_remaining_count = review_repository.get_remaining_reviews_count(g.current_user['id'],
-                                                                                review_form.application_form_id)
-        skip = self.sanitise_skip(args['skip'], reviews_remaining_count)
+        limit = ReviewAPI.NEXT_RESPONSE_COUNT + 1
+        if after is not None:
+            # Clients paging by response id have the count from the first page, so it isn't counted again
+            reviews_remaining_count = None
+            queue = review_repository.get_review_queue(reviewer_user_id, review_form.application_form_id,
+                                                       after=after, limit=limit)
+            if not queue:
+                # Past the end of the queue, so go back to the start
+                queue = review_repository.get_review_queue(reviewer_user_id, review_form.application_form_id,
+                                                           limit=limit)
+        else:
+            reviews_remaining_count = review_repository.get_remaining_reviews_count(
+                reviewer_user_id, review_form.application_form_id)
+            skip = self.sanitise_skip(args['skip'], reviews_remaining_count)
+            queue = review_repository.get_review_queue(reviewer_user_id, review_form.application_form_id,
+                                                       skip=skip, limit=limit)
 
-        response = review_repository.get_response_to_review(skip, g.current_user['id'], review_form.application_form_id)
+        response = review_repository.get_response_for_review(queue[0]) if queue else None
 
         references = []
         if response is not None:
@@ -286,7 +329,8 @@ class ReviewAPI(ReviewMixin, restful.Resource):
             reviews_remaining_count,
             args['language'],
             reference_responses=references,
-            review_response=review_response
+            review_response=review_response,
+            next_response_ids=queue[1:]
         )
 
     def sanitise_skip(self, skip, reviews_remaining_count):
@@ -345,8 +389,9 @@ class ResponseReviewEventAdminAPI(restful.Resource):
             return REVIEW_FORM_NOT_FOUND
 
         response_reviews = (review_repository.get_all_review_responses_by_response(review_form.id, response_id))
+        total_scores = review_repository.get_total_scores([review.id for review in response_reviews])
         serialized_reviews =  [
-            ReviewResponseDetailListAPI._serialise_review_response(response, args['language'])
+            ReviewResponseDetailListAPI._serialise_review_response(response, args['language'], total_scores)
             for response in response_reviews
         ]
         return marshal(ReviewResponses(review_form, serialized_reviews, args['language']), response_review_fields), 200
@@ -457,7 +502,9 @@ class ReviewCountView():
         self.firstname = count.firstname
         self.lastname = count.lastname
         self.reviews_allocated = count.reviews_allocated
-        self.reviews_completed = count.reviews_completed
+        # A review counts as completed once the reviewer has saved it, as it always has
+        self.reviews_completed = count.reviews_started
+        self.reviews_submitted = count.reviews_submitted
         self.reviewer_user_id = count.reviewer_user_id
 
 class ReviewSummaryAPI(restful.Resource):
@@ -486,7 +533,8 @@ class ReviewAssignmentAPI(GetReviewAssignmentMixin, PostReviewAssignmentMixin, r
         'firstname': fields.String,
         'lastname': fields.String,
         'reviews_allocated': fields.Integer,
-        'reviews_completed': fields.Integer
+        'reviews_completed': fields.Integer,
+        'reviews_submitted': fields.Integer
     }
 
     @auth_required
@@ -494,13 +542,12 @@ class ReviewAssignmentAPI(GetReviewAssignmentMixin, PostReviewAssignmentMixin, r
     def get(self):
         args = self.get_req_parser.parse_args()
         event_id = args['event_id']
-        user_id = g.current_user['id']
 
-        current_user = user_repository.get_by_id(user_id)
+        current_user = current_identity()
         if not current_user.is_event_admin(event_id):
             return FORBIDDEN
 
-        counts = review_repository.count_reviews_allocated_and_completed_per_reviewer(event_id)
+        counts = review_progress_repository.get_for_event(event_id)
         views = [ReviewCountView(count) for count in counts]
         return views
 
@@ -529,7 +576,7 @@ class ReviewAssignmentAPI(GetReviewAssignmentMixin, PostReviewAssignmentMixin, r
                                                       num_reviews_required, tags)
         response_reviewers = [ResponseReviewer(response_id, reviewer_user.id) for response_id in response_ids]
         db.session.add_all(response_reviewers)
-        db.session.commit()
+        db.session.flush()
 
         if len(response_ids) > 0:
             email_user(
@@ -542,6 +589,7 @@ class ReviewAssignmentAPI(GetReviewAssignmentMixin, PostReviewAssignmentMixin, r
                 ),
                 event=event,
                 user=reviewer_user)
+        db.session.commit()
         return {}, 201
 
     def add_reviewer_role(self, user_id, event_id):
@@ -550,26 +598,67 @@ class ReviewAssignmentAPI(GetReviewAssignmentMixin, PostReviewAssignmentMixin, r
         db.session.commit()
 
     def get_eligible_response_ids(self, event_id, reviewer_user_id, num_reviews, reviews_required, tags):
-        candidate_responses = review_repository.get_candidate_responses(event_id, reviewer_user_id, reviews_required)
-        # Filter by tags
-        if tags:
-            filtered_candidates_responses = []
-            for response in candidate_responses:
-                if all(rt.tag_id in tags for rt in response.response_tags) and len(response.response_tags) == len(tags):
-                    filtered_candidates_responses.append(response)
-        else:
-            filtered_candidates_responses = candidate_responses
-
-        candidate_response_ids = set([r.id for r in filtered_candidates_responses])
+        candidates = review_repository.get_assignment_candidates(event_id, reviews_required, tags)
 
-        # Now remove any responses that the reviewer is already assigned to
-        already_assigned = review_repository.get_already_assigned(reviewer_user_id)
-        already_assigned_ids = set([r.response_id for r in already_assigned])
-        responses = list(candidate_response_ids - already_assigned_ids)
+        # Remove the reviewer's own response and any responses they are already assigned to
+        already_assigned_ids = set([r.response_id for r in review_repository.get_already_assigned(reviewer_user_id)])
+        responses = [c.response_id for c in candidates
+                     if c.user_id != reviewer_user_id and c.response_id not in already_assigned_ids]
 
         return random.sample(responses, min(len(responses), num_reviews))
 
 
+class ReviewAutoAssignmentAPI(PostReviewAutoAssignmentMixin, restful.Resource):
+
+    @event_admin_required
+    def post(self, event_id):
+        """Assign the event's reviewers to every response that still needs reviews, balancing their loads."""
+        args = self.post_req_parser.parse_args()
+        tags = args['tags']
+        max_reviews_per_reviewer = args['max_reviews_per_reviewer']
+
+        event = event_repository.get_by_id(event_id)
+        if not event:
+            return EVENT_NOT_FOUND
+
+        config = review_configuration_repository.get_configuration_for_event(event_id)
+        num_reviews_required = config.num_reviews_required if config is not None else 1
+
+        candidates = review_repository.get_assignment_candidates(event_id, num_reviews_required, tags)
+        allocations = assignment.allocate(
+            candidates,
+            review_repository.get_reviewer_loads(event_id),
+            review_repository.get_assigned_pairs(event_id),
+            num_reviews_required,
+            max_reviews_per_reviewer)
+        review_repository.add_response_reviewers(event_id, allocations)
+
+        assigned_per_reviewer = Counter(reviewer_user_id for _, reviewer_user_id in allocations)
+        reviewers_by_count = defaultdict(list)
+        for reviewer_user_id, count in assigned_per_reviewer.items():
+            reviewers_by_count[count].append(reviewer_user_id)
+
+        for num_reviews, reviewer_user_ids in reviewers_by_count.items():
+            email_users(
+                'reviews-assigned',
+                reviewer_user_ids,
+                event=event,
+                template_parameters=dict(
+                    num_reviews=num_reviews,
+                    baobab_host=misc.get_baobab_host(),
+                    system_name=g.organisation.system_name,
+                    event_key=event.key
+                ))
+
+        reviews_needed = sum(num_reviews_required - c.assigned for c in candidates)
+        return {
+            'reviews_assigned': len(allocations),
+            'reviews_unallocated': reviews_needed - len(allocations),
+            'reviewers': [{'reviewer_user_id': reviewer_user_id, 'reviews_assigned': count}
+                          for reviewer_user_id, count in sorted(assigned_per_reviewer.items())]
+        }, 201
+
+
 _review_history_fields = {
     'response_id': fields.Integer,
     'review_response_id': fields.Integer,
@@ -605,7 +694,7 @@ class ReviewHistoryAPI(GetReviewHistoryMixin, restful.Resource):
         limit = args['limit']
         sort_column = args['sort_column']
 
-        reviewer = user_repository.get_by_id(user_id).is_reviewer(event_id)
+        reviewer = current_identity().is_reviewer(event_id)
         if not reviewer:
             return FORBIDDEN
 
@@ -642,7 +731,7 @@ class ReviewListAPI(restful.Resource):
         }
 
     @staticmethod
-    def _serialize_response(response, review_response, language):
+    def _serialize_response(response, review_response, language, total_scores):
         info = [
             ReviewListAPI._serialize_answer(answer, language)
             for answer in response.answers if answer.question.key == 'review-identifier']
@@ -657,7 +746,7 @@ class ReviewListAPI(restful.Resource):
             'information': info,
             'started': review_response is not None,
             'submitted': submitted,
-            'total_score': review_response.calculate_score() if review_response is not None else 0.0
+            'total_score': total_scores.get(review_response.id, 0.0) if review_response is not None else 0.0
         }
 
     @auth_required
@@ -670,12 +759,14 @@ class ReviewListAPI(restful.Resource):
         user_id = g.current_user['id']
         language = args['language']
 
-        if not user_repository.get_by_id(user_id).is_reviewer(event_id):
+        if not current_identity().is_reviewer(event_id):
             return FORBIDDEN
 
-        responses_to_review = review_repository.get_review_list(user_id, event_id)
+        responses_to_review = review_repository.get_review_list(user_id, event_id).all()
+        total_scores = review_repository.get_total_scores(
+            [review_response.id for _, review_response in responses_to_review if review_response is not None])
 
-        return [ReviewListAPI._serialize_response(response, review_response, language)
+        return [ReviewListAPI._serialize_response(response, review_response, language, total_scores)
                 for response, review_response in responses_to_review]
 
 class ResponseReviewAssignmentAPI(restful.Resource):
@@ -705,7 +796,7 @@ class ResponseReviewAssignmentAPI(restful.Resource):
 
         response_reviewers = [ResponseReviewer(response_id, reviewer_user.id) for response_id in response_ids]
         db.session.add_all(response_reviewers)
-        db.session.commit()
+        db.session.flush()
 
         if len(response_ids) > 0:
             email_user(
@@ -718,6 +809,7 @@ class ResponseReviewAssignmentAPI(restful.Resource):
                 ),
                 event=event,
                 user=reviewer_user)
+        db.session.commit()
         return {}, 201
 
     @event_admin_required
@@ -774,7 +866,7 @@ class ReviewResponseDetailListAPI(restful.Resource):
         }
 
     @staticmethod
-    def _serialise_review_response(review_response, language):
+    def _serialise_review_response(review_response, language, total_scores):
         return {
             'review_response_id': review_response.id,
             'response_id': review_response.response_id,
@@ -803,7 +895,7 @@ class ReviewResponseDetailListAPI(restful.Resource):
                     )
             ],
 
-            'total': review_response.calculate_score()
+            'total': total_scores.get(review_response.id, 0.0)
         }
 
     @auth_required
@@ -814,34 +906,127 @@ class ReviewResponseDetailListAPI(restful.Resource):
         args = parser.parse_args()
 
         review_responses = review_repository.get_all_review_responses_by_event(event_id)
+        total_scores = review_repository.get_total_scores([review_response.id for review_response in review_responses])
         return [
-            ReviewResponseDetailListAPI._serialise_review_response(review_response, args['language'])
+            ReviewResponseDetailListAPI._serialise_review_response(review_response, args['language'], total_scores)
             for review_response in review_responses
         ], 200
 
+
+class ReviewResponseExportAPI(restful.Resource):
+    """Every review of the event as a spreadsheet, with one row per review and one column per review question."""
+
+    # Review question types that only display something to the reviewer, so are never scored
+    DISPLAY_QUESTION_TYPES = ('information', 'file', 'multi-file', 'section-divider', 'heading', 'sub-heading')
+
+    HEADER = [
+        'Review ID', 'Response ID', 'Submitted', 'Submitted Timestamp',
+        'Applicant Title', 'Applicant Firstname', 'Applicant Lastname', 'Applicant Email',
+        'Reviewer Title', 'Reviewer Firstname', 'Reviewer Lastname', 'Reviewer Email'
+    ]
+
+    @staticmethod
+    def _question_label(review_question, translations):
+        translation = translations.get(review_question.id)
+        if translation is None:
+            LOGGER.warn('Could not find a translation for review question id {}'.format(review_question.id))
+            return 'Question {}'.format(review_question.id)
+        return translation.headline or translation.description or 'Question {}'.format(review_question.id)
+
+    @staticmethod
+    def _score_value(score):
+        if score.numeric_value is None:
+            return score.value
+        if score.numeric_value.is_integer():
+            return int(score.numeric_value)
+        return score.numeric_value
+
+    @staticmethod
+    def _rows(score_rows, columns, weights):
+        """Fold the score rows of each review, which arrive consecutively, into a single spreadsheet row."""
+        for _, scores in itertools.groupby(score_rows, key=attrgetter('review_response_id')):
+            values = [None] * len(columns)
+            total = 0.0
+            for score in scores:
+                if score.review_question_id in columns:
+                    values[columns[score.review_question_id]] = ReviewResponseExportAPI._score_value(score)
+                if score.review_question_id in weights:
+                    total += (score.numeric_value or 0.0) * weights[score.review_question_id]
+
+            yield [
+                score.review_response_id, score.response_id, score.is_submitted, score.submitted_timestamp,
+                score.response_user_title, score.response_user_firstname, score.response_user_lastname,
+                score.response_user_email,
+                score.reviewer_user_title, score.reviewer_user_firstname, score.reviewer_user_lastname,
+                score.reviewer_user_email
+            ] + values + [total]
+
+    @event_admin_required
+    def get(self, event_id):
+        parser = reqparse.RequestParser()
+        parser.add_argument('language', type=str, required=False, default='en')
+        parser.add_argument('format', type=str, required=False, default='csv', choices=('csv', 'xlsx'))
+        args = parser.parse_args()
+
+        event = event_repository.get_by_id(event_id)
+        review_form = review_repository.get_review_form(event_id)
+        if event is None or review_form is None:
+            return REVIEW_FORM_NOT_FOUND
+
+        review_questions = review_repository.get_review_questions_for_form(review_form.id)
+        translations = review_repository.get_question_translations(review_form.id, args['language'])
+
+        exported_questions = [q for q in review_questions if q.type not in ReviewResponseExportAPI.DISPLAY_QUESTION_TYPES]
+        columns = {q.id: index for index, q in enumerate(exported_questions)}
+        weights = {q.id: q.weight for q in review_questions if q.weight > 0}
+        header = (ReviewResponseExportAPI.HEADER
+                  + [ReviewResponseExportAPI._question_label(q, translations) for q in exported_questions]
+                  + ['Total'])
+
+        rows = ReviewResponseExportAPI._rows(review_repository.stream_review_export_rows(event_id), columns, weights)
+
+        if args['format'] == 'xlsx':
+            body, mimetype = spreadsheets.stream_xlsx(header, rows, sheet_name='Reviews'), spreadsheets.XLSX_MIMETYPE
+        else:
+            body, mimetype = spreadsheets.stream_csv(header, rows), spreadsheets.CSV_MIMETYPE
+
+        response = FlaskResponse(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = 'attachment; filename="{}_reviews.{}"'.format(
+            event.key, args['format'])
+        return response
+
 class ReviewResponseSummaryListAPI(restful.Resource):
+    DEFAULT_LIMIT = 50
+
     @staticmethod
-    def _serialise_response(response: Response, review_form: ReviewForm, language: str):
+    def _serialise_identifier(answer, language, identifier_translations):
+        question_translation = identifier_translations.get((answer.question_id, language))
+        if question_translation is None:
+            question_translation = identifier_translations.get((answer.question_id, 'en'))
+            LOGGER.warn('Could not find {} translation for question id {}'.format(language, answer.question_id))
+
+        return {
+            'headline': question_translation.headline,
+            'value': answer.value_display
+        }
+
+    @staticmethod
+    def _serialise_response(response: Response, review_questions, translations, identifier_translations, score_matrix, weights):
         scores = []
-        for review_section in review_form.review_sections:
-            for review_question in review_section.review_questions:
-                if review_question.weight > 0:
-                    review_question_translation = review_question.get_translation(language)
-                    if not review_question_translation:
-                        review_question_translation = review_question.get_translation('en')
-                        LOGGER.warn('Could not find {} translation for review question id {}'.format(language, review_score.review_question.id))
-
-                    average_score = review_repository.get_average_score_for_review_question(response.id, review_question.id)
-
-                    score = {
-                        "review_question_id": review_question.id,
-                        "headline": review_question_translation.headline,
-                        "description": review_question_translation.description,
-                        "type": review_question.type,
-                        "score": average_score,
-                        "weight": review_question.weight
-                    }
-                    scores.append(score)
+        for review_question in review_questions:
+            review_question_translation = translations.get(review_question.id)
+            if review_question_translation is None:
+                LOGGER.warn('Could not find a translation for review question id {}'.format(review_question.id))
+
+            score = {
+                "review_question_id": review_question.id,
+                "headline": review_question_translation.headline if review_question_translation else None,
+                "description": review_question_translation.description if review_question_translation else None,
+                "type": review_question.type,
+                "score": score_matrix.average(response.id, review_question.id),
+                "weight": review_question.weight
+            }
+            scores.append(score)
 
         response_summary = {
             "response_id": response.id,
@@ -850,13 +1035,13 @@ class ReviewResponseSummaryListAPI(restful.Resource):
             "response_user_lastname": response.user.lastname,
 
             "identifiers": [
-                ReviewResponseDetailListAPI._serialise_identifier(answer, response.language)
+                ReviewResponseSummaryListAPI._serialise_identifier(answer, response.language, identifier_translations)
                 for answer in response.answers
                 if answer.question.is_review_identifier()
             ],
 
             "scores": scores,
-            "total": sum(score['score'] * score['weight'] for score in scores)
+            "total": score_matrix.total(response.id, weights)
         }
         return response_summary
 
@@ -865,15 +1050,59 @@ class ReviewResponseSummaryListAPI(restful.Resource):
     def get(self, event_id):
         parser = reqparse.RequestParser()
         parser.add_argument('language', type=str, required=True)
+        parser.add_argument('sort_column', type=str, required=False, default='response_id', choices=('response_id', 'total'))
+        parser.add_argument('sort_order', type=str, required=False, default='asc', choices=('asc', 'desc'))
+        parser.add_argument('page_number', type=int, required=False)
+        parser.add_argument('limit', type=int, required=False)
         args = parser.parse_args()
+        page_number = args['page_number']
+        limit = args['limit'] or ReviewResponseSummaryListAPI.DEFAULT_LIMIT
 
-        responses = response_repository.get_all_for_event(event_id)
         review_form = review_repository.get_review_form(event_id)
+        if review_form is None:
+            return REVIEW_FORM_NOT_FOUND
 
-        return [
-            ReviewResponseSummaryListAPI._serialise_response(response, review_form, args['language'])
-            for response in responses
-        ], 200
+        review_questions = [
+            review_question
+            for review_section in review_form.review_sections
+            for review_question in review_section.review_questions
+            if review_question.weight > 0
+        ]
+        weights = {review_question.id: review_question.weight for review_question in review_questions}
+        score_matrix = score_matrix_cache.get(review_form.id)
+
+        response_ids = response_repository.get_ids_for_event(event_id)
+        if args['sort_column'] == 'total':
+            totals = score_matrix.totals(weights)
+            response_ids.sort(key=lambda response_id: (totals.get(response_id, 0), response_id))
+        if args['sort_order'] == 'desc':
+            response_ids.reverse()
+
+        num_entries = len(response_ids)
+        if page_number is not None:
+            response_ids = response_ids[page_number * limit:page_number * limit + limit]
+
+        responses = {}
+        if response_ids:
+            responses = {r.id: r for r in response_repository.get_all_by_ids_with_answers(response_ids)}
+        translations = review_repository.get_question_translations(review_form.id, args['language'])
+        identifier_translations = application_form_repository.get_review_identifier_translations(event_id)
+
+        summaries = [
+            ReviewResponseSummaryListAPI._serialise_response(
+                responses[response_id], review_questions, translations, identifier_translations, score_matrix, weights)
+            for response_id in response_ids
+        ]
+
+        if page_number is None:
+            return summaries, 200
+
+        return {
+            'responses': summaries,
+            'num_entries': num_entries,
+            'current_pagenumber': page_number,
+            'total_pages': ceil(float(num_entries) / limit)
+        }, 200
 
 
 class ReviewStageAPI(restful.Resource):
@@ -922,6 +1151,9 @@ class ReviewStageAPI(restful.Resource):
         selected_form.activate()
 
         db.session.commit()
+
+        for form in review_forms:
+            review_form_cache.bump(form.id)
         
         return {}, 201
 
@@ -1020,6 +1252,8 @@ class ReviewFormDetailAPI(restful.Resource):
 
                     review_repository.add_model(question_translation)
 
+        review_form_cache.bump(review_form.id)
+
         new_review_form = review_repository.get_review_form_by_id(review_form.id)
         new_review_form.event_id = event_id
 
@@ -1149,6 +1383,10 @@ class ReviewFormDetailAPI(restful.Resource):
 
             db.session.commit()
 
+        # Weights and questions may have changed, so recompute the rankings from scratch
+        score_matrix_cache.invalidate(id)
+        review_form_cache.bump(id)
+
         review_form = review_repository.get_review_form_by_id(id)
         review_form.event_id = event_id
 
@@ -0,0 +1,131 @@
+"""Balanced allocation of reviewers to responses.
+
+Assigning reviewers one at a time leaves the load uneven: whoever is assigned first takes the
+easy picks and later reviewers are left with whatever is still short. allocate() instead solves
+the allocation for a whole event at once. Responses are filled in rounds (every response gets
+its next reviewer before any response gets the one after), and each slot goes to the eligible
+reviewer with the fewest reviews so far, using a heap keyed on load. An applicant is never
+assigned their own response and nobody reviews the same response twice.
+"""
+
+from collections import defaultdict
+import heapq
+import random
+
+
+def allocate(candidates, reviewer_loads, assigned_pairs, reviews_required, max_reviews_per_reviewer=None,
+             rng=random):
+    """Allocate reviewers to the candidate responses, balancing the reviewers' loads.
+
+    Args:
+        candidates: Rows with response_id, user_id (the applicant) and assigned (the number of
+            reviewers the response already has).
+        reviewer_loads: (reviewer_user_id, reviews_assigned) pairs for every available reviewer.
+        assigned_pairs: (response_id, reviewer_user_id) pairs that already exist.
+        reviews_required: The number of reviewers each response needs.
+        max_reviews_per_reviewer: If given, no reviewer's load goes above this.
+        rng: Source of randomness used to break ties between equally loaded reviewers.
+
+    Returns:
+        A list of new (response_id, reviewer_user_id) pairs.
+    """
+    heap = [(load, rng.random(), reviewer_user_id) for reviewer_user_id, load in reviewer_loads
+            if max_reviews_per_reviewer is None or load < max_reviews_per_reviewer]
+    heapq.heapify(heap)
+
+    reviewers_of = defaultdict(set)
+    for response_id, reviewer_user_id in assigned_pairs:
+        reviewers_of[response_id].add(reviewer_user_id)
+
+    needed = {c.response_id: reviews_required - c.assigned for c in candidates}
+    applicants = {c.response_id: c.user_id for c in candidates}
+    allocations = []
+
+    for round_number in range(max(needed.values(), default=0)):
+        for response_id in sorted(needed):
+            if needed[response_id] <= round_number:
+                continue
+
+            # Pop reviewers in order of load until one is eligible for this response. At most
+            # the response's existing reviewers and its applicant are skipped.
+            skipped = []
+            chosen = None
+            while heap:
+                entry = heapq.heappop(heap)
+                reviewer_user_id = entry[2]
+                if reviewer_user_id == applicants[response_id] or reviewer_user_id in reviewers_of[response_id]:
+                    skipped.append(entry)
+                    continue
+                chosen = entry
+                break
+
+            for entry in skipped:
+                heapq.heappush(heap, entry)
+
+            if chosen is None:
+                continue
+
+            load, _, reviewer_user_id = chosen
+            allocations.append((response_id, reviewer_user_id))
+            reviewers_of[response_id].add(reviewer_user_id)
+            if max_reviews_per_reviewer is None or load + 1 < max_reviews_per_reviewer:
+                heapq.heappush(heap, (load + 1, rng.random(), reviewer_user_id))
+
+        if not heap:
+            break
+
+    loads = dict(reviewer_loads)
+    for _, reviewer_user_id in allocations:
+        loads[reviewer_user_id] += 1
+    _rebalance(allocations, loads, reviewers_of, applicants, max_reviews_per_reviewer)
+
+    return allocations
+
+
+def _rebalance(allocations, loads, reviewers_of, applicants, max_reviews_per_reviewer):
+    """Move new reviews from heavily to lightly loaded reviewers, where the responses allow it.
+
+    The greedy pass can be left with a slot whose least loaded reviewers are all ineligible (they
+    already review the response, or wrote it), so a few reviewers can end up two or more reviews
+    ahead. Only the reviews allocated here can move, so a reviewer who already had more reviews
+    than the others stays ahead of them. Every move lowers the sum of the squared loads, and the
+    pass stops after as many moves as there are new reviews.
+    """
+    # Positions in `allocations` of each reviewer's new reviews
+    positions = defaultdict(list)
+    for index, (_, reviewer_user_id) in enumerate(allocations):
+        positions[reviewer_user_id].append(index)
+
+    for _ in range(len(allocations)):
+        move = _find_move(allocations, loads, positions, reviewers_of, applicants, max_reviews_per_reviewer)
+        if move is None:
+            return
+
+        heavy, position, light = move
+        index = positions[heavy].pop(position)
+        response_id, _ = allocations[index]
+        allocations[index] = (response_id, light)
+        positions[light].append(index)
+        reviewers_of[response_id].discard(heavy)
+        reviewers_of[response_id].add(light)
+        loads[heavy] -= 1
+        loads[light] += 1
+
+
+def _find_move(allocations, loads, positions, reviewers_of, applicants, max_reviews_per_reviewer):
+    """(heavy reviewer, position in their new reviews, light reviewer) for the next move, or None."""
+    by_load = sorted(loads, key=loads.get)
+    # Only reviewers with new reviews have anything to give away
+    movable = sorted((reviewer_user_id for reviewer_user_id, indexes in positions.items() if indexes),
+                     key=loads.get, reverse=True)
+    for heavy in movable:
+        for light in by_load:
+            if loads[heavy] - loads[light] <= 1:
+                break
+            if max_reviews_per_reviewer is not None and loads[light] >= max_reviews_per_reviewer:
+                continue
+            for position, index in enumerate(positions[heavy]):
+                response_id = allocations[index][0]
+                if light != applicants[response_id] and light not in reviewers_of[response_id]:
+                    return heavy, position, light
+    return None
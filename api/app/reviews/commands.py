@@ -0,0 +1,17 @@
+from flask_script import Command, Option
+
+from app import LOGGER
+from app.reviews.repository import ReviewProgressRepository as review_progress_repository
+
+
+class RebuildReviewProgressCommand(Command):
+    """Recount the review_progress counters from the reviewer assignments and review responses."""
+
+    option_list = (
+        Option('--event-id', dest='event_id', type=int, default=None,
+               help='Only rebuild the counters of this event'),
+    )
+
+    def run(self, event_id):
+        rows = review_progress_repository.rebuild(event_id)
+        LOGGER.info('Rebuilt review progress for {} event reviewers'.format(rows))
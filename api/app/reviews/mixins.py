@@ -4,6 +4,7 @@ class ReviewMixin(object):
     req_parser = reqparse.RequestParser()
     req_parser.add_argument('event_id', type=int, required=True)
     req_parser.add_argument('skip', type=int, required=False)
+    req_parser.add_argument('after', type=int, required=False)
     req_parser.add_argument('language', type=str, required=True)
 
 class GetReviewResponseMixin(object):
@@ -29,6 +30,11 @@ class PostReviewAssignmentMixin(object):
     post_req_parser.add_argument('num_reviews', type=int, required=True)
     post_req_parser.add_argument('tags', type=int, action="append", location='json')
 
+class PostReviewAutoAssignmentMixin(object):
+    post_req_parser = reqparse.RequestParser()
+    post_req_parser.add_argument('tags', type=int, action="append", location='json')
+    post_req_parser.add_argument('max_reviews_per_reviewer', type=int, required=False, location='json')
+
 class GetReviewHistoryMixin(object):
     get_req_parser = reqparse.RequestParser()
     get_req_parser.add_argument('event_id', type = int, required = True)
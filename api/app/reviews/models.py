@@ -1,7 +1,9 @@
 from datetime import datetime
+from sqlalchemy.orm import validates
+
 from app import db
 from app.utils import misc
-from typing import Any, Callable, Mapping
+from app.utils.translations import TranslatedMixin
 from datetime import datetime
 
 
@@ -33,7 +35,7 @@ class ReviewForm(db.Model):
         self.active = True
 
 
-class ReviewSection(db.Model):
+class ReviewSection(TranslatedMixin, db.Model):
     id = db.Column(db.Integer(), primary_key=True)
     review_form_id = db.Column(db.Integer(), db.ForeignKey('review_form.id'), nullable=False)
     order = db.Column(db.Integer(), nullable=False)
@@ -48,16 +50,6 @@ class ReviewSection(db.Model):
         self.review_form_id = review_form_id
         self.order = order
 
-    def get_translation(self, language):
-        translation = self.translations.filter_by(language=language).first()
-        return translation
-
-    def _translations_for_field(self, accessor_fn: Callable[['ReviewSectionTranslation'], Any]) -> Mapping[str, Any]:
-        translations = {}
-        for translation in self.translations:
-            translations[translation.language] = accessor_fn(translation)
-        return translations
-
     @property
     def headline_translations(self):
         return self._translations_for_field(lambda t: t.headline)
@@ -87,7 +79,7 @@ class ReviewSectionTranslation(db.Model):
         self.description = description
 
 
-class ReviewQuestion(db.Model):
+class ReviewQuestion(TranslatedMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     review_section_id = db.Column(db.Integer(), db.ForeignKey('review_section.id'), nullable=False)
     question_id = db.Column(db.Integer(), db.ForeignKey('question.id'), nullable=True)
@@ -116,16 +108,6 @@ class ReviewQuestion(db.Model):
         self.order = order
         self.weight = weight
 
-    def get_translation(self, language):
-        translation = self.translations.filter_by(language=language).first()
-        return translation
-
-    def _translations_for_field(self, accessor_fn: Callable[['ReviewQuestionTranslation'], Any]) -> Mapping[str, Any]:
-        translations = {}
-        for translation in self.translations:
-            translations[translation.language] = accessor_fn(translation)
-        return translations
-
     @property
     def headline_translations(self):
         return self._translations_for_field(lambda t: t.headline)
@@ -220,16 +202,21 @@ class ReviewResponse(db.Model):
 
     def calculate_score(self):
         return sum([
-            misc.try_parse_float(score.value) * score.review_question.weight for score in self.review_scores
+            (score.numeric_value or 0.0) * score.review_question.weight for score in self.review_scores
             if score.review_question.weight > 0
         ])
 
 
 class ReviewScore(db.Model):
+    __table_args__ = (db.Index('ix_review_score_response_question_active',
+                               'review_response_id', 'review_question_id', 'is_active'),)
+
     id = db.Column(db.Integer(), primary_key=True)
     review_response_id = db.Column(db.Integer(), db.ForeignKey('review_response.id'), nullable=False)
     review_question_id = db.Column(db.Integer(), db.ForeignKey('review_question.id'), nullable=False)
     value = db.Column(db.String(), nullable=False)
+    # value parsed as a number, or null if it isn't one, so scores can be aggregated in the database
+    numeric_value = db.Column(db.Float(), nullable=True)
     is_active = db.Column(db.Boolean(), nullable=False)
     created_on = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
 
@@ -244,6 +231,28 @@ class ReviewScore(db.Model):
         self.is_active = True
         self.created_on = datetime.now()
 
+    @validates('value')
+    def _set_numeric_value(self, key, value):
+        self.numeric_value = misc.try_parse_number(value)
+        return value
+
+
+class ReviewProgress(db.Model):
+    """Running counts of a reviewer's assigned, started and submitted reviews for an event.
+
+    Kept up to date by the listeners in app.reviews.progress, and rebuilt from scratch by the
+    rebuild_review_progress command.
+    """
+    __tablename__ = 'review_progress'
+    __table_args__ = (db.UniqueConstraint('event_id', 'reviewer_user_id', name='uq_review_progress_event_reviewer'),)
+
+    id = db.Column(db.Integer(), primary_key=True)
+    event_id = db.Column(db.Integer(), db.ForeignKey('event.id'), nullable=False)
+    reviewer_user_id = db.Column(db.Integer(), db.ForeignKey('app_user.id'), nullable=False)
+    reviews_allocated = db.Column(db.Integer(), nullable=False, default=0)
+    reviews_started = db.Column(db.Integer(), nullable=False, default=0)
+    reviews_submitted = db.Column(db.Integer(), nullable=False, default=0)
+
 
 class ReviewConfiguration(db.Model):
     id = db.Column(db.Integer(), primary_key=True)
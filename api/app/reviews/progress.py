@@ -0,0 +1,106 @@
+"""Keeps the review_progress counters in step with reviewer assignments and review responses.
+
+Every change to a ResponseReviewer or ReviewResponse made through the session adjusts the
+counters of its (event, reviewer) in the same flush, so they commit or roll back with the change
+itself. Bulk statements bypass the mapper events, so repository code that inserts or deletes
+assignments in bulk calls adjust() itself.
+"""
+
+from sqlalchemy import and_, event, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm.attributes import get_history
+
+from app.applicationModel.models import ApplicationForm
+from app.responses.models import Response, ResponseReviewer
+from app.reviews.models import ReviewProgress, ReviewResponse
+
+
+COUNTERS = ('reviews_allocated', 'reviews_started', 'reviews_submitted')
+
+
+def event_of_response(response_id):
+    """Scalar subquery for the id of the event a response belongs to."""
+    return (select([ApplicationForm.event_id])
+            .where(and_(Response.id == response_id, Response.application_form_id == ApplicationForm.id))
+            .as_scalar())
+
+
+def adjust(connection, event_id, reviewer_user_id, **deltas):
+    """Add deltas to the reviewer's counters for the event, creating their row if needed.
+
+    event_id may be a value or a scalar subquery such as event_of_response().
+    """
+    deltas = {counter: delta for counter, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    table = ReviewProgress.__table__
+    increments = {counter: table.c[counter] + delta for counter, delta in deltas.items()}
+    values = dict({counter: 0 for counter in COUNTERS}, event_id=event_id, reviewer_user_id=reviewer_user_id)
+    values.update(deltas)
+
+    if connection.dialect.name == 'postgresql':
+        connection.execute(
+            postgresql.insert(table)
+            .values(**values)
+            .on_conflict_do_update(constraint='uq_review_progress_event_reviewer', set_=increments))
+        return
+
+    updated = connection.execute(
+        table.update()
+        .where(and_(table.c.event_id == event_id, table.c.reviewer_user_id == reviewer_user_id))
+        .values(increments))
+    if updated.rowcount == 0:
+        connection.execute(table.insert().values(**values))
+
+
+def _changed(target, attribute):
+    """1 if a boolean attribute became true in this flush, -1 if it became false, otherwise 0."""
+    history = get_history(target, attribute)
+    if not history.added or not history.deleted:
+        return 0
+    return int(bool(history.added[0])) - int(bool(history.deleted[0]))
+
+
+# Load the previous value when these flags are set on an expired instance, so the flush can tell
+# whether they actually changed
+@event.listens_for(ResponseReviewer.active, 'set', active_history=True)
+@event.listens_for(ReviewResponse.is_submitted, 'set', active_history=True)
+def _load_previous_value(target, value, oldvalue, initiator):
+    pass
+
+
+@event.listens_for(ResponseReviewer, 'after_insert')
+def _assigned(mapper, connection, target):
+    if target.active:
+        adjust(connection, event_of_response(target.response_id), target.reviewer_user_id, reviews_allocated=1)
+
+
+@event.listens_for(ResponseReviewer, 'after_update')
+def _assignment_updated(mapper, connection, target):
+    adjust(connection, event_of_response(target.response_id), target.reviewer_user_id,
+           reviews_allocated=_changed(target, 'active'))
+
+
+@event.listens_for(ResponseReviewer, 'after_delete')
+def _unassigned(mapper, connection, target):
+    if target.active:
+        adjust(connection, event_of_response(target.response_id), target.reviewer_user_id, reviews_allocated=-1)
+
+
+@event.listens_for(ReviewResponse, 'after_insert')
+def _started(mapper, connection, target):
+    adjust(connection, event_of_response(target.response_id), target.reviewer_user_id,
+           reviews_started=1, reviews_submitted=int(bool(target.is_submitted)))
+
+
+@event.listens_for(ReviewResponse, 'after_update')
+def _review_updated(mapper, connection, target):
+    adjust(connection, event_of_response(target.response_id), target.reviewer_user_id,
+           reviews_submitted=_changed(target, 'is_submitted'))
+
+
+@event.listens_for(ReviewResponse, 'after_delete')
+def _review_deleted(mapper, connection, target):
+    adjust(connection, event_of_response(target.response_id), target.reviewer_user_id,
+           reviews_started=-1, reviews_submitted=-int(bool(target.is_submitted)))
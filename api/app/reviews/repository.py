@@ -1,73 +1,21 @@
 from sqlalchemy.sql import exists
-from sqlalchemy import and_, or_, func, cast, Date
+from sqlalchemy import and_, or_, func, cast, case, Date
+from sqlalchemy.orm import aliased, joinedload, selectinload
 from app import db
 from app.applicationModel.models import ApplicationForm
-from app.responses.models import Response, ResponseReviewer, ResponseTag
-from app.reviews.models import ReviewForm, ReviewResponse, ReviewScore, ReviewSection, ReviewSectionTranslation, ReviewQuestion, ReviewQuestionTranslation, ReviewConfiguration
+from app.responses.models import Response, ResponseReviewer, ResponseTag, Answer
+from app.reviews.models import ReviewForm, ReviewResponse, ReviewScore, ReviewSection, ReviewSectionTranslation, ReviewQuestion, ReviewQuestionTranslation, ReviewConfiguration, ReviewProgress
+from app.reviews import progress
 from app.users.models import AppUser
 from app.references.models import Reference
 from app.events.models import EventRole
 from app.utils import misc
 
+from collections import Counter
 from typing import Sequence, Optional
 
 class ReviewRepository():
 
-    @staticmethod
-    def count_reviews_allocated_and_completed_per_reviewer(event_id):
-        return db.engine.execute("""
-                (
-                    select
-                        app_user.id as reviewer_user_id,
-                        email,
-                        user_title,
-                        firstname,
-                        lastname,
-                        0 as reviews_allocated,
-                        0 as reviews_completed
-                    from app_user
-                    join event_role on event_role.user_id = app_user.id
-                    where event_role.role = 'reviewer'
-                    and event_role.event_id = {event_id}
-                    and not exists (
-                        select 1
-                        from response_reviewer
-                        inner join response on response_reviewer.response_id = response.id
-                        inner join application_form on response.application_form_id = application_form.id
-                        where response_reviewer.reviewer_user_id = app_user.id
-                        and application_form.event_id = {event_id}
-                    )
-                )
-                union
-                (
-                    select
-                        app_user.id as reviewer_user_id,
-                        email,
-                        user_title,
-                        firstname,
-                        lastname,
-                        count(response_reviewer.id) as reviews_allocated,
-                        count(review_response.id) as reviews_completed
-                    from response_reviewer
-                    join app_user
-                    on response_reviewer.reviewer_user_id = app_user.id
-                    join event_role
-                        on app_user.id = event_role.user_id
-                    join response
-                    on response.id = response_reviewer.response_id
-                    join application_form on response.application_form_id = application_form.id
-                    left join review_response
-                    on review_response.response_id = response.id
-                    and review_response.reviewer_user_id = app_user.id
-                    where
-                        event_role.role = 'reviewer'
-                        and event_role.event_id = {event_id}
-                        and application_form.event_id = {event_id}
-                    group by app_user.id
-
-                )
-            """.format(event_id=event_id))
-
     @staticmethod
     def count_unassigned_reviews(event_id: int, required_reviews_per_response: int, tag_ids: Optional[Sequence[int]] = None) -> int:
         response_ids =  (
@@ -134,19 +82,37 @@ class ReviewRepository():
         return remaining
 
     @staticmethod
-    def get_response_to_review(skip, reviewer_user_id, application_form_id):
-        response = (
-            db.session.query(Response)
-                    .filter_by(is_withdrawn=False, application_form_id=application_form_id, is_submitted=True)
-                    .join(ResponseReviewer)
+    def get_review_queue(reviewer_user_id, application_form_id, after=None, skip=0, limit=1):
+        """Ids of the responses the reviewer still has to review, in order of response id.
+
+        Pass the id of the current response as after to page through the queue by key instead of
+        by offset.
+        """
+        query = (
+            db.session.query(ResponseReviewer.response_id)
                     .filter_by(reviewer_user_id=reviewer_user_id, active=True)
+                    .join(Response, Response.id == ResponseReviewer.response_id)
+                    .filter_by(is_withdrawn=False, application_form_id=application_form_id, is_submitted=True)
                     .outerjoin(ReviewResponse, and_(ReviewResponse.response_id==ResponseReviewer.response_id, ReviewResponse.reviewer_user_id==reviewer_user_id))
                     .filter(or_(ReviewResponse.id == None, ReviewResponse.is_submitted == False))
-                    .order_by(ResponseReviewer.response_id)
-                    .offset(skip)
+        )
+        if after is not None:
+            query = query.filter(ResponseReviewer.response_id > after)
+
+        return [response_id for (response_id,) in query.order_by(ResponseReviewer.response_id).offset(skip).limit(limit)]
+
+    @staticmethod
+    def get_response_for_review(response_id):
+        """The response with its applicant and answers loaded up front."""
+        return (
+            db.session.query(Response)
+                    .filter_by(id=response_id)
+                    .options(joinedload(Response.user).joinedload(AppUser.nationality_country),
+                             joinedload(Response.user).joinedload(AppUser.residence_country),
+                             joinedload(Response.user).joinedload(AppUser.user_category),
+                             selectinload(Response.answers).joinedload(Answer.question))
                     .first()
         )
-        return response
 
     @staticmethod
     def get_review_response_with_form(id, reviewer_user_id):
@@ -261,6 +227,30 @@ class ReviewRepository():
 
         return count
 
+    @staticmethod
+    def get_review_status_counts_by_event(event_id):
+        """Counts of the reviews with the event's active review form per (submission date, is_submitted)."""
+        submitted_date = func.date(ReviewResponse.submitted_timestamp)
+        return (db.session.query(submitted_date, ReviewResponse.is_submitted, func.count(ReviewResponse.id))
+                  .join(ReviewForm, ReviewForm.id == ReviewResponse.review_form_id)
+                  .filter(ReviewForm.active == True)
+                  .join(ApplicationForm, ReviewForm.application_form_id == ApplicationForm.id)
+                  .filter(ApplicationForm.event_id == event_id)
+                  .group_by(submitted_date, ReviewResponse.is_submitted)
+                  .order_by(submitted_date)
+                  .all())
+
+    @staticmethod
+    def count_reviewers_of_submitted_responses(event_id):
+        """The number of reviewers assigned to the event's submitted responses, as count_unassigned_reviews counts them."""
+        return (db.session.query(func.count(ResponseReviewer.id))
+                  .join(Response, ResponseReviewer.response_id == Response.id)
+                  .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+                  .filter(ApplicationForm.event_id == event_id,
+                          Response.is_submitted == True,
+                          Response.is_withdrawn == False)
+                  .scalar())
+
     @staticmethod
     def get_review_complete_timeseries_by_event(event_id):
         timeseries = (db.session.query(cast(ReviewResponse.submitted_timestamp, Date), func.count(ReviewResponse.submitted_timestamp))
@@ -301,18 +291,74 @@ class ReviewRepository():
         return references
 
     @staticmethod
-    def get_candidate_responses(event_id, reviewer_user_id, reviews_required):
-        candidate_responses = db.session.query(Response) \
-            .filter(Response.user_id != reviewer_user_id,
+    def get_assignment_candidates(event_id, reviews_required, tag_ids=None):
+        """Submitted responses for the event that still need reviewers, as rows of response_id,
+        user_id (the applicant) and assigned (the number of reviewers already assigned).
+
+        If tag_ids are given, only responses tagged with exactly those tags are returned.
+        """
+        reviewer_counts = (
+            db.session.query(ResponseReviewer.response_id, func.count(ResponseReviewer.id).label('assigned'))
+            .join(Response, Response.id == ResponseReviewer.response_id)
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+            .filter(ApplicationForm.event_id == event_id)
+            .group_by(ResponseReviewer.response_id)
+            .subquery())
+        assigned = func.coalesce(reviewer_counts.c.assigned, 0)
+
+        query = (
+            db.session.query(Response.id.label('response_id'), Response.user_id, assigned.label('assigned'))
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+            .filter(ApplicationForm.event_id == event_id,
                     Response.is_submitted == True,
-                    Response.is_withdrawn == False) \
-            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id) \
-            .filter(ApplicationForm.event_id == event_id) \
-            .outerjoin(ResponseReviewer, Response.id == ResponseReviewer.response_id) \
-            .group_by(Response.id) \
-            .having(func.count(ResponseReviewer.reviewer_user_id) < reviews_required) \
-            .all()
-        return candidate_responses
+                    Response.is_withdrawn == False)
+            .outerjoin(reviewer_counts, reviewer_counts.c.response_id == Response.id)
+            .filter(assigned < reviews_required))
+
+        if tag_ids:
+            tag_ids = set(tag_ids)
+            tag_counts = (
+                db.session.query(
+                    ResponseTag.response_id,
+                    func.count(ResponseTag.id).label('total'),
+                    func.sum(case([(ResponseTag.tag_id.in_(tag_ids), 1)], else_=0)).label('matching'))
+                .group_by(ResponseTag.response_id)
+                .subquery())
+            query = (query
+                     .join(tag_counts, tag_counts.c.response_id == Response.id)
+                     .filter(tag_counts.c.total == len(tag_ids), tag_counts.c.matching == len(tag_ids)))
+
+        return query.order_by(Response.id).all()
+
+    @staticmethod
+    def get_reviewer_loads(event_id):
+        """(reviewer_user_id, reviews_assigned) for every user with the reviewer role for the event."""
+        return [(p.reviewer_user_id, p.reviews_allocated) for p in ReviewProgressRepository.get_for_event(event_id)]
+
+    @staticmethod
+    def get_assigned_pairs(event_id):
+        """(response_id, reviewer_user_id) of every reviewer assignment for the event."""
+        return (
+            db.session.query(ResponseReviewer.response_id, ResponseReviewer.reviewer_user_id)
+            .join(Response, Response.id == ResponseReviewer.response_id)
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+            .filter(ApplicationForm.event_id == event_id)
+            .all())
+
+    @staticmethod
+    def add_response_reviewers(event_id, pairs):
+        """Insert (response_id, reviewer_user_id) assignments for the event in a single bulk insert."""
+        db.session.bulk_insert_mappings(ResponseReviewer, [
+            {'response_id': response_id, 'reviewer_user_id': reviewer_user_id, 'active': True}
+            for response_id, reviewer_user_id in pairs
+        ])
+
+        # The bulk insert bypasses the mapper events that keep the progress counters up to date
+        allocated = Counter(reviewer_user_id for _, reviewer_user_id in pairs)
+        connection = db.session.connection()
+        for reviewer_user_id, count in allocated.items():
+            progress.adjust(connection, event_id, reviewer_user_id, reviews_allocated=count)
+        db.session.commit()
 
     def get_response_reviewers_for_event(event_id):
         return (db.session.query(ResponseReviewer)
@@ -322,6 +368,22 @@ class ReviewRepository():
                   .order_by(ResponseReviewer.response_id)
                   .all())
 
+    @staticmethod
+    def get_response_reviewers_for_responses(response_ids):
+        return (db.session.query(ResponseReviewer)
+                  .filter(ResponseReviewer.response_id.in_(response_ids))
+                  .options(joinedload(ResponseReviewer.user))
+                  .order_by(ResponseReviewer.response_id, ResponseReviewer.id)
+                  .all())
+
+    @staticmethod
+    def get_review_responses_for_responses(response_ids):
+        """The reviews of the responses with the active review form."""
+        return (db.session.query(ReviewResponse)
+                  .join(ReviewForm, ReviewResponse.review_form_id == ReviewForm.id)
+                  .filter(ReviewForm.active == True, ReviewResponse.response_id.in_(response_ids))
+                  .all())
+
     @staticmethod
     def get_review_responses_for_event(event_id):
         return (db.session.query(ReviewResponse)
@@ -333,7 +395,9 @@ class ReviewRepository():
 
     @staticmethod
     def delete_response_reviewer(response_id, reviewer_user_id):
-        db.session.query(ResponseReviewer).filter_by(response_id=response_id, reviewer_user_id=reviewer_user_id).delete()
+        response_reviewers = db.session.query(ResponseReviewer).filter_by(response_id=response_id, reviewer_user_id=reviewer_user_id).all()
+        for response_reviewer in response_reviewers:
+            db.session.delete(response_reviewer)
         db.session.commit()
 
     @staticmethod
@@ -357,23 +421,138 @@ class ReviewRepository():
 
     @staticmethod
     def get_average_score_for_review_question(response_id: int, review_question_id: int):
-        review_score_values = (
-            db.session.query(ReviewScore.value)
+        average_review_score = (
+            db.session.query(func.avg(func.coalesce(ReviewScore.numeric_value, 0.0)))
             .filter(ReviewScore.review_question_id == review_question_id, ReviewScore.is_active == True)
             .join(ReviewResponse, ReviewResponse.id == ReviewScore.review_response_id)
-            .join(Response, Response.id == ReviewResponse.response_id)
-            .filter_by(id=response_id)
-            .all()
+            .filter(ReviewResponse.response_id == response_id)
+            .scalar()
         )
 
-        review_score_values = [misc.try_parse_float(review_score_value[0]) for review_score_value in review_score_values]
+        return average_review_score or 0
 
-        if len(review_score_values) == 0:
-            average_review_score = 0
-        else:
-            average_review_score = sum(review_score_values) / len(review_score_values)
+    @staticmethod
+    def get_total_scores(review_response_ids):
+        """{review_response_id: weighted total of its active scores} for the given review responses."""
+        if not review_response_ids:
+            return {}
+
+        return dict(
+            db.session.query(
+                ReviewScore.review_response_id,
+                func.sum(func.coalesce(ReviewScore.numeric_value, 0.0) * ReviewQuestion.weight))
+            .join(ReviewQuestion, ReviewQuestion.id == ReviewScore.review_question_id)
+            .filter(ReviewScore.review_response_id.in_(review_response_ids),
+                    ReviewScore.is_active == True,
+                    ReviewQuestion.weight > 0)
+            .group_by(ReviewScore.review_response_id)
+            .all())
+
+    @staticmethod
+    def get_score_fingerprint(review_form_id):
+        """(count, highest id) of the active scores for the review form's questions, which changes
+        whenever a review of the form is saved."""
+        return tuple(
+            db.session.query(func.count(ReviewScore.id), func.max(ReviewScore.id))
+            .join(ReviewQuestion, ReviewQuestion.id == ReviewScore.review_question_id)
+            .join(ReviewSection, ReviewSection.id == ReviewQuestion.review_section_id)
+            .filter(ReviewSection.review_form_id == review_form_id, ReviewScore.is_active == True)
+            .one())
+
+    @staticmethod
+    def get_average_scores_for_form(review_form_id):
+        """(response_id, review_question_id, average) of the active scores for the review form's questions."""
+        return (
+            db.session.query(
+                ReviewResponse.response_id,
+                ReviewScore.review_question_id,
+                func.avg(func.coalesce(ReviewScore.numeric_value, 0.0)))
+            .join(ReviewScore, ReviewScore.review_response_id == ReviewResponse.id)
+            .join(ReviewQuestion, ReviewQuestion.id == ReviewScore.review_question_id)
+            .join(ReviewSection, ReviewSection.id == ReviewQuestion.review_section_id)
+            .filter(ReviewSection.review_form_id == review_form_id, ReviewScore.is_active == True)
+            .group_by(ReviewResponse.response_id, ReviewScore.review_question_id)
+            .all())
+
+    @staticmethod
+    def get_section_translations(review_form_id, language):
+        """{review_section_id: translation} for the review form, falling back to English."""
+        translations = (
+            db.session.query(ReviewSectionTranslation)
+            .join(ReviewSection, ReviewSection.id == ReviewSectionTranslation.review_section_id)
+            .filter(ReviewSection.review_form_id == review_form_id,
+                    ReviewSectionTranslation.language.in_([language, 'en']))
+            .all())
+
+        by_section = {}
+        for translation in sorted(translations, key=lambda t: t.language == language):
+            by_section[translation.review_section_id] = translation
+        return by_section
+
+    @staticmethod
+    def get_question_translations(review_form_id, language):
+        """{review_question_id: translation} for the review form, falling back to English."""
+        translations = (
+            db.session.query(ReviewQuestionTranslation)
+            .join(ReviewQuestion, ReviewQuestion.id == ReviewQuestionTranslation.review_question_id)
+            .join(ReviewSection, ReviewSection.id == ReviewQuestion.review_section_id)
+            .filter(ReviewSection.review_form_id == review_form_id,
+                    ReviewQuestionTranslation.language.in_([language, 'en']))
+            .all())
+
+        by_question = {}
+        for translation in sorted(translations, key=lambda t: t.language == language):
+            by_question[translation.review_question_id] = translation
+        return by_question
+
+    @staticmethod
+    def get_review_questions_for_form(review_form_id):
+        """The review form's questions in the order they are shown to reviewers."""
+        return (
+            db.session.query(ReviewQuestion)
+            .join(ReviewSection, ReviewSection.id == ReviewQuestion.review_section_id)
+            .filter(ReviewSection.review_form_id == review_form_id)
+            .order_by(ReviewSection.order, ReviewSection.id, ReviewQuestion.order, ReviewQuestion.id)
+            .all())
 
-        return average_review_score
+    @staticmethod
+    def stream_review_export_rows(event_id, batch_size=1000):
+        """Every review of the event's active review form, one row per active score, ordered by review.
+
+        Reviews without scores have a single row with a null review_question_id. The rows are plain
+        tuples read through a server-side cursor batch_size at a time, so they can be streamed
+        without loading the whole event.
+        """
+        reviewer = aliased(AppUser)
+        applicant = aliased(AppUser)
+        return (
+            db.session.query(
+                ReviewResponse.id.label('review_response_id'),
+                ReviewResponse.response_id,
+                ReviewResponse.is_submitted,
+                ReviewResponse.submitted_timestamp,
+                applicant.user_title.label('response_user_title'),
+                applicant.firstname.label('response_user_firstname'),
+                applicant.lastname.label('response_user_lastname'),
+                applicant.email.label('response_user_email'),
+                reviewer.user_title.label('reviewer_user_title'),
+                reviewer.firstname.label('reviewer_user_firstname'),
+                reviewer.lastname.label('reviewer_user_lastname'),
+                reviewer.email.label('reviewer_user_email'),
+                ReviewScore.review_question_id,
+                ReviewScore.value,
+                ReviewScore.numeric_value)
+            .join(ReviewForm, ReviewForm.id == ReviewResponse.review_form_id)
+            .join(ApplicationForm, ApplicationForm.id == ReviewForm.application_form_id)
+            .join(Response, Response.id == ReviewResponse.response_id)
+            .join(applicant, applicant.id == Response.user_id)
+            .join(reviewer, reviewer.id == ReviewResponse.reviewer_user_id)
+            .outerjoin(ReviewScore, and_(ReviewScore.review_response_id == ReviewResponse.id,
+                                         ReviewScore.is_active == True))
+            .filter(ApplicationForm.event_id == event_id, ReviewForm.active == True)
+            .order_by(ReviewResponse.id)
+            .execution_options(stream_results=True)
+            .yield_per(batch_size))
 
     @staticmethod
     def get_all_review_forms_for_event(event_id):
@@ -420,3 +599,77 @@ class ReviewConfigurationRepository():
                     .first())
         return config
 
+
+class ReviewProgressRepository():
+
+    @staticmethod
+    def get_for_event(event_id):
+        """Review progress of every reviewer for the event, read from the review_progress counters."""
+        reviewer_ids = (
+            db.session.query(EventRole.user_id)
+            .filter_by(event_id=event_id, role='reviewer')
+            .distinct()
+            .subquery())
+
+        return (
+            db.session.query(
+                AppUser.id.label('reviewer_user_id'),
+                AppUser.email,
+                AppUser.user_title,
+                AppUser.firstname,
+                AppUser.lastname,
+                func.coalesce(ReviewProgress.reviews_allocated, 0).label('reviews_allocated'),
+                func.coalesce(ReviewProgress.reviews_started, 0).label('reviews_started'),
+                func.coalesce(ReviewProgress.reviews_submitted, 0).label('reviews_submitted'))
+            .join(reviewer_ids, reviewer_ids.c.user_id == AppUser.id)
+            .outerjoin(ReviewProgress, and_(ReviewProgress.reviewer_user_id == AppUser.id,
+                                            ReviewProgress.event_id == event_id))
+            .order_by(AppUser.id)
+            .all())
+
+    @staticmethod
+    def rebuild(event_id=None):
+        """Recount the review progress of one event, or of every event, from the assignments and reviews.
+
+        Returns the number of (event, reviewer) rows written.
+        """
+        allocated = (
+            db.session.query(ApplicationForm.event_id, ResponseReviewer.reviewer_user_id, func.count(ResponseReviewer.id))
+            .join(Response, Response.id == ResponseReviewer.response_id)
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+            .filter(ResponseReviewer.active == True)
+            .group_by(ApplicationForm.event_id, ResponseReviewer.reviewer_user_id))
+        reviewed = (
+            db.session.query(
+                ApplicationForm.event_id,
+                ReviewResponse.reviewer_user_id,
+                func.count(ReviewResponse.id),
+                func.sum(case([(ReviewResponse.is_submitted == True, 1)], else_=0)))
+            .join(Response, Response.id == ReviewResponse.response_id)
+            .join(ApplicationForm, Response.application_form_id == ApplicationForm.id)
+            .group_by(ApplicationForm.event_id, ReviewResponse.reviewer_user_id))
+        existing = db.session.query(ReviewProgress)
+
+        if event_id is not None:
+            allocated = allocated.filter(ApplicationForm.event_id == event_id)
+            reviewed = reviewed.filter(ApplicationForm.event_id == event_id)
+            existing = existing.filter(ReviewProgress.event_id == event_id)
+
+        rows = {}
+        def row(key):
+            if key not in rows:
+                rows[key] = {'event_id': key[0], 'reviewer_user_id': key[1],
+                             'reviews_allocated': 0, 'reviews_started': 0, 'reviews_submitted': 0}
+            return rows[key]
+
+        for event, reviewer_user_id, count in allocated.all():
+            row((event, reviewer_user_id))['reviews_allocated'] = count
+        for event, reviewer_user_id, started, submitted in reviewed.all():
+            counts = row((event, reviewer_user_id))
+            counts['reviews_started'] = started
+            counts['reviews_submitted'] = submitted or 0
+
+        existing.delete(synchronize_session=False)
+        db.session.bulk_insert_mappings(ReviewProgress, list(rows.values()))
+        db.session.commit()
+        return len(rows)
@@ -0,0 +1,89 @@
+"""Cached score matrices for ranking the responses to a review form.
+
+A ScoreMatrix holds the average active score of every review question for every response
+reviewed with a form, aggregated by the database in one grouped query. Weighted totals are
+computed from it on demand and memoised per set of weights, so changing a question's weight
+never needs the scores to be reloaded.
+
+Reviewers only ever add score rows (an edited review deactivates its old scores and adds new
+ones), so the count and highest id of a form's active scores change whenever its scores do.
+That fingerprint is checked with a single aggregate query before a cached matrix is reused,
+which keeps the caches of every worker process correct without any coordination.
+"""
+
+from collections import defaultdict
+import threading
+
+from app.reviews.repository import ReviewRepository as review_repository
+
+
+class ScoreMatrix():
+
+    def __init__(self, fingerprint, averages):
+        self.fingerprint = fingerprint
+        self._lock = threading.Lock()
+        self._totals = {}
+
+        self.averages = defaultdict(dict)
+        for response_id, review_question_id, average in averages:
+            self.averages[response_id][review_question_id] = average
+
+    def average(self, response_id, review_question_id):
+        """The average score given to the question for the response, 0 if nobody has scored it."""
+        return self.averages.get(response_id, {}).get(review_question_id, 0)
+
+    def totals(self, weights):
+        """Weighted total of every scored response, given {review_question_id: weight}."""
+        key = tuple(sorted(weights.items()))
+        with self._lock:
+            totals = self._totals.get(key)
+        if totals is None:
+            totals = {
+                response_id: sum(average * weights[review_question_id]
+                                 for review_question_id, average in questions.items()
+                                 if review_question_id in weights)
+                for response_id, questions in self.averages.items()
+            }
+            with self._lock:
+                self._totals[key] = totals
+        return totals
+
+    def total(self, response_id, weights):
+        return self.totals(weights).get(response_id, 0)
+
+
+class ScoreMatrixCache():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._matrices = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, review_form_id):
+        fingerprint = review_repository.get_score_fingerprint(review_form_id)
+        with self._lock:
+            matrix = self._matrices.get(review_form_id)
+            if matrix is not None and matrix.fingerprint == fingerprint:
+                self.hits += 1
+                return matrix
+            self.misses += 1
+
+        matrix = ScoreMatrix(fingerprint, review_repository.get_average_scores_for_form(review_form_id))
+        with self._lock:
+            self._matrices[review_form_id] = matrix
+        return matrix
+
+    def invalidate(self, review_form_id):
+        with self._lock:
+            self._matrices.pop(review_form_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._matrices.clear()
+
+
+score_matrix_cache = ScoreMatrixCache()
@@ -1,5 +1,9 @@
+import csv
 from datetime import datetime
+import io
 import json
+import zipfile
+from xml.etree import ElementTree
 import copy
 import itertools
 
@@ -14,12 +18,17 @@ from app.references.models import ReferenceRequest, Reference
 from app.references.repository import ReferenceRequestRepository as reference_request_repository
 from app.reviews.models import ReviewForm, ReviewQuestion, ReviewResponse, ReviewScore, ReviewConfiguration
 
-from app.reviews.models import ReviewForm, ReviewQuestion, ReviewQuestionTranslation, ReviewResponse, ReviewScore, ReviewConfiguration
+from app.reviews.models import ReviewForm, ReviewQuestion, ReviewQuestionTranslation, ReviewResponse, ReviewScore, ReviewConfiguration, ReviewProgress, ReviewSectionTranslation
+from app.reviews.repository import ReviewRepository as review_repository
+from app.reviews.repository import ReviewProgressRepository as review_progress_repository
+from app.reviews.scores import score_matrix_cache
+from app.reviews.api import review_form_cache
 from app.utils.errors import REVIEW_RESPONSE_NOT_FOUND, FORBIDDEN, USER_NOT_FOUND
 from nose.plugins.skip import SkipTest
 from app.organisation.models import Organisation
 
 from parameterized import parameterized
+from mock import patch
 
 class ReviewsApiTest(ApiTestCase):
 
@@ -481,6 +490,30 @@ class ReviewsApiTest(ApiTestCase):
         self.assertEqual(data['response']['user_id'], 7)
         self.assertEqual(data['response']['answers'][1]['value'], 'I will share by tutoring.')
 
+    def test_paging_by_response_id(self):
+        self.seed_static_data()
+        self.setup_one_reviewer_three_candidates_and_one_completed_review()
+        header = self.get_auth_header_for('r1@r.com')
+
+        data = json.loads(self.app.get('/api/v1/review', headers=header, data={'event_id': 1, 'language': 'en'}).data)
+        self.assertEqual(data['response']['id'], 2)
+        self.assertEqual(data['next_response_ids'], [3])
+        self.assertEqual(data['reviews_remaining_count'], 2)
+
+        # Only the first page counts the remaining reviews
+        with patch.object(review_repository, 'get_remaining_reviews_count') as count_fn:
+            data = json.loads(self.app.get(
+                '/api/v1/review', headers=header, data={'event_id': 1, 'language': 'en', 'after': 2}).data)
+        count_fn.assert_not_called()
+        self.assertEqual(data['response']['id'], 3)
+        self.assertEqual(data['next_response_ids'], [])
+        self.assertIsNone(data['reviews_remaining_count'])
+
+        # Past the end of the queue it starts again
+        data = json.loads(self.app.get(
+            '/api/v1/review', headers=header, data={'event_id': 1, 'language': 'en', 'after': 3}).data)
+        self.assertEqual(data['response']['id'], 2)
+
     def setup_candidate_who_has_applied_to_multiple_events(self):
         user_id = 5
 
@@ -858,7 +891,6 @@ class ReviewsApiTest(ApiTestCase):
         # total unallocated: 18 - 9 = 9
         # total completed reviews: 6
 
-    @SkipTest
     def test_count_reviews_allocated_and_completed(self):
         self.seed_static_data()
         self.setup_count_reviews_allocated_and_completed()
@@ -870,16 +902,19 @@ class ReviewsApiTest(ApiTestCase):
         data = json.loads(response.data)
         data = sorted(data, key=lambda k: k['email'])
         LOGGER.debug(data)
-        self.assertEqual(len(data),3)
-        self.assertEqual(data[0]['email'], 'r2@r.com')
-        self.assertEqual(data[0]['reviews_allocated'], 4)
-        self.assertEqual(data[0]['reviews_completed'], 3)
-        self.assertEqual(data[1]['email'], 'r3@r.com')
-        self.assertEqual(data[1]['reviews_allocated'], 2)
-        self.assertEqual(data[1]['reviews_completed'], 2)
-        self.assertEqual(data[2]['email'], 'r4@r.com')
-        self.assertEqual(data[2]['reviews_allocated'], 1)
-        self.assertEqual(data[2]['reviews_completed'], 0)
+        self.assertEqual(len(data),4)
+        self.assertEqual(data[0]['email'], 'r1@r.com')
+        self.assertEqual(data[0]['reviews_allocated'], 0)
+        self.assertEqual(data[0]['reviews_completed'], 0)
+        self.assertEqual(data[1]['email'], 'r2@r.com')
+        self.assertEqual(data[1]['reviews_allocated'], 4)
+        self.assertEqual(data[1]['reviews_completed'], 3)
+        self.assertEqual(data[2]['email'], 'r3@r.com')
+        self.assertEqual(data[2]['reviews_allocated'], 2)
+        self.assertEqual(data[2]['reviews_completed'], 2)
+        self.assertEqual(data[3]['email'], 'r4@r.com')
+        self.assertEqual(data[3]['reviews_allocated'], 1)
+        self.assertEqual(data[3]['reviews_completed'], 0)
 
     def test_reviewer_is_not_assigned_to_response_more_than_once(self):
         self.seed_static_data()
@@ -1514,6 +1549,175 @@ class ResponseReviewerAssignmentApiTest(ApiTestCase):
         self.assertEqual(response.status_code, 400)
 
 
+class ReviewAutoAssignmentApiTest(ApiTestCase):
+
+    def seed_static_data(self, num_reviewers=3, num_applicants=6, num_reviews_required=2):
+        self.event = self.add_event(key='event1')
+        self.event_admin = self.add_user('eventadmin@mail.com')
+        self.add_event_role('admin', self.event_admin.id, self.event.id)
+
+        self.reviewer_ids = []
+        for i in range(num_reviewers):
+            reviewer = self.add_user('reviewer{}@mail.com'.format(i))
+            self.add_event_role('reviewer', reviewer.id, self.event.id)
+            self.reviewer_ids.append(reviewer.id)
+
+        self.application_form = self.create_application_form(self.event.id)
+        self.response_ids = []
+        for i in range(num_applicants):
+            applicant = self.add_user('applicant{}@mail.com'.format(i))
+            self.response_ids.append(self.add_response(self.application_form.id, applicant.id, is_submitted=True).id)
+
+        review_form = self.add_review_form(self.application_form.id)
+        self.add_review_config(review_form.id, num_reviews_required=num_reviews_required)
+        self.add_email_template('reviews-assigned')
+
+    def auto_assign(self, **params):
+        return self.app.post(
+            '/api/v1/reviewassignment/auto?event_id={}'.format(self.event.id),
+            headers=self.get_auth_header_for('eventadmin@mail.com'),
+            data=json.dumps(params),
+            content_type='application/json')
+
+    def reviewers_per_response(self):
+        reviewers = {}
+        for rr in db.session.query(ResponseReviewer).all():
+            reviewers.setdefault(rr.response_id, []).append(rr.reviewer_user_id)
+        return reviewers
+
+    def test_assignments_balanced(self):
+        """Every response gets the required number of distinct reviewers, spread evenly."""
+        self.seed_static_data()
+
+        response = self.auto_assign()
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(data['reviews_assigned'], 12)
+        self.assertEqual(data['reviews_unallocated'], 0)
+        self.assertEqual([r['reviews_assigned'] for r in data['reviewers']], [4, 4, 4])
+
+        reviewers = self.reviewers_per_response()
+        self.assertEqual(sorted(reviewers), self.response_ids)
+        for reviewer_ids in reviewers.values():
+            self.assertEqual(len(set(reviewer_ids)), 2)
+
+    def test_existing_assignments_count_towards_load(self):
+        """Responses that already have reviewers only get the ones they are missing."""
+        self.seed_static_data()
+        for response_id in self.response_ids[:3]:
+            self.add_response_reviewer(response_id, self.reviewer_ids[0])
+
+        data = json.loads(self.auto_assign().data)
+
+        self.assertEqual(data['reviews_assigned'], 9)
+        loads = {r: 0 for r in self.reviewer_ids}
+        for reviewer_ids in self.reviewers_per_response().values():
+            self.assertEqual(len(set(reviewer_ids)), 2)
+            for reviewer_id in reviewer_ids:
+                loads[reviewer_id] += 1
+        self.assertEqual(sorted(loads.values()), [4, 4, 4])
+
+    def test_own_response_not_assigned(self):
+        """A reviewer who also applied is never assigned their own response."""
+        self.seed_static_data(num_reviewers=2, num_applicants=2)
+        own_response_id = self.add_response(self.application_form.id, self.reviewer_ids[0], is_submitted=True).id
+
+        data = json.loads(self.auto_assign().data)
+
+        reviewers = self.reviewers_per_response()
+        self.assertEqual(reviewers[own_response_id], [self.reviewer_ids[1]])
+        self.assertEqual(data['reviews_unallocated'], 1)
+
+    def test_max_reviews_per_reviewer(self):
+        """No reviewer is given more than the maximum, leaving the rest unallocated."""
+        self.seed_static_data()
+
+        data = json.loads(self.auto_assign(max_reviews_per_reviewer=3).data)
+
+        self.assertEqual(data['reviews_assigned'], 9)
+        self.assertEqual(data['reviews_unallocated'], 3)
+
+    def test_tag_filter(self):
+        """Only responses with exactly the given tags are assigned."""
+        self.seed_static_data()
+        tag_id = self.add_tag(self.event.id).id
+        self.tag_response(self.response_ids[0], tag_id)
+
+        data = json.loads(self.auto_assign(tags=[tag_id]).data)
+
+        self.assertEqual(data['reviews_assigned'], 2)
+        self.assertEqual(list(self.reviewers_per_response()), [self.response_ids[0]])
+
+
+class ReviewProgressTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.event_id = self.add_event(key='event1').id
+        other_event_id = self.add_event(key='event2').id
+        self.reviewer_id = self.add_user('reviewer@mail.com').id
+        self.add_event_role('reviewer', self.reviewer_id, self.event_id)
+
+        application_form_id = self.create_application_form(self.event_id).id
+        other_application_form_id = self.create_application_form(other_event_id).id
+        self.review_form_id = self.add_review_form(application_form_id).id
+        self.response_ids = [
+            self.add_response(application_form_id, self.add_user('user{}@mail.com'.format(i)).id, is_submitted=True).id
+            for i in range(3)]
+        self.other_response_id = self.add_response(other_application_form_id, self.add_user('other@mail.com').id).id
+
+    def progress(self):
+        row = review_progress_repository.get_for_event(self.event_id)[0]
+        return row.reviews_allocated, row.reviews_started, row.reviews_submitted
+
+    def test_counters_follow_reviews(self):
+        """Assigning, starting, submitting and unassigning reviews update the counters."""
+        self.seed_static_data()
+        self.assertEqual(self.progress(), (0, 0, 0))
+
+        for response_id in self.response_ids:
+            self.add_response_reviewer(response_id, self.reviewer_id)
+        self.add_response_reviewer(self.other_response_id, self.reviewer_id)
+        self.assertEqual(self.progress(), (3, 0, 0))
+
+        review_response = self.add_review_response(self.reviewer_id, self.response_ids[0], self.review_form_id)
+        self.add_review_response(self.reviewer_id, self.response_ids[1], self.review_form_id, is_submitted=True)
+        self.assertEqual(self.progress(), (3, 2, 1))
+
+        review_response.submit()
+        db.session.commit()
+        self.assertEqual(self.progress(), (3, 2, 2))
+
+        review_repository.delete_response_reviewer(self.response_ids[2], self.reviewer_id)
+        self.assertEqual(self.progress(), (2, 2, 2))
+
+        response_reviewer = db.session.query(ResponseReviewer).filter_by(response_id=self.response_ids[0]).one()
+        response_reviewer.deactivate()
+        db.session.commit()
+        self.assertEqual(self.progress(), (1, 2, 2))
+
+    def test_bulk_assignments_counted(self):
+        """Assignments added in bulk are counted too."""
+        self.seed_static_data()
+
+        review_repository.add_response_reviewers(
+            self.event_id, [(response_id, self.reviewer_id) for response_id in self.response_ids])
+
+        self.assertEqual(self.progress(), (3, 0, 0))
+
+    def test_rebuild(self):
+        """Rebuilding recounts the counters from the assignments and reviews."""
+        self.seed_static_data()
+        for response_id in self.response_ids:
+            self.add_response_reviewer(response_id, self.reviewer_id)
+        self.add_review_response(self.reviewer_id, self.response_ids[0], self.review_form_id, is_submitted=True)
+        db.session.query(ReviewProgress).update({'reviews_allocated': 10, 'reviews_started': 0})
+        db.session.commit()
+
+        self.assertEqual(review_progress_repository.rebuild(self.event_id), 1)
+        self.assertEqual(self.progress(), (3, 1, 1))
+
+
 class ReferenceReviewRequest(ApiTestCase):
     def static_seed_data(self):
         # User, country and organisation is set up by ApiTestCase
@@ -1572,7 +1776,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(len(data['references']), 1)
         self.assertDictEqual(data['references'][0], {
             u'title': u'Mr',
@@ -1614,7 +1818,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(len(data['references']), 2)
         self.assertDictEqual(data['references'][0], {
             u'title': u'Mr',
@@ -1646,7 +1850,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(data.get('references', None), None)
 
     def test_get_reference_submitted_later(self):
@@ -1670,7 +1874,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(data.get('references', None), None)
 
         response = self.app.post(
@@ -1683,7 +1887,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(len(data['references']), 1)
         self.assertDictEqual(data['references'][0], {
             u'title': u'Mr',
@@ -1718,7 +1922,7 @@ class ReferenceReviewRequest(ApiTestCase):
         data = json.loads(response.data)
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(len(data['references']), 1)
 
         self.assertDictEqual(data['references'][0], {
@@ -1740,7 +1944,7 @@ class ReferenceReviewRequest(ApiTestCase):
 
         data = json.loads(response.data)
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(len(data), 8)
+        self.assertEqual(len(data), 9)
         self.assertEqual(data.get('references', None), None)
 
 
@@ -1982,6 +2186,73 @@ class ReviewResponseDetailListApiTest(ApiTestCase):
         self.assertEqual(data[1]['total'], 9)
 
 
+    def test_export_not_event_admin(self):
+        self.seed_static_data()
+
+        response = self.app.get(
+            '/api/v1/reviewresponseexport',
+            headers=self.get_auth_header_for('user1@mail.com'),
+            data={'event_id': 1}
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_export_csv(self):
+        self.seed_static_data()
+
+        response = self.app.get(
+            '/api/v1/reviewresponseexport',
+            headers=self.get_auth_header_for('event_admin@mail.com'),
+            data={'event_id': 1, 'language': 'en', 'format': 'csv'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertIn('attachment', response.headers['Content-Disposition'])
+
+        rows = list(csv.reader(io.StringIO(response.data.decode('utf-8-sig'))))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][12:], [
+            'Ethical Considerations', 'Comments for the candidate', 'What is your overall rating?',
+            'Yes/No Question', 'Total'])
+        self.assertEqual(rows[1][:3], ['1', '1', 'TRUE'])
+        self.assertEqual(rows[1][4:12], [
+            'Ms', 'Jane', 'Bloggs', 'user1@mail.com', 'Mr', 'Joe', 'Soap', 'reviewer@mail.com'])
+        self.assertEqual(rows[1][12:], ['4', 'This is a very good proposal', '5', 'Yes', '14.0'])
+        self.assertEqual(rows[2][12:], ['3', 'Not bad!', '3', 'No', '9.0'])
+
+    def test_export_xlsx(self):
+        self.seed_static_data()
+
+        response = self.app.get(
+            '/api/v1/reviewresponseexport',
+            headers=self.get_auth_header_for('event_admin@mail.com'),
+            data={'event_id': 1, 'language': 'en', 'format': 'xlsx'}
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        with zipfile.ZipFile(io.BytesIO(response.data)) as workbook:
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+        rows = [[''.join(cell.itertext()) for cell in row] for row in sheet.iter(namespace + 'row')]
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0][12], 'Ethical Considerations')
+        self.assertEqual(rows[1][12:], ['4', 'This is a very good proposal', '5', 'Yes', '14.0'])
+
+    def test_export_event_without_review_form(self):
+        self.seed_static_data()
+
+        response = self.app.get(
+            '/api/v1/reviewresponseexport',
+            headers=self.get_auth_header_for('event_admin@mail.com'),
+            data={'event_id': 2}
+        )
+
+        self.assertEqual(response.status_code, 404)
+
+
 class ReviewResponseSummaryListApiTest(ApiTestCase):
     def seed_static_data(self):
         self.user1 = self.add_user('user1@mail.com', 'Jane', 'Bloggs', 'Ms')
@@ -2205,6 +2476,98 @@ class ReviewResponseSummaryListApiTest(ApiTestCase):
 
         self.assertEqual(data[1]['total'], 5.5)
 
+    def get_summary(self, **params):
+        params.update({'event_id': 1, 'language': 'en'})
+        response = self.app.get(
+            '/api/v1/reviewresponsesummarylist',
+            headers=self.get_auth_header_for('event_admin@mail.com'),
+            data=params)
+        return json.loads(response.data)
+
+    def test_sorted_by_total_and_paginated(self):
+        self.seed_static_data()
+
+        data = self.get_summary(sort_column='total', sort_order='desc', page_number=0, limit=1)
+
+        self.assertEqual(data['num_entries'], 2)
+        self.assertEqual(data['total_pages'], 2)
+        self.assertEqual([r['response_id'] for r in data['responses']], [1])
+
+        data = self.get_summary(sort_column='total', sort_order='asc')
+        self.assertEqual([r['response_id'] for r in data], [2, 1])
+
+    def test_scores_cached_until_reviews_change(self):
+        self.seed_static_data()
+        response_id, review_form_id, review_question_id = self.response2.id, self.review_form.id, self.review_question3.id
+        self.get_summary()
+        score_matrix_cache.reset_stats()
+
+        self.get_summary()
+        self.assertEqual((score_matrix_cache.hits, score_matrix_cache.misses), (1, 0))
+
+        reviewer3 = self.add_user('reviewer3@mail.com')
+        review_response = self.add_review_response(reviewer3.id, response_id, review_form_id)
+        self.add_review_score(review_response.id, review_question_id, '6')
+
+        data = self.get_summary()
+        self.assertEqual((score_matrix_cache.hits, score_matrix_cache.misses), (1, 1))
+        self.assertEqual(data[1]['scores'][1]['score'], 3)
+        self.assertEqual(data[1]['total'], 8.5)
+
+    def test_weights_applied_to_cached_scores(self):
+        self.seed_static_data()
+        review_question1_id, review_question3_id = self.review_question1.id, self.review_question3.id
+        self.get_summary()
+
+        db.session.query(ReviewQuestion).filter_by(id=review_question1_id).update({'weight': 10})
+        db.session.query(ReviewQuestion).filter_by(id=review_question3_id).update({'weight': 0})
+        db.session.commit()
+
+        data = self.get_summary(sort_column='total', sort_order='desc')
+
+        self.assertEqual([(r['response_id'], r['total']) for r in data], [(1, 35), (2, 25)])
+        self.assertEqual(len(data[0]['scores']), 1)
+
+
+class ReviewScoreAggregationTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.add_event()
+        application_form_id = self.create_application_form().id
+        review_form_id = self.add_review_form(application_form_id).id
+        review_section_id = self.add_review_section(review_form_id).id
+        self.rating_id = self.add_review_question(review_section_id, type='multi-choice', weight=2).id
+        self.comment_id = self.add_review_question(review_section_id, type='long-text', weight=0).id
+        self.bonus_id = self.add_review_question(review_section_id, type='short-text', weight=1).id
+
+        response_id = self.add_response(application_form_id, self.add_user('applicant@mail.com').id).id
+        self.review_response_ids = []
+        for i, (rating, bonus) in enumerate([('4', '1.5'), ('3', 'n/a')]):
+            review_response_id = self.add_review_response(
+                self.add_user('reviewer{}@mail.com'.format(i)).id, response_id, review_form_id).id
+            self.add_review_score(review_response_id, self.rating_id, rating)
+            self.add_review_score(review_response_id, self.comment_id, '100')
+            self.add_review_score(review_response_id, self.bonus_id, bonus)
+            self.review_response_ids.append(review_response_id)
+        self.response_id = response_id
+
+    def test_numeric_value_set_on_write(self):
+        score = ReviewScore(1, ' 2.5 ')
+        self.assertEqual(score.numeric_value, 2.5)
+
+        score.value = 'Excellent'
+        self.assertIsNone(score.numeric_value)
+
+    def test_aggregates(self):
+        """Totals and averages are aggregated in the database, counting non-numeric values as 0."""
+        self.seed_static_data()
+
+        total_scores = review_repository.get_total_scores(self.review_response_ids)
+
+        self.assertEqual(total_scores, {self.review_response_ids[0]: 9.5, self.review_response_ids[1]: 6})
+        self.assertEqual(review_repository.get_average_score_for_review_question(self.response_id, self.rating_id), 3.5)
+        self.assertEqual(review_repository.get_average_score_for_review_question(self.response_id, self.bonus_id), 0.75)
+
 
 class ReviewStageAPITest(ApiTestCase):
     def seed_static_data(self, activate_second_stage=True):
@@ -2300,6 +2663,36 @@ class ReviewStageAPITest(ApiTestCase):
 
         self.assertEqual(response.status_code, 404)
 
+    def test_review_form_cached_until_stage_changes(self):
+        """Test that the serialized review form is reused until the review stage is changed."""
+        self.seed_static_data()
+        section = self.add_review_section(review_form_id=2)
+        self.add_review_section_translation(section.id, 'en', headline='Before')
+        section_id = section.id
+
+        params = {'event_id': 1, 'language': 'en'}
+        for _ in range(2):
+            response = self.app.get('/api/v1/review', headers=self.event_admin_headers, data=params)
+            data = json.loads(response.data)
+            self.assertEqual(data['review_form']['review_sections'][0]['headline'], 'Before')
+        self.assertEqual(review_form_cache.misses, 1)
+        self.assertEqual(review_form_cache.hits, 1)
+
+        db.session.query(ReviewSectionTranslation).filter_by(review_section_id=section_id).update({'headline': 'After'})
+        db.session.commit()
+
+        response = self.app.get('/api/v1/review', headers=self.event_admin_headers, data=params)
+        data = json.loads(response.data)
+        self.assertEqual(data['review_form']['review_sections'][0]['headline'], 'Before')
+
+        response = self.app.post('/api/v1/reviewstage', headers=self.event_admin_headers, data={'event_id': 1, 'stage': 2})
+        self.assertEqual(response.status_code, 201)
+
+        response = self.app.get('/api/v1/review', headers=self.event_admin_headers, data=params)
+        data = json.loads(response.data)
+        self.assertEqual(data['review_form']['review_sections'][0]['headline'], 'After')
+        self.assertEqual(review_form_cache.misses, 2)
+
     def test_post_no_form(self):
         """Test that the post method returns a 404 when trying to activate a stage that doesn't exist."""
         self.seed_static_data()
@@ -18,6 +18,9 @@ from .integration_tests import api as integration_tests_api
 from .outcome import api as outcome_api
 from .tags import api as tag_api
 from .invoice import api as invoice_api
+from .campaigns import api as campaign_api
+from .outbox import api as outbox_api
+from .utils import http_cache
 
 rest_api.add_resource(users_api.UserAPI, '/api/v1/user')
 rest_api.add_resource(users_api.UserCommentAPI, '/api/v1/user-comment')
@@ -66,10 +69,16 @@ rest_api.add_resource(reviews_api.ReviewAssignmentAPI,
                       '/api/v1/reviewassignment')
 rest_api.add_resource(reviews_api.ReviewSummaryAPI,
                       '/api/v1/reviewassignment/summary')
+rest_api.add_resource(reviews_api.ReviewAutoAssignmentAPI,
+                      '/api/v1/reviewassignment/auto')
 rest_api.add_resource(events_api.NotSubmittedReminderAPI,
                       '/api/v1/reminder-unsubmitted')
 rest_api.add_resource(events_api.NotStartedReminderAPI,
                       '/api/v1/reminder-not-started')
+rest_api.add_resource(campaign_api.EmailCampaignAPI, '/api/v1/email-campaign')
+rest_api.add_resource(campaign_api.AdminEmailCampaignAPI, '/api/v1/admin/email-campaign')
+rest_api.add_resource(outbox_api.EmailMetricsAPI, '/api/v1/admin/email-metrics')
+rest_api.add_resource(http_cache.HttpCacheStatsAPI, '/api/v1/admin/http-cache-stats')
 rest_api.add_resource(reviews_api.ReviewHistoryAPI, '/api/v1/reviewhistory')
 rest_api.add_resource(users_api.UserProfileList, '/api/v1/userprofilelist')
 rest_api.add_resource(users_api.UserProfile, '/api/v1/userprofile')
@@ -129,6 +138,7 @@ rest_api.add_resource(reviews_api.ResponseReviewAPI, '/api/v1/responsereview')
 rest_api.add_resource(reviews_api.ResponseReviewEventAdminAPI, '/api/v1/responsereview-admin')
 rest_api.add_resource(reviews_api.ResponseReviewAssignmentAPI, '/api/v1/assignresponsereviewer')
 rest_api.add_resource(reviews_api.ReviewResponseDetailListAPI, '/api/v1/reviewresponsedetaillist')
+rest_api.add_resource(reviews_api.ReviewResponseExportAPI, '/api/v1/reviewresponseexport')
 rest_api.add_resource(reviews_api.ReviewResponseSummaryListAPI, '/api/v1/reviewresponsesummarylist')
 rest_api.add_resource(reviews_api.ReviewStageAPI, '/api/v1/reviewstage')
 rest_api.add_resource(reviews_api.ReviewFormDetailAPI, '/api/v1/review-form-detail')
@@ -5,8 +5,18 @@ from app.utils.auth import auth_required, event_admin_required
 from app.tags.repository import TagRepository as tag_repository
 from app.utils import errors
 from app.tags.models import Tag, TagTranslation, TagType
+from app.utils.http_cache import conditional_get, PRIVATE
+from app.utils.shared_cache import VersionCounter
 from app import LOGGER
 
+
+# Bumped whenever one of an event's tags changes, so the tag lists can be revalidated without queries
+tag_versions = VersionCounter('tags')
+
+
+def _tags_version(resource, event_id):
+    return tag_versions.shared_version(event_id)
+
 def _serialize_tag_detail(tag):
     """Serializes a tag with all of its translations."""
     result = {
@@ -72,6 +82,7 @@ class TagAPI(restful.Resource):
             description = description_translations.get(language)
             tag.translations.append(TagTranslation(tag.id, language, name, description))
         tag_repository.add_tag(tag)
+        tag_versions.bump(event_id)
 
         return _serialize_tag_detail(tag), 201
 
@@ -107,11 +118,13 @@ class TagAPI(restful.Resource):
                 tag_repository.delete_translation(translation.id)
 
         tag_repository.commit()
+        tag_versions.bump(event_id)
 
         return _serialize_tag_detail(tag), 200
     
 class TagListAPI(restful.Resource):
     @event_admin_required
+    @conditional_get(PRIVATE, version=_tags_version)
     def get(self, event_id):
         req_parser = reqparse.RequestParser()
         req_parser.add_argument('language', type=str, required=True)
@@ -124,6 +137,7 @@ class TagListAPI(restful.Resource):
 
 class TagListConfigAPI(restful.Resource):
     @event_admin_required
+    @conditional_get(PRIVATE, version=_tags_version)
     def get(self, event_id):
 
         tags = tag_repository.get_all_for_event(event_id)
@@ -132,5 +146,6 @@ class TagListConfigAPI(restful.Resource):
 
 class TagTypeListAPI(restful.Resource):
     @event_admin_required
+    @conditional_get(PRIVATE, max_age=3600)
     def get(self, event_id):
         return [t.value.upper() for t in TagType]
\ No newline at end of file
@@ -1,4 +1,5 @@
 from app import db
+from app.utils.translations import TranslatedMixin
 from enum import Enum
 
 class TagType(Enum):
@@ -6,7 +7,7 @@ class TagType(Enum):
     REGISTRATION = 'registration'
     GRANT = 'grant'
 
-class Tag(db.Model):
+class Tag(TranslatedMixin, db.Model):
     __tablename__ = 'tag'
     id = db.Column(db.Integer(), primary_key=True)
     event_id = db.Column(db.Integer(), db.ForeignKey('event.id'), nullable=False)
@@ -28,10 +29,6 @@ class Tag(db.Model):
     def update(self, tag_type, active):
         self.tag_type = tag_type
         self.active = active
-    
-    def get_translation(self, language):
-        translation = self.translations.filter_by(language=language).first()
-        return translation
 
 class TagTranslation(db.Model):
     __tablename__ = 'tag_translation'
@@ -240,3 +240,30 @@ class ReviewsApiTest(ApiTestCase):
         self.assertEqual(data[0]['tag_type'], 'REGISTRATION')
         self.assertEqual(data[0]['name'], 'English Tag 1 Event 2')
         self.assertEqual(data[0]['description'], 'English Tag 1 Event 2 Description')
+
+    def test_list_revalidation(self):
+        """Check that an unchanged tag list is answered with a 304 until a tag changes."""
+        self.seed_static_data()
+        params = {'event_id': 1, 'language': 'en'}
+
+        response = self.app.get('/api/v1/tags', headers=self.user1_headers, data=params)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'private, no-cache')
+
+        response = self.app.get('/api/v1/tags', headers=dict(self.user1_headers, **{'If-None-Match': etag}), data=params)
+        self.assertEqual(response.status_code, 304)
+
+        response = self.app.put(
+            '/api/v1/tag',
+            headers=self.user1_headers,
+            data=json.dumps({'id': 1, 'event_id': 1, 'tag_type': 'RESPONSE', 'name': {'en': 'Renamed'},
+                             'description': {'en': 'Renamed'}, 'active': True}),
+            content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+
+        response = self.app.get('/api/v1/tags', headers=dict(self.user1_headers, **{'If-None-Match': etag}), data=params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)[0]['name'], 'Renamed')
+
+        response = self.app.get('/api/v1/tags', headers=dict(self.user3_headers, **{'If-None-Match': etag}), data=params)
+        self.assertEqual(response.status_code, 403)
@@ -9,8 +9,11 @@ from flask_restful import fields, marshal, marshal_with, reqparse
 from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
 
-from app import LOGGER, bcrypt, db
+from app import LOGGER, db
+from app.campaigns import dispatch
+from app.campaigns.api import campaign_fields
 from app.events.models import EventRole
+from app.events.repository import EventRepository as event_repository
 import app.events.status as event_status
 from app.users.mixins import (AuthenticateMixin, PrivacyPolicyMixin,
                               SignupMixin, UserProfileListMixin,
@@ -19,16 +22,19 @@ from app.users.models import AppUser, PasswordReset, UserComment
 from app.users.repository import UserRepository as user_repository
 from app.utils import errors, misc
 from app.utils.auth import admin_required, auth_required, generate_token, get_user_from_request
-from app.utils.emailer import email_user, send_mail
+from app.utils.identity import current_identity
+from app.utils.emailer import email_user, render_generic_email, send_mail
 from app.utils.errors import (ADD_VERIFY_TOKEN_FAILED, BAD_CREDENTIALS,
                               EMAIL_IN_USE, EMAIL_NOT_VERIFIED,
                               EMAIL_VERIFY_CODE_NOT_VALID,
                               ERROR_UPDATING_USER_PROFILE, FORBIDDEN,
-                              MISSING_PASSWORD, POLICY_ALREADY_AGREED,
+                              MISSING_PASSWORD, PASSWORD_HASHER_BUSY, POLICY_ALREADY_AGREED,
                               POLICY_NOT_AGREED, RESET_PASSWORD_CODE_EXPIRED,
                               RESET_PASSWORD_CODE_NOT_VALID, USER_DELETED,
                               USER_NOT_FOUND, VERIFY_EMAIL_INVITED_GUEST)
 from app.utils.misc import make_code
+from app.utils.passwords import password_hasher, PasswordHasherBusy
+from app.utils.rate_limit import rate_limit, IP
 from app.utils.errors import UNAUTHORIZED
 
 
@@ -101,20 +107,25 @@ class UserAPI(SignupMixin, restful.Resource):
 
         LOGGER.info("Registering email: {}".format(email))
 
-        user = AppUser(
-            email=email,
-            firstname=firstname,
-            lastname=lastname,
-            user_title=user_title,
-            password=password,
-            organisation_id=g.organisation.id)
+        try:
+            user = AppUser(
+                email=email,
+                firstname=firstname,
+                lastname=lastname,
+                user_title=user_title,
+                password=password,
+                organisation_id=g.organisation.id)
+        except PasswordHasherBusy:
+            return PASSWORD_HASHER_BUSY
         user.user_primaryLanguage = user_primaryLanguage
 
         db.session.add(user)
 
+        # Flushed rather than committed so that the verification email is committed with the user
         try:
-            db.session.commit()
+            db.session.flush()
         except IntegrityError:
+            db.session.rollback()
             LOGGER.error("email: {} already in use".format(email))
             return EMAIL_IN_USE
 
@@ -129,6 +140,7 @@ class UserAPI(SignupMixin, restful.Resource):
                 ),
                 user=user,
                 subject_parameters=dict(system=g.organisation.system_name))
+            db.session.commit()
 
             LOGGER.debug("Sent verification email to {}".format(user.email))
         else:
@@ -163,8 +175,9 @@ class UserAPI(SignupMixin, restful.Resource):
         user.user_primaryLanguage = user_primaryLanguage
 
         try:
-            db.session.commit()
+            db.session.flush()
         except Exception as e:
+            db.session.rollback()
             LOGGER.error("Exception updating user profile - {}".format(e))
             return ERROR_UPDATING_USER_PROFILE
 
@@ -182,6 +195,8 @@ class UserAPI(SignupMixin, restful.Resource):
 
             LOGGER.debug("Sent re-verification email to {}".format(user.email))
 
+        db.session.commit()
+
         roles = db.session.query(EventRole).filter(
             EventRole.user_id == user.id).all()
 
@@ -269,9 +284,8 @@ class UserProfileList(UserProfileListMixin, restful.Resource):
     def get(self):
         args = self.req_parser.parse_args()
         event_id = args['event_id']
-        current_user_id = g.current_user['id']
 
-        current_user = user_repository.get_by_id(current_user_id)
+        current_user = current_identity()
         if not current_user.is_event_admin(event_id):
             return FORBIDDEN
 
@@ -305,6 +319,7 @@ class UserProfile(UserProfileMixin, restful.Resource):
 
 class AuthenticationAPI(AuthenticateMixin, restful.Resource):
 
+    @rate_limit(limit=30, window=60, per=IP)
     def post(self):
         args = self.req_parser.parse_args()
 
@@ -323,9 +338,16 @@ class AuthenticationAPI(AuthenticateMixin, restful.Resource):
                     "Failed to authenticate, email {} not verified".format(args['email']))
                 return EMAIL_NOT_VERIFIED
 
-            if bcrypt.check_password_hash(user.password, args['password']):
+            try:
+                authenticated = password_hasher.check(user.password, args['password'])
+            except PasswordHasherBusy:
+                return PASSWORD_HASHER_BUSY
+
+            if authenticated:
                 LOGGER.debug(
                     "Successful authentication for email: {}".format(args['email']))
+                if password_hasher.needs_rehash(user.password):
+                    _rehash_password(user, args['password'])
                 roles = db.session.query(EventRole).filter(
                     EventRole.user_id == user.id).all()
                 return user_info(user, roles)
@@ -336,6 +358,15 @@ class AuthenticationAPI(AuthenticateMixin, restful.Resource):
         return BAD_CREDENTIALS
 
 
+def _rehash_password(user, password):
+    """Hash the password again with the current cost factor, or leave that to the next login if the hasher is busy."""
+    try:
+        user.set_password(password)
+        db.session.commit()
+    except PasswordHasherBusy:
+        LOGGER.debug("Postponed rehashing the password of user {}".format(user.id))
+
+
 class AuthenticationRefreshAPI(restful.Resource):
 
     @auth_required
@@ -351,6 +382,7 @@ class AuthenticationRefreshAPI(restful.Resource):
 
 class PasswordResetRequestAPI(restful.Resource):
 
+    @rate_limit(limit=5, window=300, per=IP)
     def post(self):
 
         req_parser = reqparse.RequestParser()
@@ -368,7 +400,7 @@ class PasswordResetRequestAPI(restful.Resource):
 
         password_reset = PasswordReset(user=user)
         db.session.add(password_reset)
-        db.session.commit()
+        db.session.flush()
 
         email_user(
             'password-reset',
@@ -380,12 +412,14 @@ class PasswordResetRequestAPI(restful.Resource):
             ),
             subject_parameters=dict(system_name=g.organisation.system_name),
             user=user)
+        db.session.commit()
 
         return {}, 201
 
 
 class PasswordResetConfirmAPI(restful.Resource):
 
+    @rate_limit(limit=10, window=60, per=IP)
     def post(self):
 
         req_parser = reqparse.RequestParser()
@@ -409,7 +443,10 @@ class PasswordResetConfirmAPI(restful.Resource):
                 "Reset code expired for code: {}".format(args['code']))
             return RESET_PASSWORD_CODE_EXPIRED
 
-        password_reset.user.set_password(args['password'])
+        try:
+            password_reset.user.set_password(args['password'])
+        except PasswordHasherBusy:
+            return PASSWORD_HASHER_BUSY
         db.session.delete(password_reset)
         db.session.commit()
 
@@ -458,8 +495,9 @@ class ResendVerificationEmailAPI(restful.Resource):
             user.verify_token = make_code()
 
         try:
-            db.session.commit()
+            db.session.flush()
         except IntegrityError:
+            db.session.rollback()
             LOGGER.error("Adding verify token for {} failed. ".format(email))
             return ADD_VERIFY_TOKEN_FAILED
 
@@ -473,6 +511,7 @@ class ResendVerificationEmailAPI(restful.Resource):
             ),
             user=user,
             subject_parameters=dict(system=g.organisation.system_name))
+        db.session.commit()
 
         LOGGER.debug("Resent email verification to: {}".format(email))
 
@@ -513,7 +552,7 @@ class UserCommentAPI(restful.Resource):
         req_parser.add_argument('user_id', type=int, required=True)
         args = req_parser.parse_args()
 
-        current_user = user_repository.get_by_id(g.current_user['id'])
+        current_user = current_identity()
         if not current_user.is_event_admin(args['event_id']):
             return FORBIDDEN
 
@@ -524,36 +563,54 @@ class UserCommentAPI(restful.Resource):
         return comments
 
 
-GENERIC_EMAIL_TEMPLATE = """Dear {user_title} {user_firstname} {user_lastname},
-
-{body}
-"""
-
-
 class EmailerAPI(restful.Resource):
 
     @admin_required
     def post(self):
+        """Email one user straight away, or mail-merge to several users or an event segment as a campaign."""
         req_parser = reqparse.RequestParser()
-        req_parser.add_argument('user_id', type=int, required=True)
+        req_parser.add_argument('user_id', type=int, required=False, action='append')
+        req_parser.add_argument('event_id', type=int, required=False)
+        req_parser.add_argument('segment', type=str, required=False, choices=list(dispatch.SEGMENTS))
+        req_parser.add_argument('max_per_second', type=float, required=False)
         req_parser.add_argument('email_subject', type=str, required=True)
         req_parser.add_argument('email_body', type=str, required=True)
         args = req_parser.parse_args()
 
-        user = user_repository.get_by_id(args['user_id'])
+        user_ids = args['user_id']
+        if user_ids and len(user_ids) == 1 and args['segment'] is None:
+            return self.send_to_user(user_ids[0], args['email_subject'], args['email_body'])
+
+        event = None
+        if not user_ids:
+            if args['event_id'] is None or args['segment'] is None:
+                return errors.CAMPAIGN_NO_RECIPIENTS
+            event = event_repository.get_by_id(args['event_id'])
+            if event is None or event.organisation_id != g.organisation.id:
+                return errors.EVENT_NOT_FOUND
+
+        campaign = dispatch.create_mail_merge(
+            g.organisation.id,
+            args['email_subject'],
+            args['email_body'],
+            created_by_user_id=g.current_user['id'],
+            user_ids=user_ids or None,
+            event=event,
+            segment=args['segment'],
+            max_per_second=args['max_per_second'])
+
+        return marshal(campaign, campaign_fields), 201
+
+    def send_to_user(self, user_id, subject, body):
+        user = user_repository.get_by_id(user_id)
         if user is None:
             return errors.USER_NOT_FOUND
         try:
             send_mail(recipient=user.email,
                       sender_name=g.organisation.name,
                       sender_email=g.organisation.email_from,
-                      subject=args['email_subject'],
-                      body_text=GENERIC_EMAIL_TEMPLATE.format(
-                          user_title=user.user_title,
-                          user_firstname=user.firstname,
-                          user_lastname=user.lastname,
-                          body=args['email_body'],
-                      )
+                      subject=subject,
+                      body_text=render_generic_email(user, body)
                       )
         except Exception as e:
             LOGGER.error('Error sending email: {}'.format(e))
@@ -0,0 +1,48 @@
+from concurrent.futures import ThreadPoolExecutor
+import time
+
+from flask_script import Command, Option
+
+from app import LOGGER
+from app.utils.passwords import PasswordHasher, PasswordHasherBusy, password_hasher
+
+
+class BenchmarkPasswordHashingCommand(Command):
+    """Measure login throughput (password checks per second) for a range of hashing pool sizes."""
+
+    option_list = (
+        Option('--workers', dest='workers', default='1,2,4',
+               help='Comma-separated pool sizes to measure'),
+        Option('--logins', dest='logins', type=int, default=40,
+               help='Logins to run for each pool size'),
+        Option('--concurrency', dest='concurrency', type=int, default=16,
+               help='Logins in flight at once, like the threads of the web workers'),
+        Option('--rounds', dest='rounds', type=int, default=password_hasher.rounds),
+    )
+
+    def run(self, workers, logins, concurrency, rounds):
+        password = 'benchmark-password'
+        pw_hash = PasswordHasher(workers=0, rounds=rounds).hash(password)
+
+        LOGGER.info('{} logins at cost {}, {} at a time'.format(logins, rounds, concurrency))
+        LOGGER.info('workers  logins/s  rejected')
+        for pool_size in [int(size) for size in workers.split(',')]:
+            hasher = PasswordHasher(workers=pool_size, max_pending=concurrency, rounds=rounds)
+            # Start the pool's processes before timing
+            hasher.check(pw_hash, password)
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as threads:
+                results = list(threads.map(lambda _: self._login(hasher, pw_hash, password), range(logins)))
+            elapsed = time.perf_counter() - start
+            hasher.shutdown()
+
+            LOGGER.info('{:>7}  {:>8.1f}  {:>8}'.format(
+                pool_size, results.count(True) / elapsed, results.count(None)))
+
+    @staticmethod
+    def _login(hasher, pw_hash, password):
+        try:
+            return hasher.check(pw_hash, password)
+        except PasswordHasherBusy:
+            return None
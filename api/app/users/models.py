@@ -1,7 +1,8 @@
 from datetime import datetime, timedelta
 
-from app import db, bcrypt, LOGGER
+from app import db, LOGGER
 from app.utils.misc import make_code
+from app.utils.passwords import password_hasher
 from flask_login import UserMixin
 from sqlalchemy.schema import UniqueConstraint
 
@@ -68,7 +69,7 @@ class AppUser(db.Model, UserMixin):
         return f"{self.firstname} {self.lastname}"
 
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = password_hasher.hash(password)
 
     def deactivate(self):
         self.active = False
@@ -1,12 +1,13 @@
 from app import db
 from app.applicationModel.models import ApplicationForm
-from app.events.models import EventRole
+from app.events.models import Event, EventRole
 from app.responses.models import Response
 from app.users.models import AppUser
 from app.invitedGuest.models import InvitedGuest
 from app.organisation.models import Organisation
 from sqlalchemy import func
-from sqlalchemy import or_
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import exists
 
 class UserRepository():
 
@@ -14,6 +15,10 @@ class UserRepository():
     def get_by_id(user_id):
         return db.session.query(AppUser).get(user_id)
 
+    @staticmethod
+    def get_all_by_ids(user_ids):
+        return db.session.query(AppUser).filter(AppUser.id.in_(user_ids)).all()
+
     @staticmethod
     def get_by_id_with_response(user_id):
         return db.session.query(AppUser, Response)\
@@ -38,23 +43,44 @@ class UserRepository():
                          .first()
 
     @staticmethod
-    def get_all_with_unsubmitted_response():
-        # TODO: Filter this to event
+    def _with_unsubmitted_response_for(event_id):
         return db.session.query(AppUser)\
                          .filter_by(active=True, is_deleted=False)\
-                         .join(Response, Response.user_id==AppUser.id)\
-                         .filter_by(is_submitted=False, is_withdrawn=False)\
-                         .all()
-    
+                         .filter(exists().where(and_(
+                             Response.user_id == AppUser.id,
+                             Response.is_submitted == False,
+                             Response.is_withdrawn == False,
+                             Response.application_form_id == ApplicationForm.id,
+                             ApplicationForm.event_id == event_id)))
+
     @staticmethod
-    def get_all_without_responses():
-        # TODO: Filter this to event
+    def _without_responses_for(event_id):
+        organisation_id = db.session.query(Event.organisation_id).filter_by(id=event_id).as_scalar()
         return db.session.query(AppUser)\
                          .filter_by(active=True, is_deleted=False)\
-                         .outerjoin(Response, Response.user_id==AppUser.id)\
-                         .filter_by(id=None)\
-                         .all()
-    
+                         .filter(AppUser.organisation_id == organisation_id)\
+                         .filter(~exists().where(and_(
+                             Response.user_id == AppUser.id,
+                             Response.application_form_id == ApplicationForm.id,
+                             ApplicationForm.event_id == event_id)))
+
+    @staticmethod
+    def get_ids_with_unsubmitted_response(event_id):
+        """Query for the ids of users with an unsubmitted response for the event."""
+        return UserRepository._with_unsubmitted_response_for(event_id).with_entities(AppUser.id)
+
+    @staticmethod
+    def get_ids_without_responses(event_id):
+        """Query for the ids of users in the event's organisation who haven't started a response."""
+        return UserRepository._without_responses_for(event_id).with_entities(AppUser.id)
+
+    @staticmethod
+    def get_ids_in_organisation(user_ids, organisation_id):
+        """Query for the ids of the given users that are active members of the organisation."""
+        return db.session.query(AppUser.id)\
+                         .filter_by(active=True, is_deleted=False, organisation_id=organisation_id)\
+                         .filter(AppUser.id.in_(user_ids))
+
     @staticmethod
     def get_all_with_responses_for(event_id):
         return db.session.query(AppUser, Response)\
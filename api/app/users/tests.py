@@ -11,7 +11,9 @@ from app.responses.models import Response
 from app.users.models import (AppUser, Country, PasswordReset, UserCategory,
                               UserComment)
 from app.utils.errors import POLICY_ALREADY_AGREED, POLICY_NOT_AGREED
+from app.utils.passwords import cost_of, password_hasher
 from app.utils.testing import ApiTestCase
+from mock import patch
 
 USER_DATA = {
         'email': 'something@email.com',
@@ -184,6 +186,63 @@ class UserApiTest(ApiTestCase):
         response = self.app.post('/api/v1/authenticate', data=AUTH_DATA)
         assert response.status_code == 200
 
+    def test_rehash_on_login(self):
+        self.seed_static_data()
+        with patch.object(password_hasher, 'rounds', 4):
+            user = self.add_user(AUTH_DATA['email'], password=AUTH_DATA['password'])
+        user_id = user.id
+        self.assertEqual(cost_of(user.password), 4)
+
+        with patch.object(password_hasher, 'rounds', 5):
+            response = self.app.post('/api/v1/authenticate', data=AUTH_DATA)
+            self.assertEqual(response.status_code, 200)
+
+            pw_hash = db.session.query(AppUser).get(user_id).password
+            self.assertEqual(cost_of(pw_hash), 5)
+            self.assertTrue(password_hasher.check(pw_hash, AUTH_DATA['password']))
+
+    def test_login_when_hasher_busy(self):
+        self.seed_static_data()
+        self.add_user(AUTH_DATA['email'], password=AUTH_DATA['password'])
+        app.config['PASSWORD_HASH_RUN_INLINE'] = False
+
+        with patch.object(password_hasher, 'pending', password_hasher.max_pending):
+            response = self.app.post('/api/v1/authenticate', data=AUTH_DATA)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertTrue(int(response.headers['Retry-After']) > 0)
+
+    def test_login_rate_limited(self):
+        self.seed_static_data()
+        app.config['RATE_LIMIT_ENABLED'] = True
+        app.config['RATE_LIMITS'] = 'AuthenticationAPI.post=2/60'
+
+        wrong = dict(AUTH_DATA, password='wrong')
+        statuses = [self.app.post('/api/v1/authenticate', data=wrong).status_code for _ in range(2)]
+        response = self.app.post('/api/v1/authenticate', data=wrong)
+
+        self.assertEqual(statuses, [401, 401])
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(0 < int(response.headers['Retry-After']) <= 30)
+        self.assertEqual(response.headers['X-RateLimit-Remaining'], '0')
+
+    def test_login_rate_limit_ignores_spoofed_forwarded_for(self):
+        """Only the address the load balancer adds to X-Forwarded-For identifies the client."""
+        self.seed_static_data()
+        app.config['RATE_LIMIT_ENABLED'] = True
+        app.config['RATE_LIMITS'] = 'AuthenticationAPI.post=2/60'
+
+        wrong = dict(AUTH_DATA, password='wrong')
+        statuses = [
+            self.app.post('/api/v1/authenticate', data=wrong,
+                          headers={'X-Forwarded-For': '10.0.0.{}, 203.0.113.7'.format(i)}).status_code
+            for i in range(3)]
+        self.assertEqual(statuses, [401, 401, 429])
+
+        # Another client behind the same load balancer has its own bucket
+        response = self.app.post('/api/v1/authenticate', data=wrong, headers={'X-Forwarded-For': '203.0.113.8'})
+        self.assertEqual(response.status_code, 401)
+
     def test_authentication_response(self):
         self.seed_static_data()
         response = self.app.post('/api/v1/user', data=USER_DATA)
@@ -9,9 +9,8 @@ from itsdangerous import TimedJSONWebSignatureSerializer as Serializer
 from itsdangerous import SignatureExpired, BadSignature
 
 from app import app
-from app.users.repository import UserRepository as user_repository
-from app.users.models import AppUser
 from app.utils.errors import UNAUTHORIZED, FORBIDDEN
+from app.utils.identity import current_identity
 
 
 TWO_WEEKS = 1209600
@@ -79,9 +78,10 @@ def auth_optional(func):
 def admin_required(func):
     @wraps(func)
     def wrapper(*args, **kwargs):
-        user = get_user_from_request()
-        if user and user['is_admin']:
-            g.current_user = user
+        # The database's is_admin rather than the token's, which outlives the flag being removed
+        identity = current_identity()
+        if identity is not None and identity.is_admin:
+            g.current_user = identity.token
             return func(*args, **kwargs)
         return FORBIDDEN
     return wrapper
@@ -94,13 +94,11 @@ def event_admin_required(func):
         req_parser.add_argument('event_id', type=int, required=True)
         req_args = req_parser.parse_args()
 
-        user = get_user_from_request()
-        if user:
-            user_info = user_repository.get_by_id(user['id'])
-            if user_info.is_event_admin(req_args['event_id']):
-                g.current_user = user
-                return func(*args, event_id=req_args['event_id'], **kwargs)
-        
+        identity = current_identity()
+        if identity is not None and identity.is_event_admin(req_args['event_id']):
+            g.current_user = identity.token
+            return func(*args, event_id=req_args['event_id'], **kwargs)
+
         return FORBIDDEN
 
     return wrapper
@@ -0,0 +1,124 @@
+"""In-process metrics for email delivery.
+
+Every stage of sending an email (template resolution, rendering, MIME construction, SMTP
+connect/auth and the SMTP send itself) is timed into a latency histogram per template key,
+alongside counters of sent emails and of failures by exception type. The metrics are kept
+per process, so with several workers each reports its own share.
+
+The template key of the email being sent is tracked per thread, so code deep in the delivery
+path (e.g. the SMTP pool) can record timings against it without it being passed down:
+
+    with email_metrics.tracking('offer') as timings:
+        with email_metrics.timed('render'):
+            ...
+"""
+
+from bisect import bisect_left
+from collections import Counter
+from contextlib import contextmanager
+import threading
+from time import perf_counter
+
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+STAGES = ('resolve', 'render', 'build', 'connect', 'send')
+
+UNKNOWN_TEMPLATE = 'unknown'
+
+
+class Histogram():
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def to_dict(self):
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets['+Inf' if bound == float('inf') else str(bound)] = cumulative
+        return {'count': self.count, 'sum': self.total, 'buckets': buckets}
+
+
+class EmailMetrics():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+            self._sent = Counter()
+            self._failures = Counter()
+
+    @property
+    def current_template_key(self):
+        return getattr(self._local, 'template_key', None) or UNKNOWN_TEMPLATE
+
+    @contextmanager
+    def tracking(self, template_key):
+        """Attribute everything measured in this thread to template_key.
+
+        Yields a dict that collects the seconds spent in each stage, for callers that want to log them.
+        """
+        previous = getattr(self._local, 'template_key', None), getattr(self._local, 'timings', None)
+        timings = {}
+        self._local.template_key, self._local.timings = template_key, timings
+        try:
+            yield timings
+        finally:
+            self._local.template_key, self._local.timings = previous
+
+    def observe(self, stage, seconds):
+        """Record the time taken by a stage for the email currently being sent by this thread."""
+        timings = getattr(self._local, 'timings', None)
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0) + seconds
+
+        key = (self.current_template_key, stage)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, stage):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - start)
+
+    def record_sent(self):
+        with self._lock:
+            self._sent[self.current_template_key] += 1
+
+    def record_failure(self, exception):
+        with self._lock:
+            self._failures[(self.current_template_key, type(exception).__name__)] += 1
+
+    def snapshot(self):
+        """The metrics of every template key, as a JSON-serialisable dict."""
+        with self._lock:
+            keys = {key for key, _ in self._histograms} | set(self._sent) | {key for key, _ in self._failures}
+            templates = {key: {'sent': self._sent[key], 'failures': {}, 'latency': {}} for key in keys}
+            for (key, stage), histogram in self._histograms.items():
+                templates[key]['latency'][stage] = histogram.to_dict()
+            for (key, exception_type), count in self._failures.items():
+                templates[key]['failures'][exception_type] = count
+        return templates
+
+
+email_metrics = EmailMetrics()
@@ -1,6 +1,9 @@
 import traceback
+from datetime import datetime, timedelta
 from app import LOGGER
-from config import SMTP_USERNAME, SMTP_PASSWORD, SMTP_SENDER_NAME, SMTP_SENDER_EMAIL, SMTP_HOST, SMTP_PORT, DEBUG
+from config import (SMTP_USERNAME, SMTP_PASSWORD, SMTP_SENDER_NAME, SMTP_SENDER_EMAIL, SMTP_HOST, SMTP_PORT, DEBUG,
+                    SMTP_POOL_SIZE, SMTP_POOL_MAX_MESSAGES_PER_SESSION, SMTP_POOL_HEALTH_CHECK_INTERVAL,
+                    EMAIL_OUTBOX_ENABLED)
 import smtplib
 import email.utils
 from email.mime.multipart import MIMEMultipart
@@ -11,6 +14,67 @@ from flask import g, request
 from app.email_template.repository import EmailRepository as email_repository
 from app.users.repository import UserRepository as user_repository
 from app.events.repository import EventRepository as event_repository
+from app.outbox.models import OutboxEmail
+from app.outbox.repository import OutboxRepository as outbox_repository
+from app.utils.email_metrics import email_metrics
+from app.utils.smtp_pool import SMTPConnectionPool, connection_lost
+
+smtp_pool = SMTPConnectionPool(
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_USERNAME,
+    SMTP_PASSWORD,
+    max_size=SMTP_POOL_SIZE,
+    max_messages_per_session=SMTP_POOL_MAX_MESSAGES_PER_SESSION,
+    health_check_interval=SMTP_POOL_HEALTH_CHECK_INTERVAL,
+    observer=email_metrics.observe)
+
+GENERIC_EMAIL_TEMPLATE = """Dear {user_title} {user_firstname} {user_lastname},
+
+{body}
+"""
+
+
+def render_generic_email(user, body):
+    """Address a free-text body (e.g. from an admin mail-merge) to a user."""
+    return GENERIC_EMAIL_TEMPLATE.format(
+        user_title=user.user_title,
+        user_firstname=user.firstname,
+        user_lastname=user.lastname,
+        body=body)
+
+
+def get_event_name(event, language):
+    """Event name in the given language, falling back to English if the event isn't translated."""
+    names = event.get_all_name_translations()
+    return names.get(language, names.get('en'))
+
+
+def render_email(email_template, user, template_parameters=None, subject_parameters=None, event_name=None):
+    """Render the subject and body of a (cached) email template for a user.
+
+    The user's title and names, and the event name if given, are filled in unless
+    overridden by the parameters. The parameter dicts are not modified.
+    """
+    subject_parameters = dict(subject_parameters or {})
+    if event_name is not None and 'event_name' not in subject_parameters:
+        subject_parameters['event_name'] = event_name
+
+    subject = email_template.format_subject(**subject_parameters)
+
+    template_parameters = dict(template_parameters or {})
+    if 'title' not in template_parameters:
+        template_parameters['title'] = user.user_title
+    if 'firstname' not in template_parameters:
+        template_parameters['firstname'] = user.firstname
+    if 'lastname' not in template_parameters:
+        template_parameters['lastname'] = user.lastname
+    if event_name is not None and 'event_name' not in template_parameters:
+        template_parameters['event_name'] = event_name
+
+    body_text = email_template.format_template(**template_parameters)
+    return subject, body_text
+
 
 def email_user(
     email_template_key, 
@@ -19,40 +83,202 @@ def email_user(
     event=None,
     subject_parameters=None, 
     file_name='',
-    file_path=''
+    file_path='',
+    return_timings=False
 ):
-    """Send an email to a specified user using an email template. Handles resolving the correct language."""
+    """Send an email to a specified user using an email template. Handles resolving the correct language.
+
+    If return_timings is set, returns a dict of the seconds spent in each stage of sending the email
+    (see app.utils.email_metrics) so the caller can log them.
+
+    With EMAIL_OUTBOX_ENABLED the email is only added to the session (see enqueue_mail), so callers
+    must commit after calling this, in the same transaction as the change the email is about.
+    """
     if user is None:
         raise ValueError('You must specify a user!')
 
-    language = user.user_primaryLanguage
-    email_template = email_repository.get(None if event is None else event.id, email_template_key, language)
+    with email_metrics.tracking(email_template_key) as timings:
+        language = user.user_primaryLanguage
+        with email_metrics.timed('resolve'):
+            email_template = email_repository.get(None if event is None else event.id, email_template_key, language)
+            event_name = None if event is None else get_event_name(event, language)
 
-    if email_template is None:
-        raise ValueError('Could not find email template with key {}'.format(email_template_key))
-    
-    subject_parameters = subject_parameters or {}
-    if event is not None and 'event_name' not in subject_parameters:
-        subject_parameters['event_name'] = event.get_name(language) if event.has_specific_translation(language) else event.get_name('en')
+        if email_template is None:
+            raise ValueError('Could not find email template with key {}'.format(email_template_key))
 
-    subject = email_template.subject.format(**subject_parameters)
+        with email_metrics.timed('render'):
+            subject, body_text = render_email(email_template, user, template_parameters, subject_parameters, event_name)
+
+        if EMAIL_OUTBOX_ENABLED:
+            enqueue_mail(recipient=user.email, subject=subject, body_text=body_text, file_name=file_name,
+                         file_path=file_path, template_key=email_template_key)
+        else:
+            send_mail(recipient=user.email, subject=subject, body_text=body_text, file_name=file_name, file_path=file_path)
+
+    if return_timings:
+        return timings
+
+
+def render_emails(email_template_key, users, event=None, template_parameters=None, subject_parameters=None):
+    """Render an email template for many users using a constant number of queries.
+
+    Users can be given as AppUser instances or as user ids, which are loaded in one query. All the
+    event's translations are loaded in one query and the template is resolved once per language,
+    so every message is rendered from memory.
+
+    Returns:
+        A list of mail dicts (recipient, subject, body_text and template_key) in the order of users.
+    """
+    user_ids = [user for user in users if isinstance(user, int)]
+    if user_ids:
+        users_by_id = {user.id: user for user in user_repository.get_all_by_ids(user_ids)}
+        missing = [user_id for user_id in user_ids if user_id not in users_by_id]
+        if missing:
+            raise ValueError('Could not find users with ids {}'.format(missing))
+        users = [users_by_id[user] if isinstance(user, int) else user for user in users]
+
+    with email_metrics.tracking(email_template_key):
+        with email_metrics.timed('resolve'):
+            event_names = {} if event is None else event.get_all_name_translations()
+
+        templates = {}
+        mails = []
+        for user in users:
+            language = user.user_primaryLanguage
+            if language not in templates:
+                with email_metrics.timed('resolve'):
+                    email_template = email_repository.get(
+                        None if event is None else event.id, email_template_key, language)
+                if email_template is None:
+                    raise ValueError('Could not find email template with key {}'.format(email_template_key))
+                event_name = event_names.get(language, event_names.get('en')) if event is not None else None
+                templates[language] = (email_template, event_name)
+
+            email_template, event_name = templates[language]
+            with email_metrics.timed('render'):
+                subject, body_text = render_email(
+                    email_template, user, template_parameters, subject_parameters, event_name)
+            mails.append({
+                'recipient': user.email,
+                'subject': subject,
+                'body_text': body_text,
+                'template_key': email_template_key
+            })
+    return mails
 
-    template_parameters = template_parameters or {}
-    if 'title' not in template_parameters:
-        template_parameters['title'] = user.user_title
-    if 'firstname' not in template_parameters:
-        template_parameters['firstname'] = user.firstname
-    if 'lastname' not in template_parameters:
-        template_parameters['lastname'] = user.lastname
-    if event is not None and 'event_name' not in template_parameters:
-        template_parameters['event_name'] = event.get_name(language) if event.has_specific_translation(language) else event.get_name('en')
 
-    body_text = email_template.template.format(**template_parameters)
-    send_mail(recipient=user.email, subject=subject, body_text=body_text, file_name=file_name, file_path=file_path)
+def email_users(email_template_key, users, event=None, template_parameters=None, subject_parameters=None,
+                sender_name=None, sender_email=None, pace=None, on_sent=None):
+    """Batch variant of email_user: render the template for every user with render_emails and deliver
+    the messages together.
+
+    Returns:
+        A list of (recipient, exception) tuples for the mails that could not be sent.
+    """
+    mails = render_emails(email_template_key, users, event, template_parameters, subject_parameters)
+    return deliver_many(mails, sender_name=sender_name, sender_email=sender_email, pace=pace, on_sent=on_sent)
+
+
+def _outbox_email(recipient, subject, body_text='', body_html='', file_name='', file_path='', sender_name=None,
+                  sender_email=None, template_key=None, next_attempt_at=None):
+    attachment = None
+    if file_name != "" and file_path != "":
+        with open(file_path, "rb") as attachment_file:
+            attachment = attachment_file.read()
+
+    return OutboxEmail(
+        recipient=recipient,
+        subject=subject,
+        body_text=body_text,
+        body_html=body_html,
+        sender_name=sender_name or g.organisation.name,
+        sender_email=sender_email or g.organisation.email_from,
+        attachment_name=file_name or None,
+        attachment=attachment,
+        template_key=template_key,
+        next_attempt_at=next_attempt_at)
+
+
+def enqueue_mail(recipient, subject, body_text='', body_html='', file_name='', file_path='', sender_name=None,
+                 sender_email=None, template_key=None):
+    """Queue an email in the outbox for delivery by the outbox worker instead of sending it inline.
+
+    The email is not committed: it is written by the caller's next commit, together with the change
+    that triggered it. The attachment, if any, is read into the outbox immediately since the file
+    may be overwritten or deleted before the worker gets to it.
+    """
+    return outbox_repository.add(_outbox_email(
+        recipient, subject, body_text, body_html, file_name, file_path, sender_name, sender_email, template_key))
+
+
+def enqueue_many(mails, sender_name=None, sender_email=None, pace=None, on_sent=None):
+    """Queue many mails in the outbox in a single transaction.
+
+    If given, pace is a Throttle and each mail is scheduled for its next free slot instead of
+    being delivered straight away, so the outbox worker sends them at the throttle's rate.
+    on_sent is called with each recipient once their mail is queued.
+
+    Returns:
+        A list of (recipient, exception) tuples for the mails that could not be queued.
+    """
+    failures, queued = [], []
+    now = datetime.now()
+    for mail in mails:
+        next_attempt_at = now if pace is None else now + timedelta(seconds=pace.reserve())
+        try:
+            queued.append(_outbox_email(sender_name=sender_name, sender_email=sender_email,
+                                        next_attempt_at=next_attempt_at, **mail))
+        except Exception as e:
+            LOGGER.error("Exception {} while trying to queue email to {}: {}".format(
+                e, mail['recipient'], traceback.format_exc()))
+            failures.append((mail['recipient'], e))
+
+    outbox_repository.add_all(queued)
+    if on_sent is not None:
+        for outbox_email in queued:
+            on_sent(outbox_email.recipient)
+    return failures
+
+
+def _build_message(recipient, subject, body_text, body_html, charset, file_name, file_path, sender_name, sender_email,
+                   file_content=None):
+    msg = MIMEMultipart()
+    msg['Subject'] = subject
+    msg['From'] = email.utils.formataddr(
+        (sender_name, sender_email))
+    msg['To'] = recipient
+
+    body_part1 = MIMEText(body_text, 'plain', _charset=charset)
+    body_part2 = MIMEText(body_html, 'html', _charset=charset)
+
+    if file_name != "" and (file_path != "" or file_content is not None):
+        part = MIMEBase('application', 'octet-stream')
+        if file_content is not None:
+            part.set_payload(file_content)
+        else:
+            with open(file_path, "rb") as attachment:
+                part.set_payload(attachment.read())
+        encoders.encode_base64(part)
+
+        part.add_header('Content-Disposition', "attachment; filename= %s" % file_name)
+        msg.attach(part)
+
+    msg.attach(body_part1)
+    msg.attach(body_part2)
+    return msg
+
+
+def _log_mail(recipient, subject, body_text, body_html, sender_name, sender_email):
+    LOGGER.debug('Sender Name: {sender_name}'.format(sender_name=sender_name))
+    LOGGER.debug('Sender Email: {sender_email}'.format(sender_email=sender_email))
+    LOGGER.debug('Recipient : {recipient}'.format(recipient=recipient))
+    LOGGER.debug('Subject : {subject}'.format(subject=subject))
+    LOGGER.debug('Body Text : {body}'.format(body=body_text))
+    LOGGER.debug('Body HTML : {body}'.format(body=body_html))
 
 
 def send_mail(recipient, subject, body_text='', body_html='', charset='UTF-8', mail_type='AMZ', file_name='',
-              file_path='', sender_name=None, sender_email=None):
+              file_path='', sender_name=None, sender_email=None, file_content=None):
     '''[summary]
 
     Arguments:
@@ -73,43 +299,105 @@ def send_mail(recipient, subject, body_text='', body_html='', charset='UTF-8', m
     if (not DEBUG):
         if mail_type == 'AMZ':
             try:
-                msg = MIMEMultipart()
-                msg['Subject'] = subject
-                msg['From'] = email.utils.formataddr(
-                    (sender_name, sender_email))
-                msg['To'] = recipient
-
-                body_part1 = MIMEText(body_text, 'plain', _charset=charset)
-                body_part2 = MIMEText(body_html, 'html', _charset=charset)
-
-                if file_name != "" and file_path != "":
-                    attachment = open(file_path, "rb")
-
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment.read())
-                    encoders.encode_base64(part)
-
-                    part.add_header('Content-Disposition', "attachment; filename= %s" % file_name)
-                    msg.attach(part)
-
-                msg.attach(body_part1)
-                msg.attach(body_part2)
-
-                server = smtplib.SMTP(SMTP_HOST, SMTP_PORT)
-                server.ehlo()
-                server.starttls()
-                server.ehlo()
-                server.login(SMTP_USERNAME, SMTP_PASSWORD)
-                server.sendmail(sender_email, recipient, msg.as_string())
-                server.close()
+                with email_metrics.timed('build'):
+                    msg = _build_message(recipient, subject, body_text, body_html, charset,
+                                         file_name, file_path, sender_name, sender_email, file_content).as_string()
+                smtp_pool.send(sender_email, recipient, msg)
+                email_metrics.record_sent()
             except Exception as e:
+                email_metrics.record_failure(e)
                 LOGGER.error("Exception {} while trying to send email: {}".format(e, traceback.format_exc()))
                 raise e
 
     else:
-        LOGGER.debug('Sender Name: {sender_name}'.format(sender_name=sender_name))
-        LOGGER.debug('Sender Email: {sender_email}'.format(sender_email=sender_email))
-        LOGGER.debug('Recipient : {recipient}'.format(recipient=recipient))
-        LOGGER.debug('Subject : {subject}'.format(subject=subject))
-        LOGGER.debug('Body Text : {body}'.format(body=body_text))
-        LOGGER.debug('Body HTML : {body}'.format(body=body_html))
+        _log_mail(recipient, subject, body_text, body_html, sender_name, sender_email)
+
+
+def deliver_many(mails, sender_name=None, sender_email=None, pace=None, on_sent=None):
+    """Deliver rendered mails through the outbox if it is enabled, or over one SMTP session otherwise.
+
+    pace and on_sent are as for enqueue_many and send_many. Without the outbox, pace may be any
+    callable.
+
+    Returns:
+        A list of (recipient, exception) tuples for the mails that could not be sent.
+    """
+    if EMAIL_OUTBOX_ENABLED:
+        return enqueue_many(mails, sender_name=sender_name, sender_email=sender_email, pace=pace, on_sent=on_sent)
+    return send_many(mails, sender_name=sender_name, sender_email=sender_email, pace=pace, on_sent=on_sent)
+
+
+def send_many(mails, sender_name=None, sender_email=None, charset='UTF-8', pace=None, on_sent=None):
+    """Send many messages over a single pooled SMTP session.
+
+    Each mail is a dict with a recipient and subject, and optionally body_text, body_html,
+    file_name and file_path, as accepted by send_mail. A failure for one recipient doesn't
+    stop the remaining mails from being sent. If given, pace is called before each message
+    is sent, which allows the caller to throttle sending, and on_sent is called with each
+    recipient as soon as their mail has been sent, so the caller knows how far it got if the
+    SMTP session is lost part way through.
+
+    Returns:
+        A list of (recipient, exception) tuples for the mails that could not be sent.
+    """
+    sender_name = sender_name or g.organisation.name
+    sender_email = sender_email or g.organisation.email_from
+
+    failures = []
+    if DEBUG:
+        for mail in mails:
+            if pace is not None:
+                pace()
+            _log_mail(mail['recipient'], mail['subject'], mail.get('body_text', ''), mail.get('body_html', ''),
+                      sender_name, sender_email)
+            if on_sent is not None:
+                on_sent(mail['recipient'])
+        return failures
+
+    with smtp_pool.session() as session:
+        for mail in mails:
+            if pace is not None:
+                pace()
+            with email_metrics.tracking(mail.get('template_key')):
+                # A message that can't be built (e.g. a missing attachment) only fails its recipient
+                try:
+                    with email_metrics.timed('build'):
+                        msg = _build_message(
+                            mail['recipient'],
+                            mail['subject'],
+                            mail.get('body_text', ''),
+                            mail.get('body_html', ''),
+                            charset,
+                            mail.get('file_name', ''),
+                            mail.get('file_path', ''),
+                            sender_name,
+                            sender_email).as_string()
+                except Exception as e:
+                    _record_failure(failures, mail['recipient'], e)
+                    continue
+
+                try:
+                    smtp_pool.send_on(session, sender_email, mail['recipient'], msg)
+                except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                    # The server refused this message, the session is still good for the others
+                    _record_failure(failures, mail['recipient'], e)
+                    continue
+                except Exception as e:
+                    if connection_lost(e):
+                        # The session is gone, so the remaining mails would fail too
+                        email_metrics.record_failure(e)
+                        raise
+                    _record_failure(failures, mail['recipient'], e)
+                    continue
+
+                email_metrics.record_sent()
+                if on_sent is not None:
+                    on_sent(mail['recipient'])
+
+    return failures
+
+
+def _record_failure(failures, recipient, e):
+    email_metrics.record_failure(e)
+    LOGGER.error("Exception {} while trying to send email to {}: {}".format(e, recipient, traceback.format_exc()))
+    failures.append((recipient, e))
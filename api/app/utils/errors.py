@@ -1,5 +1,7 @@
 # Define custom error messages here
 
+from config import PASSWORD_HASH_RETRY_AFTER
+
 EMAIL_IN_USE = ({'message': 'User with that email already exists'}, 409)
 UNAUTHORIZED = (
     {'message': 'Authentication is required to access this resource', 'type': 'UNAUTHORIZED'}, 401)
@@ -9,6 +11,9 @@ FORBIDDEN = ({'message': 'Access to this resource is forbidden'}, 403)
 RESET_PASSWORD_CODE_NOT_VALID = (
     {'message': 'Valid code is required to reset a password'}, 418)
 TOO_MANY_REQUESTS = ({'message': 'Too many requests'}, 429)
+PASSWORD_HASHER_BUSY = (
+    {'message': 'Too many requests are being processed, please try again shortly', 'type': 'BUSY'}, 503,
+    {'Retry-After': str(PASSWORD_HASH_RETRY_AFTER)})
 EVENT_NOT_FOUND = ({'message': 'No event exists with that ID'}, 404)
 EVENT_WITH_KEY_NOT_FOUND = ({'message': 'No event exists with that KEY'}, 404)
 EVENT_WITH_TRANSLATION_NOT_FOUND = ({'message': 'Translation for event not found'}, 404)
@@ -143,6 +148,10 @@ INVOICE_MUST_HAVE_FUTURE_DATE = ({'message': 'Invoice must have a due date in th
 INVOICE_OVERDUE = ({'message': 'Invoice is overdue and cannot be paid anymore'}, 400)
 INVOICE_NEGATIVE = ({'message': 'Invoice cannot be negative'}, 400)
 STRIPE_SETUP_INCOMPLETE = ({'message': 'Stripe setup has not yet been completed.'}, 400)
+STRIPE_ACCOUNT_IN_USE = ({'message': 'The Stripe account is already used by another organisation'}, 409)
 INDEMNITY_NOT_FOUND = ({'message': "The event does not have an indemnity form"}, 404)
 INDEMNITY_NOT_SIGNED = ({'message': "Indemnity form has not been signed"}, 400)
-NOT_A_GUEST = ({'message': "You are not a confirmed guest of this event."}, 404)
\ No newline at end of file
+NOT_A_GUEST = ({'message': "You are not a confirmed guest of this event."}, 404)
+CAMPAIGN_NOT_FOUND = ({'message': 'No email campaign exists with that ID for the event'}, 404)
+CAMPAIGN_NO_RECIPIENTS = ({'message': 'Specify the users to email, or an event and segment'}, 400)
+CAMPAIGN_STATE_CONFLICT = ({'message': 'The email campaign cannot be changed in its current state'}, 409)
\ No newline at end of file
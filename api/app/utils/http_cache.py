@@ -0,0 +1,145 @@
+"""Conditional GET support for read-mostly endpoints.
+
+conditional_get() decorates the get method of a restful.Resource so that its responses carry an
+ETag and a Cache-Control header, and a request whose If-None-Match matches is answered with an
+empty 304. It goes below the auth decorators (so a 304 is only ever sent to someone who may see
+the data) and above marshal_with:
+
+    @auth_required
+    @conditional_get(PRIVATE, version=lambda self, event_id: tag_versions.shared_version(event_id))
+    @marshal_with(tag_fields)
+    def get(self, event_id):
+        ...
+
+With a version function the ETag is derived from the version (a VersionCounter bumped whenever
+the data changes), and a matching request is answered before the method runs, so it costs no
+queries at all. Without one, or while the version is unknown (the function returns None, e.g.
+when Redis is down), the ETag is a hash of the response, which still saves sending and parsing
+it again.
+
+PUBLIC responses may be stored by shared caches for max_age seconds; PRIVATE ones only by the
+user's browser. Responses depend on the organisation, which is resolved from the Origin header,
+so they all vary by it. Hits (304s) and misses are counted per endpoint in http_cache_stats.
+"""
+
+from functools import wraps
+import hashlib
+import json
+import threading
+
+from flask import g, request, Response as FlaskResponse
+import flask_restful as restful
+from flask_restful.utils import unpack
+
+from app.utils.auth import admin_required
+
+
+PUBLIC = 'public'
+PRIVATE = 'private'
+
+
+class HttpCacheStats():
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._counts = {}
+
+    def record(self, endpoint, hit):
+        with self._lock:
+            counts = self._counts.setdefault(endpoint, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: dict(counts, hit_rate=counts['hits'] / (counts['hits'] + counts['misses']))
+                for endpoint, counts in self._counts.items()
+            }
+
+
+http_cache_stats = HttpCacheStats()
+
+
+def _etag(endpoint, scope, content):
+    organisation = getattr(g, 'organisation', None)
+    parts = [endpoint, str(organisation.id if organisation is not None else ''), content]
+    if scope == PRIVATE:
+        user = getattr(g, 'current_user', None) or {}
+        parts.append(str(user.get('id', '')))
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:32]
+
+
+def _cache_headers(etag, scope, max_age):
+    if scope == PRIVATE and not max_age:
+        cache_control = 'private, no-cache'
+    else:
+        cache_control = '{}, max-age={}'.format(scope, max_age)
+    return {
+        'ETag': '"{}"'.format(etag),
+        'Cache-Control': cache_control,
+        'Vary': 'Origin, Authorization' if scope == PRIVATE else 'Origin'
+    }
+
+
+def _not_modified(endpoint, etag, scope, max_age):
+    http_cache_stats.record(endpoint, hit=True)
+    return FlaskResponse(status=304, headers=_cache_headers(etag, scope, max_age))
+
+
+def conditional_get(scope, max_age=0, version=None, name=None):
+    """Answer GET requests for unchanged data with 304 Not Modified.
+
+    Args:
+        scope: PUBLIC for data that is the same for everyone, PRIVATE for data that depends on
+            (or may only be seen by) the current user.
+        max_age: Seconds the response may be used without revalidating it.
+        version: Called with the method's arguments, returns the current version of the data or
+            None if it isn't known.
+        name: The endpoint's name in http_cache_stats, by default the method's qualified name.
+    """
+    def decorator(fn):
+        endpoint = name or fn.__qualname__
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            etag = None
+            if version is not None:
+                current = version(*args, **kwargs)
+                if current is not None:
+                    # The request's parameters (e.g. its language) select what is sent for a version
+                    parameters = sorted(request.values.items(multi=True))
+                    etag = _etag(endpoint, scope, '{}\n{}'.format(current, parameters))
+                    if request.if_none_match.contains(etag):
+                        return _not_modified(endpoint, etag, scope, max_age)
+
+            result = fn(*args, **kwargs)
+            if isinstance(result, FlaskResponse):
+                return result
+            data, status, headers = unpack(result)
+            if status != 200:
+                return result
+
+            if etag is None:
+                etag = _etag(endpoint, scope, json.dumps(data, sort_keys=True, default=str))
+                if request.if_none_match.contains(etag):
+                    return _not_modified(endpoint, etag, scope, max_age)
+
+            http_cache_stats.record(endpoint, hit=False)
+            headers = dict(headers or {})
+            headers.update(_cache_headers(etag, scope, max_age))
+            return data, status, headers
+
+        return wrapper
+    return decorator
+
+
+class HttpCacheStatsAPI(restful.Resource):
+    """Conditional GET hits and misses per endpoint, in the process serving the request."""
+
+    @admin_required
+    def get(self):
+        return http_cache_stats.snapshot(), 200
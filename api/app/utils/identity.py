@@ -0,0 +1,185 @@
+"""The user making a request and the roles they have at each event.
+
+current_identity() builds an Identity from the request's token the first time it is called in a
+request and keeps it on flask.g, so the auth decorators and the handlers behind them share it
+instead of each loading the AppUser again. Its is_* checks answer exactly like AppUser's, from a
+role index {event_id: roles} that is loaded with a single query when the first check is made.
+
+Role indexes are also kept in Redis for ROLE_CACHE_TTL seconds, so most requests don't query for
+them at all. They are stored under a per-user version, which is bumped when a session that
+added, changed or removed an EventRole through the ORM, or changed a user's is_admin flag,
+commits. A request that read the roles just before the commit stores them under the old version,
+so it can't put them back after the invalidation. Bulk updates and deletes of event roles can't
+tell whose roles they changed, so they rely on the TTL. Without Redis the index is loaded once
+per request.
+"""
+
+import json
+
+from flask import g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from app import db
+from app.events.models import EventRole
+from app.users.models import AppUser
+from app.utils.shared_cache import redis_call, UNAVAILABLE, VersionCounter
+from config import ROLE_CACHE_TTL
+
+
+_INFO_KEY = 'changed_role_users'
+
+
+class Identity():
+
+    def __init__(self, token, roles_loader):
+        """`token` is the verified token. `roles_loader` returns the user's (is_admin, roles) when needed."""
+        self.token = token
+        self.id = token['id']
+        self.email = token['email']
+        self._roles_loader = roles_loader
+        self._roles = None
+
+    def _load_roles(self):
+        if self._roles is None:
+            self._roles = self._roles_loader()
+        return self._roles
+
+    @property
+    def is_admin(self):
+        # From the database rather than the token, which stays valid after the flag is removed
+        return self._load_roles()[0]
+
+    @property
+    def roles(self):
+        """{event_id: frozenset of role names}"""
+        return self._load_roles()[1]
+
+    def has_role(self, event_id, *roles):
+        return not self.roles.get(event_id, frozenset()).isdisjoint(roles)
+
+    def _has_admin_role(self, event_id, *roles):
+        return self.is_admin or self.has_role(event_id, *roles)
+
+    def is_event_admin(self, event_id):
+        return self._has_admin_role(event_id, 'admin')
+
+    def is_event_treasurer(self, event_id):
+        return self._has_admin_role(event_id, 'treasurer')
+
+    def is_registration_admin(self, event_id):
+        return self._has_admin_role(event_id, 'registration-admin', 'admin')
+
+    def is_reviewer(self, event_id):
+        return self.has_role(event_id, 'reviewer')
+
+    def is_registration_volunteer(self, event_id):
+        return self._has_admin_role(event_id, 'registration-admin', 'admin', 'registration-volunteer')
+
+
+class RoleCache():
+
+    def __init__(self, ttl=ROLE_CACHE_TTL, client=None):
+        self.ttl = ttl
+        self.client = client
+        self._versions = VersionCounter('roles', client)
+
+    def _key(self, user_id, version):
+        return 'roles:{}:{}'.format(user_id, version)
+
+    def _query(self, user_id):
+        rows = (
+            db.session.query(AppUser.is_admin, EventRole.event_id, EventRole.role)
+            .select_from(AppUser)
+            .outerjoin(EventRole, EventRole.user_id == AppUser.id)
+            .filter(AppUser.id == user_id)
+            .all()
+        )
+        roles = {}
+        for _, event_id, role in rows:
+            if event_id is not None:
+                roles.setdefault(event_id, set()).add(role)
+        is_admin = bool(rows) and bool(rows[0].is_admin)
+        return is_admin, roles
+
+    def get(self, user_id):
+        """(is_admin, {event_id: frozenset of roles}) for the user, from Redis if it's there."""
+        # Read before querying, so roles loaded before a change are stored under the old version
+        version = self._versions.shared_version(user_id)
+        stored = None if version is None else redis_call('get', self._key(user_id, version), client=self.client)
+        if stored not in (None, UNAVAILABLE):
+            data = json.loads(stored)
+            return data['is_admin'], {int(event_id): frozenset(roles) for event_id, roles in data['roles'].items()}
+
+        is_admin, roles = self._query(user_id)
+        if version is not None and stored is not UNAVAILABLE:
+            data = {'is_admin': is_admin, 'roles': {event_id: sorted(r) for event_id, r in roles.items()}}
+            redis_call('set', self._key(user_id, version), json.dumps(data), ex=self.ttl, client=self.client)
+        return is_admin, {event_id: frozenset(r) for event_id, r in roles.items()}
+
+    def invalidate(self, *user_ids):
+        """Invalidate the users' cached roles. Call after the change has been committed."""
+        for user_id in user_ids:
+            self._versions.bump(user_id)
+
+
+role_cache = RoleCache()
+
+
+def identity_from_token(token):
+    return Identity(token, lambda: role_cache.get(token['id']))
+
+
+def current_identity():
+    """The Identity of the request's user, or None if the request has no valid token."""
+    identity = g.get('identity')
+    if identity is None:
+        # Imported here, as app.utils.auth builds on this module
+        from app.utils.auth import get_user_from_request
+        token = get_user_from_request()
+        if token is None:
+            return None
+        identity = g.identity = identity_from_token(token)
+    return identity
+
+
+def _changed(session, user_id):
+    if user_id is not None:
+        session.info.setdefault(_INFO_KEY, set()).add(user_id)
+
+
+def _event_role_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is None:
+        return
+    _changed(session, target.user_id)
+    # A role moved to another user changes the previous user's roles too
+    for user_id in get_history(target, 'user_id').deleted or ():
+        _changed(session, user_id)
+
+
+def _user_changed(mapper, connection, target):
+    session = Session.object_session(target)
+    if session is not None and get_history(target, 'is_admin').has_changes():
+        _changed(session, target.id)
+
+
+def _after_commit(session):
+    user_ids = session.info.pop(_INFO_KEY, None)
+    if user_ids:
+        role_cache.invalidate(*user_ids)
+        if has_request_context() and g.get('identity') is not None and g.identity.id in user_ids:
+            g.identity._roles = None
+
+
+def _after_rollback(session):
+    session.info.pop(_INFO_KEY, None)
+
+
+event.listen(EventRole, 'after_insert', _event_role_changed)
+event.listen(EventRole, 'after_update', _event_role_changed)
+event.listen(EventRole, 'after_delete', _event_role_changed)
+event.listen(AppUser, 'after_update', _user_changed)
+event.listen(Session, 'after_commit', _after_commit)
+event.listen(Session, 'after_rollback', _after_rollback)
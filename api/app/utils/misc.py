@@ -1,3 +1,4 @@
+import math
 import uuid
 from flask import g
 
@@ -15,3 +16,12 @@ def try_parse_float(text):
         return float(text)
     except:
         return 0.0
+
+
+def try_parse_number(text):
+    """The value of text as a finite float, or None if it isn't a number."""
+    try:
+        number = float(text)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
@@ -0,0 +1,123 @@
+"""Password hashing and verification off the request threads.
+
+bcrypt is deliberately slow, about a quarter of a second per hash at the default cost, so a burst
+of logins when applications open used to keep every worker busy hashing while the rest of the
+site waited. PasswordHasher runs bcrypt in a small pool of processes per worker instead. Requests
+wait for their hash without holding the GIL, so the worker's other threads keep serving, and at
+most PASSWORD_HASH_MAX_PENDING hashes may be queued or running at once: beyond that
+PasswordHasherBusy is raised straight away, which the endpoints answer with a 503 and a
+Retry-After header rather than letting logins pile up.
+
+New hashes use BCRYPT_LOG_ROUNDS. After a successful login, needs_rehash() tells whether the stored
+hash was made with a different cost, in which case the login hashes the password again, so raising
+the cost takes effect as users log in.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+import os
+import threading
+
+import bcrypt
+from werkzeug.exceptions import ServiceUnavailable
+
+from app import app
+from config import (BCRYPT_LOG_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_TIMEOUT,
+                    PASSWORD_HASH_RETRY_AFTER)
+
+
+class PasswordHasherBusy(ServiceUnavailable):
+    """Too many passwords are being hashed already. Answered with a 503 wherever it isn't caught."""
+
+    description = 'Too many requests are being processed, please try again shortly'
+
+    def get_headers(self, environ=None):
+        return super(PasswordHasherBusy, self).get_headers(environ) + [
+            ('Retry-After', str(PASSWORD_HASH_RETRY_AFTER))]
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(pw_hash, password):
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), pw_hash.encode('utf-8'))
+    except ValueError:
+        # Not a bcrypt hash
+        return False
+
+
+def cost_of(pw_hash):
+    """The cost factor a bcrypt hash ($2b$<cost>$...) was made with, or None if it isn't one."""
+    try:
+        return int(pw_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class PasswordHasher():
+
+    def __init__(self,
+                 workers=PASSWORD_HASH_WORKERS,
+                 max_pending=PASSWORD_HASH_MAX_PENDING,
+                 timeout=PASSWORD_HASH_TIMEOUT,
+                 rounds=BCRYPT_LOG_ROUNDS):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.rounds = rounds
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.pending = 0
+
+    def _get_executor(self):
+        # Each gunicorn worker starts its own pool after forking
+        if self._executor is None or self._pid != os.getpid():
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+            self._pid = os.getpid()
+        return self._executor
+
+    def _run(self, fn, *args):
+        if app.config.get('PASSWORD_HASH_RUN_INLINE') or self.workers < 1:
+            return fn(*args)
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                raise PasswordHasherBusy()
+            future = self._get_executor().submit(fn, *args)
+            self.pending += 1
+
+        # The slot is held until the hash finishes, not just while a request waits for it, so
+        # max_pending bounds the work that is queued or running
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Drops the hash if it hasn't started; one that is running keeps its slot until it's done
+            future.cancel()
+            raise PasswordHasherBusy()
+
+    def _release(self, future):
+        with self._lock:
+            self.pending -= 1
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, pw_hash, password):
+        if cost_of(pw_hash) is None:
+            return False
+        return self._run(_check, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        return cost_of(pw_hash) != self.rounds
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
@@ -1,35 +1,181 @@
-from functools import wraps
+"""Token bucket rate limiting of endpoints.
 
-from flask import request, g
-from time import time
+Each client gets a bucket of `limit` tokens per route, refilled at `limit` tokens per `window`
+seconds, and every request takes a token: bursts of up to `limit` requests are let through, and
+after that requests are allowed at the refill rate. A request finding the bucket empty is
+answered with a 429 and a Retry-After header.
 
-from app import app, redis
+    class AuthenticationAPI(AuthenticateMixin, restful.Resource):
+
+        @rate_limit(limit=20, window=60, per=IP)
+        def post(self):
+            ...
+
+Buckets are kept in Redis, and taking a token is a single Lua script, so it is one round trip and
+atomic however many workers are hammering the same bucket. When Redis can't be used, each process
+keeps its own buckets instead, so a client gets `limit` requests per worker until Redis is back.
+
+Clients are told apart by their user id (USER, falling back to the address for anonymous
+requests) or by their address (IP). The address is the one ProxyFix takes from the entries in
+X-Forwarded-For added by the PROXY_FIX_X_FOR proxies in front of the app, so clients can't get
+a fresh bucket by sending their own X-Forwarded-For. Limits can be changed per route without a
+deploy through the RATE_LIMITS config, e.g. RATE_LIMITS='AuthenticationAPI.post=50/60'.
+"""
+
+from functools import lru_cache, wraps
+import math
+import threading
+import time
+
+from flask import g, request
+
+from app import app, LOGGER
 from app.utils.errors import TOO_MANY_REQUESTS
+from app.utils.shared_cache import redis_call, UNAVAILABLE
+
+
+USER = 'user'
+IP = 'ip'
+
+# Takes a token from the bucket in KEYS[1] if it has one. ARGV is the bucket's capacity, its
+# refill rate in tokens per millisecond and the time in milliseconds. Returns whether a token
+# was taken and the tokens left, as a string since Redis truncates Lua numbers to integers.
+_TAKE_TOKEN = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'at')
+local tokens = tonumber(bucket[1]) or capacity
+local at = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - at) * rate)
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'at', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.max(1, math.ceil((capacity - tokens) / rate)))
+return {allowed, tostring(tokens)}
+"""
+
+
+def _refill(tokens, at, capacity, rate, now):
+    """The tokens in a bucket at `now`, given it had `tokens` at `at`, as _TAKE_TOKEN computes them.
+
+    The tests run the script and the local buckets side by side to keep the two in step.
+    """
+    return min(capacity, tokens + max(0, now - at) * rate)
+
+
+class RateLimiter():
+
+    def __init__(self, client=None):
+        self.client = client
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """Forget the buckets kept in this process (but not in Redis)."""
+        with self._lock:
+            self._buckets = {}
+
+    def _take_local(self, key, capacity, rate, now):
+        with self._lock:
+            # Drop buckets that have refilled completely, so the dict doesn't grow without bound
+            if len(self._buckets) > 10000:
+                self._buckets = {k: (tokens, at, c, r) for k, (tokens, at, c, r) in self._buckets.items()
+                                 if _refill(tokens, at, c, r, now) < c}
+            tokens, at, _, _ = self._buckets.get(key, (capacity, now, capacity, rate))
+            tokens = _refill(tokens, at, capacity, rate, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now, capacity, rate)
+        return allowed, tokens
 
+    def take(self, key, limit, window):
+        """Take a token from the bucket, returning whether there was one and the tokens left."""
+        now = int(time.time() * 1000)
+        rate = limit / (window * 1000.0)
+        result = redis_call('eval', _TAKE_TOKEN, 1, key, limit, repr(rate), now, client=self.client)
+        if result is UNAVAILABLE:
+            return self._take_local(key, limit, rate, now)
+        allowed, tokens = result
+        return bool(allowed), float(tokens)
 
-def rate_limit(limit=100, window=60):
+
+rate_limiter = RateLimiter()
+
+
+def _client_id(per):
+    user = getattr(g, 'current_user', None)
+    if per == USER and user:
+        return 'user:{}'.format(user['id'])
+    return 'ip:{}'.format(request.remote_addr)
+
+
+@lru_cache(maxsize=4)
+def _parse_limits(config):
+    """{route: (limit, window)} from a RATE_LIMITS string, e.g. 'AuthenticationAPI.post=50/60,...'.
+
+    Each value is only parsed once. Malformed entries are logged and skipped, leaving their
+    routes on the limits they are declared with.
+    """
+    limits = {}
+    for entry in config.split(','):
+        if not entry.strip():
+            continue
+        try:
+            route, limit = entry.split('=')
+            count, window = (int(n) for n in limit.split('/'))
+            if count <= 0 or window <= 0:
+                raise ValueError('the limit and window must be positive')
+        except ValueError as e:
+            LOGGER.warning('Ignoring malformed RATE_LIMITS entry {!r}: {}'.format(entry, e))
+            continue
+        limits[route.strip()] = (count, window)
+    return limits
+
+
+def _configured_limits():
+    return _parse_limits(app.config.get('RATE_LIMITS') or '')
+
+
+# Parse the deployment's limits at startup, so a malformed entry is reported straight away
+_configured_limits()
+
+
+def rate_limit(limit=100, window=60, per=USER, name=None):
+    """Allow bursts of `limit` requests to the route and `limit` per `window` seconds after that.
+
+    Args:
+        per: USER to count requests per user (and per address for anonymous requests), IP to
+            count them per address. A USER limit must go below the auth decorator.
+        name: The route's name in keys and the RATE_LIMITS config, by default the method's
+            qualified name.
+    """
     def decorator(func):
+        route = name or func.__qualname__
+
         @wraps(func)
         def wrapper(*args, **kwargs):
-            key = "{0}: {1}".format(request.remote_addr, request.path)
-
-            try:
-                remaining = limit - int(redis.get(key))
-            except (ValueError, TypeError):
-                remaining = limit
-                redis.set(key, 0)
+            if not app.config.get('RATE_LIMIT_ENABLED', True):
+                return func(*args, **kwargs)
 
-            expires_in = redis.ttl(key)
-            if not expires_in:
-                redis.expire(key, window)
-                expires_in = window
+            route_limit, route_window = _configured_limits().get(route, (limit, window))
+            key = 'rate_limit:{}:{}'.format(route, _client_id(per))
+            allowed, tokens = rate_limiter.take(key, route_limit, route_window)
 
-            g.rate_limits = (limit, remaining-1, time()+expires_in)
+            # Seconds until the bucket is full again, and until it has a token if it is empty
+            seconds_per_token = route_window / route_limit
+            full_in = (route_limit - tokens) * seconds_per_token
+            g.rate_limits = (route_limit, math.floor(tokens), time.time() + full_in)
 
-            if remaining > 0:
-                redis.incr(key, 1)
+            if allowed:
                 return func(*args, **kwargs)
-            return TOO_MANY_REQUESTS
+            retry_after = math.ceil((1 - tokens) * seconds_per_token)
+            body, status = TOO_MANY_REQUESTS
+            return body, status, {'Retry-After': str(retry_after)}
         return wrapper
     return decorator
 
@@ -0,0 +1,173 @@
+"""Caches shared by every worker process through Redis.
+
+Redis only ever makes things faster, it is never needed for a correct answer. When it can't be
+reached, redis_call() returns UNAVAILABLE and the caches carry on without it: a VersionedCache
+keeps its versions in the process instead, which is exact for a single process (the tests, the
+development server) and with several workers means a worker can serve an outdated entry until
+Redis is back or the entry's TTL runs out. After a failed call Redis is left alone for
+REDIS_RETRY_INTERVAL seconds, so an outage doesn't cost every request a connection attempt.
+
+Setting SHARED_CACHE_ENABLED to False in the app config skips Redis altogether (the tests do
+this, so that a local Redis server can't leak entries between them).
+"""
+
+from collections import OrderedDict
+import json
+import threading
+import time
+
+from redis.exceptions import RedisError
+
+from app import app, redis, LOGGER
+from config import REDIS_RETRY_INTERVAL
+
+
+UNAVAILABLE = object()
+
+_lock = threading.Lock()
+_retry_at = 0.0
+
+
+def redis_call(command, *args, client=None, **kwargs):
+    """Run a Redis command, returning its result or UNAVAILABLE if Redis can't be used right now."""
+    global _retry_at
+
+    if not app.config.get('SHARED_CACHE_ENABLED', True) or time.monotonic() < _retry_at:
+        return UNAVAILABLE
+
+    try:
+        return getattr(client or redis, command)(*args, **kwargs)
+    except RedisError as e:
+        with _lock:
+            _retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+        LOGGER.warning('Redis is unavailable, retrying in {} seconds: {}'.format(REDIS_RETRY_INTERVAL, e))
+        return UNAVAILABLE
+
+
+def reset_redis_backoff():
+    global _retry_at
+    with _lock:
+        _retry_at = 0.0
+
+
+class VersionCounter():
+    """A version per item, shared by every worker through Redis and bumped when the item changes.
+
+    Without Redis each process counts its own versions, which version() reports as 'local-N' and
+    shared_version() as None, so callers that need every worker to agree can tell the difference.
+    """
+
+    def __init__(self, namespace, client=None):
+        self.namespace = namespace
+        self.client = client
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._local_versions = {}
+
+    def _key(self, item_id):
+        return '{}:version:{}'.format(self.namespace, item_id)
+
+    def shared_version(self, item_id):
+        """The item's version in Redis, or None if Redis can't be used right now."""
+        key = self._key(item_id)
+        version = redis_call('get', key, client=self.client)
+        if version is None:
+            # Start from the time rather than 0, so that values stored under an earlier counter
+            # for this item (e.g. before Redis evicted it) can't be mistaken for current ones
+            redis_call('set', key, int(time.time() * 1000), nx=True, client=self.client)
+            version = redis_call('get', key, client=self.client)
+
+        if version is UNAVAILABLE or version is None:
+            return None
+        return int(version)
+
+    def version(self, item_id):
+        version = self.shared_version(item_id)
+        if version is None:
+            with self._lock:
+                return 'local-{}'.format(self._local_versions.get(item_id, 0))
+        return version
+
+    def bump(self, item_id):
+        """Invalidate every cached value of the item. Call after the change has been committed."""
+        with self._lock:
+            self._local_versions[item_id] = self._local_versions.get(item_id, 0) + 1
+        redis_call('incr', self._key(item_id), client=self.client)
+
+
+class VersionedCache():
+    """JSON-serialisable values built per (item id, language) and invalidated by bumping a version.
+
+    The version of each item is a Redis counter, and values are stored in Redis under a key that
+    includes it, so bumping the version invalidates the item for every worker at once and the old
+    values simply expire. Each process also keeps the values it has used most recently, keyed by
+    version too, so a hit only costs the lookup of the version.
+
+    Cached values are shared between requests and must not be modified.
+    """
+
+    def __init__(self, namespace, ttl, max_local_entries=256, client=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_local_entries = max_local_entries
+        self.client = client
+        self._lock = threading.Lock()
+        self._versions = VersionCounter(namespace, client)
+        self.clear()
+
+    def clear(self):
+        """Forget everything cached in this process (but not in Redis)."""
+        with self._lock:
+            self._values = OrderedDict()
+            self._versions.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _value_key(self, item_id, language, version):
+        return '{}:{}:{}:{}'.format(self.namespace, item_id, language, version)
+
+    def version(self, item_id):
+        return self._versions.version(item_id)
+
+    def bump(self, item_id):
+        """Invalidate every cached value of the item. Call after the change has been committed."""
+        self._versions.bump(item_id)
+
+    def get(self, item_id, language, build):
+        """The cached value of the item in the language, calling build() to create it on a miss."""
+        version = self.version(item_id)
+        local_key = (item_id, language, version)
+
+        with self._lock:
+            if local_key in self._values:
+                self._values.move_to_end(local_key)
+                self.hits += 1
+                return self._values[local_key]
+
+        value = None
+        shared = not isinstance(version, str)
+        if shared:
+            stored = redis_call('get', self._value_key(item_id, language, version), client=self.client)
+            if stored is not UNAVAILABLE and stored is not None:
+                value = json.loads(stored)
+
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+        if value is None:
+            value = build()
+            if shared:
+                redis_call('set', self._value_key(item_id, language, version), json.dumps(value), ex=self.ttl,
+                           client=self.client)
+
+        with self._lock:
+            self._values[local_key] = value
+            while len(self._values) > self.max_local_entries:
+                self._values.popitem(last=False)
+        return value
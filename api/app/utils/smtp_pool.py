@@ -0,0 +1,185 @@
+"""A per-process pool of authenticated SMTP sessions.
+
+Opening a session costs a TCP connect, EHLO, STARTTLS, a second EHLO and a LOGIN, which
+dominates the time taken to send a single message. The pool keeps authenticated sessions
+open between sends, checks idle sessions with NOOP before reusing them, transparently
+reconnects sessions the server has dropped and recycles a session after a fixed number of
+messages so that long-lived connections don't hit relay limits.
+"""
+
+from contextlib import contextmanager
+import os
+import smtplib
+import threading
+from time import perf_counter, time
+
+from app import LOGGER
+
+
+def connection_lost(e):
+    """Whether a sending error means the session is gone, rather than that one message was refused.
+
+    Every SMTPException is an OSError, so refusals (SMTPRecipientsRefused, SMTPDataError, ...)
+    have to be told apart from dropped connections and socket errors.
+    """
+    if isinstance(e, smtplib.SMTPServerDisconnected):
+        return True
+    return isinstance(e, OSError) and not isinstance(e, smtplib.SMTPException)
+
+
+class PooledSMTPSession():
+    """An authenticated SMTP connection along with its usage statistics."""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.messages_sent = 0
+        self.last_used = time()
+
+
+class SMTPConnectionPool():
+
+    def __init__(self,
+                 host,
+                 port,
+                 username,
+                 password,
+                 max_size=2,
+                 max_messages_per_session=100,
+                 health_check_interval=30,
+                 timeout=30,
+                 use_tls=True,
+                 connection_factory=smtplib.SMTP,
+                 observer=None):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.max_size = max_size
+        self.max_messages_per_session = max_messages_per_session
+        self.health_check_interval = health_check_interval
+        self.timeout = timeout
+        self.use_tls = use_tls
+        self.connection_factory = connection_factory
+        # Called with a stage ('connect' or 'send') and the seconds it took
+        self.observer = observer
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(self.max_size)
+
+    def _check_pid(self):
+        # Sockets must not be shared between forked workers, so a child process
+        # starts with an empty pool rather than inheriting its parent's sessions.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._reset()
+
+    def _observe(self, stage, start):
+        if self.observer is not None:
+            self.observer(stage, perf_counter() - start)
+
+    def _connect(self):
+        LOGGER.debug('Opening SMTP session to {}:{}'.format(self.host, self.port))
+        start = perf_counter()
+        connection = self.connection_factory(self.host, self.port, timeout=self.timeout)
+        try:
+            connection.ehlo()
+            if self.use_tls:
+                connection.starttls()
+                connection.ehlo()
+            if self.username:
+                connection.login(self.username, self.password)
+        except Exception:
+            self._close_connection(connection)
+            raise
+        self._observe('connect', start)
+        return connection
+
+    @staticmethod
+    def _close_connection(connection):
+        try:
+            connection.quit()
+        except (smtplib.SMTPException, OSError):
+            connection.close()
+
+    def _is_healthy(self, session):
+        if time() - session.last_used < self.health_check_interval:
+            return True
+        try:
+            status, _ = session.connection.noop()
+            return status == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def _reconnect(self, session):
+        self._close_connection(session.connection)
+        session.connection = self._connect()
+        session.messages_sent = 0
+
+    def acquire(self):
+        """Check a healthy session out of the pool, opening a new one if none are idle."""
+        self._check_pid()
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    session = self._idle.pop() if self._idle else None
+                if session is None:
+                    return PooledSMTPSession(self._connect())
+                if self._is_healthy(session):
+                    return session
+                LOGGER.debug('Discarding unhealthy SMTP session')
+                self._close_connection(session.connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, session, discard=False):
+        """Return a session to the pool, closing it if it is broken or has reached its message cap."""
+        session.last_used = time()
+        if discard or session.messages_sent >= self.max_messages_per_session:
+            self._close_connection(session.connection)
+        else:
+            with self._lock:
+                self._idle.append(session)
+        self._slots.release()
+
+    @contextmanager
+    def session(self):
+        session = self.acquire()
+        try:
+            yield session
+        except Exception as e:
+            self.release(session, discard=connection_lost(e))
+            raise
+        else:
+            self.release(session)
+
+    def send_on(self, session, sender, recipient, message):
+        """Send a message on a checked-out session, reconnecting once if the server dropped it."""
+        if session.messages_sent >= self.max_messages_per_session:
+            self._reconnect(session)
+        try:
+            start = perf_counter()
+            session.connection.sendmail(sender, recipient, message)
+        except (smtplib.SMTPServerDisconnected, ConnectionError):
+            LOGGER.warning('SMTP session dropped, reconnecting')
+            self._reconnect(session)
+            start = perf_counter()
+            session.connection.sendmail(sender, recipient, message)
+        self._observe('send', start)
+        session.messages_sent += 1
+
+    def send(self, sender, recipient, message):
+        with self.session() as session:
+            self.send_on(session, sender, recipient, message)
+
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for session in idle:
+            self._close_connection(session.connection)
@@ -0,0 +1,180 @@
+"""Streaming CSV and XLSX writers.
+
+Both take a header and an iterable of rows and return a generator of bytes, so an export can be
+sent with a streamed flask Response: the first bytes go out as soon as the header is written and
+only about CHUNK_ROWS rows are held in memory at a time, however many rows there are.
+
+The XLSX writer produces the smallest workbook Excel, LibreOffice and Google Sheets will open (one
+sheet of inline strings and numbers, no styles). zipfile can write to a stream it can't seek
+in, so the sheet is compressed and sent as it is written.
+"""
+
+import csv
+import datetime
+import io
+import math
+import numbers
+import re
+import zipfile
+from xml.sax.saxutils import escape, quoteattr
+
+
+CHUNK_ROWS = 200
+
+CSV_MIMETYPE = 'text/csv'
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Spreadsheet programs run cells starting with these as formulas
+_FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+# Characters that aren't allowed in XML 1.0 documents
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]')
+
+_XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>')
+
+_XLSX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    '</Relationships>')
+
+_XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name={} sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>')
+
+_XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')
+
+_XLSX_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+
+_XLSX_SHEET_END = '</sheetData></worksheet>'
+
+
+class _ChunkBuffer():
+    """Write-only file object whose contents are taken out in chunks as they are sent."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(data.encode('utf-8') if isinstance(data, str) else bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _text(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def _csv_cell(value):
+    if isinstance(value, numbers.Number) and not isinstance(value, bool):
+        return value
+    text = _text(value)
+    if text.startswith(_FORMULA_PREFIXES):
+        return "'" + text
+    return text
+
+
+def stream_csv(header, rows):
+    """Generate a UTF-8 CSV file, with a byte order mark so Excel detects the encoding."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    buffer.write('\ufeff')
+    writer.writerow([_csv_cell(value) for value in header])
+    yield drain()
+
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_cell(value) for value in row])
+        if count % CHUNK_ROWS == 0:
+            yield drain()
+
+    data = drain()
+    if data:
+        yield data
+
+
+def _xlsx_cell(value):
+    if value is None:
+        return '<c/>'
+    if isinstance(value, bool):
+        return '<c t="b"><v>{}</v></c>'.format(int(value))
+    if isinstance(value, numbers.Number) and math.isfinite(value):
+        return '<c><v>{}</v></c>'.format(value)
+    text = _INVALID_XML_CHARS.sub('', _text(value))
+    return '<c t="inlineStr"><is><t xml:space="preserve">{}</t></is></c>'.format(escape(text))
+
+
+def _xlsx_row(row):
+    return '<row>{}</row>'.format(''.join(_xlsx_cell(value) for value in row))
+
+
+def _sheet_name(name):
+    name = re.sub(r'[\[\]:*?/\\]', ' ', name).strip()
+    return name[:31] or 'Sheet1'
+
+
+def stream_xlsx(header, rows, sheet_name='Sheet1'):
+    """Generate an XLSX workbook with a single sheet."""
+    buffer = _ChunkBuffer()
+
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as workbook:
+        workbook.writestr('[Content_Types].xml', _XLSX_CONTENT_TYPES)
+        workbook.writestr('_rels/.rels', _XLSX_RELS)
+        workbook.writestr('xl/workbook.xml', _XLSX_WORKBOOK.format(quoteattr(_sheet_name(sheet_name))))
+        workbook.writestr('xl/_rels/workbook.xml.rels', _XLSX_WORKBOOK_RELS)
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write((_XLSX_SHEET_START + _xlsx_row(header)).encode('utf-8'))
+            yield buffer.drain()
+
+            for count, row in enumerate(rows, 1):
+                sheet.write(_xlsx_row(row).encode('utf-8'))
+                if count % CHUNK_ROWS == 0:
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            sheet.write(_XLSX_SHEET_END.encode('utf-8'))
+
+    yield buffer.drain()
@@ -23,6 +23,15 @@ from app.organisation.resolver import OrganisationResolver
 from app.registration.models import Offer, RegistrationForm, OfferTag
 from app.responses.models import Answer, Response, ResponseReviewer, ResponseTag
 from app.users.models import AppUser, Country, UserCategory
+from app.email_template.cache import email_template_cache
+from app.reviews.scores import score_matrix_cache
+from app.reviews.api import review_form_cache
+from app.applicationModel.cache import application_form_cache
+from app.tags.api import tag_versions
+from app.utils.http_cache import http_cache_stats
+from app.content.payloads import content_payloads
+from app.events.stats import event_stats_cache
+from app.utils.rate_limit import rate_limiter
 from app.email_template.models import EmailTemplate
 from app.reviews.models import ReviewConfiguration, ReviewForm, ReviewSection, ReviewSectionTranslation, ReviewResponse, ReviewQuestion, ReviewQuestionTranslation, ReviewScore
 from app.tags.models import Tag, TagTranslation
@@ -65,10 +74,24 @@ class ApiTestCase(unittest.TestCase):
         app.config['TESTING'] = True
         app.config['DEBUG'] = True
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        app.config['EMAIL_CAMPAIGN_RUN_INLINE'] = True
+        app.config['PASSWORD_HASH_RUN_INLINE'] = True
+        app.config['RATE_LIMIT_ENABLED'] = False
+        app.config['RATE_LIMITS'] = ''
+        app.config['SHARED_CACHE_ENABLED'] = False
         self.app = app.test_client()
         db.reflect()
         db.drop_all()
         db.create_all()
+        email_template_cache.clear()
+        score_matrix_cache.clear()
+        review_form_cache.clear()
+        application_form_cache.clear()
+        tag_versions.clear()
+        http_cache_stats.clear()
+        content_payloads.clear()
+        event_stats_cache.clear()
+        rate_limiter.clear()
         LOGGER.setLevel('ERROR')
 
         # Add dummy metadata
@@ -309,6 +332,20 @@ class ApiTestCase(unittest.TestCase):
         db.session.add(obj)
         db.session.commit()
 
+    def count_queries(self, fn):
+        """The number of SQL statements run by calling fn."""
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            fn()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return len(statements)
+
     def tearDown(self):
         db.session.remove()
         db.reflect()
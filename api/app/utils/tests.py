@@ -8,10 +8,40 @@ from app.responses.repository import ResponseRepository as response_repository
 from functools import partial
 
 from app import LOGGER, app, db
-
-
-
-from app.utils.emailer import email_user
+from app.events.models import EventRole
+from app.organisation.models import Organisation
+from app.users.models import AppUser
+from flask import g
+
+
+
+import io
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+import zipfile
+from xml.etree import ElementTree
+
+import fakeredis
+
+
+from app.email_template.cache import email_template_cache
+from app.utils.email_metrics import email_metrics
+from app.utils.shared_cache import VersionedCache, reset_redis_backoff
+from app.utils import translations
+from app.utils.translations import get_translations
+from app.utils.http_cache import http_cache_stats
+from app.utils.auth import generate_token
+from app.utils.identity import current_identity, role_cache
+from app.utils.passwords import PasswordHasher, PasswordHasherBusy
+from app.utils.rate_limit import RateLimiter, _parse_limits
+from app.tags.api import tag_versions
+from app.tags.models import Tag
+from app.utils import spreadsheets
+from app.utils.emailer import email_user, email_users, send_many
+from app.utils.smtp_pool import SMTPConnectionPool
 from app.utils.strings import build_response_html_answers, build_response_html_app_info
 from app.utils.testing import ApiTestCase
 from mock import patch
@@ -124,6 +154,633 @@ class EmailerTest(ApiTestCase):
             file_name='', 
             file_path='')
 
+    @patch('app.utils.emailer.send_many')
+    def test_email_users_batch(self, send_many_fn):
+        """Check that the batch variant renders each user's language from ids."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        user_ids = [self.zulu_user.id, self.english_user.id, self.french_user.id]
+
+        with app.test_request_context():
+            failures = email_users('template1', user_ids, event=self.event, template_parameters={'param': 'Blah'})
+
+        self.assertEqual(failures, [])
+        mails = send_many_fn.call_args[0][0]
+        self.assertEqual([m['recipient'] for m in mails], ['zulu@person.com', 'english@person.com', 'french@person.com'])
+        self.assertEqual(mails[0]['subject'], 'English subject no event')
+        self.assertEqual(mails[1]['body_text'], 'English template English Event Name Blah')
+        self.assertTrue(mails[2]['subject'].startswith('Sujet fran'))
+        self.assertTrue(mails[2]['body_text'].endswith('Blah'))
+
+    @patch('app.utils.emailer.send_many')
+    def test_email_users_constant_queries(self, send_many_fn):
+        """Check that the number of queries doesn't grow with the number of recipients."""
+        send_many_fn.return_value = []
+        self.seed_static_data()
+        more_ids = [self.add_user(email='extra{}@person.com'.format(i),
+                                  post_create_fn=lambda u: setattr(u, 'user_primaryLanguage', 'fr')).id
+                    for i in range(5)]
+        event_id = self.event.id
+        few = [self.english_user.id, self.french_user.id, self.zulu_user.id]
+        many = few + more_ids
+
+        def send(user_ids):
+            email_template_cache.clear()
+            translations.clear()
+            email_users('template1', user_ids, event=self.event, template_parameters={'param': 'x'})
+
+        with app.test_request_context():
+            self.event = db.session.query(type(self.event)).get(event_id)
+            few_queries = self.count_queries(lambda: send(few))
+            many_queries = self.count_queries(lambda: send(many))
+
+        self.assertEqual(len(send_many_fn.call_args[0][0]), 8)
+        self.assertEqual(many_queries, few_queries)
+
+    def test_email_users_unknown_id(self):
+        """Check that unknown user ids are reported."""
+        self.seed_static_data()
+
+        with self.assertRaises(ValueError):
+            email_users('template1', [self.english_user.id, 1000])
+
+
+class FakeSMTP():
+    """Stand-in for smtplib.SMTP that records the commands it receives."""
+    instances = []
+
+    def __init__(self, host, port, timeout=None):
+        self.sent = []
+        self.logins = 0
+        self.noops = 0
+        self.closed = False
+        self.drop_next_send = False
+        self.healthy = True
+        FakeSMTP.instances.append(self)
+
+    def ehlo(self):
+        pass
+
+    def starttls(self):
+        pass
+
+    def login(self, username, password):
+        self.logins += 1
+
+    def noop(self):
+        self.noops += 1
+        if not self.healthy:
+            raise smtplib.SMTPServerDisconnected()
+        return 250, b'OK'
+
+    def sendmail(self, sender, recipient, message):
+        if self.drop_next_send:
+            self.drop_next_send = False
+            raise smtplib.SMTPServerDisconnected()
+        self.sent.append(recipient)
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+class SMTPConnectionPoolTest(unittest.TestCase):
+    """Test reuse, health checking and recycling of pooled SMTP sessions."""
+
+    def setUp(self):
+        FakeSMTP.instances = []
+
+    def make_pool(self, **kwargs):
+        return SMTPConnectionPool('host', 587, 'user', 'pass', connection_factory=FakeSMTP, **kwargs)
+
+    def test_session_reused(self):
+        """Consecutive sends share one authenticated connection."""
+        pool = self.make_pool()
+        pool.send('from@org.com', 'one@user.com', 'msg')
+        pool.send('from@org.com', 'two@user.com', 'msg')
+
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].logins, 1)
+        self.assertEqual(FakeSMTP.instances[0].sent, ['one@user.com', 'two@user.com'])
+
+    def test_message_cap_recycles_session(self):
+        """A session is closed and replaced once it reaches its message cap."""
+        pool = self.make_pool(max_messages_per_session=2)
+        with pool.session() as session:
+            for i in range(5):
+                pool.send_on(session, 'from@org.com', 'user{}@user.com'.format(i), 'msg')
+
+        self.assertEqual(len(FakeSMTP.instances), 3)
+        self.assertTrue(FakeSMTP.instances[0].closed)
+        self.assertTrue(FakeSMTP.instances[1].closed)
+        self.assertEqual(FakeSMTP.instances[2].sent, ['user4@user.com'])
+
+    def test_reconnect_on_dropped_session(self):
+        """A message is retried on a fresh connection if the server drops the session."""
+        pool = self.make_pool()
+        pool.send('from@org.com', 'one@user.com', 'msg')
+        FakeSMTP.instances[0].drop_next_send = True
+        pool.send('from@org.com', 'two@user.com', 'msg')
+
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(FakeSMTP.instances[1].sent, ['two@user.com'])
+
+    def test_unhealthy_idle_session_replaced(self):
+        """Idle sessions are checked with NOOP and replaced if they fail."""
+        pool = self.make_pool(health_check_interval=0)
+        pool.send('from@org.com', 'one@user.com', 'msg')
+        FakeSMTP.instances[0].healthy = False
+        pool.send('from@org.com', 'two@user.com', 'msg')
+
+        self.assertEqual(FakeSMTP.instances[0].noops, 1)
+        self.assertEqual(len(FakeSMTP.instances), 2)
+        self.assertEqual(FakeSMTP.instances[1].sent, ['two@user.com'])
+
+
+class EmailMetricsTest(ApiTestCase):
+    """Test timing and counting of email deliveries."""
+
+    def setUp(self):
+        super(EmailMetricsTest, self).setUp()
+        FakeSMTP.instances = []
+        email_metrics.reset()
+        self.pool = SMTPConnectionPool('host', 587, 'user', 'pass', connection_factory=FakeSMTP,
+                                       observer=email_metrics.observe)
+        self.user = self.add_user(email='applicant@person.com')
+        self.add_email_template('template1', 'Hello {firstname}')
+
+    def send(self, raises=None, **kwargs):
+        with patch('app.utils.emailer.DEBUG', False), patch('app.utils.emailer.smtp_pool', self.pool), \
+                app.test_request_context():
+            g.organisation = db.session.query(Organisation).get(self.dummy_org_id)
+            if raises is None:
+                return email_user('template1', user=self.user, **kwargs)
+            # Asserted inside the request context, which would otherwise be preserved by the exception
+            with self.assertRaises(raises):
+                email_user('template1', user=self.user, **kwargs)
+
+    def test_timings_returned_and_recorded(self):
+        """Each stage is timed for the caller and recorded against the template key."""
+        timings = self.send(return_timings=True)
+
+        self.assertEqual(set(timings), {'resolve', 'render', 'build', 'connect', 'send'})
+        self.assertIsNone(self.send())
+
+        metrics = email_metrics.snapshot()['template1']
+        self.assertEqual(metrics['sent'], 2)
+        self.assertEqual(metrics['failures'], {})
+        self.assertEqual(metrics['latency']['send']['count'], 2)
+        # The SMTP session is reused, so only the first email paid for connecting
+        self.assertEqual(metrics['latency']['connect']['count'], 1)
+        self.assertEqual(metrics['latency']['render']['buckets']['+Inf'], 2)
+
+    def test_failures_counted_by_type(self):
+        """Failed sends are counted by exception type."""
+        def refuse(sender, recipient, message):
+            raise smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')})
+
+        self.send()
+        FakeSMTP.instances[0].sendmail = refuse
+
+        self.send(raises=smtplib.SMTPRecipientsRefused)
+
+        metrics = email_metrics.snapshot()['template1']
+        self.assertEqual(metrics['sent'], 1)
+        self.assertEqual(metrics['failures'], {'SMTPRecipientsRefused': 1})
+
+    def test_send_many_missing_attachment(self):
+        """A mail whose attachment can't be read fails on its own and the rest are still sent."""
+        mails = [
+            {'recipient': 'one@user.com', 'subject': 'Hi', 'file_name': 'cv.pdf', 'file_path': '/no/such/cv.pdf'},
+            {'recipient': 'two@user.com', 'subject': 'Hi'},
+        ]
+        with patch('app.utils.emailer.DEBUG', False), patch('app.utils.emailer.smtp_pool', self.pool), \
+                app.test_request_context():
+            g.organisation = db.session.query(Organisation).get(self.dummy_org_id)
+            failures = send_many(mails)
+
+        self.assertEqual([(recipient, type(e)) for recipient, e in failures], [('one@user.com', FileNotFoundError)])
+        self.assertEqual(FakeSMTP.instances[0].sent, ['two@user.com'])
+
+    def test_send_many_refused_recipient(self):
+        """A recipient refused by the server fails on its own and the session carries on."""
+        send = FakeSMTP.sendmail
+
+        def refuse_bad(smtp, sender, recipient, message):
+            if recipient == 'bad@x.com':
+                raise smtplib.SMTPRecipientsRefused({recipient: (550, b'No such user')})
+            send(smtp, sender, recipient, message)
+
+        mails = [{'recipient': address, 'subject': 'Hi'} for address in ['one@x.com', 'bad@x.com', 'good@x.com']]
+        with patch.object(FakeSMTP, 'sendmail', refuse_bad), patch('app.utils.emailer.DEBUG', False), \
+                patch('app.utils.emailer.smtp_pool', self.pool), app.test_request_context():
+            g.organisation = db.session.query(Organisation).get(self.dummy_org_id)
+            failures = send_many(mails)
+
+        self.assertEqual([(recipient, type(e)) for recipient, e in failures],
+                         [('bad@x.com', smtplib.SMTPRecipientsRefused)])
+        self.assertEqual(len(FakeSMTP.instances), 1)
+        self.assertEqual(FakeSMTP.instances[0].sent, ['one@x.com', 'good@x.com'])
+        self.assertFalse(FakeSMTP.instances[0].closed)
+
+    def test_metrics_endpoint(self):
+        """System admins can read the metrics."""
+        self.send()
+        self.add_user(email='admin@admin.com', is_admin=True)
+
+        response = self.app.get('/api/v1/admin/email-metrics', headers=self.get_auth_header_for('admin@admin.com'))
+        data = json.loads(response.data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['templates']['template1']['sent'], 1)
+        self.assertIn('hits', data['template_cache'])
+
+        response = self.app.get('/api/v1/admin/email-metrics',
+                                headers=self.get_auth_header_for('applicant@person.com'))
+        self.assertEqual(response.status_code, 403)
+
+
+class VersionedCacheTest(ApiTestCase):
+
+    def setUp(self):
+        super(VersionedCacheTest, self).setUp()
+        app.config['SHARED_CACHE_ENABLED'] = True
+        reset_redis_backoff()
+        redis = fakeredis.FakeStrictRedis()
+        # Two worker processes sharing one Redis
+        self.first = VersionedCache('test', ttl=60, client=redis)
+        self.second = VersionedCache('test', ttl=60, client=redis)
+
+    def test_shared_between_workers(self):
+        self.assertEqual(self.first.get(1, 'en', lambda: {'name': 'one'}), {'name': 'one'})
+        self.assertEqual(self.second.get(1, 'en', lambda: self.fail('Should be read from Redis')), {'name': 'one'})
+        self.assertEqual(self.second.get(1, 'fr', lambda: {'name': 'un'}), {'name': 'un'})
+        self.assertEqual(self.first.misses, 1)
+        self.assertEqual(self.second.misses, 1)
+        self.assertEqual(self.second.hits, 1)
+
+    def test_bump_invalidates_every_worker(self):
+        self.first.get(1, 'en', lambda: {'name': 'one'})
+        self.second.get(1, 'en', lambda: {'name': 'one'})
+
+        self.first.bump(1)
+
+        self.assertEqual(self.second.get(1, 'en', lambda: {'name': 'updated'}), {'name': 'updated'})
+        self.assertEqual(self.first.get(1, 'en', lambda: self.fail('Should be read from Redis')), {'name': 'updated'})
+        self.assertEqual(self.first.get(2, 'en', lambda: {'name': 'two'}), {'name': 'two'})
+
+    def test_local_versions_without_redis(self):
+        app.config['SHARED_CACHE_ENABLED'] = False
+        self.first.get(1, 'en', lambda: {'name': 'one'})
+        self.assertEqual(self.first.get(1, 'en', lambda: self.fail('Should be cached')), {'name': 'one'})
+
+        self.first.bump(1)
+        self.assertEqual(self.first.get(1, 'en', lambda: {'name': 'updated'}), {'name': 'updated'})
+
+
+class TranslationsTest(ApiTestCase):
+
+    def seed_static_data(self):
+        self.add_organisation()
+        self.event = self.add_event()
+        self.tags = [self.add_tag(names={'en': 'Tag {} en'.format(i), 'fr': 'Tag {} fr'.format(i)},
+                                  descriptions={'en': '', 'fr': ''})
+                     for i in range(3)]
+        self.english_tag = self.add_tag(names={'en': 'English only'}, descriptions={'en': ''})
+
+    def test_loaded_for_every_object_in_session(self):
+        self.seed_static_data()
+        tags = db.session.query(Tag).order_by(Tag.id).all()
+        names = []
+
+        queries = self.count_queries(lambda: names.extend(tag.get_translation('fr').name for tag in tags[:3]))
+
+        self.assertEqual(names, ['Tag 0 fr', 'Tag 1 fr', 'Tag 2 fr'])
+        self.assertEqual(queries, 1)
+        self.assertFalse(tags[3].has_specific_translation('fr'))
+        self.assertEqual(tags[3].get_translation('fr', fallback_language='en').name, 'English only')
+
+    def test_get_translations_falls_back_to_english(self):
+        self.seed_static_data()
+        tag_ids = [self.tags[0].id, self.english_tag.id]
+
+        translations = get_translations(Tag, tag_ids, 'fr')
+
+        self.assertEqual(translations[tag_ids[0]].name, 'Tag 0 fr')
+        self.assertEqual(translations[tag_ids[1]].name, 'English only')
+
+    def test_changes_are_seen(self):
+        self.seed_static_data()
+        self.assertEqual(self.event.get_name('fr'), None)
+
+        self.event.update({'en': 'Updated', 'fr': 'Mis a jour'}, {'en': 'Description', 'fr': 'Description'},
+                          self.event.start_date, self.event.end_date, self.event.key, self.event.organisation_id,
+                          self.event.email_from, self.event.url, self.event.application_open,
+                          self.event.application_close, self.event.review_open, self.event.review_close,
+                          self.event.selection_open, self.event.selection_close, self.event.offer_open,
+                          self.event.offer_close, self.event.registration_open, self.event.registration_close,
+                          self.event.event_type, self.event.travel_grant, self.event.miniconf_url)
+        db.session.commit()
+
+        self.assertEqual(self.event.get_name('fr'), 'Mis a jour')
+        self.assertEqual(self.event.get_all_name_translations(), {'en': 'Updated', 'fr': 'Mis a jour'})
+
+
+class HttpCacheTest(ApiTestCase):
+
+    def setUp(self):
+        super(HttpCacheTest, self).setUp()
+        app.config['SHARED_CACHE_ENABLED'] = True
+        reset_redis_backoff()
+        tag_versions.client = fakeredis.FakeStrictRedis()
+        role_cache.client = role_cache._versions.client = fakeredis.FakeStrictRedis()
+
+    def tearDown(self):
+        tag_versions.client = None
+        role_cache.client = role_cache._versions.client = None
+        super(HttpCacheTest, self).tearDown()
+
+    def seed_static_data(self):
+        self.add_organisation()
+        self.event = self.add_event()
+        self.add_tag(names={'en': 'English', 'fr': 'Francais'}, descriptions={'en': '', 'fr': ''})
+        admin = self.add_user('admin@mail.com')
+        self.event.add_event_role('admin', admin.id)
+        db.session.commit()
+        self.headers = self.get_auth_header_for('admin@mail.com')
+
+    def get_tags(self, language, etag=None):
+        headers = self.headers if etag is None else dict(self.headers, **{'If-None-Match': etag})
+        return self.app.get('/api/v1/tags', headers=headers, query_string={'event_id': 1, 'language': language})
+
+    def test_versioned_etag(self):
+        self.seed_static_data()
+        etag = self.get_tags('en').headers['ETag']
+
+        # Answered from the version alone, without listing the tags
+        with patch('app.tags.api.tag_repository.get_all_for_event') as get_all_for_event:
+            response = self.get_tags('en', etag)
+        self.assertEqual(response.status_code, 304)
+        get_all_for_event.assert_not_called()
+
+        self.assertEqual(self.get_tags('fr', etag).status_code, 200)
+
+        tag_versions.bump(1)
+        self.assertEqual(self.get_tags('en', etag).status_code, 200)
+
+        stats = http_cache_stats.snapshot()['TagListAPI.get']
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+        self.assertEqual(stats['hit_rate'], 0.25)
+
+
+class IdentityTest(ApiTestCase):
+
+    def setUp(self):
+        super(IdentityTest, self).setUp()
+        app.config['SHARED_CACHE_ENABLED'] = True
+        reset_redis_backoff()
+        role_cache.client = role_cache._versions.client = fakeredis.FakeStrictRedis()
+
+    def tearDown(self):
+        role_cache.client = role_cache._versions.client = None
+        super(IdentityTest, self).tearDown()
+
+    def seed_static_data(self):
+        self.add_organisation()
+        self.add_event(key='event1')
+        self.add_event(key='event2')
+        user = self.add_user('volunteer@mail.com')
+        self.user_id = user.id
+        self.token = generate_token(user)
+        self.add_event_role('registration-volunteer', self.user_id, 1)
+        self.add_event_role('reviewer', self.user_id, 2)
+
+    def count_identity_queries(self, fn):
+        """The queries run by fn, called with the identity of a request authorized with self.token."""
+        def call():
+            with app.test_request_context(headers={'Authorization': self.token}):
+                fn(current_identity())
+        return self.count_queries(call)
+
+    def test_roles_loaded_once_per_request(self):
+        self.seed_static_data()
+        app.config['SHARED_CACHE_ENABLED'] = False
+
+        def check(identity):
+            self.assertEqual(identity.id, self.user_id)
+            self.assertTrue(identity.is_registration_volunteer(1))
+            self.assertFalse(identity.is_registration_admin(1))
+            self.assertFalse(identity.is_reviewer(1))
+            self.assertTrue(identity.is_reviewer(2))
+            self.assertFalse(identity.is_event_admin(2))
+            self.assertIs(current_identity(), identity)
+
+        self.assertEqual(self.count_identity_queries(check), 1)
+
+    def test_roles_cached_until_they_change(self):
+        self.seed_static_data()
+
+        self.assertEqual(self.count_identity_queries(lambda identity: identity.is_event_admin(1)), 1)
+        self.assertEqual(self.count_identity_queries(lambda identity: self.assertFalse(identity.is_event_admin(1))), 0)
+
+        self.add_event_role('admin', self.user_id, 1)
+        self.assertEqual(self.count_identity_queries(lambda identity: self.assertTrue(identity.is_event_admin(1))), 1)
+
+        event_role = db.session.query(EventRole).filter_by(user_id=self.user_id, role='admin').one()
+        db.session.delete(event_role)
+        db.session.commit()
+        self.assertEqual(self.count_identity_queries(lambda identity: self.assertFalse(identity.is_event_admin(1))), 1)
+
+    def test_roles_loaded_before_a_change_not_cached(self):
+        """Roles read just before a change commits can't overwrite the invalidation."""
+        self.seed_static_data()
+        query = role_cache._query
+
+        def query_then_change(user_id):
+            roles = query(user_id)
+            self.add_event_role('admin', self.user_id, 1)
+            return roles
+
+        with patch.object(role_cache, '_query', query_then_change):
+            self.assertNotIn('admin', role_cache.get(self.user_id)[1][1])
+        self.assertIn('admin', role_cache.get(self.user_id)[1][1])
+
+    def test_is_admin_from_database(self):
+        """A token issued while the user was a site admin doesn't outlive the flag."""
+        self.seed_static_data()
+        user = db.session.query(AppUser).get(self.user_id)
+        user.is_admin = True
+        db.session.commit()
+        self.token = generate_token(user)
+
+        user.is_admin = False
+        db.session.commit()
+        self.count_identity_queries(lambda identity: self.assertFalse(identity.is_admin))
+
+    def test_admin_required_from_database(self):
+        """Site admin endpoints are closed to a token issued before the flag was removed."""
+        self.seed_static_data()
+        user = db.session.query(AppUser).get(self.user_id)
+        user.is_admin = True
+        db.session.commit()
+        header = {'Authorization': generate_token(user)}
+        self.assertEqual(self.app.get('/api/v1/admin/email-metrics', headers=header).status_code, 200)
+
+        db.session.query(AppUser).get(self.user_id).is_admin = False
+        db.session.commit()
+        self.assertEqual(self.app.get('/api/v1/admin/email-metrics', headers=header).status_code, 403)
+
+
+class PasswordHasherTest(unittest.TestCase):
+
+    def setUp(self):
+        app.config['PASSWORD_HASH_RUN_INLINE'] = False
+        self.hasher = PasswordHasher(workers=2, max_pending=2, rounds=4)
+
+    def tearDown(self):
+        self.hasher.shutdown()
+        app.config['PASSWORD_HASH_RUN_INLINE'] = True
+
+    def test_hash_and_check_in_pool(self):
+        pw_hash = self.hasher.hash('secret')
+        self.assertTrue(self.hasher.check(pw_hash, 'secret'))
+        self.assertFalse(self.hasher.check(pw_hash, 'not secret'))
+        self.assertFalse(self.hasher.check('not a hash', 'secret'))
+        self.assertFalse(self.hasher.needs_rehash(pw_hash))
+        self.assertTrue(PasswordHasher(rounds=5).needs_rehash(pw_hash))
+        self.assertEqual(self.hasher.pending, 0)
+
+    def test_rejects_beyond_max_pending(self):
+        self.hasher.pending = 2
+        with self.assertRaises(PasswordHasherBusy):
+            self.hasher.hash('secret')
+
+    def test_timed_out_hash_holds_slot_until_done(self):
+        self.hasher.timeout = 0.05
+        with self.assertRaises(PasswordHasherBusy):
+            self.hasher._run(time.sleep, 0.5)
+        self.assertEqual(self.hasher.pending, 1)
+
+        deadline = time.monotonic() + 5
+        while self.hasher.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.assertEqual(self.hasher.pending, 0)
+
+
+class CountingRedis(fakeredis.FakeStrictRedis):
+    """An in-memory Redis that runs Lua scripts, counting the round trips."""
+
+    def __init__(self, *args, **kwargs):
+        super(CountingRedis, self).__init__(*args, **kwargs)
+        self.calls = 0
+
+    def execute_command(self, *args, **kwargs):
+        self.calls += 1
+        return super(CountingRedis, self).execute_command(*args, **kwargs)
+
+
+class RateLimiterTest(ApiTestCase):
+
+    def hammer(self, limiter, threads=20, requests=10):
+        def take(_):
+            return limiter.take('rate_limit:test:ip:127.0.0.1', 50, 3600)[0]
+
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            return list(executor.map(take, range(threads * requests)))
+
+    def test_local_buckets_under_concurrency(self):
+        results = self.hammer(RateLimiter())
+        self.assertEqual(results.count(True), 50)
+
+    def use_redis(self):
+        app.config['SHARED_CACHE_ENABLED'] = True
+        reset_redis_backoff()
+        return CountingRedis()
+
+    def test_redis_buckets_under_concurrency(self):
+        client = self.use_redis()
+
+        results = self.hammer(RateLimiter(client=client))
+
+        self.assertEqual(results.count(True), 50)
+        # One round trip per request
+        self.assertEqual(client.calls, len(results))
+
+    def test_refill(self):
+        limiter = RateLimiter()
+        with patch('app.utils.rate_limit.time.time', return_value=1000.0):
+            self.assertEqual([limiter.take('key', 2, 10)[0] for _ in range(3)], [True, True, False])
+        with patch('app.utils.rate_limit.time.time', return_value=1005.0):
+            self.assertEqual([limiter.take('key', 2, 10)[0] for _ in range(2)], [True, False])
+
+    def test_script_matches_local_buckets(self):
+        """The Lua script and the buckets kept without Redis agree request by request."""
+        in_redis = RateLimiter(client=self.use_redis())
+        local = RateLimiter()
+
+        for now in [1000.0, 1000.0, 1000.1, 1000.1, 1000.1, 1002.5, 1002.5, 1009.0, 1030.0, 1030.0]:
+            with patch('app.utils.rate_limit.time.time', return_value=now):
+                redis_allowed, redis_tokens = in_redis.take('key', 3, 10)
+                app.config['SHARED_CACHE_ENABLED'] = False
+                local_allowed, local_tokens = local.take('key', 3, 10)
+                app.config['SHARED_CACHE_ENABLED'] = True
+            self.assertEqual(redis_allowed, local_allowed)
+            self.assertAlmostEqual(redis_tokens, local_tokens, places=6)
+
+    def test_malformed_limits_skipped(self):
+        """Malformed RATE_LIMITS entries are skipped with a warning instead of failing every request."""
+        with patch('app.utils.rate_limit.LOGGER') as logger:
+            limits = _parse_limits('AuthenticationAPI.post=50/60, Broken.post=50, Zero.post=0/60,Other.get=x/60,')
+
+        self.assertEqual(limits, {'AuthenticationAPI.post': (50, 60)})
+        self.assertEqual(logger.warning.call_count, 3)
+
+    def test_malformed_limits_fall_back_to_declared(self):
+        app.config['RATE_LIMIT_ENABLED'] = True
+        app.config['RATE_LIMITS'] = 'AuthenticationAPI.post=lots'
+
+        response = self.app.post('/api/v1/authenticate', data={'email': 'nobody@user.com', 'password': 'wrong'})
+
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.headers['X-RateLimit-Limit'], '30')
+
+
+class SpreadsheetsTest(unittest.TestCase):
+
+    def test_csv_streamed_in_chunks(self):
+        consumed = []
+
+        def rows():
+            for i in range(450):
+                consumed.append(i)
+                yield [i, 'row {}'.format(i)]
+
+        chunks = spreadsheets.stream_csv(['id', 'name'], rows())
+        self.assertEqual(next(chunks), '\ufeffid,name\r\n'.encode('utf-8'))
+        self.assertEqual(consumed, [])
+        self.assertEqual(len(list(chunks)), 3)
+
+    def test_csv_formulas_escaped(self):
+        data = b''.join(spreadsheets.stream_csv(['a', 'b'], [['=1+1', -1]])).decode('utf-8-sig')
+        self.assertEqual(data, "a,b\r\n'=1+1,-1\r\n")
+
+    def test_xlsx_readable(self):
+        rows = [[i, 'row <{}>'.format(i), i % 2 == 0, None] for i in range(450)]
+        data = b''.join(spreadsheets.stream_xlsx(['id', 'name', 'even', 'empty'], rows, sheet_name='A/B'))
+
+        with zipfile.ZipFile(io.BytesIO(data)) as workbook:
+            self.assertIn('name="A B"', workbook.read('xl/workbook.xml').decode('utf-8'))
+            sheet = ElementTree.fromstring(workbook.read('xl/worksheets/sheet1.xml'))
+
+        namespace = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+        parsed = [[''.join(cell.itertext()) for cell in row] for row in sheet.iter(namespace + 'row')]
+        self.assertEqual(len(parsed), 451)
+        self.assertEqual(parsed[0], ['id', 'name', 'even', 'empty'])
+        self.assertEqual(parsed[450], ['449', 'row <449>', '0', ''])
+
+
 class BuildResponseHTMLTest(ApiTestCase):
     """
     Test HTML builder functionality for the application information as well as 
@@ -0,0 +1,131 @@
+"""Bulk loading of the translations of translated models.
+
+Events, questions, sections, review sections, review questions and tags keep their translations
+in a lazy='dynamic' relationship, so looking up a translation used to cost a query every time.
+TranslatedMixin's lookups instead go through translations_of(), which loads translations in bulk
+and keeps them for the rest of the session, i.e. the request.
+
+The first lookup for a model loads the translations of every instance of that model in the
+session at once. Serializing a form or a list therefore costs one query per translated model
+rather than one per object and language, without the callers having to know. preload() loads
+the translations of a given set of ids up front, for callers that know what they need before
+the objects are loaded.
+
+The loaded translations are forgotten whenever the session flushes, commits or rolls back, or
+runs a bulk update or delete, so a request never sees translations it has just changed.
+"""
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app import db
+
+
+DEFAULT_LANGUAGE = 'en'
+
+# Keep IN clauses well below the limits of the database drivers
+_CHUNK_SIZE = 500
+
+_INFO_KEY = 'translations'
+
+
+class TranslatedMixin():
+    """Lookups of a model's translations, kept in the relationship named by __translations__."""
+
+    __translations__ = 'translations'
+
+    def translation_map(self):
+        """{language: translation} for the object."""
+        return translations_of(self)
+
+    def get_translation(self, language, fallback_language=None):
+        translations = translations_of(self)
+        translation = translations.get(language)
+        if translation is None and fallback_language is not None:
+            translation = translations.get(fallback_language)
+        return translation
+
+    def has_specific_translation(self, language):
+        return language in translations_of(self)
+
+    def _translations_for_field(self, accessor_fn):
+        return {language: accessor_fn(translation) for language, translation in translations_of(self).items()}
+
+
+def _relationship(model):
+    relationship = model.__mapper__.relationships[model.__translations__]
+    translation_model = relationship.mapper.class_
+    parent_column = relationship.local_remote_pairs[0][1]
+    return translation_model, getattr(translation_model, parent_column.key)
+
+
+def _loaded(session, model):
+    return session.info.setdefault(_INFO_KEY, {}).setdefault(model, {})
+
+
+def _load(session, model, ids):
+    loaded = _loaded(session, model)
+    ids = [id for id in set(ids) if id not in loaded]
+    translation_model, parent_id = _relationship(model)
+
+    for start in range(0, len(ids), _CHUNK_SIZE):
+        chunk = ids[start:start + _CHUNK_SIZE]
+        for id in chunk:
+            loaded[id] = {}
+        for translation in session.query(translation_model).filter(parent_id.in_(chunk)):
+            loaded[getattr(translation, parent_id.key)][translation.language] = translation
+    return loaded
+
+
+def preload(model, ids, session=None):
+    """Load the translations of the model's objects with the given ids, if they aren't loaded yet."""
+    _load(session or db.session(), model, ids)
+
+
+def translations_of(obj):
+    """{language: translation} for a translated object, loaded along with every object of its model in the session."""
+    session = object_session(obj)
+    model = type(obj)
+    if session is None or obj.id is None:
+        # Not saved yet, so there is nothing to batch with
+        return {translation.language: translation for translation in getattr(obj, model.__translations__)}
+
+    translations = _loaded(session, model).get(obj.id)
+    if translations is None:
+        ids = [other.id for other in list(session.identity_map.values())
+               if type(other) is model and other.id is not None]
+        ids.append(obj.id)
+        translations = _load(session, model, ids)[obj.id]
+    return translations
+
+
+def get_translations(model, ids, language, fallback_language=DEFAULT_LANGUAGE, session=None):
+    """{id: translation} in the language, or else the fallback language, for the model's objects with the ids."""
+    loaded = _load(session or db.session(), model, ids)
+    by_id = {}
+    for id in ids:
+        translations = loaded.get(id, {})
+        translation = translations.get(language) or translations.get(fallback_language)
+        if translation is not None:
+            by_id[id] = translation
+    return by_id
+
+
+def clear(session=None):
+    """Forget the translations loaded in the session."""
+    (session or db.session()).info.pop(_INFO_KEY, None)
+
+
+def _forget(session, *args):
+    clear(session)
+
+
+def _forget_after_bulk(context):
+    clear(context.session)
+
+
+event.listen(Session, 'after_flush', _forget)
+event.listen(Session, 'after_commit', _forget)
+event.listen(Session, 'after_rollback', _forget)
+event.listen(Session, 'after_bulk_update', _forget_after_bulk)
+event.listen(Session, 'after_bulk_delete', _forget_after_bulk)
@@ -23,6 +23,77 @@ SMTP_SENDER_NAME = os.getenv('SMTP_SENDER_NAME', None)
 SMTP_SENDER_EMAIL = os.getenv('SMTP_SENDER_EMAIL', None)
 SMTP_HOST = os.getenv('SMTP_HOST', None)
 SMTP_PORT = os.getenv('SMTP_PORT', None)
+SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 2))
+SMTP_POOL_MAX_MESSAGES_PER_SESSION = int(os.getenv('SMTP_POOL_MAX_MESSAGES_PER_SESSION', 100))
+SMTP_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv('SMTP_POOL_HEALTH_CHECK_INTERVAL', 30))
+
+# When enabled, email_user queues emails in the outbox table and an outbox worker
+# (python run.py outbox_worker) must be running to deliver them.
+EMAIL_OUTBOX_ENABLED = os.getenv('EMAIL_OUTBOX_ENABLED', '').lower() not in ('', '0', 'false')
+OUTBOX_WORKER_CONCURRENCY = int(os.getenv('OUTBOX_WORKER_CONCURRENCY', SMTP_POOL_SIZE))
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', 50))
+OUTBOX_POLL_INTERVAL = int(os.getenv('OUTBOX_POLL_INTERVAL', 5))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', 5))
+OUTBOX_BACKOFF_SECONDS = int(os.getenv('OUTBOX_BACKOFF_SECONDS', 60))
+OUTBOX_STALE_AFTER_SECONDS = int(os.getenv('OUTBOX_STALE_AFTER_SECONDS', 600))
+
+# Seconds a resolved email template is cached for in each process
+EMAIL_TEMPLATE_CACHE_TTL = int(os.getenv('EMAIL_TEMPLATE_CACHE_TTL', 300))
+
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+# Seconds to stop using Redis for after a failed call
+REDIS_RETRY_INTERVAL = int(os.getenv('REDIS_RETRY_INTERVAL', 30))
+
+# Seconds a serialized review form is kept in Redis after it was last built
+REVIEW_FORM_CACHE_TTL = int(os.getenv('REVIEW_FORM_CACHE_TTL', 86400))
+
+# Seconds a serialized application form is kept in Redis after it was last built
+APPLICATION_FORM_CACHE_TTL = int(os.getenv('APPLICATION_FORM_CACHE_TTL', 86400))
+
+# Seconds browsers and proxies may reuse the content lists (countries, titles, etc.), and how
+# often each worker checks whether `python run.py rebuild_content` asked it to rebuild them
+CONTENT_MAX_AGE = int(os.getenv('CONTENT_MAX_AGE', 86400))
+CONTENT_VERSION_CHECK_INTERVAL = int(os.getenv('CONTENT_VERSION_CHECK_INTERVAL', 30))
+
+# Seconds the event dashboard statistics are served from the cache before being recomputed, and
+# for how long a stale snapshot may still be served while it is recomputed
+EVENT_STATS_CACHE_TTL = int(os.getenv('EVENT_STATS_CACHE_TTL', 30))
+EVENT_STATS_STALE_TTL = int(os.getenv('EVENT_STATS_STALE_TTL', 600))
+# Recompute stale statistics in a background thread instead of in the request that found them stale
+EVENT_STATS_BACKGROUND_REFRESH = os.getenv('EVENT_STATS_BACKGROUND_REFRESH', '').lower() not in ('', '0', 'false')
+
+# Turn off the endpoints' rate limits (the tests do), and override them per route, e.g.
+# RATE_LIMITS='AuthenticationAPI.post=50/60,PasswordResetRequestAPI.post=10/300'
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() != 'false'
+RATE_LIMITS = os.getenv('RATE_LIMITS', '')
+
+# Number of proxies (the load balancer) in front of the app that append to X-Forwarded-For, 0 if none
+PROXY_FIX_X_FOR = int(os.getenv('PROXY_FIX_X_FOR', 1))
+
+# Seconds each worker keeps the organisations for, and remembers that a domain has none
+ORGANISATION_CACHE_TTL = int(os.getenv('ORGANISATION_CACHE_TTL', 300))
+ORGANISATION_NEGATIVE_CACHE_TTL = int(os.getenv('ORGANISATION_NEGATIVE_CACHE_TTL', 60))
+
+# Seconds a user's event roles are kept in Redis. Role changes made through the app take effect
+# straight away; bulk changes made directly in the database take effect within this time
+ROLE_CACHE_TTL = int(os.getenv('ROLE_CACHE_TTL', 60))
+
+# bcrypt cost factor of new password hashes. Existing hashes are upgraded as their users log in
+BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+# Processes hashing passwords in each web worker, how many hashes may be queued or running in a
+# worker before further logins are turned away with a 503, how long a login waits for its hash,
+# and the Retry-After sent with the 503
+PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 8))
+PASSWORD_HASH_TIMEOUT = int(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+PASSWORD_HASH_RETRY_AFTER = int(os.getenv('PASSWORD_HASH_RETRY_AFTER', 5))
+# Hash passwords in the calling thread instead of in the pool (used by the tests)
+PASSWORD_HASH_RUN_INLINE = False
+
+EMAIL_CAMPAIGN_CHUNK_SIZE = int(os.getenv('EMAIL_CAMPAIGN_CHUNK_SIZE', 200))
+EMAIL_CAMPAIGN_MAX_PER_SECOND = float(os.getenv('EMAIL_CAMPAIGN_MAX_PER_SECOND', 10))
+# Run campaigns in the calling thread instead of in the background (used by the tests)
+EMAIL_CAMPAIGN_RUN_INLINE = False
 
 GCP_CREDENTIALS_DICT = {
     'type': 'service_account',
@@ -1,5 +1,11 @@
 """Gunicorn configuration."""
 
+import os
+
 forwarded_allow_ips = '*'
 secure_scheme_headers = {'X-Forwarded-Proto': 'https'}
 workers = 4
+# Threads per worker, so that a worker keeps serving while some of its requests wait for
+# password hashes (see app/utils/passwords.py)
+worker_class = 'gthread'
+threads = int(os.getenv('GUNICORN_THREADS', 4))
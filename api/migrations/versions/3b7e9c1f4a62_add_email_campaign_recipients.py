@@ -0,0 +1,66 @@
+"""Add per-recipient status, pausing and rate limits to email campaigns
+
+Revision ID: 3b7e9c1f4a62
+Revises: 8d41b6e2c3a5
+Create Date: 2026-10-18 14:12:38.204115
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '3b7e9c1f4a62'
+down_revision = '8d41b6e2c3a5'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+campaign_recipient_status = postgresql.ENUM('PENDING', 'SENT', 'FAILED', name='campaign_recipient_status')
+
+
+def upgrade():
+    op.execute("COMMIT")
+    op.execute("ALTER TYPE campaign_status ADD VALUE 'PAUSED'")
+    op.execute("ALTER TYPE campaign_status ADD VALUE 'CANCELLED'")
+
+    op.alter_column('email_campaign', 'template_key', existing_type=sa.String(length=50), nullable=True)
+    op.add_column('email_campaign', sa.Column('subject', sa.String(), nullable=True))
+    op.add_column('email_campaign', sa.Column('body', sa.String(), nullable=True))
+    op.add_column('email_campaign', sa.Column('max_per_second', sa.Float(), nullable=False, server_default='10'))
+    op.add_column('email_campaign', sa.Column('generation', sa.Integer(), nullable=False, server_default='0'))
+    op.alter_column('email_campaign', 'max_per_second', server_default=None)
+    op.alter_column('email_campaign', 'generation', server_default=None)
+
+    op.create_table('email_campaign_recipient',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('campaign_id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.Enum('PENDING', 'SENT', 'FAILED', name='campaign_recipient_status'), nullable=False),
+    sa.Column('error', sa.String(), nullable=True),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['campaign_id'], ['email_campaign.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['app_user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('campaign_id', 'user_id', name='uq_email_campaign_recipient_campaign_id_user_id')
+    )
+    op.create_index('ix_email_campaign_recipient_campaign_id_status', 'email_campaign_recipient',
+                    ['campaign_id', 'status', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_email_campaign_recipient_campaign_id_status', table_name='email_campaign_recipient')
+    op.drop_table('email_campaign_recipient')
+    campaign_recipient_status.drop(op.get_bind())
+
+    op.drop_column('email_campaign', 'generation')
+    op.drop_column('email_campaign', 'max_per_second')
+    op.drop_column('email_campaign', 'body')
+    op.drop_column('email_campaign', 'subject')
+    op.execute("DELETE FROM email_campaign WHERE template_key IS NULL")
+    op.alter_column('email_campaign', 'template_key', existing_type=sa.String(length=50), nullable=False)
+
+    op.execute("UPDATE email_campaign SET status = 'FAILED' WHERE status IN ('PAUSED', 'CANCELLED')")
+    op.execute("""DELETE FROM pg_enum
+WHERE enumlabel IN ('PAUSED', 'CANCELLED')
+AND enumtypid = (
+  SELECT oid FROM pg_type WHERE typname = 'campaign_status'
+)""")
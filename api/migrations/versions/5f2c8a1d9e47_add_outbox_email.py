@@ -0,0 +1,47 @@
+"""Add outbox_email table for queued email delivery
+
+Revision ID: 5f2c8a1d9e47
+Revises: 9143756e596d
+Create Date: 2026-10-18 09:12:41.318204
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '5f2c8a1d9e47'
+down_revision = '9143756e596d'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+outbox_status = postgresql.ENUM('PENDING', 'SENDING', 'SENT', 'DEAD', name='outbox_status')
+
+
+def upgrade():
+    op.create_table('outbox_email',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('recipient', sa.String(length=255), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('body_text', sa.String(), nullable=False),
+    sa.Column('body_html', sa.String(), nullable=False),
+    sa.Column('sender_name', sa.String(length=100), nullable=False),
+    sa.Column('sender_email', sa.String(length=255), nullable=False),
+    sa.Column('attachment_name', sa.String(length=255), nullable=True),
+    sa.Column('attachment', sa.LargeBinary(), nullable=True),
+    sa.Column('template_key', sa.String(length=50), nullable=True),
+    sa.Column('status', sa.Enum('PENDING', 'SENDING', 'SENT', 'DEAD', name='outbox_status'), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(), nullable=False),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('sent_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_outbox_email_status_next_attempt_at', 'outbox_email', ['status', 'next_attempt_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_outbox_email_status_next_attempt_at', table_name='outbox_email')
+    op.drop_table('outbox_email')
+    outbox_status.drop(op.get_bind())
@@ -0,0 +1,47 @@
+"""Add email_campaign table for background reminder campaigns
+
+Revision ID: 8d41b6e2c3a5
+Revises: 5f2c8a1d9e47
+Create Date: 2026-10-18 10:41:07.552918
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = '8d41b6e2c3a5'
+down_revision = '5f2c8a1d9e47'
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+campaign_status = postgresql.ENUM('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='campaign_status')
+
+
+def upgrade():
+    op.create_table('email_campaign',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=True),
+    sa.Column('organisation_id', sa.Integer(), nullable=False),
+    sa.Column('segment', sa.String(length=50), nullable=False),
+    sa.Column('template_key', sa.String(length=50), nullable=False),
+    sa.Column('template_parameters', sa.JSON(), nullable=False),
+    sa.Column('status', sa.Enum('QUEUED', 'RUNNING', 'COMPLETED', 'FAILED', name='campaign_status'), nullable=False),
+    sa.Column('total_recipients', sa.Integer(), nullable=False),
+    sa.Column('sent_count', sa.Integer(), nullable=False),
+    sa.Column('failed_count', sa.Integer(), nullable=False),
+    sa.Column('last_recipient_id', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_by_user_id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['created_by_user_id'], ['app_user.id'], ),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.ForeignKeyConstraint(['organisation_id'], ['organisation.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('email_campaign')
+    campaign_status.drop(op.get_bind())
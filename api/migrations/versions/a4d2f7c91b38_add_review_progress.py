@@ -0,0 +1,53 @@
+"""Add per-reviewer review progress counters
+
+Revision ID: a4d2f7c91b38
+Revises: 3b7e9c1f4a62
+Create Date: 2026-10-18 16:02:51.117342
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a4d2f7c91b38'
+down_revision = '3b7e9c1f4a62'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_table('review_progress',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('event_id', sa.Integer(), nullable=False),
+    sa.Column('reviewer_user_id', sa.Integer(), nullable=False),
+    sa.Column('reviews_allocated', sa.Integer(), nullable=False),
+    sa.Column('reviews_started', sa.Integer(), nullable=False),
+    sa.Column('reviews_submitted', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['event_id'], ['event.id'], ),
+    sa.ForeignKeyConstraint(['reviewer_user_id'], ['app_user.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('event_id', 'reviewer_user_id', name='uq_review_progress_event_reviewer')
+    )
+
+    op.execute("""
+        INSERT INTO review_progress (event_id, reviewer_user_id, reviews_allocated, reviews_started, reviews_submitted)
+        SELECT event_id, reviewer_user_id, sum(allocated), sum(started), sum(submitted)
+        FROM (
+            SELECT application_form.event_id, response_reviewer.reviewer_user_id,
+                   1 AS allocated, 0 AS started, 0 AS submitted
+            FROM response_reviewer
+            JOIN response ON response.id = response_reviewer.response_id
+            JOIN application_form ON application_form.id = response.application_form_id
+            WHERE response_reviewer.active
+            UNION ALL
+            SELECT application_form.event_id, review_response.reviewer_user_id,
+                   0, 1, CASE WHEN review_response.is_submitted THEN 1 ELSE 0 END
+            FROM review_response
+            JOIN response ON response.id = review_response.response_id
+            JOIN application_form ON application_form.id = response.application_form_id
+        ) AS counts
+        GROUP BY event_id, reviewer_user_id
+    """)
+
+
+def downgrade():
+    op.drop_table('review_progress')
@@ -0,0 +1,24 @@
+"""Add the Stripe account id of organisations, indexed to resolve webhooks
+
+Revision ID: a4f19c2e7b53
+Revises: e5b8a3d60c14
+Create Date: 2026-10-18 21:14:09.512734
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a4f19c2e7b53'
+down_revision = 'e5b8a3d60c14'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('organisation', sa.Column('stripe_account_id', sa.String(length=100), nullable=True))
+    op.create_index('ix_organisation_stripe_account_id', 'organisation', ['stripe_account_id'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_organisation_stripe_account_id', table_name='organisation')
+    op.drop_column('organisation', 'stripe_account_id')
@@ -0,0 +1,33 @@
+"""Add a numeric copy of review score values and index active scores
+
+Revision ID: c7e31b5d8f20
+Revises: a4d2f7c91b38
+Create Date: 2026-10-18 17:21:09.448730
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c7e31b5d8f20'
+down_revision = 'a4d2f7c91b38'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.add_column('review_score', sa.Column('numeric_value', sa.Float(), nullable=True))
+
+    # Values that aren't plain decimal numbers stay null, as misc.try_parse_number would leave them
+    op.execute("""
+        UPDATE review_score
+        SET numeric_value = CAST(trim(value) AS double precision)
+        WHERE trim(value) ~ '^[-+]?([0-9]+\\.?[0-9]*|\\.[0-9]+)([eE][-+]?[0-9]+)?$'
+    """)
+
+    op.create_index('ix_review_score_response_question_active', 'review_score',
+                    ['review_response_id', 'review_question_id', 'is_active'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_review_score_response_question_active', table_name='review_score')
+    op.drop_column('review_score', 'numeric_value')
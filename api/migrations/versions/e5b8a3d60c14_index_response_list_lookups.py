@@ -0,0 +1,28 @@
+"""Index the lookups made when listing an event's responses
+
+Revision ID: e5b8a3d60c14
+Revises: c7e31b5d8f20
+Create Date: 2026-10-18 19:02:41.226318
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'e5b8a3d60c14'
+down_revision = 'c7e31b5d8f20'
+
+from alembic import op
+import sqlalchemy as sa
+
+
+def upgrade():
+    op.create_index('ix_response_application_form_id_id', 'response', ['application_form_id', 'id'], unique=False)
+    op.create_index('ix_answer_response_id_question_id', 'answer', ['response_id', 'question_id'], unique=False)
+    op.create_index('ix_response_tag_response_id', 'response_tag', ['response_id'], unique=False)
+    op.create_index('ix_response_reviewer_response_id', 'response_reviewer', ['response_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_response_reviewer_response_id', table_name='response_reviewer')
+    op.drop_index('ix_response_tag_response_id', table_name='response_tag')
+    op.drop_index('ix_answer_response_id_question_id', table_name='answer')
+    op.drop_index('ix_response_application_form_id_id', table_name='response')